@@ -0,0 +1,48 @@
+import hashid_field.field
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentfulSyncState",
+            fields=[
+                ("id", models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ("sync_token", models.TextField(blank=True, default="")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ContentItem",
+            fields=[
+                (
+                    "id",
+                    hashid_field.field.HashidAutoField(
+                        alphabet="abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890",
+                        min_length=7,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("external_id", models.CharField(max_length=64, unique=True)),
+                ("content_type", models.CharField(db_index=True, max_length=64)),
+                ("slug", models.SlugField(blank=True, max_length=255)),
+                ("fields", models.JSONField(default=dict)),
+                ("is_published", models.BooleanField(db_index=True, default=True)),
+                ("content_hash", models.CharField(blank=True, default="", max_length=64)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(fields=["content_type", "is_published"], name="content_con_content_9af264_idx")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0002_contentitem_contentfulsyncstate"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="contentitem",
+            name="content_con_content_9af264_idx",
+        ),
+        migrations.AddIndex(
+            model_name="contentitem",
+            index=models.Index(
+                fields=["content_type", "is_published", "-created_at", "-id"], name="content_item_type_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contentitem",
+            index=models.Index(fields=["is_published", "-created_at", "-id"], name="content_item_created"),
+        ),
+    ]
@@ -32,23 +32,49 @@ class ContentItem(models.Model):
     fields = models.JSONField(default=dict)
     is_published = models.BooleanField(default=True, db_index=True)
 
+    # sha256 of content type and fields, lets the sync skip entries that didn't change
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["content_type", "is_published"]),
+            # Keyset pagination of published items, all of them or of a content type
+            models.Index(
+                fields=["content_type", "is_published", "-created_at", "-id"], name="content_item_type_created"
+            ),
+            models.Index(fields=["is_published", "-created_at", "-id"], name="content_item_created"),
         ]
 
     def save(self, *args, **kwargs):
-        if not self.slug and "title" in self.fields:
-            self.slug = slugify(self.fields["title"])[:255]
+        if not self.slug:
+            self.slug = self.get_default_slug(self.fields)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.fields.get("title", str(self.id))
 
+    @staticmethod
+    def get_default_slug(fields: dict) -> str:
+        if "title" not in fields:
+            return ""
+        return slugify(fields["title"])[:255]
+
+
+class ContentfulSyncState(models.Model):
+    """
+    Sync API token of a Contentful space and environment. The next sync fetches only entries changed after it.
+    """
+
+    id = models.CharField(max_length=255, primary_key=True)
+    sync_token = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.id
+
 
 class Document(models.Model):
     """User-uploaded document."""
@@ -70,6 +96,9 @@ class Document(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="document_user_created"),
+        ]
 
     def save(self, *args, **kwargs):
         if self.file:
@@ -1,4 +1,5 @@
 from django.conf import settings
+from hashid_field import rest as hidrest
 from rest_framework import serializers
 
 from . import models, tasks
@@ -14,6 +15,8 @@ class ContentfulWebhookSerializer(serializers.Serializer):
 class ContentItemSerializer(serializers.ModelSerializer):
     """Serializer for ContentItem model."""
 
+    id = hidrest.HashidSerializerCharField(source_field="content.ContentItem.id", read_only=True)
+
     class Meta:
         model = models.ContentItem
         fields = ["id", "external_id", "content_type", "slug", "fields", "is_published", "created_at", "updated_at"]
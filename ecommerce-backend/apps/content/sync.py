@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+from collections import Counter
+from collections.abc import Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from apps.websockets.topics import publish_topic_event
+
+from .models import ContentfulSyncState, ContentItem
+
+logger = logging.getLogger(__name__)
+
+# Columns overwritten when an entry already exists. The slug is kept, the same way ContentItem.save() keeps it.
+UPDATED_FIELDS = ["content_type", "fields", "content_hash", "is_published", "updated_at"]
+
+
+def get_content_hash(content_type: str, fields: dict) -> str:
+    payload = json.dumps([content_type, fields], sort_keys=True, separators=(",", ":"), cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def publish_content_updates(items: Iterable[ContentItem]):
+    """
+    Tells the clients subscribed to ``content:<content_type>`` which items of the content type changed.
+    """
+    external_ids = {}
+    for item in items:
+        external_ids.setdefault(item.content_type, []).append(item.external_id)
+    for content_type, ids in external_ids.items():
+        publish_topic_event(f"content:{content_type}", "content_update", {"external_ids": ids})
+
+
+def chunked(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class ContentItemSync:
+    """
+    Applies Contentful Sync API pages to ``ContentItem`` rows.
+
+    A delta sync continues from the stored sync token and receives only entries published or deleted since then. Each
+    page is applied in one transaction together with the token it carries, so an interrupted sync continues from the
+    last applied page. Without a token (or with ``full=True``) an initial sync of the whole space is done; entries that
+    were not part of it are unpublished at the end and the token is stored only once the full sync is complete.
+
+    Entries are written in chunks with a single upsert per chunk. Entries whose content hash matches the stored row are
+    skipped.
+    """
+
+    def __init__(self, service, chunk_size: int = None):
+        self.service = service
+        self.chunk_size = chunk_size or settings.CONTENT_SYNC_CHUNK_SIZE
+        self.stats = Counter()
+
+    @property
+    def state_id(self) -> str:
+        return f"{self.service.space_id}:{self.service.environment}"
+
+    def run(self, full: bool = False) -> dict:
+        state, _ = ContentfulSyncState.objects.get_or_create(pk=self.state_id)
+        sync_token = None if full else state.sync_token or None
+        self.stats = Counter(full=int(sync_token is None))
+
+        if sync_token is None:
+            self._run_full(state)
+        else:
+            self._run_delta(state, sync_token)
+
+        return {
+            "synced_count": self.stats["synced"],
+            "updated_count": self.stats["updated"],
+            "unpublished_count": self.stats["unpublished"],
+            "full": bool(self.stats["full"]),
+        }
+
+    def _run_delta(self, state: ContentfulSyncState, sync_token: str):
+        for page in self.service.sync(sync_token):
+            with transaction.atomic():
+                self.apply_entries(page.entries)
+                self.unpublish(page.deleted_ids)
+                state.sync_token = page.sync_token
+                state.save(update_fields=["sync_token", "updated_at"])
+
+    def _run_full(self, state: ContentfulSyncState):
+        synced_ids = set()
+        sync_token = None
+        for page in self.service.sync():
+            with transaction.atomic():
+                self.apply_entries(page.entries)
+                self.unpublish(page.deleted_ids)
+            synced_ids.update(entry["id"] for entry in page.entries)
+            sync_token = page.sync_token
+
+        if sync_token is None:
+            return
+
+        with transaction.atomic():
+            self.unpublish_missing(synced_ids)
+            state.sync_token = sync_token
+            state.save(update_fields=["sync_token", "updated_at"])
+
+    def apply_entries(self, entries: list[dict]):
+        for chunk in chunked(entries, self.chunk_size):
+            self.stats["synced"] += len(chunk)
+            self.stats["updated"] += self._upsert(chunk)
+
+    def _upsert(self, entries: list[dict]) -> int:
+        # A page may contain the same entry more than once, the last version wins
+        items = {}
+        for entry in entries:
+            items[entry["id"]] = ContentItem(
+                external_id=entry["id"],
+                content_type=entry["content_type"],
+                fields=entry["fields"],
+                slug=ContentItem.get_default_slug(entry["fields"]),
+                content_hash=get_content_hash(entry["content_type"], entry["fields"]),
+                is_published=True,
+            )
+
+        current_hashes = dict(
+            ContentItem.objects.filter(external_id__in=items.keys(), is_published=True).values_list(
+                "external_id", "content_hash"
+            )
+        )
+        changed_items = [item for item in items.values() if current_hashes.get(item.external_id) != item.content_hash]
+        if changed_items:
+            ContentItem.objects.bulk_create(
+                changed_items, update_conflicts=True, unique_fields=["external_id"], update_fields=UPDATED_FIELDS
+            )
+            transaction.on_commit(lambda: publish_content_updates(changed_items))
+        return len(changed_items)
+
+    def unpublish(self, external_ids: Iterable[str]):
+        for chunk in chunked(list(external_ids), self.chunk_size):
+            self.stats["unpublished"] += ContentItem.objects.filter(external_id__in=chunk, is_published=True).update(
+                is_published=False
+            )
+
+    def unpublish_missing(self, synced_ids: set[str]):
+        published_ids = (
+            ContentItem.objects.filter(is_published=True)
+            .values_list("external_id", flat=True)
+            .iterator(chunk_size=self.chunk_size)
+        )
+        self.unpublish([external_id for external_id in published_ids if external_id not in synced_ids])
@@ -0,0 +1,54 @@
+from apps.integrations.services.contentful_service import ContentfulSyncPage
+
+
+class FakeContentfulService:
+    """
+    In-memory stand-in for ``ContentfulService.sync``.
+
+    Every publish and delete is appended to a change log and a sync token is a position in it, so a delta sync returns
+    the latest state of entries changed after the token, the same way the Contentful Sync API does.
+    """
+
+    space_id = "fake-space"
+    environment = "master"
+
+    def __init__(self, entries_count: int = 0, page_size: int = 1000):
+        self.page_size = page_size
+        self.entries = {}
+        self.changelog = []
+        self.fail_after_pages = None
+        for index in range(entries_count):
+            self.publish_entry(f"entry-{index}", {"title": f"Entry {index}", "body": f"Body of entry {index}"})
+
+    def is_configured(self) -> bool:
+        return True
+
+    def publish_entry(self, entry_id: str, fields: dict, content_type: str = "page"):
+        self.entries[entry_id] = {"id": entry_id, "content_type": content_type, "fields": fields}
+        self.changelog.append(entry_id)
+
+    def delete_entry(self, entry_id: str):
+        del self.entries[entry_id]
+        self.changelog.append(entry_id)
+
+    def sync(self, sync_token: str | None = None):
+        start = int(sync_token) if sync_token else 0
+        # Latest position of every entry changed after the token
+        changes = {entry_id: position for position, entry_id in enumerate(self.changelog[start:], start=start)}
+        if sync_token is None:
+            changes = {entry_id: position for entry_id, position in changes.items() if entry_id in self.entries}
+
+        changed_ids = sorted(changes, key=changes.get)
+        for page_number, page_start in enumerate(range(0, max(len(changed_ids), 1), self.page_size)):
+            if self.fail_after_pages is not None and page_number >= self.fail_after_pages:
+                raise ConnectionError("Contentful is not reachable")
+
+            page_ids = changed_ids[page_start : page_start + self.page_size]
+            has_more = page_start + self.page_size < len(changed_ids)
+            page_end = changes[page_ids[-1]] + 1 if has_more else len(self.changelog)
+            yield ContentfulSyncPage(
+                sync_token=str(page_end),
+                entries=[self.entries[entry_id] for entry_id in page_ids if entry_id in self.entries],
+                deleted_ids=[entry_id for entry_id in page_ids if entry_id not in self.entries],
+                has_more=has_more,
+            )
@@ -0,0 +1,141 @@
+import pytest
+
+from apps.tasks.content_tasks import sync_content
+
+from ..models import ContentfulSyncState, ContentItem
+from ..sync import ContentItemSync
+from .fakes import FakeContentfulService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def contentful():
+    return FakeContentfulService(entries_count=25, page_size=10)
+
+
+def get_published_ids():
+    return set(ContentItem.objects.filter(is_published=True).values_list("external_id", flat=True))
+
+
+class TestContentItemSync:
+    def test_initial_sync_creates_all_entries(self, contentful):
+        result = ContentItemSync(contentful, chunk_size=4).run()
+
+        assert result == {"synced_count": 25, "updated_count": 25, "unpublished_count": 0, "full": True}
+        assert get_published_ids() == set(contentful.entries)
+        item = ContentItem.objects.get(external_id="entry-3")
+        assert item.fields == {"title": "Entry 3", "body": "Body of entry 3"}
+        assert item.slug == "entry-3"
+        assert ContentfulSyncState.objects.get(pk="fake-space:master").sync_token == "25"
+
+    def test_delta_sync_fetches_only_changes(self, contentful):
+        ContentItemSync(contentful).run()
+        contentful.publish_entry("entry-1", {"title": "Entry 1", "body": "Changed"})
+        contentful.publish_entry("entry-new", {"title": "New entry"})
+        contentful.delete_entry("entry-2")
+
+        result = ContentItemSync(contentful).run()
+
+        assert result == {"synced_count": 2, "updated_count": 2, "unpublished_count": 1, "full": False}
+        assert ContentItem.objects.get(external_id="entry-1").fields["body"] == "Changed"
+        assert ContentItem.objects.get(external_id="entry-new").is_published
+        assert not ContentItem.objects.get(external_id="entry-2").is_published
+
+    def test_changed_entries_are_published_to_their_content_type_topics(
+        self, contentful, mocker, django_capture_on_commit_callbacks
+    ):
+        publish = mocker.patch("apps.content.sync.publish_topic_event")
+        ContentItemSync(contentful).run()
+        contentful.publish_entry("entry-1", {"title": "Entry 1", "body": "Changed"})
+        contentful.publish_entry("entry-new", {"title": "New article"}, content_type="article")
+        publish.reset_mock()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ContentItemSync(contentful).run()
+
+        assert sorted(publish.call_args_list) == [
+            mocker.call("content:article", "content_update", {"external_ids": ["entry-new"]}),
+            mocker.call("content:page", "content_update", {"external_ids": ["entry-1"]}),
+        ]
+
+    def test_unchanged_entries_are_skipped(self, contentful):
+        ContentItemSync(contentful).run()
+        updated_at = ContentItem.objects.get(external_id="entry-1").updated_at
+        contentful.publish_entry("entry-1", {"title": "Entry 1", "body": "Body of entry 1"})
+
+        result = ContentItemSync(contentful).run()
+
+        assert result["synced_count"] == 1
+        assert result["updated_count"] == 0
+        assert ContentItem.objects.get(external_id="entry-1").updated_at == updated_at
+
+    def test_republished_entry_is_published_again(self, contentful):
+        ContentItemSync(contentful).run()
+        fields = contentful.entries["entry-1"]["fields"]
+        contentful.delete_entry("entry-1")
+        ContentItemSync(contentful).run()
+        contentful.publish_entry("entry-1", fields)
+
+        ContentItemSync(contentful).run()
+
+        assert ContentItem.objects.get(external_id="entry-1").is_published
+
+    def test_slug_is_kept_on_update(self, contentful):
+        ContentItemSync(contentful).run()
+        contentful.publish_entry("entry-1", {"title": "Renamed"})
+
+        ContentItemSync(contentful).run()
+
+        assert ContentItem.objects.get(external_id="entry-1").slug == "entry-1"
+
+    def test_full_sync_unpublishes_missing_entries(self, contentful):
+        ContentItem.objects.create(external_id="removed", content_type="page", fields={"title": "Removed"})
+
+        result = ContentItemSync(contentful).run(full=True)
+
+        assert result["unpublished_count"] == 1
+        assert not ContentItem.objects.get(external_id="removed").is_published
+
+    def test_interrupted_delta_sync_continues_after_last_applied_page(self, contentful):
+        ContentItemSync(contentful).run()
+        for index in range(15):
+            contentful.publish_entry(f"entry-{index}", {"title": f"Changed {index}"})
+        contentful.fail_after_pages = 1
+
+        with pytest.raises(ConnectionError):
+            ContentItemSync(contentful).run()
+
+        assert ContentfulSyncState.objects.get().sync_token == "35"
+        contentful.fail_after_pages = None
+        result = ContentItemSync(contentful).run()
+        assert result["synced_count"] == 5
+        assert ContentItem.objects.filter(fields__title__startswith="Changed").count() == 15
+
+    def test_delta_sync_of_large_space_runs_constant_number_of_queries(self, django_assert_max_num_queries):
+        contentful = FakeContentfulService(entries_count=100_000)
+        ContentItemSync(contentful).run()
+        assert ContentItem.objects.filter(is_published=True).count() == 100_000
+
+        for index in range(0, 100_000, 1000):
+            contentful.publish_entry(f"entry-{index}", {"title": f"Changed {index}"})
+        contentful.delete_entry("entry-1")
+
+        # state, savepoint, current hashes, upsert, unpublish, save token, release savepoint
+        with django_assert_max_num_queries(7):
+            result = ContentItemSync(contentful).run()
+
+        assert result == {"synced_count": 100, "updated_count": 100, "unpublished_count": 1, "full": False}
+
+
+class TestSyncContentTask:
+    def test_returns_error_when_contentful_is_not_configured(self):
+        assert sync_content() == {"error": "Contentful is not configured"}
+
+    def test_syncs_content(self, contentful, mocker):
+        mocker.patch("apps.integrations.services.contentful_service.ContentfulService", return_value=contentful)
+
+        result = sync_content()
+
+        assert result["synced_count"] == 25
+        assert len(get_published_ids()) == 25
@@ -36,9 +36,9 @@ class ContentItemViewSet(viewsets.ReadOnlyModelViewSet):
         if not content_type:
             return Response({"error": "content_type query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        items = self.get_queryset().filter(content_type=content_type)
+        items = self.paginate_queryset(self.get_queryset().filter(content_type=content_type))
         serializer = self.get_serializer(items, many=True)
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
@@ -83,6 +83,8 @@ class PageViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.PageSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = "slug"
+    # A handful of static pages, listed by title
+    pagination_class = None
 
     def get_queryset(self):
         if self.action in ["list", "retrieve"]:
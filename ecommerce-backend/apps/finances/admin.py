@@ -2,6 +2,8 @@ from django.contrib import admin
 from djstripe import admin as djstripe_admin
 from djstripe import models as djstripe_models
 
+from . import models
+
 admin.site.unregister(djstripe_models.PaymentIntent)
 admin.site.unregister(djstripe_models.Charge)
 
@@ -14,3 +16,18 @@ class PaymentIntentAdmin(djstripe_admin.StripeModelAdmin):
 @admin.register(djstripe_models.Charge)
 class ChargeAdmin(djstripe_admin.StripeModelAdmin):
     change_form_template = "djstripe/charge/admin/change_form.html"
+
+
+@admin.register(models.QueuedWebhookEvent)
+class QueuedWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "event_type", "ordering_key", "stripe_created", "attempts", "processed_at", "failed_at")
+    list_filter = ("event_type",)
+    search_fields = ("event_id", "ordering_key")
+    readonly_fields = ("trigger",)
+
+
+@admin.register(models.TenantEntitlements)
+class TenantEntitlementsAdmin(admin.ModelAdmin):
+    list_display = ("tenant", "plan", "trial_end", "valid_until", "updated_at")
+    list_filter = ("plan",)
+    readonly_fields = ("tenant", "plan", "price_id", "trial_end", "valid_until", "limits", "updated_at")
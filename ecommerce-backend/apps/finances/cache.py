@@ -0,0 +1,263 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from djstripe import models as djstripe_models
+from djstripe.settings import djstripe_settings
+
+from apps.multitenancy.models import Tenant
+from common.cache import MISSING, CacheStats, LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CustomerRef:
+    """
+    Primary key of a tenant's dj-stripe customer, to filter related objects by, and its Stripe id, to call the Stripe
+    API with. Neither changes for the lifetime of the customer.
+    """
+
+    pk: int
+    id: str
+
+    def get_customer(self) -> djstripe_models.Customer:
+        return djstripe_models.Customer.objects.get(pk=self.pk)
+
+
+class CustomerCache:
+    """
+    Two-tier mapping of tenants to their dj-stripe customers, in front of ``Customer.get_or_create``.
+
+    The first tier is an in-process LRU, the second one is the shared ``CACHES["default"]``; the mapping is warmed from
+    the ``djstripe_customer`` table at boot (see ``warm()``) and kept up to date by model signals (see ``signals.py``).
+    A tenant without a customer is resolved under a lock in the shared cache, so concurrent first requests of the
+    tenant create a single Stripe customer: the request holding the lock creates it, the others wait for the mapping.
+    """
+
+    KEY_PREFIX = "stripe_customer"
+
+    def __init__(self):
+        self.local = LocalTTLCache(
+            max_size=settings.STRIPE_CUSTOMER_LOCAL_CACHE_MAX_SIZE,
+            timeout=settings.STRIPE_CUSTOMER_LOCAL_CACHE_TIMEOUT,
+        )
+        self.stats = CacheStats()
+
+    @staticmethod
+    def normalize_tenant_id(tenant_id) -> str | None:
+        try:
+            tenant_pk = Tenant._meta.pk.to_python(tenant_id)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        return str(tenant_pk) if tenant_pk is not None else None
+
+    @classmethod
+    def tenant_key(cls, tenant_pk, livemode: bool = None) -> str:
+        livemode = djstripe_settings.STRIPE_LIVE_MODE if livemode is None else livemode
+        return f"{cls.KEY_PREFIX}:{'live' if livemode else 'test'}:{tenant_pk}"
+
+    @classmethod
+    def lock_key(cls, tenant_pk) -> str:
+        return f"{cls.tenant_key(tenant_pk)}:lock"
+
+    def get(self, tenant) -> CustomerRef:
+        """
+        Returns the customer of the tenant, creating it in Stripe if the tenant doesn't have one yet.
+        """
+        tenant_pk = self.normalize_tenant_id(tenant.pk)
+        key = self.tenant_key(tenant_pk)
+
+        customer_ref = self.local.get(key)
+        if customer_ref is not MISSING:
+            self.stats["local_hits"] += 1
+            return customer_ref
+
+        customer_ref = cache.get(key)
+        if customer_ref is not None:
+            self.stats["shared_hits"] += 1
+            self.local.set(key, customer_ref)
+            return customer_ref
+
+        self.stats["misses"] += 1
+        customer_ref = self._fetch(tenant_pk)
+        if customer_ref is None:
+            return self._create(tenant, tenant_pk)
+
+        self.set(tenant_pk, customer_ref)
+        return customer_ref
+
+    def set(self, tenant_pk, customer_ref: CustomerRef, livemode: bool = None):
+        key = self.tenant_key(self.normalize_tenant_id(tenant_pk), livemode)
+        cache.set(key, customer_ref, timeout=settings.STRIPE_CUSTOMER_CACHE_TIMEOUT)
+        self.local.set(key, customer_ref)
+
+    def invalidate(self, tenant_pk, livemode: bool = None):
+        key = self.tenant_key(self.normalize_tenant_id(tenant_pk), livemode)
+        cache.delete(key)
+        self.local.delete(key)
+
+    def warm(self, batch_size: int = 1000) -> int:
+        """
+        Copies the mapping of all tenants with a customer from the database to the shared cache.
+        """
+        customers = (
+            djstripe_models.Customer.objects.filter(subscriber__isnull=False)
+            .order_by("pk")
+            .values_list("pk", "id", "subscriber", "livemode")
+        )
+        warmed_count = 0
+        batch = list(customers[:batch_size])
+        while batch:
+            cache.set_many(
+                {
+                    self.tenant_key(self.normalize_tenant_id(tenant_pk), livemode): CustomerRef(pk=pk, id=customer_id)
+                    for pk, customer_id, tenant_pk, livemode in batch
+                },
+                timeout=settings.STRIPE_CUSTOMER_CACHE_TIMEOUT,
+            )
+            warmed_count += len(batch)
+            batch = list(customers.filter(pk__gt=batch[-1][0])[:batch_size])
+
+        logger.info(f"Warmed Stripe customers of {warmed_count} tenants")
+        return warmed_count
+
+    def warm_in_background(self):
+        """
+        Warms the shared cache in a thread, once per ``STRIPE_CUSTOMER_CACHE_TIMEOUT`` no matter how many workers boot.
+        """
+        if not cache.add(f"{self.KEY_PREFIX}:warmed", True, timeout=settings.STRIPE_CUSTOMER_CACHE_TIMEOUT):
+            return
+
+        threading.Thread(target=self._warm_safely, name="stripe-customer-cache-warmer", daemon=True).start()
+
+    def clear(self):
+        self.local.clear()
+        self.stats.clear()
+
+    def _warm_safely(self):
+        try:
+            self.warm()
+        except Exception as e:
+            logger.exception(f"Warming Stripe customers failed: {e}")
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _fetch(tenant_pk) -> CustomerRef | None:
+        customer = (
+            djstripe_models.Customer.objects.filter(subscriber=tenant_pk, livemode=djstripe_settings.STRIPE_LIVE_MODE)
+            .values_list("pk", "id")
+            .first()
+        )
+        return CustomerRef(*customer) if customer else None
+
+    def _create(self, tenant, tenant_pk) -> CustomerRef:
+        lock_key = self.lock_key(tenant_pk)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.STRIPE_CUSTOMER_LOCK_TIMEOUT
+        while not cache.add(lock_key, token, timeout=settings.STRIPE_CUSTOMER_LOCK_TIMEOUT):
+            # Another request is creating the customer
+            self.stats["lock_waits"] += 1
+            time.sleep(settings.STRIPE_CUSTOMER_LOCK_POLL_INTERVAL)
+            customer_ref = cache.get(self.tenant_key(tenant_pk)) or self._fetch(tenant_pk)
+            if customer_ref is not None:
+                return customer_ref
+            if time.monotonic() >= deadline:
+                # The lock expires by itself; ``get_or_create`` below still finds a customer created meanwhile
+                logger.warning(f"Timed out waiting for the Stripe customer of tenant {tenant_pk} to be created")
+                break
+
+        try:
+            # The customer may have been created between the cache miss and taking the lock
+            customer_ref = self._fetch(tenant_pk)
+            if customer_ref is None:
+                customer, created = djstripe_models.Customer.get_or_create(tenant)
+                self.stats["created"] += created
+                customer_ref = CustomerRef(pk=customer.pk, id=customer.id)
+        except Exception:
+            self._release_lock(lock_key, token)
+            raise
+
+        def publish():
+            # Before releasing the lock, so waiting requests find the customer
+            self.set(tenant_pk, customer_ref)
+            self._release_lock(lock_key, token)
+
+        # A customer created in a transaction is only published once it's committed; if the transaction is rolled back,
+        # the lock expires by itself
+        transaction.on_commit(publish)
+        return customer_ref
+
+    @staticmethod
+    def _release_lock(lock_key: str, token: str):
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+class PriceCatalog:
+    """
+    In-process catalog of all prices with their products, loaded with a single query.
+
+    Subscription schedules reference prices by their Stripe id in every item of every phase; resolving them from the
+    catalog keeps the number of queries of subscription endpoints constant. Saving or deleting a price or a product,
+    including the ones synced by dj-stripe from ``price.*`` and ``product.*`` webhooks, drops the catalog of the
+    process and bumps the version in the shared cache, which makes other processes reload theirs (see ``signals.py``).
+    """
+
+    VERSION_KEY = "price_catalog:version"
+
+    def __init__(self):
+        self.stats = CacheStats()
+        self._prices: dict[str, djstripe_models.Price] | None = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get_price(self, price_id: str) -> djstripe_models.Price | None:
+        return self._get_prices().get(price_id)
+
+    def get_by_plan(self, plan_config) -> djstripe_models.Price | None:
+        """
+        The oldest price of the plan's product, like ``PriceManager.get_by_plan`` used to query.
+        """
+        return next((price for price in self._get_prices().values() if price.product.name == plan_config.name), None)
+
+    def invalidate(self):
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        self.clear()
+
+    def clear(self):
+        self._prices = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _get_prices(self) -> dict[str, djstripe_models.Price]:
+        prices, now = self._prices, time.monotonic()
+        if prices is not None and now - self._checked_at < settings.PRICE_CATALOG_VERSION_CHECK_INTERVAL:
+            self.stats["local_hits"] += 1
+            return prices
+
+        version = cache.get(self.VERSION_KEY)
+        if prices is None or version != self._version:
+            self.stats["loads"] += 1
+            prices = {
+                price.id: price
+                for price in djstripe_models.Price.objects.select_related("product").order_by("created", "pk")
+            }
+            self._prices, self._version = prices, version
+        self._checked_at = now
+        return prices
+
+
+customer_cache = CustomerCache()
+price_catalog = PriceCatalog()
+
+
+def get_tenant_customer(tenant) -> CustomerRef:
+    return customer_cache.get(tenant)
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -12,6 +12,8 @@ class SubscriptionPlanPriceConfig:
 class SubscriptionPlanConfig:
     name: str
     initial_price: SubscriptionPlanPriceConfig
+    # Feature limits copied to the tenant entitlements, e.g. {"max_members": 5}; None stands for no limit
+    limits: dict[str, int | None] = field(default_factory=dict)
 
 
 FREE_PLAN = SubscriptionPlanConfig(
@@ -28,3 +30,4 @@ YEARLY_PLAN = SubscriptionPlanConfig(
 )
 
 ALL_PLANS = [FREE_PLAN, MONTHLY_PLAN, YEARLY_PLAN]
+PLANS_BY_NAME = {plan.name: plan for plan in ALL_PLANS}
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...services import entitlements
+
+
+class Command(BaseCommand):
+    help = "Compute entitlements of all tenants from their subscription schedules"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        refreshed_count = 0
+        for batch in entitlements.iter_tenant_pk_batches(batch_size):
+            refreshed_count += len(entitlements.refresh_tenant_entitlements(batch))
+
+        self.stdout.write(f"Refreshed entitlements of {refreshed_count} tenants")
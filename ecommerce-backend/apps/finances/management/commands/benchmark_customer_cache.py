@@ -0,0 +1,188 @@
+import pathlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test import override_settings
+from djstripe import models as djstripe_models
+
+from apps.multitenancy.constants import TenantType
+from apps.multitenancy.models import Tenant
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, rolled_back_transaction, run_batch_benchmark
+
+from ...cache import customer_cache
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = "customer-cache-benchmark@example.org"
+
+
+class CountingHTTPClient:
+    """
+    Wraps the Stripe HTTP client to count the API requests made through it.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def request_with_retries(self, *args, **kwargs):
+        with self._lock:
+            self.requests += 1
+        return self.client.request_with_retries(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def _load_trace(trace: str | None, iterations: int, tenants: int) -> list[int]:
+    """
+    Indexes of the tenants sending each request: read from ``trace`` (one index per line) or drawn with a skew towards
+    the first tenants, like traffic of a few large tenants and a long tail of small ones.
+    """
+    if trace:
+        return [int(line) % tenants for line in pathlib.Path(trace).read_text().split()]
+    return random.Random(0).choices(range(tenants), weights=[1 / (rank + 1) for rank in range(tenants)], k=iterations)
+
+
+def _legacy_customer(tenant):
+    """
+    Customer resolution as it was done before the customer cache was introduced.
+    """
+    customer, _ = djstripe_models.Customer.get_or_create(tenant)
+    return customer
+
+
+class Command(BenchmarkCommand):
+    """
+    The trace is replayed against tenants with customers in a rolled back transaction. Their mapping is invalidated in
+    the shared cache afterwards.
+
+    Bursts send ``--concurrency`` concurrent first requests of each of ``--burst-tenants`` tenants without a customer,
+    in threads with their own database connections; every customer they create is a Stripe API call, so point
+    ``--stripe-api-base`` at stripe-mock. Burst tenants and their customers are deleted afterwards.
+    """
+
+    help = (
+        "Replay a trace of tenant requests resolving the tenant's Stripe customer with Customer.get_or_create versus "
+        "the customer cache, counting database queries and Stripe API calls"
+    )
+
+    default_iterations = 5000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--tenants", type=int, default=200)
+        parser.add_argument("--trace", help="File with the index of the tenant sending each request, one per line")
+        parser.add_argument("--burst-tenants", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--stripe-api-base", default="http://stripemock:12111")
+
+    def run_benchmarks(
+        self,
+        iterations: int,
+        tenants: int,
+        trace: str | None,
+        burst_tenants: int,
+        concurrency: int,
+        stripe_api_base: str,
+        **options,
+    ) -> list[BenchmarkResult]:
+        stripe.api_base = stripe_api_base
+        http_client = CountingHTTPClient(stripe.http_client.new_default_http_client())
+        stripe.default_http_client = http_client
+
+        results = []
+        api_calls = {}
+        # No free plan schedule is created in Stripe for the benchmark tenants
+        with override_settings(STRIPE_ENABLED=False):
+            with rolled_back_transaction():
+                tenant_objects = self._create_tenants(tenants, with_customers=True)
+                requests = [tenant_objects[index] for index in _load_trace(trace, iterations, tenants)]
+
+                def replay(resolve):
+                    def run():
+                        for tenant in requests:
+                            resolve(tenant)
+
+                    return run
+
+                for name, resolve, reset in (
+                    ("trace, get_or_create", _legacy_customer, None),
+                    ("trace, cold cache", customer_cache.get, lambda: self._invalidate(tenant_objects)),
+                    ("trace, warm cache", customer_cache.get, None),
+                ):
+                    if reset:
+                        reset()
+                    http_client.requests = 0
+                    results.append(run_batch_benchmark(name, replay(resolve), len(requests)))
+                    api_calls[name] = http_client.requests
+
+                self._invalidate(tenant_objects)
+
+            bursts = (("burst, get_or_create", _legacy_customer), ("burst, cache", customer_cache.get))
+            for name, resolve in bursts if burst_tenants else ():
+                http_client.requests = 0
+                result, failures = self._run_burst(name, resolve, burst_tenants, concurrency)
+                results.append(result)
+                api_calls[name] = http_client.requests
+                if failures:
+                    self.stdout.write(f"{name}: {failures} requests failed")
+
+        for name, count in api_calls.items():
+            self.stdout.write(f"{name}: {count} Stripe API calls")
+        self.stdout.write(f"Customer cache stats: {dict(customer_cache.stats)}")
+        return results
+
+    @staticmethod
+    def _create_tenants(count: int, with_customers: bool) -> list[Tenant]:
+        user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL)
+        tenants = [
+            Tenant.objects.create(creator=user, name=f"Customer cache benchmark {index}", type=TenantType.ORGANIZATION)
+            for index in range(count)
+        ]
+        if with_customers:
+            djstripe_models.Customer.objects.bulk_create(
+                djstripe_models.Customer(id=f"cus_benchmark_{tenant.pk}", subscriber=tenant, livemode=False)
+                for tenant in tenants
+            )
+        return tenants
+
+    @staticmethod
+    def _invalidate(tenants: list[Tenant]):
+        for tenant in tenants:
+            customer_cache.invalidate(tenant.pk)
+
+    def _run_burst(self, name: str, resolve, tenant_count: int, concurrency: int) -> tuple[BenchmarkResult, int]:
+        tenants = self._create_tenants(tenant_count, with_customers=False)
+        failures = 0
+
+        def resolve_customer(tenant):
+            try:
+                resolve(tenant)
+            except IntegrityError:
+                # A concurrent request already saved the customer of the tenant
+                return 1
+            finally:
+                connection.close()
+            return 0
+
+        try:
+            started_at = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                failures = sum(
+                    executor.map(resolve_customer, [tenant for tenant in tenants for _ in range(concurrency)])
+                )
+            seconds = time.perf_counter() - started_at
+        finally:
+            self._invalidate(tenants)
+            djstripe_models.Customer.objects.filter(subscriber__in=tenants).delete()
+            Tenant.objects.filter(pk__in=[tenant.pk for tenant in tenants]).delete()
+
+        # Queries run in the worker threads, on their own connections
+        return BenchmarkResult(name=name, iterations=tenant_count * concurrency, seconds=seconds, queries=0), failures
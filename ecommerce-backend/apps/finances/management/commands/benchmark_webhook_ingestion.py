@@ -0,0 +1,151 @@
+import datetime
+import itertools
+import json
+import pathlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from djstripe import models as djstripe_models
+
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, rolled_back_transaction, run_batch_benchmark
+
+from ...models import QueuedWebhookEvent
+from ...webhook_ingestion import WebhookEventProcessor, get_ordering_key
+
+DEFAULT_FIXTURE = pathlib.Path(__file__).parents[2] / "tests" / "data" / "stripe_webhook_events.json"
+BENCHMARK_WEBHOOK_SECRET = "whsec_benchmark"
+QUEUE_CALLBACK = "apps.finances.webhook_ingestion.queue_webhook_event"
+
+
+def _generate_events(recorded_events: list[dict], count: int, customers: int) -> list[dict]:
+    """
+    Cycles the recorded events with new event ids, spreading them over ``customers`` customers in Stripe order.
+    """
+    created = int(time.time())
+    events = []
+    for index, recorded_event in zip(range(count), itertools.cycle(recorded_events)):
+        event = json.loads(json.dumps(recorded_event))
+        event["id"] = f"evt_benchmark_{uuid.uuid4().hex}"
+        event["created"] = created + index
+        obj = event["data"]["object"]
+        customer_id = f"cus_benchmark_{index % customers}"
+        if obj.get("object") == "customer":
+            obj["id"] = customer_id
+        elif "customer" in obj:
+            obj["customer"] = customer_id
+        events.append(event)
+    return events
+
+
+def _sign(body: str) -> str:
+    timestamp = int(time.time())
+    signature = stripe.WebhookSignature._compute_signature(f"{timestamp}.{body}", BENCHMARK_WEBHOOK_SECRET)
+    return f"t={timestamp},v1={signature}"
+
+
+def _post_events(events: list[dict]):
+    client = Client()
+    url = reverse("djstripe:webhook")
+    for event in events:
+        body = json.dumps(event)
+        client.post(url, data=body, content_type="application/json", HTTP_STRIPE_SIGNATURE=_sign(body))
+
+
+def _process_ordering_key(ordering_key: str) -> int:
+    try:
+        processor = WebhookEventProcessor(ordering_key, max_attempts=1)
+        processor.run()
+        return processor.stats["processed"] + processor.stats["failed"]
+    finally:
+        connection.close()
+
+
+class Command(BenchmarkCommand):
+    """
+    Recorded events are replayed with new event ids, spread over ``--customers`` customers. Handlers and the webhook
+    owner account lookup call the Stripe API at ``--stripe-api-base``; point it at stripe-mock, otherwise handlers fail
+    fast and processing times aren't representative.
+
+    Webhook responses are measured in a rolled back transaction. Workers need committed events, so they're processed in
+    threads with their own database connections; queued events and their triggers are deleted afterwards, objects synced
+    by the handlers are not, so run the benchmark against a development database. Worker threads share the GIL, so they
+    only scale while handlers wait for the Stripe API, like worker processes do.
+    """
+
+    help = (
+        "Measure webhook responses per second with handlers run inline versus queued events, and how many queued "
+        "events per second workers process in parallel over customers"
+    )
+
+    default_iterations = 500
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--fixture", default=str(DEFAULT_FIXTURE))
+        parser.add_argument("--customers", type=int, default=50)
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--stripe-api-base", default="http://stripemock:12111")
+
+    def run_benchmarks(
+        self, iterations: int, fixture: str, customers: int, workers: int, stripe_api_base: str, **options
+    ) -> list[BenchmarkResult]:
+        stripe.api_base = stripe_api_base
+        recorded_events = json.loads(pathlib.Path(fixture).read_text())
+
+        results = []
+        # The test client sends requests to "testserver"
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], DJSTRIPE_WEBHOOK_SECRET=BENCHMARK_WEBHOOK_SECRET
+        ):
+            with override_settings(DJSTRIPE_WEBHOOK_EVENT_CALLBACK=None), rolled_back_transaction():
+                events = _generate_events(recorded_events, iterations, customers)
+                results.append(
+                    run_batch_benchmark("webhook, inline handlers", lambda: _post_events(events), iterations)
+                )
+
+            with override_settings(DJSTRIPE_WEBHOOK_EVENT_CALLBACK=QUEUE_CALLBACK), rolled_back_transaction():
+                # on_commit() never fires in a rolled back transaction, so no worker task is sent
+                events = _generate_events(recorded_events, iterations, customers)
+                results.append(run_batch_benchmark("webhook, queued", lambda: _post_events(events), iterations))
+
+            for worker_count in sorted({1, workers}):
+                results.append(self._run_workers(recorded_events, iterations, customers, worker_count))
+
+        return results
+
+    def _run_workers(self, recorded_events: list[dict], iterations: int, customers: int, workers: int):
+        events = _generate_events(recorded_events, iterations, customers)
+        # Queued directly rather than posted, so no worker task is sent on commit
+        triggers = djstripe_models.WebhookEventTrigger.objects.bulk_create(
+            djstripe_models.WebhookEventTrigger(remote_ip="127.0.0.1", headers={}, body=json.dumps(event), valid=True)
+            for event in events
+        )
+        try:
+            QueuedWebhookEvent.objects.bulk_create(
+                QueuedWebhookEvent(
+                    event_id=event["id"],
+                    event_type=event["type"],
+                    ordering_key=get_ordering_key(event),
+                    stripe_created=datetime.datetime.fromtimestamp(event["created"], tz=datetime.UTC),
+                    trigger=trigger,
+                )
+                for event, trigger in zip(events, triggers, strict=True)
+            )
+            ordering_keys = {get_ordering_key(event) for event in events}
+
+            started_at = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                processed_count = sum(executor.map(_process_ordering_key, ordering_keys))
+            seconds = time.perf_counter() - started_at
+        finally:
+            djstripe_models.WebhookEventTrigger.objects.filter(pk__in=[trigger.pk for trigger in triggers]).delete()
+            djstripe_models.Event.objects.filter(id__in=[event["id"] for event in events]).delete()
+
+        # Queries run in the worker threads, on their own connections
+        return BenchmarkResult(name=f"workers x{workers}", iterations=processed_count, seconds=seconds, queries=0)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services import entitlements
+
+
+class Command(BaseCommand):
+    help = "Compare stored tenant entitlements with the ones computed from subscription schedules"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--fix", action="store_true", help="Store the computed entitlements of inconsistent tenants"
+        )
+
+    def handle(self, *args, batch_size, fix, **options):
+        inconsistent_count = 0
+        for batch in entitlements.iter_tenant_pk_batches(batch_size):
+            inconsistent = entitlements.find_inconsistent_entitlements(batch)
+            for stored, expected in inconsistent:
+                stored_fields = (
+                    {name: getattr(stored, name) for name in entitlements.ENTITLEMENT_FIELDS} if stored else None
+                )
+                expected_fields = {name: getattr(expected, name) for name in entitlements.ENTITLEMENT_FIELDS}
+                self.stdout.write(f"Tenant {expected.tenant_id}: stored {stored_fields}, expected {expected_fields}")
+
+            if fix and inconsistent:
+                entitlements.save_entitlements([expected for _, expected in inconsistent])
+            inconsistent_count += len(inconsistent)
+
+        if fix:
+            self.stdout.write(f"Fixed entitlements of {inconsistent_count} tenants")
+        elif inconsistent_count:
+            raise CommandError(f"Entitlements of {inconsistent_count} tenants are inconsistent")
+        else:
+            self.stdout.write("Entitlements of all tenants are consistent")
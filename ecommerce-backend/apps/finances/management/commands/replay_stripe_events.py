@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from ...models import QueuedWebhookEvent
+from ...webhook_ingestion import replay_webhook_event
+
+
+class Command(BaseCommand):
+    help = (
+        "Run webhook handlers of stored Stripe events again, in the order Stripe created them. Handlers of events that "
+        "were already processed are invoked again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_ids", nargs="*", help="Stripe event ids")
+        parser.add_argument("--ordering-key", help="Replay events of a customer, or of an object without customer")
+        parser.add_argument("--failed", action="store_true", help="Replay events which ran out of attempts")
+        parser.add_argument("--since", type=parse_datetime, help="Replay events received since this ISO 8601 time")
+        parser.add_argument("--dry-run", action="store_true", help="Only list events which would be replayed")
+
+    def handle(self, *args, event_ids, ordering_key, failed, since, dry_run, **options):
+        if not (event_ids or ordering_key or failed or since):
+            raise CommandError("Select events to replay with event ids, --ordering-key, --failed or --since")
+
+        events = QueuedWebhookEvent.objects.all()
+        if event_ids:
+            events = events.filter(event_id__in=event_ids)
+        if ordering_key:
+            events = events.filter(ordering_key=ordering_key)
+        if failed:
+            events = events.filter(failed_at__isnull=False)
+        if since:
+            events = events.filter(received_at__gte=since)
+
+        replayed_count = failed_count = 0
+        for event in events.order_by("ordering_key", "stripe_created", "pk"):
+            if dry_run:
+                self.stdout.write(f"{event.event_id} {event.event_type} ({event.ordering_key})")
+                continue
+
+            try:
+                replay_webhook_event(event)
+            except Exception as e:
+                failed_count += 1
+                self.stderr.write(f"Replaying {event.event_id} failed: {e}")
+            else:
+                replayed_count += 1
+
+        if not dry_run:
+            self.stdout.write(f"Replayed {replayed_count} events, {failed_count} failed")
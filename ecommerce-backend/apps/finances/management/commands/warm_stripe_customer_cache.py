@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...cache import customer_cache
+
+
+class Command(BaseCommand):
+    help = "Copy the mapping of tenants to their Stripe customers to the shared cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        warmed_count = customer_cache.warm(batch_size=batch_size)
+        self.stdout.write(f"Warmed Stripe customers of {warmed_count} tenants")
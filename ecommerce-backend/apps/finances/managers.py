@@ -40,7 +40,9 @@ class ProductManager(models.Manager):
 
 class PriceManager(models.Manager):
     def get_by_plan(self, plan: SubscriptionPlanConfig):
-        return self.filter(product__name=plan.name).order_by("created").first()
+        from .cache import price_catalog
+
+        return price_catalog.get_by_plan(plan)
 
     def get_or_create_subscription_price(
         self,
@@ -65,3 +67,11 @@ class PriceManager(models.Manager):
                 ),
                 True,
             )
+
+
+class QueuedWebhookEventQuerySet(models.QuerySet):
+    def filter_pending(self):
+        return self.filter(processed_at__isnull=True, failed_at__isnull=True)
+
+
+QueuedWebhookEventManager = models.Manager.from_queryset(QueuedWebhookEventQuerySet)
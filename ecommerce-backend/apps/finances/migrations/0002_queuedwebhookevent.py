@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("djstripe", "0012_2_8"),
+        ("finances", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedWebhookEvent",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("event_id", models.CharField(max_length=255, unique=True)),
+                ("event_type", models.CharField(max_length=250)),
+                ("ordering_key", models.CharField(max_length=255)),
+                ("stripe_created", models.DateTimeField()),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True, default="")),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                ("failed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "trigger",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="queued_event",
+                        to="djstripe.webhookeventtrigger",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("failed_at__isnull", True), ("processed_at__isnull", True)),
+                        fields=["ordering_key", "stripe_created", "id"],
+                        name="finances_queued_event_pending",
+                    )
+                ],
+            },
+        ),
+    ]
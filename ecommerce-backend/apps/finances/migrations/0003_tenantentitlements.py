@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("finances", "0002_queuedwebhookevent"),
+        ("multitenancy", "0007_tenantmembership_creator"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantEntitlements",
+            fields=[
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="entitlements",
+                        serialize=False,
+                        to="multitenancy.tenant",
+                    ),
+                ),
+                ("plan", models.CharField(blank=True, default="", max_length=255)),
+                ("price_id", models.CharField(blank=True, default="", max_length=255)),
+                ("trial_end", models.DateTimeField(blank=True, null=True)),
+                ("valid_until", models.DateTimeField(blank=True, null=True)),
+                ("limits", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "tenant entitlements",
+            },
+        ),
+    ]
@@ -1,6 +1,10 @@
+import datetime
+
+from django.db import models
+from django.utils import timezone
 from djstripe import models as djstripe_models
 
-from . import managers
+from . import constants, managers
 
 
 class Product(djstripe_models.Product):
@@ -15,3 +19,84 @@ class Price(djstripe_models.Price):
         proxy = True
 
     objects = managers.PriceManager()
+
+
+class QueuedWebhookEvent(models.Model):
+    """
+    A verified Stripe webhook event waiting to be processed by a worker.
+
+    The raw event is kept by its dj-stripe ``WebhookEventTrigger``. Events sharing an ``ordering_key`` (their customer,
+    or their object for events without a customer) are processed one at a time in the order Stripe created them, while
+    events with different keys are processed in parallel. ``event_id`` is unique, so a redelivered event is stored once.
+    """
+
+    event_id: str = models.CharField(max_length=255, unique=True)
+    event_type: str = models.CharField(max_length=250)
+    ordering_key: str = models.CharField(max_length=255)
+    stripe_created: datetime.datetime = models.DateTimeField()
+    trigger = models.OneToOneField(
+        "djstripe.WebhookEventTrigger", on_delete=models.CASCADE, related_name="queued_event"
+    )
+
+    attempts: int = models.PositiveIntegerField(default=0)
+    error: str = models.TextField(blank=True, default="")
+
+    received_at: datetime.datetime = models.DateTimeField(auto_now_add=True)
+    processed_at: datetime.datetime | None = models.DateTimeField(null=True, blank=True)
+    failed_at: datetime.datetime | None = models.DateTimeField(null=True, blank=True)
+
+    objects = managers.QueuedWebhookEventManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["ordering_key", "stripe_created", "id"],
+                condition=models.Q(processed_at__isnull=True, failed_at__isnull=True),
+                name="finances_queued_event_pending",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type} {self.event_id}"
+
+
+class TenantEntitlements(models.Model):
+    """
+    Plan of a tenant as of its current subscription schedule phase, denormalized so feature checks don't need to read
+    the schedule, its phases and the price of the phase.
+
+    The row is recomputed whenever dj-stripe saves a schedule of the tenant, be it synced from a Stripe event or changed
+    by ``services.subscriptions`` (see ``signals.py``). ``valid_until`` is the end of the phase it was computed from; an
+    expired row is recomputed on read.
+    """
+
+    tenant = models.OneToOneField(
+        "multitenancy.Tenant", on_delete=models.CASCADE, primary_key=True, related_name="entitlements"
+    )
+    plan: str = models.CharField(max_length=255, blank=True, default="")
+    price_id: str = models.CharField(max_length=255, blank=True, default="")
+    trial_end: datetime.datetime | None = models.DateTimeField(null=True, blank=True)
+    valid_until: datetime.datetime | None = models.DateTimeField(null=True, blank=True)
+    limits: dict = models.JSONField(default=dict, blank=True)
+    updated_at: datetime.datetime = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "tenant entitlements"
+
+    def __str__(self) -> str:
+        return f"{self.tenant_id}: {self.plan or '-'}"
+
+    @property
+    def is_expired(self) -> bool:
+        return self.valid_until is not None and self.valid_until <= timezone.now()
+
+    @property
+    def is_trialing(self) -> bool:
+        return self.trial_end is not None and self.trial_end > timezone.now()
+
+    @property
+    def is_paid(self) -> bool:
+        return bool(self.plan) and self.plan != constants.FREE_PLAN.name
+
+    def get_limit(self, name: str, default: int | None = None) -> int | None:
+        return self.limits.get(name, default)
@@ -0,0 +1,50 @@
+from rest_access_policy import AccessPolicy
+
+from common.acl.helpers import Action, Effect, Principal, make_statement
+
+from .services.entitlements import get_request_entitlements
+
+
+class TenantEntitlementsAccess(AccessPolicy):
+    """
+    Conditions gating views on the plan of the current tenant, e.g. ``condition=["is_tenant_on_paid_plan"]`` or
+    ``condition=["is_tenant_within_limit:max_members"]``. They read the materialized entitlements, once per request.
+    """
+
+    def is_tenant_on_plan(self, request, view, action, plan_name: str) -> bool:
+        entitlements = get_request_entitlements(request)
+        return entitlements is not None and entitlements.plan == plan_name
+
+    def is_tenant_on_paid_plan(self, request, view, action) -> bool:
+        entitlements = get_request_entitlements(request)
+        return entitlements is not None and entitlements.is_paid
+
+    def is_tenant_trialing(self, request, view, action) -> bool:
+        entitlements = get_request_entitlements(request)
+        return entitlements is not None and entitlements.is_trialing
+
+    def is_tenant_within_limit(self, request, view, action, limit_name: str) -> bool:
+        """
+        The view provides the current usage with a ``get_entitlement_usage(limit_name)`` method.
+        """
+        entitlements = get_request_entitlements(request)
+        if entitlements is None:
+            return False
+
+        limit = entitlements.get_limit(limit_name)
+        return limit is None or view.get_entitlement_usage(limit_name) < limit
+
+
+class SubscriptionScheduleAccess(TenantEntitlementsAccess):
+    """
+    The schedule of the tenant can be read, changed and cancelled by its users. Whether the plan allows the change is
+    validated by the serializers, which answer with their validation errors, e.g. ``no_paid_subscription``.
+    """
+
+    statements = [
+        make_statement(
+            principal=Principal.Authenticated,
+            action=[Action.List, Action.Retrieve, "partial_update", "cancel"],
+            effect=Effect.Allow,
+        ),
+    ]
@@ -10,7 +10,9 @@ from drf_yasg.utils import swagger_serializer_method
 from rest_framework import exceptions, serializers
 
 from . import constants, models, utils
+from .cache import get_tenant_customer, price_catalog
 from .services import customers, subscriptions
+from .services.entitlements import get_request_entitlements
 
 
 class PaymentIntentSerializer(serializers.ModelSerializer):
@@ -34,7 +36,7 @@ class PaymentIntentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context["request"]
 
-        (customer, _) = djstripe_models.Customer.get_or_create(request.tenant)
+        customer = get_tenant_customer(request.tenant)
         amount = int(validated_data["product"]) * 100
         payment_intent_response = djstripe_models.PaymentIntent._api_create(
             amount=amount,
@@ -59,7 +61,7 @@ class SetupIntentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context["request"]
 
-        (customer, _) = djstripe_models.Customer.get_or_create(request.tenant)
+        customer = get_tenant_customer(request.tenant)
         setup_intent_response = djstripe_models.SetupIntent._api_create(
             customer=customer.id, payment_method_types=["card"], usage="off_session"
         )
@@ -80,7 +82,7 @@ class PaymentMethodSerializer(serializers.ModelSerializer):
 
 class UpdateDefaultPaymentMethodSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
-        customer, _ = djstripe_models.Customer.get_or_create(self.context["request"].tenant)
+        customer = get_tenant_customer(self.context["request"].tenant).get_customer()
         customers.set_default_payment_method(customer=customer, payment_method=instance)
         return instance
 
@@ -130,7 +132,7 @@ class SubscriptionSchedulePhaseItemSerializer(serializers.Serializer):
     @swagger_serializer_method(serializer_or_field=PriceSerializer)
     def get_price(self, obj):
         # We check for existence of the price because of the stripe-mock limitations
-        price = djstripe_models.Price.objects.filter(id=obj["price"]).first()
+        price = price_catalog.get_price(obj["price"])
         if not price:
             return None
         return PriceSerializer(price).data
@@ -180,7 +182,8 @@ class TenantSubscriptionScheduleSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         customer = self.instance.customer
         can_activate_trial = utils.customer_can_activate_trial(customer)
-        is_trialing = subscriptions.is_current_schedule_phase_trialing(schedule=self.instance)
+        entitlements = get_request_entitlements(self.context["request"])
+        is_trialing = entitlements is not None and entitlements.is_trialing
 
         payment_method = customer.default_payment_method
         if payment_method is None:
@@ -196,6 +199,7 @@ class TenantSubscriptionScheduleSerializer(serializers.ModelSerializer):
             "payment_method": payment_method,
             "can_activate_trial": can_activate_trial,
             "is_trialing": is_trialing,
+            "is_free_plan": entitlements is not None and entitlements.plan == constants.FREE_PLAN.name,
         }
 
     def update(self, instance: djstripe_models.SubscriptionSchedule, validated_data):
@@ -215,7 +219,7 @@ class TenantSubscriptionScheduleSerializer(serializers.ModelSerializer):
             current_phase["items"] = [{"price": price.id}]
             return subscriptions.update_schedule(instance, phases=[current_phase])
 
-        if subscriptions.is_current_schedule_phase_plan(schedule=instance, plan_config=constants.FREE_PLAN):
+        if validated_data["is_free_plan"]:
             current_phase["end_date"] = "now"
 
         next_phase = {"items": [{"price": price.id}]}
@@ -246,7 +250,7 @@ class CancelTenantActiveSubscriptionSerializer(serializers.ModelSerializer):
         current_phase = subscriptions.get_current_schedule_phase(schedule=instance)
         next_phase = {"items": [{"price": free_plan_price.id}]}
 
-        if subscriptions.is_current_schedule_phase_trialing(schedule=instance):
+        if get_request_entitlements(self.context["request"]).is_trialing:
             current_phase["end_date"] = current_phase["trial_end"]
 
         return subscriptions.update_schedule(instance, phases=[current_phase, next_phase])
@@ -0,0 +1,144 @@
+import datetime
+from collections.abc import Iterable, Iterator
+
+from django.db.models import Prefetch
+from djstripe import enums as djstripe_enums
+from djstripe import models as djstripe_models
+from djstripe.settings import djstripe_settings
+
+from apps.multitenancy.models import Tenant
+
+from .. import constants, models
+from . import subscriptions
+
+ENTITLEMENT_FIELDS = ("plan", "price_id", "trial_end", "valid_until", "limits")
+
+_REQUEST_CACHE_ATTR = "_tenant_entitlements"
+
+
+def _from_timestamp(value: int | None) -> datetime.datetime | None:
+    return datetime.datetime.fromtimestamp(value, tz=datetime.UTC) if value else None
+
+
+def build_entitlements(tenant_pks: Iterable) -> list[models.TenantEntitlements]:
+    """
+    Computes unsaved entitlements of the tenants from their active subscription schedules, with a fixed number of
+    queries regardless of the number of tenants. Tenants without a customer or an active schedule get no plan.
+    """
+    tenant_pks = list(tenant_pks)
+    customers = djstripe_models.Customer.objects.filter(
+        subscriber__in=tenant_pks, livemode=djstripe_settings.STRIPE_LIVE_MODE
+    ).prefetch_related(
+        Prefetch(
+            "schedules",
+            queryset=djstripe_models.SubscriptionSchedule.objects.filter(
+                status=djstripe_enums.SubscriptionScheduleStatus.active
+            ).order_by("pk"),
+            to_attr="active_schedules",
+        )
+    )
+
+    current_phases = {}
+    for customer in customers:
+        if not customer.active_schedules:
+            continue
+        # The same schedule and phase ``subscriptions.get_schedule`` and ``get_current_schedule_phase`` return
+        if phases := subscriptions.get_valid_schedule_phases(customer.active_schedules[0]):
+            current_phases[customer.subscriber_id] = phases[0]
+
+    price_ids = {phase["items"][0]["price"] for phase in current_phases.values()}
+    plan_names = dict(models.Price.objects.filter(id__in=price_ids).values_list("id", "product__name"))
+
+    entitlements = []
+    for tenant_pk in tenant_pks:
+        phase = current_phases.get(tenant_pk)
+        if phase is None:
+            entitlements.append(models.TenantEntitlements(tenant_id=tenant_pk))
+            continue
+
+        price_id = phase["items"][0]["price"]
+        plan_name = plan_names.get(price_id, "")
+        plan_config = constants.PLANS_BY_NAME.get(plan_name)
+        entitlements.append(
+            models.TenantEntitlements(
+                tenant_id=tenant_pk,
+                plan=plan_name,
+                price_id=price_id,
+                trial_end=_from_timestamp(phase.get("trial_end")),
+                valid_until=_from_timestamp(phase.get("end_date")),
+                limits=dict(plan_config.limits) if plan_config else {},
+            )
+        )
+    return entitlements
+
+
+def save_entitlements(entitlements: list[models.TenantEntitlements]) -> list[models.TenantEntitlements]:
+    return models.TenantEntitlements.objects.bulk_create(
+        entitlements,
+        update_conflicts=True,
+        unique_fields=["tenant"],
+        update_fields=[*ENTITLEMENT_FIELDS, "updated_at"],
+    )
+
+
+def refresh_tenant_entitlements(tenant_pks: Iterable) -> list[models.TenantEntitlements]:
+    return save_entitlements(build_entitlements(tenant_pks))
+
+
+def get_tenant_entitlements(tenant) -> models.TenantEntitlements:
+    """
+    Reads the materialized entitlements of the tenant; they're only computed here if they're missing or the phase
+    they were computed from has ended.
+    """
+    entitlements = models.TenantEntitlements.objects.filter(tenant=tenant).first()
+    if entitlements is None or entitlements.is_expired:
+        (entitlements,) = refresh_tenant_entitlements([tenant.pk])
+    return entitlements
+
+
+def get_request_entitlements(request) -> models.TenantEntitlements | None:
+    """
+    Entitlements of ``request.tenant``, read once per request no matter how many checks use them.
+    """
+    # DRF requests wrap the Django request, which is shared with middlewares
+    http_request = getattr(request, "_request", request)
+    try:
+        return getattr(http_request, _REQUEST_CACHE_ATTR)
+    except AttributeError:
+        pass
+
+    tenant = getattr(request, "tenant", None)
+    entitlements = get_tenant_entitlements(tenant) if tenant else None
+    setattr(http_request, _REQUEST_CACHE_ATTR, entitlements)
+    return entitlements
+
+
+def iter_tenant_pk_batches(batch_size: int) -> Iterator[list]:
+    """
+    Yields primary keys of all tenants in batches, each read with a keyset condition instead of an offset.
+    """
+    tenant_pks = Tenant.objects.order_by("pk").values_list("pk", flat=True)
+    batch = list(tenant_pks[:batch_size])
+    while batch:
+        yield batch
+        batch = list(tenant_pks.filter(pk__gt=batch[-1])[:batch_size])
+
+
+def find_inconsistent_entitlements(
+    tenant_pks: Iterable,
+) -> list[tuple[models.TenantEntitlements | None, models.TenantEntitlements]]:
+    """
+    Returns ``(stored, expected)`` pairs of the tenants whose stored entitlements are missing or differ from the ones
+    computed from their subscription schedules.
+    """
+    expected_entitlements = build_entitlements(tenant_pks)
+    stored_entitlements = models.TenantEntitlements.objects.in_bulk(
+        [entitlements.tenant_id for entitlements in expected_entitlements]
+    )
+
+    inconsistent = []
+    for expected in expected_entitlements:
+        stored = stored_entitlements.get(expected.tenant_id)
+        if stored is None or any(getattr(stored, name) != getattr(expected, name) for name in ENTITLEMENT_FIELDS):
+            inconsistent.append((stored, expected))
+    return inconsistent
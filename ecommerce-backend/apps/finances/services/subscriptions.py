@@ -5,6 +5,7 @@ from djstripe import enums as djstripe_enums
 from djstripe import models as djstripe_models
 
 from .. import constants, models
+from ..cache import get_tenant_customer, price_catalog
 from ..exceptions import SubscriptionAndPriceDefinedTogether, SubscriptionOrPriceNotDefined, UserOrCustomerNotDefined
 
 
@@ -22,11 +23,13 @@ def initialize_tenant(tenant):
 
 def get_schedule(tenant=None, customer=None):
     if tenant:
-        customer, _ = djstripe_models.Customer.get_or_create(tenant)
+        customer = get_tenant_customer(tenant)
     if customer is None:
         raise UserOrCustomerNotDefined("Either user or customer must be defined")
 
-    return customer.schedules.filter(status=djstripe_enums.SubscriptionScheduleStatus.active).first()
+    return djstripe_models.SubscriptionSchedule.objects.filter(
+        customer=customer.pk, status=djstripe_enums.SubscriptionScheduleStatus.active
+    ).first()
 
 
 def create_schedule(
@@ -38,7 +41,7 @@ def create_schedule(
     subscription_schedule_stripe_instance = None
     if price:
         if tenant:
-            customer, _ = djstripe_models.Customer.get_or_create(tenant)
+            customer = get_tenant_customer(tenant)
         if customer is None:
             raise UserOrCustomerNotDefined("Either user or customer must be defined")
 
@@ -66,10 +69,9 @@ def update_schedule(instance: djstripe_models.SubscriptionSchedule, **kwargs):
 
 
 def get_valid_schedule_phases(schedule: djstripe_models.SubscriptionSchedule):
+    now = timezone.now()
     return [
-        phase
-        for phase in schedule.phases
-        if timezone.datetime.fromtimestamp(phase["end_date"], tz=datetime.UTC) > timezone.now()
+        phase for phase in schedule.phases if timezone.datetime.fromtimestamp(phase["end_date"], tz=datetime.UTC) > now
     ]
 
 
@@ -82,9 +84,8 @@ def is_current_schedule_phase_plan(
     schedule: djstripe_models.SubscriptionSchedule, plan_config: constants.SubscriptionPlanConfig
 ):
     current_phase = get_current_schedule_phase(schedule)
-    current_price_id = current_phase["items"][0]["price"]
-    current_price = djstripe_models.Price.objects.get(id=current_price_id)
-    return current_price.product.name == plan_config.name
+    current_price = price_catalog.get_price(current_phase["items"][0]["price"])
+    return current_price is not None and current_price.product.name == plan_config.name
 
 
 def is_current_schedule_phase_trialing(schedule: djstripe_models.SubscriptionSchedule):
@@ -1,13 +1,20 @@
 import logging
 
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.forms import model_to_dict
+from djstripe import models as djstripe_models
 from stripe.error import AuthenticationError
 
 from apps.multitenancy.models import Tenant
+from apps.websockets.topics import publish_topic_event
 
-from .services import subscriptions
+from . import models
+from .cache import CustomerRef, customer_cache, price_catalog
+from .services import entitlements, subscriptions
+from .webhook_ingestion import publish_queued_webhook_event
 
 logger = logging.getLogger(__name__)
 
@@ -25,3 +32,73 @@ def create_free_plan_subscription(sender, instance, created, **kwargs):
             return
         except Exception as e:
             raise e
+
+
+@receiver(post_save, sender=djstripe_models.SubscriptionSchedule)
+def refresh_entitlements_on_schedule_change(sender, instance: djstripe_models.SubscriptionSchedule, **kwargs):
+    """
+    dj-stripe saves schedules synced from Stripe events as well as the ones changed by ``services.subscriptions``.
+    """
+    customer = instance.customer
+    if customer is None or customer.subscriber_id is None:
+        return
+
+    tenant_pk = customer.subscriber_id
+
+    def refresh():
+        for tenant_entitlements in entitlements.refresh_tenant_entitlements([tenant_pk]):
+            publish_topic_event(
+                "billing",
+                "entitlements_update",
+                model_to_dict(tenant_entitlements, fields=entitlements.ENTITLEMENT_FIELDS),
+                tenant_id=tenant_pk,
+                key="entitlements_update",
+            )
+
+    transaction.on_commit(refresh)
+
+
+@receiver(pre_save, sender=djstripe_models.Customer)
+def remember_purged_customer_subscriber(sender, instance: djstripe_models.Customer, **kwargs):
+    if instance.pk is None or instance.subscriber_id is not None:
+        return
+
+    # ``Customer.purge()`` drops the subscriber, whose mapping has to be invalidated
+    instance._previous_subscriber_id = (
+        djstripe_models.Customer.objects.filter(pk=instance.pk).values_list("subscriber", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=djstripe_models.Customer)
+def update_customer_cache(sender, instance: djstripe_models.Customer, **kwargs):
+    livemode = instance.livemode
+    if instance.subscriber_id is not None:
+        tenant_pk, customer_ref = instance.subscriber_id, CustomerRef(pk=instance.pk, id=instance.id)
+        transaction.on_commit(lambda: customer_cache.set(tenant_pk, customer_ref, livemode))
+    elif previous_tenant_pk := getattr(instance, "_previous_subscriber_id", None):
+        transaction.on_commit(lambda: customer_cache.invalidate(previous_tenant_pk, livemode))
+
+
+@receiver(post_delete, sender=djstripe_models.Customer)
+def invalidate_customer_cache(sender, instance: djstripe_models.Customer, **kwargs):
+    if instance.subscriber_id is None:
+        return
+
+    tenant_pk, livemode = instance.subscriber_id, instance.livemode
+    transaction.on_commit(lambda: customer_cache.invalidate(tenant_pk, livemode))
+
+
+@receiver(post_save, sender=djstripe_models.WebhookEventTrigger)
+def publish_queued_webhook_event_on_save(sender, instance: djstripe_models.WebhookEventTrigger, **kwargs):
+    publish_queued_webhook_event(instance)
+
+
+@receiver([post_save, post_delete], sender=djstripe_models.Price)
+@receiver([post_save, post_delete], sender=djstripe_models.Product)
+@receiver([post_save, post_delete], sender=models.Price)
+@receiver([post_save, post_delete], sender=models.Product)
+def invalidate_price_catalog(sender, **kwargs):
+    # dj-stripe syncs prices and products of ``price.*`` and ``product.*`` webhooks by saving or deleting them. The
+    # catalog of this process is dropped right away; other processes reload theirs once the change is committed.
+    price_catalog.clear()
+    transaction.on_commit(price_catalog.invalidate)
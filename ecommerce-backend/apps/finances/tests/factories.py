@@ -1,4 +1,5 @@
 import datetime
+import json
 import uuid
 
 import factory
@@ -308,3 +309,37 @@ class RefundFactory(factory.django.DjangoModelFactory):
     currency = "usd"
     reason = enums.RefundReason.duplicate
     status = enums.RefundStatus.succeeded
+
+
+class WebhookEventTriggerFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = djstripe_models.WebhookEventTrigger
+
+    remote_ip = "127.0.0.1"
+    headers = {}
+    body = "{}"
+    valid = True
+
+
+class QueuedWebhookEventFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.QueuedWebhookEvent
+
+    event_id = factory.Sequence(lambda n: f"evt_{n}")
+    event_type = "customer.updated"
+    ordering_key = "cus_1"
+    stripe_created = factory.LazyFunction(timezone.now)
+    trigger = factory.SubFactory(
+        WebhookEventTriggerFactory,
+        body=factory.LazyAttribute(
+            lambda obj: json.dumps(
+                {
+                    "id": obj.factory_parent.event_id,
+                    "object": "event",
+                    "type": obj.factory_parent.event_type,
+                    "livemode": False,
+                    "data": {"object": {"object": "customer", "id": obj.factory_parent.ordering_key}},
+                }
+            )
+        ),
+    )
@@ -22,6 +22,8 @@ pytest_factoryboy.register(factories.SubscriptionItemFactory)
 pytest_factoryboy.register(factories.SubscriptionScheduleFactory)
 pytest_factoryboy.register(factories.WebhookEventFactory)
 pytest_factoryboy.register(factories.RefundFactory)
+pytest_factoryboy.register(factories.WebhookEventTriggerFactory)
+pytest_factoryboy.register(factories.QueuedWebhookEventFactory)
 
 
 @pytest.fixture(autouse=True)
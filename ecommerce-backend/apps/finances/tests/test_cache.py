@@ -0,0 +1,283 @@
+import datetime
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from djstripe import models as djstripe_models
+
+from common.cache import MISSING
+
+from .. import constants, models, serializers, views
+from ..cache import CustomerCache, CustomerRef, customer_cache, get_tenant_customer
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    cache.clear()
+    customer_cache.clear()
+    yield
+    cache.clear()
+    customer_cache.clear()
+
+
+class TestCustomerCache:
+    def test_existing_customer_is_fetched_with_single_query(self, customer_factory, django_assert_num_queries):
+        customer = customer_factory()
+
+        with django_assert_num_queries(1):
+            customer_ref = get_tenant_customer(customer.subscriber)
+
+        assert customer_ref == CustomerRef(pk=customer.pk, id=customer.id)
+        assert customer_cache.stats["misses"] == 1
+
+    def test_second_lookup_is_served_from_local_cache(self, customer_factory, django_assert_num_queries):
+        customer = customer_factory()
+        get_tenant_customer(customer.subscriber)
+
+        with django_assert_num_queries(0):
+            customer_ref = get_tenant_customer(customer.subscriber)
+
+        assert customer_ref.id == customer.id
+        assert customer_cache.stats["local_hits"] == 1
+
+    def test_shared_cache_is_used_after_local_cache_is_dropped(self, customer_factory, django_assert_num_queries):
+        customer = customer_factory()
+        get_tenant_customer(customer.subscriber)
+        customer_cache.local.clear()
+
+        with django_assert_num_queries(0):
+            customer_ref = get_tenant_customer(customer.subscriber)
+
+        assert customer_ref.pk == customer.pk
+        assert customer_cache.stats["shared_hits"] == 1
+
+    def test_missing_customer_is_created(
+        self, tenant_factory, customer_factory, mocker, django_capture_on_commit_callbacks
+    ):
+        tenant = tenant_factory()
+        get_or_create = mocker.patch.object(
+            djstripe_models.Customer,
+            "get_or_create",
+            side_effect=lambda subscriber: (customer_factory(subscriber=subscriber), True),
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            customer_ref = get_tenant_customer(tenant)
+
+        get_or_create.assert_called_once_with(tenant)
+        customer = djstripe_models.Customer.objects.get(subscriber=tenant)
+        assert customer_ref == CustomerRef(pk=customer.pk, id=customer.id)
+        assert customer_cache.stats["created"] == 1
+        assert cache.get(CustomerCache.lock_key(str(tenant.pk))) is None
+        assert cache.get(CustomerCache.tenant_key(str(tenant.pk))) == customer_ref
+
+    def test_lock_is_released_when_creation_fails(self, tenant_factory, mocker):
+        tenant = tenant_factory()
+        mocker.patch.object(djstripe_models.Customer, "get_or_create", side_effect=RuntimeError("Stripe is down"))
+
+        with pytest.raises(RuntimeError):
+            get_tenant_customer(tenant)
+
+        assert cache.get(CustomerCache.lock_key(str(tenant.pk))) is None
+
+    def test_warm_copies_mapping_to_shared_cache(self, customer_factory, django_assert_num_queries):
+        customers = customer_factory.create_batch(3)
+
+        call_command("warm_stripe_customer_cache", "--batch-size", "2")
+
+        with django_assert_num_queries(0):
+            for customer in customers:
+                assert get_tenant_customer(customer.subscriber) == CustomerRef(pk=customer.pk, id=customer.id)
+
+
+class TestCustomerCacheSignals:
+    def test_saved_customer_is_written_through(
+        self, tenant_factory, customer_factory, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        tenant = tenant_factory()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            customer = customer_factory(subscriber=tenant)
+
+        with django_assert_num_queries(0):
+            assert get_tenant_customer(tenant) == CustomerRef(pk=customer.pk, id=customer.id)
+
+    def test_purged_customer_is_invalidated(self, customer_factory, django_capture_on_commit_callbacks):
+        customer = customer_factory()
+        tenant = customer.subscriber
+        get_tenant_customer(tenant)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            customer.subscriber = None
+            customer.save()
+
+        assert customer_cache.local.get(CustomerCache.tenant_key(str(tenant.pk))) is MISSING
+        assert cache.get(CustomerCache.tenant_key(str(tenant.pk))) is None
+
+    def test_deleted_customer_is_invalidated(self, customer_factory, django_capture_on_commit_callbacks):
+        customer = customer_factory()
+        tenant = customer.subscriber
+        get_tenant_customer(tenant)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            customer.delete()
+
+        assert cache.get(CustomerCache.tenant_key(str(tenant.pk))) is None
+
+
+class TestFinanceViewSets:
+    def test_queryset_is_filtered_by_cached_customer(
+        self, customer_factory, payment_intent_factory, rf, django_assert_num_queries
+    ):
+        customer = customer_factory()
+        payment_intent = payment_intent_factory(customer=customer)
+        payment_intent_factory()
+        get_tenant_customer(customer.subscriber)
+        request = rf.get("/")
+        request.tenant = customer.subscriber
+
+        # Only the payment intents themselves
+        with django_assert_num_queries(1):
+            payment_intents = list(views.PaymentIntentViewSet(request=request).get_queryset())
+
+        assert payment_intents == [payment_intent]
+
+    def test_schedules_are_filtered_by_cached_customer(self, subscription_schedule_factory, rf):
+        schedule = subscription_schedule_factory()
+        subscription_schedule_factory()
+        request = rf.get("/")
+        request.tenant = schedule.customer.subscriber
+
+        assert list(views.SubscriptionScheduleViewSet(request=request).get_queryset()) == [schedule]
+
+
+class TestPriceCatalog:
+    def test_prices_are_loaded_with_single_query(
+        self, price_catalog, free_plan_price, monthly_plan_price, django_assert_num_queries
+    ):
+        price_catalog.clear()
+        price_catalog.stats.clear()
+
+        with django_assert_num_queries(1):
+            assert price_catalog.get_price(free_plan_price.id) == free_plan_price
+            assert price_catalog.get_price(monthly_plan_price.id).product.name == constants.MONTHLY_PLAN.name
+            assert price_catalog.get_price("price_unknown") is None
+
+        assert price_catalog.stats["loads"] == 1
+
+    def test_get_by_plan_is_served_from_catalog(
+        self, free_plan_price, monthly_plan_price, yearly_plan_price, django_assert_num_queries
+    ):
+        with django_assert_num_queries(1):
+            assert models.Price.objects.get_by_plan(constants.FREE_PLAN) == free_plan_price
+            assert models.Price.objects.get_by_plan(constants.YEARLY_PLAN) == yearly_plan_price
+
+    def test_synced_price_drops_catalog(self, price_catalog, monthly_plan_price):
+        price_catalog.get_price(monthly_plan_price.id)
+        price_catalog.stats.clear()
+
+        # What dj-stripe does for ``price.updated`` webhooks
+        monthly_plan_price.nickname = "Monthly, renamed"
+        monthly_plan_price.save()
+
+        assert price_catalog.get_price(monthly_plan_price.id).nickname == "Monthly, renamed"
+        assert price_catalog.stats["loads"] == 1
+
+    def test_other_processes_reload_catalog_on_version_change(
+        self, price_catalog, monthly_plan_price, settings, django_capture_on_commit_callbacks
+    ):
+        settings.PRICE_CATALOG_VERSION_CHECK_INTERVAL = 0
+        price_catalog.get_price(monthly_plan_price.id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            models.Product.objects.filter(pk=monthly_plan_price.product.pk).update(name="Renamed")
+            # Another process changed the product, only the shared version tells this one
+            price_catalog.invalidate()
+        price_catalog._prices = {monthly_plan_price.id: monthly_plan_price}
+        price_catalog._version = "stale"
+
+        assert price_catalog.get_price(monthly_plan_price.id).product.name == "Renamed"
+
+
+class TestSubscriptionScheduleSerializer:
+    @staticmethod
+    def make_phase(price, days: int) -> dict:
+        start = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(days=days)
+        return {
+            "items": [{"price": price.id, "quantity": 1}],
+            "start_date": int(start.timestamp()),
+            "end_date": int((start + datetime.timedelta(days=30)).timestamp()),
+            "trial_end": None,
+        }
+
+    def test_query_count_does_not_grow_with_phases(
+        self, price_catalog, subscription_schedule_factory, free_plan_price, monthly_plan_price, yearly_plan_price
+    ):
+        prices = [free_plan_price, monthly_plan_price, yearly_plan_price]
+        short_schedule = subscription_schedule_factory(phases=[{"items": [{"price": free_plan_price.id}]}])
+        long_schedule = subscription_schedule_factory(
+            phases=[
+                {"items": [{"price": free_plan_price.id}]},
+                *[self.make_phase(prices[index % len(prices)], days=30 * index) for index in range(1, 7)],
+            ]
+        )
+
+        # Loaded once per process, not per request
+        price_catalog.get_price(free_plan_price.id)
+
+        query_counts = []
+        for schedule in (short_schedule, long_schedule):
+            schedule = djstripe_models.SubscriptionSchedule.objects.get(pk=schedule.pk)
+            with CaptureQueriesContext(connection) as queries:
+                data = serializers.TenantSubscriptionScheduleSerializer(schedule).data
+            query_counts.append(len(queries))
+
+        assert query_counts[0] == query_counts[1]
+        assert len(data["phases"]) == 7
+        assert [phase["item"]["price"]["id"] for phase in data["phases"][1:4]] == [
+            monthly_plan_price.id,
+            yearly_plan_price.id,
+            free_plan_price.id,
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentCustomerCreation:
+    def test_concurrent_first_requests_create_single_customer(self, tenant_factory, customer_factory, mocker):
+        tenant = tenant_factory()
+        created = threading.Event()
+
+        def create_customer(subscriber):
+            # Slow enough for the other requests to find the lock taken
+            time.sleep(0.2)
+            customer = customer_factory(subscriber=subscriber)
+            created.set()
+            return customer, True
+
+        get_or_create = mocker.patch.object(djstripe_models.Customer, "get_or_create", side_effect=create_customer)
+        results = []
+
+        def resolve_customer():
+            try:
+                results.append(customer_cache.get(tenant))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=resolve_customer) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        get_or_create.assert_called_once()
+        assert created.is_set()
+        assert len(results) == 5
+        assert len(set(results)) == 1
+        assert customer_cache.stats["lock_waits"] > 0
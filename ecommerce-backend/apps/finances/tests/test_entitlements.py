@@ -0,0 +1,189 @@
+import datetime
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from .. import constants
+from ..models import TenantEntitlements
+from ..policies import SubscriptionScheduleAccess, TenantEntitlementsAccess
+from ..services import entitlements
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def monthly_plan_schedule(subscription_schedule_factory, monthly_plan_price):
+    return subscription_schedule_factory(phases=[{"items": [{"price": monthly_plan_price.id}]}])
+
+
+def make_request(tenant):
+    request = Request(RequestFactory().get("/"))
+    request.tenant = tenant
+    return request
+
+
+class TestBuildEntitlements:
+    def test_plan_of_current_phase(self, monthly_plan_schedule, monthly_plan_price):
+        tenant = monthly_plan_schedule.customer.subscriber
+        phase = monthly_plan_schedule.phases[0]
+
+        (result,) = entitlements.build_entitlements([tenant.pk])
+
+        assert result.tenant_id == tenant.pk
+        assert result.plan == constants.MONTHLY_PLAN.name
+        assert result.price_id == monthly_plan_price.id
+        assert result.valid_until == datetime.datetime.fromtimestamp(phase["end_date"], tz=datetime.UTC)
+        assert result.is_paid
+
+    def test_tenant_without_customer_has_no_plan(self, tenant_factory):
+        tenant = tenant_factory()
+
+        (result,) = entitlements.build_entitlements([tenant.pk])
+
+        assert result.plan == ""
+        assert not result.is_paid
+
+    def test_queries_dont_grow_with_tenants(
+        self, subscription_schedule_factory, free_plan_price, monthly_plan_price, django_assert_num_queries
+    ):
+        schedules = [
+            subscription_schedule_factory(phases=[{"items": [{"price": price.id}]}])
+            for price in (free_plan_price, monthly_plan_price, monthly_plan_price)
+        ]
+
+        # customers, their active schedules, prices with products
+        with django_assert_num_queries(3):
+            result = entitlements.build_entitlements([schedule.customer.subscriber_id for schedule in schedules])
+
+        assert [item.plan for item in result] == [
+            constants.FREE_PLAN.name,
+            constants.MONTHLY_PLAN.name,
+            constants.MONTHLY_PLAN.name,
+        ]
+
+
+class TestRefreshEntitlements:
+    def test_saved_schedule_refreshes_entitlements_on_commit(
+        self, monthly_plan_schedule, django_capture_on_commit_callbacks
+    ):
+        TenantEntitlements.objects.all().delete()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            monthly_plan_schedule.save()
+
+        stored = TenantEntitlements.objects.get(tenant=monthly_plan_schedule.customer.subscriber)
+        assert stored.plan == constants.MONTHLY_PLAN.name
+
+    def test_existing_entitlements_are_updated(self, monthly_plan_schedule, free_plan_price):
+        tenant = monthly_plan_schedule.customer.subscriber
+        TenantEntitlements.objects.create(tenant=tenant, plan=constants.FREE_PLAN.name, price_id=free_plan_price.id)
+
+        entitlements.refresh_tenant_entitlements([tenant.pk])
+
+        stored = TenantEntitlements.objects.get(tenant=tenant)
+        assert stored.plan == constants.MONTHLY_PLAN.name
+        assert TenantEntitlements.objects.count() == 1
+
+
+class TestGetTenantEntitlements:
+    def test_stored_entitlements_are_read_with_single_query(self, monthly_plan_schedule, django_assert_num_queries):
+        tenant = monthly_plan_schedule.customer.subscriber
+        entitlements.refresh_tenant_entitlements([tenant.pk])
+
+        with django_assert_num_queries(1):
+            result = entitlements.get_tenant_entitlements(tenant)
+
+        assert result.plan == constants.MONTHLY_PLAN.name
+
+    def test_missing_entitlements_are_computed(self, monthly_plan_schedule):
+        tenant = monthly_plan_schedule.customer.subscriber
+        TenantEntitlements.objects.all().delete()
+
+        assert entitlements.get_tenant_entitlements(tenant).plan == constants.MONTHLY_PLAN.name
+        assert TenantEntitlements.objects.filter(tenant=tenant).exists()
+
+    def test_expired_entitlements_are_recomputed(self, monthly_plan_schedule):
+        tenant = monthly_plan_schedule.customer.subscriber
+        TenantEntitlements.objects.update_or_create(
+            tenant=tenant,
+            defaults={"plan": constants.FREE_PLAN.name, "valid_until": timezone.now() - datetime.timedelta(days=1)},
+        )
+
+        assert entitlements.get_tenant_entitlements(tenant).plan == constants.MONTHLY_PLAN.name
+
+    def test_request_reads_entitlements_once(self, monthly_plan_schedule, django_assert_num_queries):
+        tenant = monthly_plan_schedule.customer.subscriber
+        entitlements.refresh_tenant_entitlements([tenant.pk])
+        request = make_request(tenant)
+
+        with django_assert_num_queries(1):
+            first = entitlements.get_request_entitlements(request)
+            second = entitlements.get_request_entitlements(request._request)
+
+        assert first is second
+
+    def test_request_without_tenant(self):
+        assert entitlements.get_request_entitlements(make_request(None)) is None
+
+
+class TestTenantEntitlementsAccess:
+    def test_paid_plan_condition(self, monthly_plan_schedule, tenant_factory):
+        policy = TenantEntitlementsAccess()
+        paying_tenant = monthly_plan_schedule.customer.subscriber
+
+        assert policy.is_tenant_on_paid_plan(make_request(paying_tenant), None, "list")
+        assert policy.is_tenant_on_plan(make_request(paying_tenant), None, "list", constants.MONTHLY_PLAN.name)
+        assert not policy.is_tenant_on_paid_plan(make_request(tenant_factory()), None, "list")
+
+    def test_limit_condition(self, monthly_plan_schedule, mocker):
+        tenant = monthly_plan_schedule.customer.subscriber
+        TenantEntitlements.objects.create(tenant=tenant, limits={"max_members": 2})
+        view = mocker.Mock()
+
+        view.get_entitlement_usage.return_value = 1
+        assert TenantEntitlementsAccess().is_tenant_within_limit(make_request(tenant), view, "create", "max_members")
+        view.get_entitlement_usage.return_value = 2
+        assert not TenantEntitlementsAccess().is_tenant_within_limit(
+            make_request(tenant), view, "create", "max_members"
+        )
+
+    def test_schedule_can_be_cancelled_on_any_plan(self, monthly_plan_schedule, tenant_factory, mocker):
+        policy = SubscriptionScheduleAccess()
+        request = make_request(monthly_plan_schedule.customer.subscriber)
+        request.user = mocker.Mock(is_anonymous=False)
+
+        assert policy.has_permission(request, mocker.Mock(action="cancel"))
+        assert policy.has_permission(request, mocker.Mock(action="partial_update"))
+
+        # A tenant without a paid plan gets the serializer's no_paid_subscription error instead
+        request = make_request(tenant_factory())
+        request.user = mocker.Mock(is_anonymous=False)
+        assert policy.has_permission(request, mocker.Mock(action="cancel"))
+        assert policy.has_permission(request, mocker.Mock(action="retrieve"))
+
+
+class TestEntitlementsCommands:
+    def test_backfill(self, monthly_plan_schedule, tenant_factory):
+        tenant = tenant_factory()
+        TenantEntitlements.objects.all().delete()
+
+        call_command("backfill_tenant_entitlements", "--batch-size", "1")
+
+        assert TenantEntitlements.objects.get(tenant=monthly_plan_schedule.customer.subscriber).is_paid
+        assert TenantEntitlements.objects.get(tenant=tenant).plan == ""
+
+    def test_check_reports_inconsistent_entitlements(self, monthly_plan_schedule, capsys):
+        call_command("backfill_tenant_entitlements")
+        tenant = monthly_plan_schedule.customer.subscriber
+        TenantEntitlements.objects.filter(tenant=tenant).update(plan=constants.FREE_PLAN.name)
+
+        with pytest.raises(CommandError, match="1 tenants"):
+            call_command("check_tenant_entitlements")
+        assert f"Tenant {tenant.pk}" in capsys.readouterr().out
+
+        call_command("check_tenant_entitlements", "--fix")
+        call_command("check_tenant_entitlements")
+        assert TenantEntitlements.objects.get(tenant=tenant).plan == constants.MONTHLY_PLAN.name
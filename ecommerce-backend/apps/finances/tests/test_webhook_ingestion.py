@@ -0,0 +1,297 @@
+import datetime
+import json
+import pathlib
+import threading
+import time
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from djstripe import models as djstripe_models
+from stripe import WebhookSignature
+
+from apps.tasks.finance_tasks import process_webhook_events, resume_webhook_events
+
+from ..models import QueuedWebhookEvent
+from ..webhook_ingestion import WebhookEventProcessor, get_ordering_key, queue_webhook_event
+
+pytestmark = pytest.mark.django_db
+
+WEBHOOK_SECRET = "whsec_test"
+RECORDED_EVENTS = json.loads((pathlib.Path(__file__).parent / "data" / "stripe_webhook_events.json").read_text())
+
+
+def sign(body: str, secret: str = WEBHOOK_SECRET) -> str:
+    timestamp = int(time.time())
+    signature = WebhookSignature._compute_signature(f"{timestamp}.{body}", secret)
+    return f"t={timestamp},v1={signature}"
+
+
+@pytest.fixture
+def async_webhooks(settings, mocker):
+    settings.DJSTRIPE_WEBHOOK_SECRET = WEBHOOK_SECRET
+    settings.DJSTRIPE_WEBHOOK_EVENT_CALLBACK = queue_webhook_event
+    account = djstripe_models.Account.objects.create(id="acct_test", charges_enabled=False, details_submitted=False)
+    mocker.patch("djstripe.models.base.StripeModel._find_owner_account", return_value=account)
+
+
+@pytest.fixture
+def process_task_mock(mocker):
+    return mocker.patch("apps.tasks.finance_tasks.process_webhook_events.delay")
+
+
+@pytest.fixture
+def trigger_process_mock(mocker):
+    return mocker.patch.object(djstripe_models.WebhookEventTrigger, "process", autospec=True)
+
+
+def post_event(api_client, data: dict, signature: str = None):
+    body = json.dumps(data)
+    return api_client.post(
+        reverse("djstripe:webhook"),
+        data=body,
+        content_type="application/json",
+        HTTP_STRIPE_SIGNATURE=signature or sign(body),
+    )
+
+
+def processed_event_ids(trigger_process_mock) -> list[str]:
+    return [call.args[0].json_body["id"] for call in trigger_process_mock.call_args_list]
+
+
+@pytest.mark.usefixtures("async_webhooks")
+class TestQueueWebhookEvent:
+    def test_event_is_queued_without_processing(
+        self, api_client, process_task_mock, trigger_process_mock, django_capture_on_commit_callbacks
+    ):
+        data = RECORDED_EVENTS[0]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = post_event(api_client, data)
+
+        assert response.status_code == 200
+        event = QueuedWebhookEvent.objects.get()
+        assert event.event_id == data["id"]
+        assert event.event_type == data["type"]
+        assert event.ordering_key == data["data"]["object"]["customer"]
+        assert event.stripe_created == datetime.datetime.fromtimestamp(data["created"], tz=datetime.UTC)
+        assert event.trigger.valid
+        trigger_process_mock.assert_not_called()
+        process_task_mock.assert_called_once_with(event.ordering_key)
+
+    def test_duplicate_event_is_skipped(self, api_client, process_task_mock, django_capture_on_commit_callbacks):
+        data = RECORDED_EVENTS[0]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post_event(api_client, data)
+            response = post_event(api_client, data)
+
+        assert response.status_code == 200
+        assert QueuedWebhookEvent.objects.count() == 1
+        assert djstripe_models.WebhookEventTrigger.objects.count() == 2
+        process_task_mock.assert_called_once()
+
+    def test_event_is_published_after_last_save_of_trigger(
+        self, webhook_event_trigger_factory, process_task_mock, django_capture_on_commit_callbacks
+    ):
+        trigger = webhook_event_trigger_factory(body=json.dumps(RECORDED_EVENTS[0]))
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            queue_webhook_event(trigger)
+        assert callbacks == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            trigger.save()
+            trigger.save()
+
+        process_task_mock.assert_called_once_with(QueuedWebhookEvent.objects.get().ordering_key)
+
+    def test_concurrently_stored_event_is_skipped(
+        self, webhook_event_trigger_factory, process_task_mock, django_capture_on_commit_callbacks, mocker
+    ):
+        mocker.patch.object(QueuedWebhookEvent.objects, "get_or_create", side_effect=IntegrityError)
+        trigger = webhook_event_trigger_factory(body=json.dumps(RECORDED_EVENTS[0]))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            queue_webhook_event(trigger)
+            trigger.save()
+
+        process_task_mock.assert_not_called()
+
+    def test_event_with_invalid_signature_is_not_queued(self, api_client, process_task_mock):
+        data = RECORDED_EVENTS[0]
+
+        response = post_event(api_client, data, signature=sign(json.dumps(data), secret="whsec_other"))
+
+        assert response.status_code == 400
+        assert not QueuedWebhookEvent.objects.exists()
+        process_task_mock.assert_not_called()
+
+
+class TestGetOrderingKey:
+    def test_recorded_events(self):
+        assert {data["type"]: get_ordering_key(data) for data in RECORDED_EVENTS} == {
+            "invoice.payment_failed": "cus_OO1p3ZH0s7Wpzb",
+            "invoice.payment_action_required": "cus_OO1p3ZH0s7Wpzb",
+            "customer.subscription.trial_will_end": "cus_OO1p3ZH0s7Wpzb",
+            "payment_method.attached": "cus_OO1p9Xq1tPlTnE",
+            "payment_method.detached": "card_1NapZ9Jr3d0nrouDrz0CzUZx",
+            "subscription_schedule.released": "cus_OO1pR4nKw1cZgA",
+            "subscription_schedule.canceled": "cus_OO1pR4nKw1cZgA",
+            "charge.refund.updated": "re_1NapZCJr3d0nrouDy8bXnA6s",
+            "customer.updated": "cus_OO1p3ZH0s7Wpzb",
+        }
+
+
+class TestWebhookEventProcessor:
+    def test_events_are_processed_in_stripe_order(self, queued_webhook_event_factory, trigger_process_mock):
+        now = datetime.datetime.now(tz=datetime.UTC)
+        second = queued_webhook_event_factory(stripe_created=now)
+        first = queued_webhook_event_factory(stripe_created=now - datetime.timedelta(seconds=1))
+        queued_webhook_event_factory(ordering_key="cus_2")
+
+        processed_count = WebhookEventProcessor("cus_1").run()
+
+        assert processed_count == 2
+        assert processed_event_ids(trigger_process_mock) == [first.event_id, second.event_id]
+        first.refresh_from_db()
+        assert first.processed_at is not None
+        assert first.attempts == 1
+        assert QueuedWebhookEvent.objects.filter_pending().get().ordering_key == "cus_2"
+
+    def test_failed_event_blocks_its_key(self, queued_webhook_event_factory, trigger_process_mock):
+        now = datetime.datetime.now(tz=datetime.UTC)
+        failing = queued_webhook_event_factory(stripe_created=now - datetime.timedelta(seconds=1))
+        queued_webhook_event_factory(stripe_created=now)
+        trigger_process_mock.side_effect = RuntimeError("Stripe is down")
+
+        with pytest.raises(RuntimeError):
+            WebhookEventProcessor("cus_1", max_attempts=3).run()
+
+        assert trigger_process_mock.call_count == 1
+        failing.refresh_from_db()
+        assert failing.attempts == 1
+        assert failing.processed_at is None
+        assert failing.failed_at is None
+        assert "Stripe is down" in failing.error
+        assert failing.trigger.exception == "Stripe is down"
+        assert QueuedWebhookEvent.objects.filter_pending().count() == 2
+
+    def test_event_is_marked_failed_after_max_attempts(self, queued_webhook_event_factory, trigger_process_mock):
+        now = datetime.datetime.now(tz=datetime.UTC)
+        failing = queued_webhook_event_factory(stripe_created=now - datetime.timedelta(seconds=1), attempts=2)
+        following = queued_webhook_event_factory(stripe_created=now)
+        trigger_process_mock.side_effect = [RuntimeError("Stripe is down"), None]
+
+        processor = WebhookEventProcessor("cus_1", max_attempts=3)
+        processor.run()
+
+        assert processor.stats == {"failed": 1, "processed": 1}
+        failing.refresh_from_db()
+        assert failing.attempts == 3
+        assert failing.failed_at is not None
+        following.refresh_from_db()
+        assert following.processed_at is not None
+
+    def test_task_retries_failed_event(self, queued_webhook_event_factory, trigger_process_mock, mocker):
+        queued_webhook_event_factory()
+        trigger_process_mock.side_effect = RuntimeError("Stripe is down")
+        retry = mocker.patch.object(process_webhook_events, "retry", side_effect=RuntimeError("retry"))
+
+        with pytest.raises(RuntimeError, match="retry"):
+            process_webhook_events("cus_1")
+
+        assert retry.call_args.kwargs["countdown"] == 1
+
+    def test_task_returns_stats(self, queued_webhook_event_factory, trigger_process_mock):
+        queued_webhook_event_factory.create_batch(2)
+
+        assert process_webhook_events("cus_1") == {"ordering_key": "cus_1", "processed": 2}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentWebhookEventProcessors:
+    def test_key_locked_by_another_worker_is_skipped(self, queued_webhook_event_factory, trigger_process_mock):
+        event = queued_webhook_event_factory()
+        locked = threading.Event()
+        released = threading.Event()
+
+        def process_event():
+            try:
+                with transaction.atomic():
+                    QueuedWebhookEvent.objects.select_for_update().get(pk=event.pk)
+                    locked.set()
+                    released.wait(timeout=10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=process_event)
+        thread.start()
+        locked.wait(timeout=10)
+        try:
+            processed_count = WebhookEventProcessor("cus_1").run()
+        finally:
+            released.set()
+            thread.join()
+
+        assert processed_count == 0
+        trigger_process_mock.assert_not_called()
+        assert QueuedWebhookEvent.objects.filter_pending().count() == 1
+
+
+class TestResumeWebhookEvents:
+    def test_keys_of_stalled_events_are_resumed(self, queued_webhook_event_factory, process_task_mock):
+        stalled = queued_webhook_event_factory.create_batch(2, ordering_key="cus_stalled")
+        queued_webhook_event_factory(ordering_key="cus_recent")
+        queued_webhook_event_factory(ordering_key="cus_done", processed_at=datetime.datetime.now(tz=datetime.UTC))
+        QueuedWebhookEvent.objects.filter(pk__in=[event.pk for event in stalled]).update(
+            received_at=datetime.datetime.now(tz=datetime.UTC) - datetime.timedelta(minutes=10)
+        )
+        QueuedWebhookEvent.objects.filter(ordering_key="cus_done").update(
+            received_at=datetime.datetime.now(tz=datetime.UTC) - datetime.timedelta(minutes=10)
+        )
+
+        assert resume_webhook_events() == {"resumed": ["cus_stalled"]}
+        process_task_mock.assert_called_once_with("cus_stalled")
+
+
+class TestReplayStripeEventsCommand:
+    def test_failed_events_are_replayed(self, queued_webhook_event_factory, trigger_process_mock):
+        now = datetime.datetime.now(tz=datetime.UTC)
+        failed = queued_webhook_event_factory(failed_at=now, attempts=5, error="Traceback")
+        queued_webhook_event_factory(processed_at=now)
+
+        call_command("replay_stripe_events", "--failed")
+
+        assert processed_event_ids(trigger_process_mock) == [failed.event_id]
+        failed.refresh_from_db()
+        assert failed.failed_at is None
+        assert failed.processed_at is not None
+        assert failed.error == ""
+
+    def test_handlers_of_processed_event_are_invoked_again(
+        self, queued_webhook_event_factory, webhook_event_factory, trigger_process_mock, mocker
+    ):
+        stripe_event = webhook_event_factory(type="customer.updated", data={"object": {"object": "customer"}})
+        event = queued_webhook_event_factory(
+            event_id=stripe_event.id, processed_at=datetime.datetime.now(tz=datetime.UTC)
+        )
+        invoke_handlers = mocker.patch.object(djstripe_models.Event, "invoke_webhook_handlers", autospec=True)
+
+        call_command("replay_stripe_events", event.event_id)
+
+        invoke_handlers.assert_called_once_with(stripe_event)
+        trigger_process_mock.assert_not_called()
+
+    def test_dry_run(self, queued_webhook_event_factory, trigger_process_mock, capsys):
+        event = queued_webhook_event_factory(ordering_key="cus_2")
+
+        call_command("replay_stripe_events", "--ordering-key", "cus_2", "--dry-run")
+
+        assert event.event_id in capsys.readouterr().out
+        trigger_process_mock.assert_not_called()
+
+    def test_events_have_to_be_selected(self):
+        with pytest.raises(CommandError):
+            call_command("replay_stripe_events")
@@ -1,11 +1,12 @@
 import datetime
-from unittest.mock import patch
 
 import calleee
 import pytest
 from djstripe import models as djstripe_models
 from djstripe.enums import RefundFailureReason, RefundStatus
 
+from apps.notifications.models import OutboxMessage
+
 from .. import notifications
 from .utils import stripe_encode
 
@@ -78,8 +79,7 @@ class TestSubscriptionScheduleRelease:
 
 
 class TestSendSubscriptionErrorEmail:
-    @patch("common.emails.send_email")
-    def test_send_email_on_invoice_payment_failed(self, send_email, webhook_event_factory, subscription):
+    def test_send_email_on_invoice_payment_failed(self, webhook_event_factory, subscription):
         webhook_event = webhook_event_factory(
             type="invoice.payment_failed",
             data={
@@ -93,12 +93,13 @@ class TestSendSubscriptionErrorEmail:
 
         webhook_event.invoke_webhook_handlers()
 
-        send_email.apply_async.assert_called_with(
-            (subscription.customer.subscriber.email, notifications.SubscriptionErrorEmail.name, None)
-        )
+        assert OutboxMessage.objects.last().payload == {
+            "to": subscription.customer.subscriber.email,
+            "email_type": notifications.SubscriptionErrorEmail.name,
+            "email_data": None,
+        }
 
-    @patch("common.emails.send_email")
-    def test_send_email_on_invoice_payment_required(self, send_email, webhook_event_factory, subscription):
+    def test_send_email_on_invoice_payment_required(self, webhook_event_factory, subscription):
         webhook_event = webhook_event_factory(
             type="invoice.payment_action_required",
             data={
@@ -112,14 +113,15 @@ class TestSendSubscriptionErrorEmail:
 
         webhook_event.invoke_webhook_handlers()
 
-        send_email.apply_async.assert_called_with(
-            (subscription.customer.subscriber.email, notifications.SubscriptionErrorEmail.name, None)
-        )
+        assert OutboxMessage.objects.last().payload == {
+            "to": subscription.customer.subscriber.email,
+            "email_type": notifications.SubscriptionErrorEmail.name,
+            "email_data": None,
+        }
 
 
 class TestSendTrialExpiresSoonEmail:
-    @patch("common.emails.send_email")
-    def test_previously_trialing_subscription_is_canceled(self, send_email, webhook_event_factory, customer):
+    def test_previously_trialing_subscription_is_canceled(self, webhook_event_factory, customer):
         webhook_event = webhook_event_factory(
             type="customer.subscription.trial_will_end",
             data={"object": {"object": "subscription", "customer": customer.id, "trial_end": 1617103425}},
@@ -127,13 +129,11 @@ class TestSendTrialExpiresSoonEmail:
 
         webhook_event.invoke_webhook_handlers()
 
-        send_email.apply_async.assert_called_with(
-            (
-                customer.subscriber.email,
-                notifications.TrialExpiresSoonEmail.name,
-                {"expiry_date": "2021-03-30T11:23:45Z"},
-            )
-        )
+        assert OutboxMessage.objects.last().payload == {
+            "to": customer.subscriber.email,
+            "email_type": notifications.TrialExpiresSoonEmail.name,
+            "email_data": {"expiry_date": "2021-03-30T11:23:45Z"},
+        }
 
 
 class TestPaymentMethodDetached:
@@ -4,37 +4,41 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from . import serializers
+from . import policies, serializers
+from .cache import get_tenant_customer
+
+# The creation time of dj-stripe objects is nullable, the primary key grows with it
+STRIPE_OBJECTS_ORDERING = ("-djstripe_id",)
 
 
 class PaymentIntentViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.PaymentIntentSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = STRIPE_OBJECTS_ORDERING
     http_method_names = ["get", "post", "patch"]
 
     def get_queryset(self):
-        customer, _ = djstripe_models.Customer.get_or_create(self.request.tenant)
-        return djstripe_models.PaymentIntent.objects.filter(customer=customer)
+        return djstripe_models.PaymentIntent.objects.filter(customer=get_tenant_customer(self.request.tenant).id)
 
 
 class SetupIntentViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.SetupIntentSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = STRIPE_OBJECTS_ORDERING
     http_method_names = ["get", "post"]
 
     def get_queryset(self):
-        customer, _ = djstripe_models.Customer.get_or_create(self.request.tenant)
-        return djstripe_models.SetupIntent.objects.filter(customer=customer)
+        return djstripe_models.SetupIntent.objects.filter(customer=get_tenant_customer(self.request.tenant).id)
 
 
 class PaymentMethodViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.PaymentMethodSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = STRIPE_OBJECTS_ORDERING
     http_method_names = ["get", "delete"]
 
     def get_queryset(self):
-        customer, _ = djstripe_models.Customer.get_or_create(self.request.tenant)
-        return djstripe_models.PaymentMethod.objects.filter(customer=customer)
+        return djstripe_models.PaymentMethod.objects.filter(customer=get_tenant_customer(self.request.tenant).id)
 
     @action(detail=True, methods=["post"])
     def set_default(self, request, pk=None):
@@ -50,20 +54,20 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
 class SubscriptionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.SubscriptionSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = STRIPE_OBJECTS_ORDERING
 
     def get_queryset(self):
-        customer, _ = djstripe_models.Customer.get_or_create(self.request.tenant)
-        return djstripe_models.Subscription.objects.filter(customer=customer)
+        return djstripe_models.Subscription.objects.filter(customer=get_tenant_customer(self.request.tenant).id)
 
 
 class SubscriptionScheduleViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.TenantSubscriptionScheduleSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [policies.SubscriptionScheduleAccess]
+    keyset_ordering = STRIPE_OBJECTS_ORDERING
     http_method_names = ["get", "patch"]
 
     def get_queryset(self):
-        customer, _ = djstripe_models.Customer.get_or_create(self.request.tenant)
-        return djstripe_models.SubscriptionSchedule.objects.filter(customer=customer)
+        return djstripe_models.SubscriptionSchedule.objects.filter(customer=get_tenant_customer(self.request.tenant).pk)
 
     @action(detail=True, methods=["post"], serializer_class=serializers.CancelTenantActiveSubscriptionSerializer)
     def cancel(self, request, pk=None):
@@ -0,0 +1,177 @@
+import datetime
+import logging
+from collections import Counter
+from traceback import format_exc
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+from djstripe import models as djstripe_models
+from djstripe.settings import djstripe_settings
+from djstripe.utils import get_id_from_stripe_data
+
+from .models import QueuedWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def get_ordering_key(data: dict) -> str:
+    """
+    Events of a customer are ordered by the customer id, events without a customer by the id of their object.
+    """
+    obj = data.get("data", {}).get("object", {})
+    if obj.get("object") == "customer":
+        return obj["id"]
+    return get_id_from_stripe_data(obj.get("customer")) or obj.get("id") or data["id"]
+
+
+def get_api_key(trigger: djstripe_models.WebhookEventTrigger) -> str:
+    # The same key dj-stripe uses when it processes a trigger within the webhook request
+    account = trigger.stripe_trigger_account
+    return (account and account.default_api_key) or djstripe_settings.get_default_api_key(trigger.json_body["livemode"])
+
+
+def queue_webhook_event(trigger: djstripe_models.WebhookEventTrigger, api_key: str = None):
+    """
+    ``DJSTRIPE_WEBHOOK_EVENT_CALLBACK`` of the async ingestion mode, called once the signature of the event is verified.
+
+    The event is only stored and handed to a worker, so Stripe gets its response without waiting for the handlers and
+    the Stripe API calls they make. An event that was already received is skipped.
+
+    dj-stripe saves the trigger once more after its callback returns, outside of any transaction, so the event is handed
+    to the worker by ``publish_queued_webhook_event`` after that save; otherwise the worker's save of the processed
+    trigger and the request's one would overwrite each other.
+    """
+    data = trigger.json_body
+    try:
+        event, created = QueuedWebhookEvent.objects.get_or_create(
+            event_id=data["id"],
+            defaults={
+                "event_type": data["type"],
+                "ordering_key": get_ordering_key(data),
+                "stripe_created": datetime.datetime.fromtimestamp(data["created"], tz=datetime.UTC),
+                "trigger": trigger,
+            },
+        )
+    except IntegrityError:
+        # Stored by a concurrent redelivery of the event
+        created = False
+    if not created:
+        logger.info(f"Stripe event {data['id']} was already received, skipping it")
+        return
+
+    trigger._queued_webhook_event = event
+
+
+def publish_queued_webhook_event(trigger: djstripe_models.WebhookEventTrigger):
+    """
+    Hands the event queued by ``queue_webhook_event`` to a worker once its trigger is saved for the last time.
+    """
+    from apps.tasks.finance_tasks import process_webhook_events
+
+    event = trigger.__dict__.pop("_queued_webhook_event", None)
+    if event is not None:
+        transaction.on_commit(lambda: process_webhook_events.delay(event.ordering_key))
+
+
+def process_webhook_event(event: QueuedWebhookEvent, replay: bool = False):
+    """
+    Runs the webhook handlers of the event. dj-stripe skips events it has already processed, unless they are replayed.
+    """
+    stripe_event = None
+    if replay:
+        stripe_event = djstripe_models.Event.objects.filter(id=event.event_id).first()
+
+    if stripe_event is not None:
+        stripe_event.invoke_webhook_handlers()
+    else:
+        event.trigger.process(save=True, api_key=get_api_key(event.trigger))
+
+    event.attempts += 1
+    event.error = ""
+    event.processed_at = timezone.now()
+    event.failed_at = None
+    event.save(update_fields=["attempts", "error", "processed_at", "failed_at"])
+
+
+def replay_webhook_event(event: QueuedWebhookEvent):
+    with transaction.atomic():
+        # Waits for a worker which is processing the event right now
+        event = QueuedWebhookEvent.objects.select_for_update(of=("self",)).select_related("trigger").get(pk=event.pk)
+        process_webhook_event(event, replay=True)
+
+
+class WebhookEventProcessor:
+    """
+    Processes pending events of a single ordering key, oldest first.
+
+    Every event is processed in a transaction holding the lock of its row. A worker which finds the oldest pending event
+    locked leaves the key to the worker holding the lock, which goes on until no event of the key is pending, so events
+    of a key are never processed concurrently or out of order. A failed event blocks its key until it's retried; after
+    ``STRIPE_WEBHOOK_MAX_ATTEMPTS`` attempts it's marked as failed, left for the ``replay_stripe_events`` command, and
+    the following events are processed.
+    """
+
+    def __init__(self, ordering_key: str, max_attempts: int = None):
+        self.ordering_key = ordering_key
+        self.max_attempts = max_attempts or settings.STRIPE_WEBHOOK_MAX_ATTEMPTS
+        self.stats = Counter()
+
+    def run(self) -> int:
+        while self.process_next():
+            pass
+        return self.stats["processed"]
+
+    def process_next(self) -> bool:
+        """
+        Returns ``False`` if no event of the key is pending or another worker is processing it. Raises the exception of
+        an event which failed and will be retried.
+        """
+        error = None
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    event = self._lock_next_event()
+            except OperationalError:
+                # NOWAIT: another worker is processing the key
+                return False
+
+            if event is None:
+                return False
+
+            try:
+                with transaction.atomic():
+                    process_webhook_event(event)
+            except Exception as e:
+                error = e
+                self._record_failure(event, e)
+            else:
+                self.stats["processed"] += 1
+
+        if error is not None and event.failed_at is None:
+            raise error
+        return True
+
+    def _lock_next_event(self) -> QueuedWebhookEvent | None:
+        return (
+            QueuedWebhookEvent.objects.filter_pending()
+            .filter(ordering_key=self.ordering_key)
+            .select_related("trigger")
+            .select_for_update(nowait=True, of=("self",))
+            .order_by("stripe_created", "pk")
+            .first()
+        )
+
+    def _record_failure(self, event: QueuedWebhookEvent, exception: Exception):
+        event.attempts += 1
+        event.error = format_exc()
+        if event.attempts >= self.max_attempts:
+            event.failed_at = timezone.now()
+            self.stats["failed"] += 1
+            logger.error(f"Stripe event {event.event_id} failed {event.attempts} times, giving up: {exception}")
+        event.save(update_fields=["attempts", "error", "failed_at"])
+
+        max_length = djstripe_models.WebhookEventTrigger._meta.get_field("exception").max_length
+        djstripe_models.WebhookEventTrigger.objects.filter(pk=event.trigger_id).update(
+            exception=str(exception)[:max_length], traceback=event.error
+        )
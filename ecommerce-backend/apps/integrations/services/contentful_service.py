@@ -1,4 +1,6 @@
 import logging
+from collections.abc import Iterator
+from dataclasses import dataclass, field
 from typing import Any
 
 from django.conf import settings
@@ -6,6 +8,18 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ContentfulSyncPage:
+    """
+    One page of the Contentful Sync API. ``sync_token`` continues the sync right after this page.
+    """
+
+    sync_token: str
+    entries: list[dict[str, Any]] = field(default_factory=list)
+    deleted_ids: list[str] = field(default_factory=list)
+    has_more: bool = False
+
+
 class ContentfulService:
     """Service for interacting with Contentful CMS."""
 
@@ -85,6 +99,33 @@ class ContentfulService:
             logger.error(f"Error fetching all entries: {e}")
             return []
 
+    def sync(self, sync_token: str | None = None) -> Iterator[ContentfulSyncPage]:
+        """
+        Iterate pages of the Contentful Sync API.
+
+        Without a ``sync_token`` an initial sync returning all published entries is started. With a token only entries
+        published and deleted (or unpublished) since the token was issued are returned. Errors are not swallowed, a
+        partially applied sync must not be mistaken for a complete one.
+        """
+        if not self.is_configured():
+            return
+
+        import contentful
+
+        page = self.client.sync({"sync_token": sync_token} if sync_token else {"initial": True, "type": "Entry"})
+        while True:
+            sync_page = ContentfulSyncPage(sync_token=page.next_sync_token, has_more=bool(page.next_page_url))
+            for item in page.items:
+                if isinstance(item, contentful.DeletedEntry):
+                    sync_page.deleted_ids.append(item.id)
+                elif isinstance(item, contentful.Entry):
+                    sync_page.entries.append(self._serialize_entry(item))
+            yield sync_page
+
+            if not sync_page.has_more:
+                break
+            page = page.next(self.client)
+
     def get_content_types(self) -> list[dict[str, Any]]:
         """Get all content types."""
         if not self.is_configured():
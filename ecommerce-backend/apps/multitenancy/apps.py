@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MultitenancyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.multitenancy"
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Subquery
+
+from common.cache import MISSING, CacheStats, LocalTTLCache
+
+from .models import Tenant, TenantMembership
+
+# Some cache backends (django-redis) drop ``None`` values from ``get_many``, so negative results are stored as False
+_NOT_FOUND = False
+
+
+@dataclass(frozen=True)
+class TenantContext:
+    tenant: Tenant | None
+    role: str | None
+
+
+class TenantContextCache:
+    """
+    Two-tier cache of the tenant resolved from the request and the role of the current user within it.
+
+    The first tier is an in-process LRU with a short TTL, the second one is the shared ``CACHES["default"]``.
+    Both values are filled by a single query and invalidated by model signals (see ``signals.py``). Tenants are cached
+    as the values of their fields and every lookup gets a ``Tenant`` instance of its own, so attributes set on it or
+    related objects cached on it don't leak into other requests.
+    Missing tenants and memberships are cached as well, so unknown ids don't hit the database on every request.
+
+    Whether a user accepted the membership of a tenant is cached separately for WebSocket connections, which are
+    checked by ``ais_member()`` without leaving the event loop while the local tier holds the answer.
+    """
+
+    KEY_PREFIX = "tenant_context"
+
+    def __init__(self):
+        self.local = LocalTTLCache(
+            max_size=settings.TENANT_CONTEXT_LOCAL_CACHE_MAX_SIZE,
+            timeout=settings.TENANT_CONTEXT_LOCAL_CACHE_TIMEOUT,
+        )
+        self.stats = CacheStats()
+
+    @staticmethod
+    def normalize_tenant_id(tenant_id) -> str | None:
+        try:
+            tenant_pk = Tenant._meta.pk.to_python(tenant_id)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        return str(tenant_pk) if tenant_pk is not None else None
+
+    @classmethod
+    def tenant_key(cls, tenant_pk) -> str:
+        return f"{cls.KEY_PREFIX}:tenant:{tenant_pk}"
+
+    @classmethod
+    def role_key(cls, tenant_pk, user_pk) -> str:
+        return f"{cls.KEY_PREFIX}:role:{tenant_pk}:{user_pk}"
+
+    @classmethod
+    def member_key(cls, tenant_pk, user_pk) -> str:
+        return f"{cls.KEY_PREFIX}:member:{tenant_pk}:{user_pk}"
+
+    def get(self, tenant_id, user=None) -> TenantContext:
+        tenant_pk = self.normalize_tenant_id(tenant_id)
+        if tenant_pk is None:
+            return TenantContext(tenant=None, role=None)
+
+        user_pk = str(user.pk) if user and user.is_authenticated else None
+        # Users authenticated from a cached principal snapshot (see apps.users.cache) carry their tenant roles already
+        principal = getattr(user, "principal", None) if user_pk else None
+        keys = [self.tenant_key(tenant_pk)]
+        if user_pk and principal is None:
+            keys.append(self.role_key(tenant_pk, user_pk))
+
+        values = self._get_many(keys)
+        if all(key in values for key in keys):
+            tenant = self._build_tenant(values[keys[0]])
+            if principal is not None:
+                role = principal.tenant_roles.get(tenant_pk)
+            else:
+                role = values[keys[1]] if user_pk else None
+            return TenantContext(tenant=tenant, role=role if tenant else None)
+
+        self.stats["misses"] += 1
+        tenant, role = self._fetch(tenant_pk, user if principal is None else None)
+        fetched = {keys[0]: self._get_tenant_values(tenant)}
+        if len(keys) > 1:
+            fetched[keys[1]] = role
+        self._set_many(fetched)
+        if principal is not None and tenant is not None:
+            role = principal.tenant_roles.get(tenant_pk)
+
+        return TenantContext(tenant=tenant, role=role)
+
+    def is_member(self, tenant_id, user_pk) -> bool:
+        tenant_pk = self.normalize_tenant_id(tenant_id)
+        if tenant_pk is None:
+            return False
+
+        key = self.member_key(tenant_pk, user_pk)
+        values = self._get_many([key])
+        if key in values:
+            # A cached non-member is read back as None, see _NOT_FOUND
+            return bool(values[key])
+
+        self.stats["misses"] += 1
+        is_member = TenantMembership.objects.filter(tenant_id=tenant_pk, user_id=user_pk, is_accepted=True).exists()
+        self._set_many({key: is_member})
+        return is_member
+
+    async def ais_member(self, tenant_id, user_pk) -> bool:
+        tenant_pk = self.normalize_tenant_id(tenant_id)
+        if tenant_pk is None:
+            return False
+
+        is_member = self.local.get(self.member_key(tenant_pk, user_pk))
+        if is_member is not MISSING:
+            self.stats["local_hits"] += 1
+            return bool(is_member)
+
+        return await database_sync_to_async(self.is_member)(tenant_pk, user_pk)
+
+    def invalidate_tenant(self, tenant_pk):
+        self._delete_many([self.tenant_key(tenant_pk)])
+
+    def invalidate_membership(self, tenant_pk, user_pk):
+        self._delete_many([self.role_key(tenant_pk, user_pk), self.member_key(tenant_pk, user_pk)])
+
+    def clear(self):
+        self.local.clear()
+        self.stats.clear()
+
+    @staticmethod
+    def _fetch(tenant_pk, user) -> tuple[Tenant | None, str | None]:
+        queryset = Tenant.objects.filter(pk=tenant_pk)
+        if user and user.is_authenticated:
+            memberships = TenantMembership.objects.filter(tenant=OuterRef("pk"), user=user.pk)
+            queryset = queryset.annotate(current_user_role=Subquery(memberships.values("role")[:1]))
+
+        tenant = queryset.first()
+        if tenant is None:
+            return None, None
+
+        # The role is user specific, so it must not end up in the cached tenant instance
+        role = tenant.__dict__.pop("current_user_role", None)
+        return tenant, role
+
+    @staticmethod
+    def _get_tenant_values(tenant: Tenant | None) -> dict | None:
+        if tenant is None:
+            return None
+        return {field.attname: getattr(tenant, field.attname) for field in Tenant._meta.concrete_fields}
+
+    @staticmethod
+    def _build_tenant(values: dict | None) -> Tenant | None:
+        if values is None:
+            return None
+        # Fields added after the values were cached are deferred, i.e. loaded on access
+        return Tenant.from_db(None, list(values), list(values.values()))
+
+    def _get_many(self, keys: list[str]) -> dict:
+        values = {}
+        shared_keys = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is MISSING:
+                shared_keys.append(key)
+            else:
+                values[key] = value
+
+        if not shared_keys:
+            self.stats["local_hits"] += 1
+            return values
+
+        shared_values = {
+            key: None if value is _NOT_FOUND else value for key, value in cache.get_many(shared_keys).items()
+        }
+        for key, value in shared_values.items():
+            self.local.set(key, value)
+        values.update(shared_values)
+
+        if len(shared_values) == len(shared_keys):
+            self.stats["shared_hits"] += 1
+        return values
+
+    def _set_many(self, values: dict):
+        cache.set_many(
+            {key: _NOT_FOUND if value is None else value for key, value in values.items()},
+            timeout=settings.TENANT_CONTEXT_CACHE_TIMEOUT,
+        )
+        for key, value in values.items():
+            self.local.set(key, value)
+
+    def _delete_many(self, keys: list[str]):
+        cache.delete_many(keys)
+        for key in keys:
+            self.local.delete(key)
+
+
+tenant_context_cache = TenantContextCache()
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+
+from common.benchmarks import BenchmarkCommand, rolled_back_transaction, run_benchmark
+
+from ...cache import tenant_context_cache
+from ...constants import TenantType, TenantUserRole
+from ...middleware import TenantMiddleware
+from ...models import Tenant, TenantMembership
+
+User = get_user_model()
+
+# Number of ACL policy checks reading request.user_role in a typical request
+ROLE_READS_PER_REQUEST = 3
+
+
+def _legacy_context(tenant_id, user):
+    """
+    Tenant and role resolution as it was done before the tenant context cache was introduced.
+    """
+    tenant = Tenant.objects.get(pk=tenant_id)
+    return tenant, TenantMembership.objects.get(user=user, tenant=tenant).role
+
+
+class Command(BenchmarkCommand):
+    help = "Measure queries and latency of tenant + role resolution per request, with and without the context cache"
+
+    def run_benchmarks(self, iterations: int, **options):
+        with rolled_back_transaction():
+            user = User.objects.create(email="tenant-context-benchmark@example.org")
+            tenant = Tenant.objects.create(creator=user, name="Benchmark", type=TenantType.ORGANIZATION)
+            TenantMembership.objects.create(user=user, tenant=tenant, role=TenantUserRole.ADMIN, is_accepted=True)
+
+            request_factory = RequestFactory()
+            tenant_id = str(tenant.pk)
+
+            def handle_request():
+                request = request_factory.get("/", HTTP_X_TENANT_ID=tenant_id)
+                request.user = user
+
+                def get_response(request):
+                    return [str(request.tenant.pk)] + [request.user_role for _ in range(ROLE_READS_PER_REQUEST)]
+
+                return TenantMiddleware(get_response)(request)
+
+            def handle_legacy_request():
+                return _legacy_context(tenant_id, user)
+
+            def handle_cold_request():
+                tenant_context_cache.invalidate_tenant(tenant_id)
+                tenant_context_cache.invalidate_membership(tenant_id, user.pk)
+                return handle_request()
+
+            def handle_shared_cache_request():
+                tenant_context_cache.local.clear()
+                return handle_request()
+
+            results = [
+                run_benchmark("legacy (uncached lookups)", handle_legacy_request, iterations),
+                run_benchmark("cold cache (joined query)", handle_cold_request, iterations),
+                run_benchmark("shared cache hit", handle_shared_cache_request, iterations),
+                run_benchmark("local cache hit", handle_request, iterations),
+            ]
+
+            tenant_context_cache.invalidate_tenant(tenant_id)
+            tenant_context_cache.invalidate_membership(tenant_id, user.pk)
+
+        self.stdout.write(f"Tenant context cache stats: {dict(tenant_context_cache.stats)}")
+        return results
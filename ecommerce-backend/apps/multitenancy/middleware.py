@@ -1,6 +1,6 @@
 from django.utils.functional import SimpleLazyObject
 
-from .models import Tenant, TenantMembership
+from .cache import tenant_context_cache
 
 
 def get_current_tenant(tenant_id):
@@ -13,10 +13,7 @@ def get_current_tenant(tenant_id):
     Returns:
         Tenant or None: The retrieved tenant or None if not found.
     """
-    try:
-        return Tenant.objects.get(pk=tenant_id)
-    except (Tenant.DoesNotExist, TypeError, ValueError):
-        return None
+    return tenant_context_cache.get(tenant_id).tenant
 
 
 def get_current_user_role(tenant, user):
@@ -31,11 +28,7 @@ def get_current_user_role(tenant, user):
         str or None: The user role or None if not found or invalid conditions.
     """
     if user and user.is_authenticated and tenant:
-        try:
-            membership = TenantMembership.objects.get(user=user, tenant=tenant)
-            return membership.role
-        except TenantMembership.DoesNotExist:
-            return None
+        return tenant_context_cache.get(tenant.pk, user).role
 
     return None
 
@@ -46,6 +39,8 @@ class TenantMiddleware:
 
     This middleware extracts the tenant ID from request headers or parameters
     and attaches the tenant object to the request.
+
+    Tenant and user role are resolved together from the tenant context cache on first access.
     """
 
     def __init__(self, get_response):
@@ -56,8 +51,9 @@ class TenantMiddleware:
         tenant_id = request.headers.get("X-Tenant-ID") or request.GET.get("tenant_id")
 
         if tenant_id:
-            request.tenant = SimpleLazyObject(lambda: get_current_tenant(tenant_id))
-            request.user_role = SimpleLazyObject(lambda: get_current_user_role(request.tenant, request.user))
+            tenant_context = SimpleLazyObject(lambda: tenant_context_cache.get(tenant_id, request.user))
+            request.tenant = SimpleLazyObject(lambda: tenant_context.tenant)
+            request.user_role = SimpleLazyObject(lambda: tenant_context.role)
         else:
             request.tenant = None
             request.user_role = None
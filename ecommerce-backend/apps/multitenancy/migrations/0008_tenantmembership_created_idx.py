@@ -0,0 +1,14 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("multitenancy", "0007_tenantmembership_creator"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tenantmembership",
+            index=models.Index(fields=["tenant", "-created_at", "-id"], name="membership_tenant_created"),
+        ),
+    ]
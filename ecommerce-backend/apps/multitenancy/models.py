@@ -156,6 +156,9 @@ class TenantMembership(TimestampedMixin, models.Model):
                 condition=~Q(invitee_email_address__exact=""),
             ),
         ]
+        indexes = [
+            models.Index(fields=["tenant", "-created_at", "-id"], name="membership_tenant_created"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} {self.tenant.name} {self.role}"
@@ -6,7 +6,10 @@ from django.utils.translation import gettext_lazy as _
 from hashid_field import rest as hidrest
 from rest_framework import exceptions, serializers
 
+from apps.users.cache import principal_cache
+
 from . import models, notifications
+from .cache import tenant_context_cache
 from .constants import TenantType, TenantUserRole
 from .services.membership import create_tenant_membership
 from .tokens import tenant_invitation_token
@@ -67,6 +70,9 @@ class AcceptTenantInvitationSerializer(TenantInvitationActionSerializer):
             models.TenantMembership.objects.get_not_accepted().filter(pk=membership_id, user=user).update(
                 is_accepted=True, invitation_accepted_at=timezone.now()
             )
+            # QuerySet.update() doesn't send post_save, so the cached role and principal need to be dropped explicitly
+            tenant_context_cache.invalidate_membership(membership.tenant_id, user.pk)
+            principal_cache.bump_version(user.pk)
             notifications.send_accepted_tenant_invitation_notification(membership, str(membership_id))
         return {"ok": True}
 
@@ -136,6 +142,11 @@ class CreateTenantInvitationSerializer(serializers.Serializer):
 class TenantMembershipSerializer(serializers.ModelSerializer):
     """Serializer for tenant membership"""
 
+    id = hidrest.HashidSerializerCharField(source_field="multitenancy.TenantMembership.id", read_only=True)
+    user = hidrest.HashidSerializerCharField(source_field="users.User.id", source="user_id", read_only=True)
+    tenant = hidrest.HashidSerializerCharField(
+        source_field="multitenancy.Tenant.id", source="tenant_id", read_only=True
+    )
     user_email = serializers.SerializerMethodField()
     user_name = serializers.SerializerMethodField()
 
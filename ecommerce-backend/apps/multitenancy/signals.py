@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import tenant_context_cache
+from .models import Tenant, TenantMembership
+
+
+@receiver([post_save, post_delete], sender=Tenant)
+def invalidate_tenant_context(sender, instance: Tenant, **kwargs):
+    tenant_pk = instance.pk
+    transaction.on_commit(lambda: tenant_context_cache.invalidate_tenant(tenant_pk))
+
+
+@receiver([post_save, post_delete], sender=TenantMembership)
+def invalidate_tenant_membership_context(sender, instance: TenantMembership, **kwargs):
+    if instance.user_id is None:
+        return
+
+    tenant_pk, user_pk = instance.tenant_id, instance.user_id
+    transaction.on_commit(lambda: tenant_context_cache.invalidate_membership(tenant_pk, user_pk))
@@ -0,0 +1,130 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from ..cache import tenant_context_cache
+from ..constants import TenantUserRole
+from ..middleware import TenantMiddleware
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    tenant_context_cache.clear()
+    yield
+    tenant_context_cache.clear()
+
+
+class TestTenantContextCache:
+    def test_tenant_and_role_are_fetched_with_single_query(
+        self, tenant, user, tenant_membership_factory, django_assert_num_queries
+    ):
+        tenant_membership_factory(user=user, tenant=tenant, role=TenantUserRole.ADMIN)
+
+        with django_assert_num_queries(1):
+            context = tenant_context_cache.get(str(tenant.pk), user)
+
+        assert context.tenant == tenant
+        assert context.role == TenantUserRole.ADMIN
+        assert tenant_context_cache.stats["misses"] == 1
+
+    def test_second_lookup_is_served_from_local_cache(
+        self, tenant, user, tenant_membership_factory, django_assert_num_queries
+    ):
+        tenant_membership_factory(user=user, tenant=tenant, role=TenantUserRole.MEMBER)
+        tenant_context_cache.get(str(tenant.pk), user)
+
+        with django_assert_num_queries(0):
+            context = tenant_context_cache.get(str(tenant.pk), user)
+
+        assert context.role == TenantUserRole.MEMBER
+        assert tenant_context_cache.stats["local_hits"] == 1
+
+    def test_every_lookup_gets_its_own_tenant_instance(self, tenant, user, django_assert_num_queries):
+        first = tenant_context_cache.get(str(tenant.pk), user).tenant
+        first.name = "Changed by a request"
+
+        with django_assert_num_queries(0):
+            second = tenant_context_cache.get(str(tenant.pk), user).tenant
+
+        assert second is not first
+        assert second == tenant
+        assert second.name == tenant.name
+        assert not second._state.adding
+
+    def test_shared_cache_is_used_after_local_cache_is_dropped(self, tenant, user, django_assert_num_queries):
+        tenant_context_cache.get(str(tenant.pk), user)
+        tenant_context_cache.local.clear()
+
+        with django_assert_num_queries(0):
+            context = tenant_context_cache.get(str(tenant.pk), user)
+
+        assert context.tenant == tenant
+        assert context.role is None
+        assert tenant_context_cache.stats["shared_hits"] == 1
+
+    def test_missing_tenant_is_negatively_cached(self, user, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            tenant_context_cache.get("9999", user)
+
+        tenant_context_cache.local.clear()
+        with django_assert_num_queries(0):
+            context = tenant_context_cache.get("9999", user)
+
+        assert context.tenant is None
+        assert context.role is None
+
+    def test_invalid_tenant_id_does_not_query_database(self, user, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            context = tenant_context_cache.get("not-a-hashid", user)
+
+        assert context.tenant is None
+
+    def test_membership_change_invalidates_role(
+        self, tenant, user, tenant_membership_factory, django_capture_on_commit_callbacks
+    ):
+        membership = tenant_membership_factory(user=user, tenant=tenant, role=TenantUserRole.MEMBER)
+        tenant_context_cache.get(str(tenant.pk), user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            membership.role = TenantUserRole.OWNER
+            membership.save()
+
+        assert tenant_context_cache.get(str(tenant.pk), user).role == TenantUserRole.OWNER
+
+    def test_tenant_change_invalidates_tenant(self, tenant, user, django_capture_on_commit_callbacks):
+        tenant_context_cache.get(str(tenant.pk), user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tenant.name = "Renamed tenant"
+            tenant.save()
+
+        assert tenant_context_cache.get(str(tenant.pk), user).tenant.name == "Renamed tenant"
+
+
+class TestTenantMiddleware:
+    def test_tenant_and_role_resolved_with_single_query(
+        self, tenant, user, tenant_membership_factory, django_assert_num_queries
+    ):
+        tenant_membership_factory(user=user, tenant=tenant, role=TenantUserRole.OWNER)
+        request = RequestFactory().get("/", HTTP_X_TENANT_ID=str(tenant.pk))
+        request.user = user
+
+        def get_response(request):
+            return request.tenant.pk, str(request.user_role)
+
+        with django_assert_num_queries(1):
+            response = TenantMiddleware(get_response)(request)
+
+        assert response == (tenant.pk, TenantUserRole.OWNER)
+
+    def test_anonymous_user_has_no_role(self, tenant):
+        request = RequestFactory().get("/", HTTP_X_TENANT_ID=str(tenant.pk))
+        request.user = AnonymousUser()
+
+        TenantMiddleware(lambda request: None)(request)
+
+        assert request.tenant == tenant
+        assert not request.user_role
@@ -0,0 +1,38 @@
+import pytest
+from django.urls import reverse
+
+from ..models import TenantMembership
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def authenticated_client(api_client, user):
+    api_client.force_authenticate(user)
+    return api_client
+
+
+class TestTenantMembershipViewSet:
+    def test_member_lists_memberships_of_tenant(self, authenticated_client, user, tenant, tenant_membership_factory):
+        tenant_membership_factory(user=user, tenant=tenant)
+        tenant_membership_factory(tenant=tenant)
+        tenant_membership_factory()
+
+        response = authenticated_client.get(reverse("membership-list"), {"tenant_id": str(tenant.pk)})
+
+        assert response.status_code == 200
+        assert {item["id"] for item in response.json()["results"]} == {
+            str(membership.pk) for membership in TenantMembership.objects.filter(tenant=tenant)
+        }
+
+    def test_pending_invitee_gets_no_memberships(self, authenticated_client, user, tenant, tenant_membership_factory):
+        tenant_membership_factory(user=user, tenant=tenant, is_accepted=False)
+        member = tenant_membership_factory(tenant=tenant)
+
+        response = authenticated_client.get(reverse("membership-list"), {"tenant_id": str(tenant.pk)})
+        assert response.status_code == 200
+        assert response.json()["results"] == []
+
+        response = authenticated_client.delete(reverse("membership-detail", args=[member.pk]))
+        assert response.status_code == 404
+        assert TenantMembership.objects.filter(pk=member.pk).exists()
@@ -26,12 +26,14 @@ class TenantMembershipViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        # Tenants of the user's accepted memberships only, a pending invitee isn't a member yet
+        queryset = models.TenantMembership.objects.filter(
+            tenant__in=models.TenantMembership.objects.filter(user=self.request.user).values("tenant")
+        )
         tenant_id = self.request.query_params.get("tenant_id")
         if tenant_id:
-            return models.TenantMembership.objects.filter(
-                tenant_id=tenant_id, tenant__membership__user=self.request.user
-            )
-        return models.TenantMembership.objects.filter(tenant__membership__user=self.request.user)
+            return queryset.filter(tenant_id=tenant_id)
+        return queryset
 
     @action(detail=True, methods=["delete"])
     def remove(self, request, pk=None):
@@ -6,3 +6,13 @@ from . import models
 @admin.register(models.Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ("id", "type", "user")
+
+
+@admin.register(models.NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    list_display = ("id", "type", "tenant", "sent_count", "created_at", "completed_at")
+
+
+@admin.register(models.OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "created_at")
@@ -0,0 +1,140 @@
+import logging
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import Notification, NotificationBroadcast
+from .publisher import encode_frame, notification_publisher
+from .stream import get_event_frame, notification_stream
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def get_user_group_name(user_id) -> str:
+    """
+    Name of the channel layer group the user's ``NotificationConsumer`` connections are in.
+    """
+    return f"notifications_user_{User._meta.pk.to_python(user_id)}"
+
+
+def get_notification_data(notification: Notification) -> dict:
+    return {
+        "id": str(notification.id),
+        "type": notification.type,
+        "data": notification.data,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def publish_notifications(notifications: Iterable[Notification]):
+    """
+    Appends notifications to their users' event streams and sends them to their users' WebSocket groups. Every
+    notification is encoded once, however many connections its user has.
+    """
+    notifications = list(notifications)
+    if not notifications:
+        return
+
+    data = [encode_frame(get_notification_data(notification)) for notification in notifications]
+    event_ids = notification_stream.append(notifications, data)
+    notification_publisher.publish_many(
+        [
+            (get_user_group_name(notification.user_id), get_event_frame(event_id, notification_data), None)
+            for notification, notification_data, event_id in zip(notifications, data, event_ids, strict=True)
+        ]
+    )
+
+
+def publish_unread_counts(unread_counts: dict):
+    """
+    Sends users their current number of unread notifications, keyed by user id. A count replaces the user's count
+    which wasn't sent yet.
+    """
+    notification_publisher.publish_many(
+        [
+            (
+                get_user_group_name(user_id),
+                encode_frame({"type": "unread_count", "data": {"unread_count": count}}),
+                "unread_count",
+            )
+            for user_id, count in unread_counts.items()
+        ]
+    )
+
+
+def get_broadcast_recipients(tenant_id: str = None) -> QuerySet:
+    recipients = User.objects.filter(is_active=True)
+    if tenant_id:
+        recipients = recipients.filter(tenant_memberships__tenant_id=tenant_id, tenant_memberships__is_accepted=True)
+    return recipients
+
+
+def get_keyset_chunk(queryset: QuerySet, after=None, size: int = None) -> list:
+    """
+    Returns up to ``size`` primary keys of ``queryset`` greater than ``after``. Unlike offset pagination every chunk is
+    a single index range scan, no matter how far into the table it is.
+    """
+    queryset = queryset.order_by("pk").values_list("pk", flat=True)
+    if after:
+        queryset = queryset.filter(pk__gt=after)
+    return list(queryset[:size])
+
+
+class NotificationBroadcaster:
+    """
+    Fans a ``NotificationBroadcast`` out to its recipients.
+
+    Every chunk of recipients is inserted with a single ``bulk_create`` in the same transaction that moves the
+    broadcast's checkpoint, while the broadcast row is locked. A crashed broadcast can be run again and continues after
+    the last committed chunk, and two workers running the same broadcast never notify a user twice. WebSocket messages
+    are published once the chunk is committed.
+    """
+
+    def __init__(self, broadcast_id: str, chunk_size: int = None):
+        self.broadcast_id = broadcast_id
+        self.chunk_size = chunk_size or settings.NOTIFICATIONS_BROADCAST_CHUNK_SIZE
+
+    def run(self) -> int:
+        from .counters import unread_counter
+
+        sent_count = 0
+        while (notifications := self.process_chunk()) is not None:
+            publish_notifications(notifications)
+            unread_counter.count_created(notifications)
+            sent_count += len(notifications)
+        return sent_count
+
+    def process_chunk(self) -> list[Notification] | None:
+        """
+        Notifies the next chunk of recipients. Returns ``None`` once the broadcast is completed.
+        """
+        with transaction.atomic():
+            broadcast = NotificationBroadcast.objects.select_for_update().get(pk=self.broadcast_id)
+            if broadcast.is_completed:
+                return None
+
+            user_ids = get_keyset_chunk(
+                get_broadcast_recipients(broadcast.tenant_id), after=broadcast.last_user_id, size=self.chunk_size
+            )
+            if not user_ids:
+                broadcast.completed_at = timezone.now()
+                broadcast.save(update_fields=["completed_at", "updated_at"])
+                logger.info(f"Broadcast {broadcast.pk} completed, sent to {broadcast.sent_count} users")
+                return None
+
+            notifications = Notification.objects.bulk_create(
+                [Notification(user_id=user_id, type=broadcast.type, data=broadcast.data) for user_id in user_ids]
+            )
+
+            broadcast.last_user_id = str(user_ids[-1])
+            broadcast.sent_count += len(notifications)
+            broadcast.save(update_fields=["last_user_id", "sent_count", "updated_at"])
+
+        return notifications
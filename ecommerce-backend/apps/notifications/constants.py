@@ -1,5 +1,12 @@
 from enum import Enum
 
+from django.db import models
+
 
 class Subscription(Enum):
     NOTIFICATIONS_LIST_SUBSCRIPTION = "notificationsListSubscription"
+
+
+class OutboxMessageKind(models.TextChoices):
+    EMAIL = "email", "Email"
+    NOTIFICATION = "notification", "Notification"
@@ -0,0 +1,153 @@
+import collections
+import logging
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+
+from .broadcast import get_keyset_chunk, publish_unread_counts
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class UnreadNotificationCounter:
+    """
+    Number of unread notifications of every user, kept in the shared cache so reading it never counts rows.
+
+    A user's counter is counted in the database the first time it's read and atomically incremented and decremented
+    afterwards as notifications are created and read; every change is pushed to the user's WebSocket connections. A
+    counter which hasn't been counted yet isn't changed, its next read counts it. Counters which drift, e.g. when a
+    notification is created while its counter is counted, are fixed by ``reconcile()`` which celery beat runs
+    periodically.
+
+    Changes are applied once the transaction which made them is committed; callers run them in
+    ``transaction.on_commit``.
+    """
+
+    KEY_PREFIX = "notifications:unread"
+
+    @staticmethod
+    def normalize_user_id(user_id) -> str:
+        return str(User._meta.pk.to_python(getattr(user_id, "pk", user_id)))
+
+    @classmethod
+    def user_key(cls, user_id) -> str:
+        return f"{cls.KEY_PREFIX}:{cls.normalize_user_id(user_id)}"
+
+    def get(self, user_id) -> int:
+        """
+        The user's counter, counted in the database unless it's cached.
+        """
+        key = self.user_key(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = Notification.objects.filter(user_id=self.normalize_user_id(user_id)).filter_unread().count()
+            # A counter changed in the meantime is kept, it's at least as recent as the count
+            if not cache.add(key, count, timeout=settings.NOTIFICATIONS_UNREAD_COUNTER_TIMEOUT):
+                count = cache.get(key, count)
+        return count
+
+    def change(self, deltas: dict, publish: bool = True) -> dict[str, int]:
+        """
+        Adds ``deltas`` keyed by user id to the users' counters and pushes the new counts to them.
+        """
+        keys = {self.user_key(user_id): delta for user_id, delta in deltas.items() if delta}
+        # Users who aren't counted, like most recipients of a broadcast, are skipped with a single read
+        counted_keys = cache.get_many(list(keys)) if keys else {}
+
+        unread_counts = {}
+        for key, delta in keys.items():
+            if key in counted_keys and (count := self._incr(key, delta)) is not None:
+                unread_counts[key.removeprefix(f"{self.KEY_PREFIX}:")] = count
+
+        if publish:
+            publish_unread_counts(unread_counts)
+        return unread_counts
+
+    def count_created(self, notifications: Iterable[Notification], publish: bool = True) -> dict[str, int]:
+        return self.change(
+            collections.Counter(self.normalize_user_id(notification.user_id) for notification in notifications),
+            publish=publish,
+        )
+
+    def reset(self, user_id, publish: bool = True):
+        """
+        Sets the user's counter to zero, once all of their notifications are marked read.
+        """
+        cache.set(self.user_key(user_id), 0, timeout=settings.NOTIFICATIONS_UNREAD_COUNTER_TIMEOUT)
+        if publish:
+            publish_unread_counts({self.normalize_user_id(user_id): 0})
+
+    def recount(self, user_ids: Iterable, publish: bool = True) -> dict[str, int]:
+        """
+        Counts the users' unread notifications in the database with a single query and replaces the cached counters
+        which differ. Returns the counts which were replaced.
+        """
+        keys = {self.user_key(user_id): self.normalize_user_id(user_id) for user_id in user_ids}
+        if not keys:
+            return {}
+
+        counts = dict.fromkeys(keys.values(), 0)
+        rows = (
+            Notification.objects.filter(user_id__in=list(keys.values()))
+            .filter_unread()
+            .order_by()
+            .values("user_id")
+            .annotate(count=Count("id"))
+            .values_list("user_id", "count")
+        )
+        for user_id, count in rows:
+            counts[str(user_id)] = count
+
+        cached = cache.get_many(list(keys))
+        changed = {user_id: counts[user_id] for key, user_id in keys.items() if cached.get(key) != counts[user_id]}
+        cache.set_many(
+            {self.user_key(user_id): count for user_id, count in changed.items()},
+            timeout=settings.NOTIFICATIONS_UNREAD_COUNTER_TIMEOUT,
+        )
+
+        if publish:
+            publish_unread_counts(changed)
+        return changed
+
+    def reconcile(self, batch_size: int = None) -> int:
+        """
+        Recounts the cached counters of all active users, in keyset chunks of ``batch_size`` users. Users without a
+        cached counter are skipped. Returns the number of counters which were fixed.
+        """
+        batch_size = batch_size or settings.NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_BATCH_SIZE
+        users = User.objects.filter(is_active=True)
+
+        fixed_count = 0
+        after = None
+        while user_ids := get_keyset_chunk(users, after=after, size=batch_size):
+            after = user_ids[-1]
+            cached = cache.get_many([self.user_key(user_id) for user_id in user_ids])
+            counted_user_ids = [user_id for user_id in user_ids if self.user_key(user_id) in cached]
+            fixed_count += len(self.recount(counted_user_ids))
+
+        if fixed_count:
+            logger.info(f"Fixed {fixed_count} unread notification counters")
+        return fixed_count
+
+    @staticmethod
+    def _incr(key: str, delta: int) -> int | None:
+        try:
+            count = cache.incr(key, delta)
+        except ValueError:
+            # Expired since it was read
+            return None
+
+        if count < 0:
+            # Drifted below zero, the next read counts it again
+            cache.delete(key)
+            return None
+        return count
+
+
+unread_counter = UnreadNotificationCounter()
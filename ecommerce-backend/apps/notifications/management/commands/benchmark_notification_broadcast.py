@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+
+from apps.tasks.notification_tasks import create_notification
+from common.benchmarks import BenchmarkCommand, rolled_back_transaction, run_batch_benchmark
+
+from ...broadcast import NotificationBroadcaster, get_broadcast_recipients
+from ...models import NotificationBroadcast
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Seed users and measure how many users per second a broadcast notifies, with a task per user versus the "
+        "chunked broadcaster"
+    )
+
+    default_iterations = 10_000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--legacy-users", type=int, default=1000, help="Users notified by the slow task per user path"
+        )
+
+    def run_benchmarks(self, iterations: int, chunk_size: int, legacy_users: int, **options):
+        with rolled_back_transaction():
+            User.objects.bulk_create(
+                User(email=f"broadcast-benchmark-{index}@example.org") for index in range(iterations)
+            )
+            recipients = get_broadcast_recipients()
+            user_count = recipients.count()
+
+            def legacy_broadcast():
+                # Body of every create_notification task the broadcast used to enqueue, run without the broker
+                for user_id in recipients.values_list("id", flat=True)[:legacy_users]:
+                    create_notification(user_id=user_id, notification_type="BENCHMARK_LEGACY")
+
+            def chunked_broadcast():
+                broadcast = NotificationBroadcast.objects.create(type="BENCHMARK")
+                NotificationBroadcaster(broadcast.pk, chunk_size=chunk_size).run()
+
+            return [
+                run_batch_benchmark("task per user", legacy_broadcast, min(legacy_users, user_count)),
+                run_batch_benchmark("chunked broadcaster", chunked_broadcast, user_count),
+            ]
@@ -0,0 +1,122 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import override_settings
+from django.utils import timezone
+
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, run_batch_benchmark, run_benchmark
+
+from ...broadcast import get_notification_data, get_user_group_name, publish_notifications
+from ...models import Notification
+from ...publisher import notification_publisher
+from ...stream import notification_stream
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": 1_000_000}}
+}
+
+
+def _legacy_publish(notification: Notification):
+    """
+    A notification published the way the post_save receiver and create_notification did, each of them once: the
+    message is built and sent with a new event loop.
+    """
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        get_user_group_name(notification.user_id),
+        {"type": "notification_message", "data": get_notification_data(notification)},
+    )
+
+
+class Command(BenchmarkCommand):
+    """
+    Users' connections are channels in the users' groups of the in-memory channel layer, so the channel layer's redis
+    isn't part of the measurement. Notifications aren't saved; the publisher appends their events to the users' streams
+    in redis, which are deleted afterwards.
+
+    A burst publishes ``--iterations`` notifications spread over the users at once and ends when every connection
+    holds its frames. Single notifications are published and delivered one by one, the publisher is flushed after
+    each of them instead of waiting for its window.
+    """
+
+    help = (
+        "Measure how long it takes to fan notifications out to their users' WebSocket connections, with a channel "
+        "layer message sent from a new event loop per notification versus the coalescing notification publisher"
+    )
+
+    default_iterations = 10_000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--connections", type=int, default=2, help="Connections of every user")
+        parser.add_argument("--single-iterations", type=int, default=500)
+
+    def run_benchmarks(
+        self, iterations: int, users: int, connections: int, single_iterations: int, **options
+    ) -> list[BenchmarkResult]:
+        results = []
+        with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+            channel_layer = get_channel_layer()
+            channel_names = self._connect(channel_layer, users, connections)
+
+            created_at = timezone.now()
+            notifications = [
+                Notification(id=index + 1, user_id=index % users + 1, type="BENCHMARK", data={}, created_at=created_at)
+                for index in range(iterations)
+            ]
+
+            def legacy_burst():
+                for notification in notifications:
+                    _legacy_publish(notification)
+
+            def publisher_burst():
+                publish_notifications(notifications)
+                notification_publisher.flush()
+
+            for name, burst in (("burst, loop per message", legacy_burst), ("burst, publisher", publisher_burst)):
+                results.append(run_batch_benchmark(name, burst, len(notifications)))
+                messages, frames = self._drain(channel_layer, channel_names)
+                self.stdout.write(f"{name}: {messages} channel layer messages delivered {frames} frames")
+
+            notification = notifications[0]
+
+            def publisher_single():
+                publish_notifications([notification])
+                notification_publisher.flush()
+
+            for name, publish in (
+                ("single, loop per message", lambda: _legacy_publish(notification)),
+                ("single, publisher", publisher_single),
+            ):
+                results.append(run_benchmark(name, publish, single_iterations))
+                self._drain(channel_layer, channel_names)
+
+        notification_stream.redis.delete(*(notification_stream.user_key(user_id) for user_id in range(1, users + 1)))
+        return results
+
+    @staticmethod
+    def _connect(channel_layer, users: int, connections: int) -> list[str]:
+        async def connect():
+            channel_names = []
+            for user_id in range(1, users + 1):
+                for _ in range(connections):
+                    channel_name = await channel_layer.new_channel()
+                    await channel_layer.group_add(get_user_group_name(user_id), channel_name)
+                    channel_names.append(channel_name)
+            return channel_names
+
+        return async_to_sync(connect)()
+
+    @staticmethod
+    def _drain(channel_layer, channel_names: list[str]) -> tuple[int, int]:
+        async def drain():
+            messages = frames = 0
+            for channel_name in channel_names:
+                # The in-memory layer drops the queue of a channel once it's empty
+                while channel_name in channel_layer.channels:
+                    message = await channel_layer.receive(channel_name)
+                    messages += 1
+                    frames += len(message.get("frames", [message]))
+            return messages, frames
+
+        return async_to_sync(drain)()
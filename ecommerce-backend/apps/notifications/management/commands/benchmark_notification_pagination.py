@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.benchmarks import BenchmarkCommand, rolled_back_transaction, run_benchmark
+from common.pagination import KeysetPagination
+
+from ...models import Notification
+
+User = get_user_model()
+
+
+def _seed_notifications(user, rows: int):
+    # Spread over a year, a few notifications share a creation time
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Notification._meta.db_table} (user_id, type, data, created_at)
+            SELECT %s, 'BENCHMARK', '{{}}', now() - (series / 4) * interval '30 seconds'
+            FROM generate_series(1, %s) AS series
+            """,
+            [user.pk.id, rows],
+        )
+        cursor.execute(f"ANALYZE {Notification._meta.db_table}")
+
+
+class Command(BenchmarkCommand):
+    """
+    A single user's notifications are seeded with one statement and rolled back afterwards. Every page is read with
+    ``OFFSET`` the way page number pagination does and with the keyset cursor of the row the page starts after; the
+    keyset page should take the same time at any depth.
+    """
+
+    help = "Seed a user with --rows notifications and measure reading a page at increasing depths, offset versus keyset"
+
+    default_iterations = 20
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--page-size", type=int, default=25)
+
+    def run_benchmarks(self, iterations: int, rows: int, page_size: int, **options):
+        results = []
+        # The request factory sends requests to "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]), rolled_back_transaction():
+            user = User.objects.create(email="pagination-benchmark@example.org")
+            _seed_notifications(user, rows)
+            queryset = Notification.objects.filter(user=user)
+            ordered = queryset.order_by("-created_at", "-id")
+
+            depths = [
+                depth for depth in (0, 1_000, 10_000, 100_000, rows - page_size) if 0 <= depth <= rows - page_size
+            ]
+            for depth in sorted(set(depths)):
+                page_number = depth // page_size + 1
+
+                def read_offset_page(depth=depth):
+                    return list(ordered[depth : depth + page_size])
+
+                request = self._get_request(page_size, self._get_cursor(queryset, ordered, depth, page_size))
+
+                def read_keyset_page(request=request):
+                    return KeysetPagination().paginate_queryset(queryset, request)
+
+                results.append(run_benchmark(f"offset, page {page_number}", read_offset_page, iterations))
+                results.append(run_benchmark(f"keyset, page {page_number}", read_keyset_page, iterations))
+
+        return results
+
+    @classmethod
+    def _get_cursor(cls, queryset, ordered, depth: int, page_size: int) -> str | None:
+        if depth == 0:
+            return None
+        # The first page sets up the paginator to encode cursors of the queryset with
+        paginator = KeysetPagination()
+        paginator.paginate_queryset(queryset, cls._get_request(page_size, None))
+        return paginator.encode_cursor(reverse=False, instance=ordered[depth - 1])
+
+    @staticmethod
+    def _get_request(page_size: int, cursor: str | None) -> Request:
+        params = {"page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        return Request(APIRequestFactory().get("/notifications/", params))
@@ -0,0 +1,122 @@
+import random
+
+from django.contrib.auth import get_user_model
+
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, rolled_back_transaction, run_batch_benchmark
+
+from ...broadcast import get_notification_data
+from ...models import Notification
+from ...publisher import encode_frame
+from ...serializers import NotificationSerializer
+from ...stream import notification_stream
+
+User = get_user_model()
+
+# Older than any event which is kept
+TRIMMED_EVENT_ID = "1-0"
+
+
+def _refetch(user_id, page_size: int) -> list:
+    """
+    What a client did after every reconnect: fetch the first page of its notifications over the REST API.
+    """
+    notifications = (
+        Notification.objects.filter(user_id=user_id).with_read_until().order_by("-created_at", "-id")[:page_size]
+    )
+    return NotificationSerializer(notifications, many=True).data
+
+
+class Command(BenchmarkCommand):
+    """
+    Users and their notifications are seeded in a rolled back transaction and their events appended to the users'
+    streams in redis, which are deleted afterwards.
+
+    Every one of ``--iterations`` clients reconnects as a random user which missed up to ``--max-missed`` events;
+    ``--resync-rate`` of them were disconnected for longer than their events are kept and fall back to refetching.
+    """
+
+    help = (
+        "Simulate clients reconnecting to the notification stream after a deploy, refetching their notifications "
+        "over REST versus replaying the events they missed"
+    )
+
+    default_iterations = 10_000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--events", type=int, default=50, help="Notifications of every user")
+        parser.add_argument("--max-missed", type=int, default=5)
+        parser.add_argument("--resync-rate", type=float, default=0.05)
+        parser.add_argument("--page-size", type=int, default=25)
+
+    def run_benchmarks(
+        self,
+        iterations: int,
+        users: int,
+        events: int,
+        max_missed: int,
+        resync_rate: float,
+        page_size: int,
+        **options,
+    ) -> list[BenchmarkResult]:
+        with rolled_back_transaction():
+            user_objects = User.objects.bulk_create(
+                User(email=f"reconnect-benchmark-{index}@example.org") for index in range(users)
+            )
+            try:
+                event_ids = self._seed(user_objects, events)
+                clients = self._get_clients(event_ids, iterations, max_missed, resync_rate)
+
+                def refetch_all():
+                    for user_id, _ in clients:
+                        _refetch(user_id, page_size)
+
+                stats = {"replayed": 0, "resynced": 0}
+
+                def replay_all():
+                    for user_id, last_event_id in clients:
+                        frames = notification_stream.read_after(user_id, last_event_id)
+                        if frames is None:
+                            stats["resynced"] += 1
+                            _refetch(user_id, page_size)
+                        else:
+                            stats["replayed"] += len(frames)
+
+                results = [
+                    run_batch_benchmark("reconnect, REST refetch", refetch_all, len(clients)),
+                    run_batch_benchmark("reconnect, stream replay", replay_all, len(clients)),
+                ]
+            finally:
+                notification_stream.redis.delete(*(notification_stream.user_key(user.pk) for user in user_objects))
+
+        self.stdout.write(f"Stream replay: {stats['replayed']} frames replayed, {stats['resynced']} clients resynced")
+        return results
+
+    @staticmethod
+    def _seed(users: list, events: int) -> dict:
+        notifications = Notification.objects.bulk_create(
+            Notification(user=user, type="BENCHMARK", data={"title": f"Notification {index}"})
+            for user in users
+            for index in range(events)
+        )
+        data = [encode_frame(get_notification_data(notification)) for notification in notifications]
+        event_ids = {}
+        for notification, event_id in zip(notifications, notification_stream.append(notifications, data), strict=True):
+            event_ids.setdefault(notification.user_id, []).append(event_id)
+        return event_ids
+
+    @staticmethod
+    def _get_clients(event_ids: dict, count: int, max_missed: int, resync_rate: float) -> list[tuple]:
+        generator = random.Random(0)
+        user_ids = list(event_ids)
+        clients = []
+        for _ in range(count):
+            user_id = generator.choice(user_ids)
+            if generator.random() < resync_rate:
+                clients.append((user_id, TRIMMED_EVENT_ID))
+            else:
+                user_event_ids = event_ids[user_id]
+                missed = generator.randint(0, min(max_missed, len(user_event_ids) - 1))
+                clients.append((user_id, user_event_ids[-1 - missed]))
+        return clients
@@ -0,0 +1,56 @@
+from celery import current_app
+
+from common.benchmarks import BenchmarkCommand, rolled_back_transaction, run_batch_benchmark
+from common.emails import send_email, send_emails
+
+from ...outbox import OutboxRelay, enqueue_email
+
+BENCHMARK_QUEUE = "benchmark-outbox"
+
+
+class BenchmarkOutboxRelay(OutboxRelay):
+    def dispatch_emails(self, emails: list[tuple]):
+        send_emails.apply_async((emails,), queue=BENCHMARK_QUEUE)
+
+
+class Command(BenchmarkCommand):
+    """
+    Tasks are published to the configured broker, to a separate queue which no worker consumes and which is purged
+    afterwards, so the benchmark doesn't send any email.
+    """
+
+    help = (
+        "Measure how many emails per second are handed to the broker with an apply_async() call per email versus "
+        "the transactional outbox and its relay"
+    )
+
+    default_iterations = 5000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def run_benchmarks(self, iterations: int, batch_size: int, **options):
+        emails = [
+            (f"outbox-benchmark-{index}@example.org", "BENCHMARK", {"index": index}) for index in range(iterations)
+        ]
+
+        def task_per_email():
+            for email in emails:
+                send_email.apply_async(email, queue=BENCHMARK_QUEUE)
+
+        def outbox():
+            # Every email is written by the transaction which sends it and dispatched by the relay in batches
+            for email in emails:
+                enqueue_email(*email)
+            BenchmarkOutboxRelay(batch_size=batch_size).run()
+
+        try:
+            with rolled_back_transaction():
+                return [
+                    run_batch_benchmark("apply_async per email", task_per_email, iterations),
+                    run_batch_benchmark("outbox + relay", outbox, iterations),
+                ]
+        finally:
+            with current_app.connection_for_write() as connection:
+                connection.default_channel.queue_purge(BENCHMARK_QUEUE)
@@ -0,0 +1,155 @@
+import multiprocessing
+import time
+from datetime import timedelta
+
+from django import db
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.tasks.notification_tasks import create_notification
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, rolled_back_transaction, run_batch_benchmark
+
+from ...models import Notification, ScheduledNotification
+from ...scheduler import ScheduledNotificationSender
+
+User = get_user_model()
+
+EMAIL_PREFIX = "scheduled-benchmark-"
+NOTIFICATION_TYPE = "BENCHMARK_SCHEDULED"
+
+SEED_BATCH_SIZE = 5000
+
+
+class _BenchmarkScheduledNotificationSender(ScheduledNotificationSender):
+    """
+    Inserts the notifications of a batch without the strategies, which publish them to the application's WebSocket
+    groups and unread counters once they're committed.
+    """
+
+    def dispatch_notifications(self, scheduled: list[ScheduledNotification]):
+        Notification.objects.bulk_create(
+            [
+                Notification(user_id=notification.user_id, type=notification.type, data=notification.data)
+                for notification in scheduled
+            ]
+        )
+
+
+class Command(BenchmarkCommand):
+    """
+    ``--iterations`` due scheduled notifications of ``--users`` users are committed and drained by every count of
+    ``--workers`` senders running in parallel forked processes, the way celery workers run them. The rows are marked due
+    again between the runs. The legacy path, a task and a ``save()`` per row, runs on ``--legacy-rows`` rows in a rolled
+    back transaction; it can't run in parallel without sending notifications twice.
+    """
+
+    help = (
+        "Seed a backlog of due scheduled notifications and measure how many per second are sent with a task and a "
+        "save() per row versus SKIP LOCKED batches drained by parallel workers"
+    )
+
+    default_iterations = 100_000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--legacy-rows", type=int, default=2000, help="Rows sent by the slow task per row path")
+
+    def run_benchmarks(
+        self, iterations: int, users: int, workers: list[int], batch_size: int, legacy_rows: int, **options
+    ) -> list[BenchmarkResult]:
+        with rolled_back_transaction():
+            self._seed(users, legacy_rows)
+            results = [run_batch_benchmark("task + save() per row", self._send_legacy, legacy_rows)]
+
+        try:
+            self._seed(users, iterations)
+            for count in workers:
+                results.append(self._drain(count, batch_size, iterations))
+                ScheduledNotification.objects.filter(type=NOTIFICATION_TYPE).update(sent=False, sent_at=None)
+                self._delete_notifications()
+        finally:
+            self._delete_notifications()
+            User.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+        return results
+
+    @staticmethod
+    def _seed(users: int, rows: int):
+        user_ids = [
+            user.pk
+            for user in User.objects.bulk_create(
+                User(email=f"{EMAIL_PREFIX}{index}@example.org") for index in range(users)
+            )
+        ]
+        now = timezone.now()
+        # Due over the last hour, the way a backlog builds up
+        ScheduledNotification.objects.bulk_create(
+            (
+                ScheduledNotification(
+                    user_id=user_ids[index % users],
+                    type=NOTIFICATION_TYPE,
+                    data={"index": index},
+                    scheduled_for=now - timedelta(seconds=index % 3600),
+                )
+                for index in range(rows)
+            ),
+            batch_size=SEED_BATCH_SIZE,
+        )
+
+    @staticmethod
+    def _delete_notifications():
+        # Without the post_delete signal, which would change the unread counter of a user for every notification
+        notifications = Notification.objects.filter(type=NOTIFICATION_TYPE)
+        notifications._raw_delete(notifications.db)
+
+    @staticmethod
+    def _send_legacy():
+        # Body of the task before it claimed batches, with the body of every create_notification task it enqueued
+        now = timezone.now()
+        for scheduled in ScheduledNotification.objects.filter(scheduled_for__lte=now, sent=False):
+            create_notification(user_id=scheduled.user_id, notification_type=scheduled.type, data=scheduled.data)
+            scheduled.sent = True
+            scheduled.sent_at = now
+            scheduled.save()
+
+    @classmethod
+    def _drain(cls, workers: int, batch_size: int, rows: int) -> BenchmarkResult:
+        # Forked processes must not share the database connection
+        db.connections.close_all()
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        processes = [context.Process(target=cls._run_worker, args=(queue, batch_size)) for _ in range(workers)]
+
+        started_at = time.perf_counter()
+        for process in processes:
+            process.start()
+        drained = [queue.get() for _ in processes]
+        seconds = time.perf_counter() - started_at
+        for process in processes:
+            process.join()
+        if errors := [result for result in drained if isinstance(result, CommandError)]:
+            raise errors[0]
+
+        sent_count = sum(sent_count for sent_count, _ in drained)
+        created = Notification.objects.filter(type=NOTIFICATION_TYPE).count()
+        assert sent_count == created == rows, f"{sent_count} sent and {created} created of {rows}"
+        return BenchmarkResult(
+            f"SKIP LOCKED batches, {workers} workers", rows, seconds, queries=sum(queries for _, queries in drained)
+        )
+
+    @staticmethod
+    def _run_worker(queue, batch_size: int):
+        try:
+            with CaptureQueriesContext(db.connection) as queries:
+                sent_count = _BenchmarkScheduledNotificationSender(batch_size).run()
+            queue.put((sent_count, len(queries)))
+        except Exception as e:
+            # The parent waits for a result of every worker
+            queue.put(CommandError(f"Worker couldn't drain the backlog: {e!r}"))
+            raise
+        finally:
+            db.connection.close()
@@ -6,11 +6,26 @@ class NotificationQuerySet(models.QuerySet):
     def filter_by_user(self, user):
         return self.filter(user=user)
 
+    def with_read_until(self):
+        """
+        Annotates the read watermark of every notification's user, which ``Notification.is_read`` takes into account.
+        """
+        read_state_model = self.model._meta.apps.get_model("notifications", "NotificationReadState")
+        return self.annotate(
+            read_until=models.Subquery(
+                read_state_model.objects.filter(user=models.OuterRef("user")).values("read_until")[:1]
+            )
+        )
+
     def filter_unread(self):
-        return self.filter(read_at__isnull=True)
+        return (
+            self.with_read_until()
+            .filter(read_at__isnull=True)
+            .filter(models.Q(read_until__isnull=True) | models.Q(created_at__gt=models.F("read_until")))
+        )
 
-    def mark_read(self):
-        self.update(read_at=timezone.now())
+    def mark_read(self) -> int:
+        return self.update(read_at=timezone.now())
 
 
 NotificationManager = models.Manager.from_queryset(NotificationQuerySet)
@@ -0,0 +1,45 @@
+import django.db.models.deletion
+import hashid_field.field
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("multitenancy", "0007_tenantmembership_creator"),
+        ("notifications", "0003_notification_issuer"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationBroadcast",
+            fields=[
+                (
+                    "id",
+                    hashid_field.field.HashidAutoField(
+                        alphabet="abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890",
+                        min_length=7,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("type", models.CharField(max_length=64)),
+                ("data", models.JSONField(default=dict)),
+                ("last_user_id", models.CharField(blank=True, default="", max_length=64)),
+                ("sent_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_broadcasts",
+                        to="multitenancy.tenant",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+import django.db.models.deletion
+import hashid_field.field
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("notifications", "0007_notificationreadstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduledNotification",
+            fields=[
+                (
+                    "id",
+                    hashid_field.field.HashidAutoField(
+                        alphabet="abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890",
+                        min_length=7,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("type", models.CharField(max_length=64)),
+                ("data", models.JSONField(default=dict)),
+                ("scheduled_for", models.DateTimeField()),
+                ("sent", models.BooleanField(default=False)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_notifications",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["scheduled_for"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("sent", False)),
+                        fields=["scheduled_for"],
+                        name="notifications_scheduled_due",
+                    )
+                ],
+            },
+        ),
+    ]
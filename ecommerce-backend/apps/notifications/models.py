@@ -5,7 +5,7 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
-from . import managers
+from . import constants, managers
 
 
 class Notification(models.Model):
@@ -24,18 +24,94 @@ class Notification(models.Model):
 
     objects = managers.NotificationManager()
 
+    # The user's read watermark, annotated by ``NotificationQuerySet.with_read_until()``
+    read_until: datetime.datetime | None = None
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the user's notifications
+            models.Index(fields=["user", "-created_at", "-id"], name="notifications_user_created"),
+        ]
+
     def __str__(self) -> str:
         return str(self.id)
 
     @property
     def is_read(self) -> bool:
-        return self.read_at is not None
+        """
+        Notifications are read one by one or all at once by moving the user's read watermark past them. Marking one
+        below the watermark unread lowers the watermark, see ``NotificationService.set_notification_read``.
+        """
+        return self.read_at is not None or (self.read_until is not None and self.created_at <= self.read_until)
 
     @is_read.setter
     def is_read(self, val: bool):
         self.read_at = timezone.now() if val else None
 
 
+class NotificationReadState(models.Model):
+    """
+    The user's read watermark: every notification created up to ``read_until`` is read. Marking all notifications read
+    moves it instead of updating every unread row.
+    """
+
+    user: settings.AUTH_USER_MODEL = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="notification_read_state"
+    )
+    read_until: datetime.datetime = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.user} read until {self.read_until.isoformat()}"
+
+
+class NotificationBroadcast(models.Model):
+    """
+    A notification sent to all active users or to all members of a tenant.
+
+    Recipients are processed in chunks ordered by user id; ``last_user_id`` is the checkpoint of the last chunk that
+    was committed, so an interrupted broadcast continues where it stopped.
+    """
+
+    id: str = hashid_field.HashidAutoField(primary_key=True)
+    type: str = models.CharField(max_length=64)
+    data: dict = models.JSONField(default=dict)
+    tenant = models.ForeignKey(
+        "multitenancy.Tenant", on_delete=models.CASCADE, null=True, blank=True, related_name="notification_broadcasts"
+    )
+
+    last_user_id: str = models.CharField(max_length=64, blank=True, default="")
+    sent_count: int = models.PositiveIntegerField(default=0)
+
+    created_at: datetime.datetime = models.DateTimeField(auto_now_add=True)
+    updated_at: datetime.datetime = models.DateTimeField(auto_now=True)
+    completed_at: datetime.datetime | None = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Broadcast: {self.type} ({self.sent_count} sent)"
+
+    @property
+    def is_completed(self) -> bool:
+        return self.completed_at is not None
+
+
+class OutboxMessage(models.Model):
+    """
+    An email or notification written in the same transaction as the change that caused it.
+
+    Messages are dispatched in batches by ``OutboxRelay`` once that transaction is committed and deleted in the same
+    transaction that dispatched them; a rolled back change never leaves a message behind.
+    """
+
+    id: str = hashid_field.HashidAutoField(primary_key=True)
+    kind: str = models.CharField(max_length=32, choices=constants.OutboxMessageKind.choices)
+    payload: dict = models.JSONField(default=dict)
+
+    created_at: datetime.datetime = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Outbox: {self.kind} {self.id}"
+
+
 class ScheduledNotification(models.Model):
     """Model for scheduled notifications to be sent at a future time."""
 
@@ -55,7 +131,8 @@ class ScheduledNotification(models.Model):
     class Meta:
         ordering = ["scheduled_for"]
         indexes = [
-            models.Index(fields=["scheduled_for", "sent"]),
+            # Due notifications which weren't sent yet, claimed in batches by ``ScheduledNotificationSender``
+            models.Index(fields=["scheduled_for"], condition=models.Q(sent=False), name="notifications_scheduled_due"),
         ]
 
     def __str__(self) -> str:
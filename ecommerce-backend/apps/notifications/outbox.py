@@ -0,0 +1,128 @@
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from common.emails import send_emails
+
+from . import sender
+from .constants import OutboxMessageKind
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def enqueue_email(to: str | list[str] | None, email_type: str, email_data: dict | None) -> OutboxMessage:
+    return OutboxMessage.objects.create(
+        kind=OutboxMessageKind.EMAIL, payload={"to": to, "email_type": email_type, "email_data": email_data}
+    )
+
+
+def enqueue_notification(user, type: str, data: dict, issuer=None) -> OutboxMessage:
+    return OutboxMessage.objects.create(
+        kind=OutboxMessageKind.NOTIFICATION,
+        payload={
+            "user_id": str(getattr(user, "pk", user)),
+            "type": type,
+            "data": data,
+            "issuer_id": str(getattr(issuer, "pk", issuer)) if issuer else None,
+        },
+    )
+
+
+class OutboxRelay:
+    """
+    Dispatches messages committed to the outbox.
+
+    Every batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of relays can run side by side
+    without waiting for each other or dispatching a message twice. A batch is dispatched and deleted in one
+    transaction: all of its emails are handed to the broker as a single ``send_emails`` task and its notifications are
+    sent with the batched ``send_notifications`` of every strategy. If dispatching fails, the batch is rolled back and
+    picked up again by the next run, so messages are delivered at least once.
+    """
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or settings.NOTIFICATIONS_OUTBOX_BATCH_SIZE
+        self.stats = Counter()
+        self.max_lag_seconds = 0.0
+
+    def run(self, max_batches: int = None) -> int:
+        """
+        Dispatches batches until the outbox is empty or ``max_batches`` batches were dispatched.
+        """
+        dispatched_count = batches = 0
+        started_at = time.perf_counter()
+        while max_batches is None or batches < max_batches:
+            if not (count := self.process_batch()):
+                break
+            dispatched_count += count
+            batches += 1
+
+        self.stats["seconds"] += time.perf_counter() - started_at
+        return dispatched_count
+
+    def process_batch(self) -> int:
+        with transaction.atomic():
+            messages = list(OutboxMessage.objects.select_for_update(skip_locked=True).order_by("pk")[: self.batch_size])
+            if not messages:
+                return 0
+
+            if emails := [message.payload for message in messages if message.kind == OutboxMessageKind.EMAIL]:
+                self.dispatch_emails([(email["to"], email["email_type"], email["email_data"]) for email in emails])
+            if notifications := [
+                message.payload for message in messages if message.kind == OutboxMessageKind.NOTIFICATION
+            ]:
+                self.dispatch_notifications(notifications)
+
+            OutboxMessage.objects.filter(pk__in=[message.pk for message in messages]).delete()
+
+        # Messages are claimed in insertion order, the first one of the batch has waited the longest
+        lag = (timezone.now() - messages[0].created_at).total_seconds()
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        self.stats["dispatched"] += len(messages)
+        self.stats["batches"] += 1
+        return len(messages)
+
+    def dispatch_emails(self, emails: list[tuple]):
+        send_emails.apply_async((emails,))
+
+    def dispatch_notifications(self, notifications: list[dict]):
+        user_ids = {notification["user_id"] for notification in notifications}
+        user_ids |= {notification["issuer_id"] for notification in notifications if notification["issuer_id"]}
+        users = {str(pk): user for pk, user in User.objects.in_bulk(user_ids).items()}
+
+        # A user deleted after the notification was queued has nobody to notify anymore
+        sender.send_notifications(
+            [
+                {
+                    "user": users[notification["user_id"]],
+                    "type": notification["type"],
+                    "data": notification["data"],
+                    "issuer": users.get(notification["issuer_id"]),
+                }
+                for notification in notifications
+                if notification["user_id"] in users
+            ]
+        )
+
+    def metrics(self) -> dict:
+        """
+        Throughput and lag of this relay, and the backlog left in the outbox.
+        """
+        backlog = OutboxMessage.objects.aggregate(pending=Count("pk"), oldest=Min("created_at"))
+        seconds = self.stats["seconds"]
+        return {
+            "dispatched": self.stats["dispatched"],
+            "batches": self.stats["batches"],
+            "per_second": self.stats["dispatched"] / seconds if seconds else 0.0,
+            "max_lag_seconds": self.max_lag_seconds,
+            "pending": backlog["pending"],
+            "pending_lag_seconds": (timezone.now() - backlog["oldest"]).total_seconds() if backlog["oldest"] else 0.0,
+        }
@@ -0,0 +1,160 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+
+import orjson
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+_json_encoder = DjangoJSONEncoder()
+
+
+def encode_frame(frame: dict) -> str:
+    """
+    Encodes a frame with orjson. Datetimes and the types orjson doesn't know, e.g. decimals or lazy strings, are
+    encoded by ``DjangoJSONEncoder``, so they're formatted the same way as in REST API responses.
+    """
+    return orjson.dumps(frame, default=_json_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode()
+
+
+def get_update_message(event_type: str, data: dict, key: str = None) -> dict:
+    """
+    A channel layer message for the consumers' ``event_type`` handler, e.g. ``tenant_update``, which carries its frame
+    encoded once: consumers forward ``text`` as it is instead of encoding ``data`` for every connection.
+    """
+    return {"type": event_type, "text": encode_frame({"type": event_type, "data": data}), "key": key}
+
+
+class NotificationPublisher:
+    """
+    Sends WebSocket frames to channel layer groups from an event loop which runs in a thread of its own for the
+    lifetime of the process, instead of starting a new loop for every message with ``async_to_sync``.
+
+    Frames are encoded by the caller once, the consumer sends them as they are. Frames published to the same group
+    within ``window`` seconds are coalesced into a single ``group_send``; a frame published with a ``key`` replaces
+    the group's pending frame with the same key, so e.g. only the latest unread count of a burst is sent. Up to
+    ``batch_size`` groups are sent to concurrently. Keys are sent along, so consumers may coalesce frames as well.
+    Messages handled by their ``type``, e.g. the ones of ``get_update_message``, are published as they are with
+    ``publish_message()`` and sent with the same batches, without being coalesced.
+
+    ``publish()`` can be called from any thread and never blocks on the channel layer. ``flush()`` waits until every
+    frame published before it is sent; it's called when the process exits.
+    """
+
+    def __init__(self, window: float = None, batch_size: int = None):
+        self._window = window
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pid: int | None = None
+        self._pending: dict[str, dict] = {}
+        self._messages: list[tuple[str, dict]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def window(self) -> float:
+        return settings.NOTIFICATIONS_PUBLISH_WINDOW if self._window is None else self._window
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size or settings.NOTIFICATIONS_BROADCAST_PUBLISH_BATCH_SIZE
+
+    def publish(self, group: str, text: str, key: str = None):
+        self._get_loop().call_soon_threadsafe(self._add, group, text, key)
+
+    def publish_many(self, frames: list[tuple[str, str, str | None]]):
+        """
+        Publishes ``(group, text, key)`` tuples with a single wake up of the publisher's loop.
+        """
+        if frames:
+            self._get_loop().call_soon_threadsafe(self._add_many, frames)
+
+    def publish_message(self, group: str, message: dict):
+        self._get_loop().call_soon_threadsafe(self._add_message, group, message)
+
+    def flush(self, timeout: float = None):
+        if self._loop is None or self._pid != os.getpid():
+            return
+        asyncio.run_coroutine_threadsafe(self._send_pending(), self._loop).result(timeout)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        # A forked process, e.g. a celery worker, doesn't inherit the thread running the parent's loop
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="notification-publisher", daemon=True).start()
+        if self._pid is None:
+            atexit.register(self.flush, timeout=5)
+        self._pending = {}
+        self._messages = []
+        self._flush_handle = None
+        self._loop, self._pid = loop, os.getpid()
+
+    def _add(self, group: str, text: str, key: str | None):
+        frames = self._pending.setdefault(group, {})
+        key = object() if key is None else key
+        # A replaced frame is moved behind the frames published before its replacement
+        frames.pop(key, None)
+        frames[key] = text
+        self._schedule_flush()
+
+    def _add_many(self, frames: list[tuple[str, str, str | None]]):
+        for group, text, key in frames:
+            self._add(group, text, key)
+
+    def _add_message(self, group: str, message: dict):
+        self._messages.append((group, message))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.window, self._schedule_send)
+
+    def _schedule_send(self):
+        self._loop.create_task(self._send_pending())
+
+    async def _send_pending(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        published_messages, self._messages = self._messages, []
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None or not (pending or published_messages):
+            return
+
+        messages = [
+            (
+                group,
+                {
+                    "type": "notification_frames",
+                    "frames": list(frames.values()),
+                    "keys": [key if isinstance(key, str) else None for key in frames],
+                },
+            )
+            for group, frames in pending.items()
+        ]
+        messages.extend(published_messages)
+        for start in range(0, len(messages), self.batch_size):
+            batch = messages[start : start + self.batch_size]
+            results = await asyncio.gather(
+                *(channel_layer.group_send(group, message) for group, message in batch), return_exceptions=True
+            )
+            for (group, _), result in zip(batch, results, strict=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Publishing to {group} failed: {result!r}")
+
+
+notification_publisher = NotificationPublisher()
@@ -0,0 +1,102 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from . import sender
+from .models import ScheduledNotification
+
+User = get_user_model()
+
+
+def get_due_notifications():
+    return ScheduledNotification.objects.filter(sent=False, scheduled_for__lte=timezone.now())
+
+
+class ScheduledNotificationSender:
+    """
+    Sends scheduled notifications which are due.
+
+    Every batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of senders, e.g. overlapping runs
+    of the beat task or tasks draining a backlog in parallel, run side by side without waiting for each other or
+    sending a notification twice. Its notifications are sent with the batched ``send_notifications`` of every strategy
+    and the batch is marked sent with a single UPDATE in the same transaction. If sending fails, the batch is rolled
+    back and claimed again by the next run.
+    """
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or settings.NOTIFICATIONS_SCHEDULED_BATCH_SIZE
+        self.stats = Counter()
+        self.max_lag_seconds = 0.0
+
+    def run(self, max_batches: int = None) -> int:
+        """
+        Sends batches until no notification is due or ``max_batches`` batches were sent.
+        """
+        sent_count = batches = 0
+        started_at = time.perf_counter()
+        while max_batches is None or batches < max_batches:
+            if not (count := self.process_batch()):
+                break
+            sent_count += count
+            batches += 1
+
+        self.stats["seconds"] += time.perf_counter() - started_at
+        return sent_count
+
+    def process_batch(self) -> int:
+        now = timezone.now()
+        with transaction.atomic():
+            scheduled = list(
+                ScheduledNotification.objects.filter(sent=False, scheduled_for__lte=now)
+                .select_for_update(skip_locked=True)
+                .order_by("scheduled_for")
+                .only("user_id", "type", "data", "scheduled_for")[: self.batch_size]
+            )
+            if not scheduled:
+                return 0
+
+            self.dispatch_notifications(scheduled)
+            ScheduledNotification.objects.filter(pk__in=[notification.pk for notification in scheduled]).update(
+                sent=True, sent_at=now
+            )
+
+        # Notifications are claimed in the order they're due, the first one of the batch has waited the longest
+        lag = (now - scheduled[0].scheduled_for).total_seconds()
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        self.stats["sent"] += len(scheduled)
+        self.stats["batches"] += 1
+        return len(scheduled)
+
+    def dispatch_notifications(self, scheduled: list[ScheduledNotification]):
+        users = User.objects.in_bulk({notification.user_id for notification in scheduled})
+        sender.send_notifications(
+            [
+                {
+                    "user": users[notification.user_id],
+                    "type": notification.type,
+                    "data": notification.data,
+                    "issuer": None,
+                }
+                for notification in scheduled
+            ]
+        )
+
+    def metrics(self) -> dict:
+        """
+        Throughput and lag of this sender, and the due notifications left.
+        """
+        backlog = get_due_notifications().aggregate(pending=Count("pk"), oldest=Min("scheduled_for"))
+        seconds = self.stats["seconds"]
+        return {
+            "sent": self.stats["sent"],
+            "batches": self.stats["batches"],
+            "per_second": self.stats["sent"] / seconds if seconds else 0.0,
+            "max_lag_seconds": self.max_lag_seconds,
+            "pending": backlog["pending"],
+            "pending_lag_seconds": (timezone.now() - backlog["oldest"]).total_seconds() if backlog["oldest"] else 0.0,
+        }
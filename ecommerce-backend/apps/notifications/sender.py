@@ -2,7 +2,7 @@ from functools import lru_cache
 
 from django.conf import settings
 
-from . import strategies
+from . import outbox, strategies
 from .exceptions import NotificationStrategyException
 
 
@@ -23,6 +23,12 @@ def get_enabled_strategies():
 
 
 def send_notification(user: str, type: str, data: dict, issuer: str):
+    """
+    Queues the notification in the outbox; it's sent by the outbox relay once the current transaction is committed.
+    """
+    outbox.enqueue_notification(user, type, data, issuer)
+
+
+def send_notifications(notifications: list[dict]):
     for strategy in get_enabled_strategies():
-        if strategy.should_send_notification(user, type):
-            strategy.send_notification(user, type, data, issuer)
+        strategy.send_notifications(notifications)
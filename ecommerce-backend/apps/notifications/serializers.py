@@ -2,6 +2,7 @@ from hashid_field import rest as hidrest
 from rest_framework import serializers
 
 from . import models
+from .services import NotificationService
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -11,8 +12,8 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Notification
-        fields = ("id", "type", "data", "is_read", "read_at", "created_at", "updated_at")
-        read_only_fields = ("id", "type", "data", "created_at", "updated_at")
+        fields = ("id", "type", "data", "is_read", "read_at", "created_at")
+        read_only_fields = ("id", "type", "data", "created_at")
 
 
 class UpdateNotificationSerializer(serializers.ModelSerializer):
@@ -24,8 +25,7 @@ class UpdateNotificationSerializer(serializers.ModelSerializer):
     def update(self, instance: models.Notification, validated_data: dict):
         is_read = validated_data["is_read"]
         if is_read != instance.is_read:
-            instance.is_read = is_read
-            instance.save(update_fields=["read_at"])
+            NotificationService.set_notification_read(instance, is_read)
         return instance
 
     class Meta:
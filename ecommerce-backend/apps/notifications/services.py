@@ -1,6 +1,11 @@
+import datetime
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Notification
+from .counters import unread_counter
+from .models import Notification, NotificationReadState
 
 User = get_user_model()
 
@@ -8,7 +13,64 @@ User = get_user_model()
 class NotificationService:
     @classmethod
     def mark_read_all_user_notifications(cls, user: User):
-        Notification.objects.filter_by_user(user).filter_unread().mark_read()
+        """
+        Moves the user's read watermark to now with a single upsert, however many notifications are unread.
+        """
+        NotificationReadState.objects.bulk_create(
+            [NotificationReadState(user=user, read_until=timezone.now())],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["read_until"],
+        )
+        transaction.on_commit(lambda: unread_counter.reset(user.pk))
+
+    @classmethod
+    def set_notification_read(cls, notification: Notification, is_read: bool):
+        """
+        ``notification`` has to be annotated with ``NotificationQuerySet.with_read_until()``.
+
+        A notification below the user's read watermark is marked unread by lowering the watermark to just before it;
+        the user's other notifications it uncovers are marked read one by one, so they stay read.
+        """
+        was_read = notification.is_read
+        with transaction.atomic():
+            if not is_read:
+                cls._lower_read_watermark(notification)
+            notification.is_read = is_read
+            notification.save(update_fields=["read_at"])
+
+        if notification.is_read != was_read:
+            delta = -1 if notification.is_read else 1
+            transaction.on_commit(lambda: unread_counter.change({notification.user_id: delta}))
+
+    @staticmethod
+    def _lower_read_watermark(notification: Notification):
+        state = NotificationReadState.objects.select_for_update().filter(user_id=notification.user_id).first()
+        if state is None or notification.created_at > state.read_until:
+            return
+
+        read_until = notification.created_at - datetime.timedelta(microseconds=1)
+        Notification.objects.filter(
+            user_id=notification.user_id,
+            created_at__gt=read_until,
+            created_at__lte=state.read_until,
+            read_at__isnull=True,
+        ).exclude(pk=notification.pk).update(read_at=state.read_until)
+        state.read_until = read_until
+        state.save(update_fields=["read_until"])
+        notification.read_until = read_until
+
+    @classmethod
+    def mark_read(cls, queryset) -> int:
+        """
+        Marks the unread notifications of ``queryset`` read and recounts their users' counters.
+        """
+        unread = queryset.filter_unread()
+        user_ids = set(unread.order_by().values_list("user_id", flat=True).distinct())
+        updated = unread.mark_read()
+        if user_ids:
+            transaction.on_commit(lambda: unread_counter.recount(user_ids))
+        return updated
 
     @classmethod
     def user_has_unread_notifications(cls, user: User):
@@ -1,29 +1,24 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from . import models
+from .broadcast import publish_notifications
+from .counters import unread_counter
 
 
 @receiver(post_save, sender=models.Notification)
 def notify_about_entry(sender, instance: models.Notification, created, update_fields, **kwargs):
     if created:
-        channel_layer = get_channel_layer()
-        user_group = f"user_{instance.user.id}"
+        # The only place single notifications are published, once they are committed
+        transaction.on_commit(lambda: publish_notifications([instance]))
 
-        # Send notification via WebSocket
-        async_to_sync(channel_layer.group_send)(
-            user_group,
-            {
-                "type": "notification_message",
-                "message": {
-                    "id": str(instance.id),
-                    "type": instance.type,
-                    "title": instance.data.get("title", ""),
-                    "content": instance.data.get("content", ""),
-                    "is_read": instance.is_read,
-                    "created_at": instance.created_at.isoformat(),
-                },
-            },
-        )
+        if not instance.is_read:
+            transaction.on_commit(lambda: unread_counter.count_created([instance]))
+
+
+@receiver(post_delete, sender=models.Notification)
+def uncount_deleted_notification(sender, instance: models.Notification, **kwargs):
+    # Without the read watermark annotated a notification read by it looks unread, reconcile() fixes the counter then
+    if not instance.is_read:
+        transaction.on_commit(lambda: unread_counter.change({instance.user_id: -1}))
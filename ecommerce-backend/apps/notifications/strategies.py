@@ -1,4 +1,8 @@
+from django.db import transaction
+
 from . import models
+from .broadcast import publish_notifications
+from .counters import unread_counter
 
 
 class BaseNotificationStrategy:
@@ -15,8 +19,32 @@ class BaseNotificationStrategy:
     def send_notification(user: str, type: str, data: dict):
         raise NotImplementedError("Subclasses of BaseNotificationStrategy must provide a send_notification() function")
 
+    @classmethod
+    def send_notifications(cls, notifications: list[dict]):
+        """
+        Sends a batch of notifications given as ``send_notification()`` keyword arguments. Strategies which can send
+        many notifications at once should override it.
+        """
+        for notification in notifications:
+            if cls.should_send_notification(notification["user"], notification["type"]):
+                cls.send_notification(**notification)
+
 
 class InAppNotificationStrategy(BaseNotificationStrategy):
     @staticmethod
     def send_notification(user: str, type: str, data: dict, issuer: str):
         models.Notification.objects.create(user=user, type=type, data=data, issuer=issuer)
+
+    @classmethod
+    def send_notifications(cls, notifications: list[dict]):
+        created = models.Notification.objects.bulk_create(
+            [
+                models.Notification(**notification)
+                for notification in notifications
+                if cls.should_send_notification(notification["user"], notification["type"])
+            ]
+        )
+        # bulk_create() doesn't send post_save, the WebSocket messages are published and the unread counters changed
+        # here once they are committed
+        transaction.on_commit(lambda: publish_notifications(created))
+        transaction.on_commit(lambda: unread_counter.count_created(created))
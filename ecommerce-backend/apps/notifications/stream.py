@@ -0,0 +1,96 @@
+import json
+import logging
+import re
+from collections.abc import Iterable
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+EVENT_ID_RE = re.compile(r"^\d+-\d+$")
+
+
+def get_event_frame(event_id: str | None, data: str) -> str:
+    """
+    The WebSocket frame of a notification event, around its already encoded ``data``.
+    """
+    return f'{{"type": "notification", "event_id": {json.dumps(event_id)}, "data": {data}}}'
+
+
+class NotificationStream:
+    """
+    The notification events published to every user, kept in a capped redis stream per user so a client which
+    reconnects gets the events it missed instead of fetching all of its notifications again.
+
+    - ``{prefix}:{user_id}`` is a stream of ``{"data": <encoded notification>}`` entries; the entry id is the event
+      id sent with the notification. The stream keeps about ``NOTIFICATIONS_STREAM_MAX_LENGTH`` events and expires
+      ``NOTIFICATIONS_STREAM_TIMEOUT`` seconds after the last one.
+
+    Clients send the id of the last event they got; ``read_after()`` returns the frames of the events after it, or
+    ``None`` when some of them were already trimmed or expired and the client has to resync.
+
+    Streams are kept in ``NOTIFICATIONS_STREAM_REDIS_URL``.
+    """
+
+    KEY_PREFIX = "notifications:stream"
+
+    @cached_property
+    def redis(self) -> redis.Redis:
+        return redis.Redis.from_url(settings.NOTIFICATIONS_STREAM_REDIS_URL)
+
+    @classmethod
+    def user_key(cls, user_id) -> str:
+        return f"{cls.KEY_PREFIX}:{User._meta.pk.to_python(user_id)}"
+
+    def append(self, notifications: Iterable[Notification], data: Iterable[str]) -> list[str | None]:
+        """
+        Appends the encoded ``data`` of every notification to its user's stream with a single round trip. Returns the
+        event ids, which are ``None`` when the stream couldn't be written.
+        """
+        notifications = list(notifications)
+        pipeline = self.redis.pipeline(transaction=False)
+        user_keys = set()
+        for notification, notification_data in zip(notifications, data, strict=True):
+            user_key = self.user_key(notification.user_id)
+            pipeline.xadd(
+                user_key,
+                {"data": notification_data},
+                maxlen=settings.NOTIFICATIONS_STREAM_MAX_LENGTH,
+                approximate=True,
+            )
+            user_keys.add(user_key)
+        for user_key in user_keys:
+            pipeline.expire(user_key, settings.NOTIFICATIONS_STREAM_TIMEOUT)
+
+        try:
+            results = pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Notification events of {len(user_keys)} users couldn't be written: {e}")
+            return [None] * len(notifications)
+        return [event_id.decode() for event_id in results[: len(notifications)]]
+
+    def read_after(self, user_id, last_event_id: str) -> list[str] | None:
+        """
+        Frames of the user's events after ``last_event_id``, or ``None`` when the gap can't be replayed.
+        """
+        if not isinstance(last_event_id, str) or not EVENT_ID_RE.match(last_event_id):
+            return None
+
+        # The client's last event is read too: events are trimmed oldest first, it still being there means none after
+        # it were
+        entries = self.redis.xrange(
+            self.user_key(user_id), last_event_id, "+", count=settings.NOTIFICATIONS_STREAM_MAX_LENGTH * 2
+        )
+        if not entries or entries[0][0].decode() != last_event_id:
+            return None
+        return [get_event_frame(event_id.decode(), fields[b"data"].decode()) for event_id, fields in entries[1:]]
+
+
+notification_stream = NotificationStream()
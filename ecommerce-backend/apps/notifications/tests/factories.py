@@ -1,4 +1,5 @@
 import factory
+from django.utils import timezone
 
 from .. import models
 
@@ -10,3 +11,12 @@ class NotificationFactory(factory.django.DjangoModelFactory):
 
     class Meta:
         model = models.Notification
+
+
+class ScheduledNotificationFactory(factory.django.DjangoModelFactory):
+    user = factory.SubFactory("apps.users.tests.factories.UserFactory")
+    type = factory.Faker("pystr")
+    scheduled_for = factory.LazyFunction(timezone.now)
+
+    class Meta:
+        model = models.ScheduledNotification
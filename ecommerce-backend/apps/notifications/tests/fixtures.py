@@ -3,3 +3,4 @@ import pytest_factoryboy
 from . import factories
 
 pytest_factoryboy.register(factories.NotificationFactory)
+pytest_factoryboy.register(factories.ScheduledNotificationFactory)
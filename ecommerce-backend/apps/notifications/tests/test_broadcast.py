@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.tasks.notification_tasks import broadcast_notification, send_notification_broadcast
+
+from ..broadcast import NotificationBroadcaster, publish_notifications
+from ..models import Notification, NotificationBroadcast
+from ..publisher import notification_publisher
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@pytest.fixture
+def publish_mock(mocker):
+    return mocker.patch("apps.notifications.broadcast.publish_notifications")
+
+
+class TestNotificationBroadcaster:
+    def test_notifies_all_active_users(self, user_factory, publish_mock):
+        users = user_factory.create_batch(5)
+        user_factory.create(is_active=False)
+        broadcast = NotificationBroadcast.objects.create(type="ANNOUNCEMENT", data={"title": "Hello"})
+
+        sent_count = NotificationBroadcaster(broadcast.pk, chunk_size=2).run()
+
+        assert sent_count == 5
+        assert set(Notification.objects.filter(type="ANNOUNCEMENT").values_list("user_id", flat=True)) == {
+            user.pk for user in users
+        }
+        assert publish_mock.call_count == 3
+        broadcast.refresh_from_db()
+        assert broadcast.sent_count == 5
+        assert broadcast.is_completed
+
+    def test_notifies_accepted_tenant_members(self, tenant_factory, tenant_membership_factory, publish_mock):
+        tenant = tenant_factory.create()
+        members = [tenant_membership_factory.create(tenant=tenant).user for _ in range(3)]
+        tenant_membership_factory.create(tenant=tenant, is_accepted=False)
+        tenant_membership_factory.create()
+        broadcast = NotificationBroadcast.objects.create(type="ANNOUNCEMENT", tenant=tenant)
+
+        NotificationBroadcaster(broadcast.pk).run()
+
+        assert set(Notification.objects.filter(type="ANNOUNCEMENT").values_list("user_id", flat=True)) == {
+            member.pk for member in members
+        }
+
+    def test_resumes_from_checkpoint(self, user_factory, publish_mock):
+        user_factory.create_batch(5)
+        broadcast = NotificationBroadcast.objects.create(type="ANNOUNCEMENT")
+        NotificationBroadcaster(broadcast.pk, chunk_size=2).process_chunk()
+
+        NotificationBroadcaster(broadcast.pk, chunk_size=2).run()
+
+        notified_user_ids = list(Notification.objects.filter(type="ANNOUNCEMENT").values_list("user_id", flat=True))
+        assert len(notified_user_ids) == len(set(notified_user_ids)) == 5
+
+    def test_completed_broadcast_is_not_sent_again(self, user_factory, publish_mock):
+        user_factory.create_batch(2)
+        broadcast = NotificationBroadcast.objects.create(type="ANNOUNCEMENT")
+        NotificationBroadcaster(broadcast.pk).run()
+
+        assert NotificationBroadcaster(broadcast.pk).run() == 0
+        assert Notification.objects.filter(type="ANNOUNCEMENT").count() == 2
+
+    def test_chunk_uses_constant_number_of_queries(self, user_factory, publish_mock, django_assert_num_queries):
+        user_factory.create_batch(10)
+        broadcast = NotificationBroadcast.objects.create(type="ANNOUNCEMENT")
+
+        # savepoint, lock broadcast, select recipients, bulk insert, update checkpoint, release savepoint
+        with django_assert_num_queries(6):
+            notifications = NotificationBroadcaster(broadcast.pk, chunk_size=10).process_chunk()
+
+        assert len(notifications) == 10
+
+
+class TestPublishNotifications:
+    def test_sends_frame_to_user_group(self, user, notification_factory):
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f"notifications_user_{user.pk}", channel_name)
+        notification = notification_factory.create(user=user, type="ANNOUNCEMENT")
+
+        publish_notifications([notification])
+        notification_publisher.flush()
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert message["type"] == "notification_frames"
+        (frame,) = message["frames"]
+        assert json.loads(frame)["data"]["id"] == str(notification.pk)
+
+
+class TestBroadcastNotificationTask:
+    def test_creates_broadcast_and_schedules_sending(self, mocker):
+        delay_mock = mocker.patch("apps.tasks.notification_tasks.send_notification_broadcast.delay")
+
+        result = broadcast_notification("ANNOUNCEMENT", {"title": "Hello"})
+
+        broadcast = NotificationBroadcast.objects.get()
+        assert result == {"broadcast_id": str(broadcast.pk)}
+        assert broadcast.data == {"title": "Hello"}
+        delay_mock.assert_called_once_with(str(broadcast.pk))
+
+    def test_send_notification_broadcast(self, user_factory, publish_mock):
+        user_factory.create_batch(3)
+        broadcast = NotificationBroadcast.objects.create(type="ANNOUNCEMENT")
+
+        result = send_notification_broadcast(str(broadcast.pk))
+
+        assert result == {"broadcast_id": str(broadcast.pk), "broadcast_to": 3}
@@ -0,0 +1,232 @@
+import datetime
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.tasks.notification_tasks import mark_old_notifications_read, reconcile_unread_notification_counters
+
+from ..broadcast import get_user_group_name, publish_unread_counts
+from ..counters import UnreadNotificationCounter, unread_counter
+from ..models import Notification, NotificationReadState
+from ..publisher import notification_publisher
+from ..services import NotificationService
+from ..strategies import InAppNotificationStrategy
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@pytest.fixture
+def publish_mock(mocker):
+    return mocker.patch("apps.notifications.counters.publish_unread_counts")
+
+
+@pytest.fixture
+def authenticated_client(api_client, user):
+    api_client.force_authenticate(user)
+    return api_client
+
+
+def published_counts(publish_mock) -> list[dict]:
+    return [call.args[0] for call in publish_mock.call_args_list]
+
+
+class TestUnreadNotificationCounter:
+    def test_counter_is_counted_once(self, user, notification_factory, django_assert_num_queries):
+        notification_factory.create_batch(3, user=user)
+        notification_factory(user=user, read_at=timezone.now())
+
+        with django_assert_num_queries(1):
+            assert unread_counter.get(user.pk) == 3
+        with django_assert_num_queries(0):
+            assert unread_counter.get(user.pk) == 3
+
+    def test_created_notification_is_counted(
+        self, user, notification_factory, publish_mock, django_capture_on_commit_callbacks
+    ):
+        notification_factory(user=user)
+        unread_counter.get(user.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            notification_factory(user=user)
+
+        assert unread_counter.get(user.pk) == 2
+        assert published_counts(publish_mock) == [{str(user.pk): 2}]
+
+    def test_bulk_created_notifications_are_counted(
+        self, user_factory, publish_mock, mocker, django_capture_on_commit_callbacks
+    ):
+        mocker.patch("apps.notifications.strategies.publish_notifications")
+        users = user_factory.create_batch(2)
+        for user in users:
+            unread_counter.get(user.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            InAppNotificationStrategy.send_notifications(
+                [{"user": users[0], "type": "TEST", "data": {}, "issuer": None}] * 2
+                + [{"user": users[1], "type": "TEST", "data": {}, "issuer": None}]
+            )
+
+        assert unread_counter.get(users[0].pk) == 2
+        assert unread_counter.get(users[1].pk) == 1
+        assert published_counts(publish_mock) == [{str(users[0].pk): 2, str(users[1].pk): 1}]
+
+    def test_uncounted_counter_is_not_changed(
+        self, user, notification_factory, publish_mock, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            notification_factory(user=user)
+
+        assert cache.get(UnreadNotificationCounter.user_key(user.pk)) is None
+        assert published_counts(publish_mock) == [{}]
+
+    def test_deleted_notification_is_uncounted(
+        self, user, notification_factory, publish_mock, django_capture_on_commit_callbacks
+    ):
+        notification = notification_factory(user=user)
+        unread_counter.get(user.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            notification.delete()
+
+        assert unread_counter.get(user.pk) == 0
+
+    def test_reconcile_fixes_drifted_counters(self, user_factory, notification_factory, publish_mock):
+        drifted, accurate, uncounted = user_factory.create_batch(3)
+        for user in (drifted, accurate, uncounted):
+            notification_factory.create_batch(2, user=user)
+        unread_counter.get(drifted.pk)
+        unread_counter.get(accurate.pk)
+        cache.set(UnreadNotificationCounter.user_key(drifted.pk), 5)
+
+        assert reconcile_unread_notification_counters() == {"fixed": 1}
+
+        assert unread_counter.get(drifted.pk) == 2
+        assert cache.get(UnreadNotificationCounter.user_key(uncounted.pk)) is None
+        assert published_counts(publish_mock) == [{str(drifted.pk): 2}]
+
+    def test_counts_are_published_to_user_group(self, user):
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(get_user_group_name(user.pk.id), channel_name)
+
+        publish_unread_counts({str(user.pk): 4})
+        notification_publisher.flush()
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        assert message == {
+            "type": "notification_frames",
+            "frames": ['{"type":"unread_count","data":{"unread_count":4}}'],
+            "keys": ["unread_count"],
+        }
+
+
+class TestReadWatermark:
+    def test_mark_all_read_moves_watermark(
+        self, authenticated_client, user, notification_factory, publish_mock, django_capture_on_commit_callbacks
+    ):
+        notifications = notification_factory.create_batch(3, user=user)
+        other_notification = notification_factory()
+
+        with CaptureQueriesContext(connection) as queries, django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.post(reverse("notification-mark-all-read"))
+
+        assert response.status_code == 200
+        assert not [query for query in queries if f'"{Notification._meta.db_table}"' in query["sql"]]
+        assert NotificationReadState.objects.get(user=user).read_until >= notifications[-1].created_at
+        assert not Notification.objects.filter(user=user).filter_unread().exists()
+        assert Notification.objects.filter_unread().get() == other_notification
+        assert published_counts(publish_mock) == [{str(user.pk): 0}]
+
+        response = authenticated_client.get(reverse("notification-list"))
+        assert [item["is_read"] for item in response.json()["results"]] == [True] * 3
+
+    def test_notifications_created_after_watermark_are_unread(self, authenticated_client, user, notification_factory):
+        notification_factory(user=user)
+        authenticated_client.post(reverse("notification-mark-all-read"))
+        authenticated_client.post(reverse("notification-mark-all-read"))
+        notification = notification_factory(user=user)
+
+        response = authenticated_client.get(reverse("notification-unread-count"))
+
+        assert response.json() == {"unread_count": 1}
+        assert list(Notification.objects.filter_unread()) == [notification]
+
+    def test_mark_read_is_counted(
+        self, authenticated_client, user, notification_factory, publish_mock, django_capture_on_commit_callbacks
+    ):
+        notification = notification_factory(user=user)
+        notification_factory(user=user)
+        assert authenticated_client.get(reverse("notification-unread-count")).json() == {"unread_count": 2}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = authenticated_client.patch(reverse("notification-mark-read", args=[notification.pk]))
+
+        assert response.json()["is_read"] is True
+        assert authenticated_client.get(reverse("notification-unread-count")).json() == {"unread_count": 1}
+        assert published_counts(publish_mock) == [{str(user.pk): 1}]
+
+    def test_notification_below_watermark_is_not_counted_twice(
+        self, authenticated_client, user, notification_factory, django_capture_on_commit_callbacks
+    ):
+        notification = notification_factory(user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse("notification-mark-all-read"))
+            notification_factory(user=user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.patch(reverse("notification-mark-read", args=[notification.pk]))
+
+        assert unread_counter.get(user.pk) == 1
+
+    def test_notification_below_watermark_is_marked_unread(
+        self, authenticated_client, user, notification_factory, django_capture_on_commit_callbacks
+    ):
+        older, notification, newer = notification_factory.create_batch(3, user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse("notification-mark-all-read"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            NotificationService.set_notification_read(
+                Notification.objects.with_read_until().get(pk=notification.pk), False
+            )
+
+        assert NotificationReadState.objects.get(user=user).read_until < notification.created_at
+        assert list(Notification.objects.filter(user=user).filter_unread()) == [notification]
+        assert Notification.objects.with_read_until().get(pk=newer.pk).is_read
+        assert Notification.objects.get(pk=older.pk).read_at is None
+        assert authenticated_client.get(reverse("notification-unread-count")).json() == {"unread_count": 1}
+
+    def test_old_notifications_are_marked_read(
+        self, user, notification_factory, publish_mock, django_capture_on_commit_callbacks
+    ):
+        old_notifications = notification_factory.create_batch(2, user=user)
+        notification_factory(user=user)
+        Notification.objects.filter(pk__in=[notification.pk for notification in old_notifications]).update(
+            created_at=timezone.now() - datetime.timedelta(days=40)
+        )
+        unread_counter.get(user.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert mark_old_notifications_read(user.pk.id, days=30) == {"marked_read": 2}
+
+        assert unread_counter.get(user.pk) == 1
+        assert published_counts(publish_mock) == [{str(user.pk): 1}]
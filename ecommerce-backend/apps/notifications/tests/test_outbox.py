@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from apps.tasks.notification_tasks import relay_outbox
+from common.emails import Email
+
+from .. import sender
+from ..constants import OutboxMessageKind
+from ..models import Notification, OutboxMessage
+from ..outbox import OutboxRelay, enqueue_email, enqueue_notification
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+class ExampleEmail(Email):
+    name = "EXAMPLE"
+
+
+@pytest.fixture
+def send_emails_mock(mocker):
+    return mocker.patch("apps.notifications.outbox.send_emails")
+
+
+@pytest.fixture
+def publish_mock(mocker):
+    return mocker.patch("apps.notifications.strategies.publish_notifications")
+
+
+class TestOutbox:
+    def test_email_is_queued_in_outbox(self, send_emails_mock):
+        ExampleEmail(to="user@example.com", data={"name": "test"}).send()
+
+        message = OutboxMessage.objects.get()
+        assert message.kind == OutboxMessageKind.EMAIL
+        assert message.payload == {"to": "user@example.com", "email_type": "EXAMPLE", "email_data": None}
+        send_emails_mock.apply_async.assert_not_called()
+
+    def test_rolled_back_transaction_discards_messages(self, user):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            ExampleEmail(to="user@example.com").send()
+            sender.send_notification(user=user, type="EXAMPLE", data={}, issuer=None)
+            raise RuntimeError()
+
+        assert not OutboxMessage.objects.exists()
+
+    def test_notification_is_queued_in_outbox(self, user_factory):
+        user, issuer = user_factory.create_batch(2)
+
+        sender.send_notification(user=user, type="EXAMPLE", data={"title": "Hello"}, issuer=issuer)
+
+        assert not Notification.objects.exists()
+        assert OutboxMessage.objects.get().payload == {
+            "user_id": str(user.pk),
+            "type": "EXAMPLE",
+            "data": {"title": "Hello"},
+            "issuer_id": str(issuer.pk),
+        }
+
+
+class TestOutboxRelay:
+    def test_emails_of_a_batch_are_dispatched_in_a_single_task(self, send_emails_mock):
+        for index in range(5):
+            enqueue_email(f"user-{index}@example.com", "EXAMPLE", {"index": index})
+
+        dispatched_count = OutboxRelay(batch_size=2).run()
+
+        assert dispatched_count == 5
+        assert send_emails_mock.apply_async.call_count == 3
+        first_batch, *_ = send_emails_mock.apply_async.call_args_list[0].args[0]
+        assert first_batch == [
+            ("user-0@example.com", "EXAMPLE", {"index": 0}),
+            ("user-1@example.com", "EXAMPLE", {"index": 1}),
+        ]
+        assert not OutboxMessage.objects.exists()
+
+    def test_notifications_are_created_in_bulk_and_published_on_commit(
+        self, user_factory, publish_mock, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        users = user_factory.create_batch(3)
+        for user in users:
+            enqueue_notification(user, "EXAMPLE", {"title": "Hello"}, issuer=users[0])
+
+        # select outbox batch, select users, insert notifications, delete outbox batch and a savepoint around them
+        with django_capture_on_commit_callbacks(execute=True), django_assert_num_queries(6):
+            OutboxRelay().process_batch()
+
+        notifications = Notification.objects.filter(type="EXAMPLE")
+        assert {notification.user_id for notification in notifications} == {user.pk for user in users}
+        assert {notification.issuer_id for notification in notifications} == {users[0].pk}
+        (published,) = publish_mock.call_args.args
+        assert len(published) == 3
+
+    def test_notification_of_deleted_user_is_skipped(self, user, publish_mock):
+        enqueue_notification(User._meta.pk.to_python(10**9), "EXAMPLE", {})
+        enqueue_notification(user, "EXAMPLE", {})
+
+        assert OutboxRelay().run() == 2
+
+        assert list(Notification.objects.values_list("user_id", flat=True)) == [user.pk]
+
+    def test_failed_dispatch_keeps_messages(self, send_emails_mock):
+        send_emails_mock.apply_async.side_effect = ConnectionError()
+        enqueue_email("user@example.com", "EXAMPLE", None)
+
+        with pytest.raises(ConnectionError):
+            OutboxRelay().run()
+
+        assert OutboxMessage.objects.count() == 1
+
+    def test_metrics(self, send_emails_mock):
+        for index in range(3):
+            enqueue_email(f"user-{index}@example.com", "EXAMPLE", None)
+        relay = OutboxRelay(batch_size=2)
+
+        relay.run(max_batches=1)
+        metrics = relay.metrics()
+
+        assert metrics["dispatched"] == 2
+        assert metrics["batches"] == 1
+        assert metrics["per_second"] > 0
+        assert metrics["max_lag_seconds"] >= 0
+        assert metrics["pending"] == 1
+        assert metrics["pending_lag_seconds"] > 0
+
+    def test_relay_task_returns_metrics(self, send_emails_mock):
+        enqueue_email("user@example.com", "EXAMPLE", None)
+
+        metrics = relay_outbox()
+
+        assert metrics["dispatched"] == 1
+        assert metrics["pending"] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentOutboxRelays:
+    def test_relays_skip_messages_claimed_by_each_other(self, send_emails_mock):
+        for index in range(4):
+            enqueue_email(f"user-{index}@example.com", "EXAMPLE", None)
+        claimed = threading.Event()
+        released = threading.Event()
+
+        def claim_first_batch():
+            try:
+                with transaction.atomic():
+                    list(OutboxMessage.objects.select_for_update().order_by("pk")[:2])
+                    claimed.set()
+                    released.wait(timeout=10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=claim_first_batch)
+        thread.start()
+        claimed.wait(timeout=10)
+        try:
+            dispatched_count = OutboxRelay(batch_size=10).run()
+        finally:
+            released.set()
+            thread.join()
+
+        assert dispatched_count == 2
+        (emails,) = send_emails_mock.apply_async.call_args.args[0]
+        assert [to for to, _, _ in emails] == ["user-2@example.com", "user-3@example.com"]
+        assert OutboxMessage.objects.count() == 2
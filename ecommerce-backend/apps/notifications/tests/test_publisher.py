@@ -0,0 +1,100 @@
+import datetime
+import decimal
+import json
+import logging
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from ..publisher import NotificationPublisher, encode_frame
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@pytest.fixture
+def join_group():
+    channel_layer = get_channel_layer()
+
+    def join(group: str) -> str:
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(group, channel_name)
+        return channel_name
+
+    return join
+
+
+def receive_all(channel_name: str) -> list[dict]:
+    channel_layer = get_channel_layer()
+    messages = []
+    # The in-memory layer drops the queue of a channel once it's empty
+    while channel_name in channel_layer.channels:
+        messages.append(async_to_sync(channel_layer.receive)(channel_name))
+    return messages
+
+
+class TestEncodeFrame:
+    def test_values_are_encoded_like_django(self):
+        created = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.UTC)
+
+        frame = encode_frame({"created": created, "amount": decimal.Decimal("1.50"), "name": "Zoë"})
+
+        assert json.loads(frame) == {"created": "2024-05-01T12:30:15.123Z", "amount": "1.50", "name": "Zoë"}
+
+
+class TestNotificationPublisher:
+    def test_frames_of_group_are_coalesced(self, join_group):
+        first_channel, second_channel = join_group("first"), join_group("second")
+        # Nothing is sent before the publisher is flushed
+        publisher = NotificationPublisher(window=60)
+
+        publisher.publish("first", "frame 1")
+        publisher.publish_many([("first", "frame 2", None), ("second", "frame 3", None)])
+        publisher.flush()
+
+        assert receive_all(first_channel) == [
+            {"type": "notification_frames", "frames": ["frame 1", "frame 2"], "keys": [None, None]}
+        ]
+        assert receive_all(second_channel) == [{"type": "notification_frames", "frames": ["frame 3"], "keys": [None]}]
+
+    def test_frame_with_key_replaces_pending_frame(self, join_group):
+        channel_name = join_group("group")
+        publisher = NotificationPublisher(window=60)
+
+        publisher.publish("group", "count 1", key="unread_count")
+        publisher.publish("group", "notification")
+        publisher.publish("group", "count 2", key="unread_count")
+        publisher.flush()
+
+        assert receive_all(channel_name) == [
+            {"type": "notification_frames", "frames": ["notification", "count 2"], "keys": [None, "unread_count"]}
+        ]
+
+    def test_frames_are_sent_after_window(self, join_group):
+        channel_name = join_group("group")
+        publisher = NotificationPublisher(window=0)
+
+        publisher.publish("group", "frame")
+
+        # The in-memory layer doesn't wake up a receiver waiting in another thread's loop, so it isn't waited on
+        deadline = time.monotonic() + 5
+        while channel_name not in get_channel_layer().channels and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert receive_all(channel_name) == [{"type": "notification_frames", "frames": ["frame"], "keys": [None]}]
+
+    def test_failed_send_is_logged(self, join_group, mocker, caplog):
+        channel_layer = get_channel_layer()
+        mocker.patch.object(channel_layer, "group_send", side_effect=ConnectionError("Redis is down"))
+        publisher = NotificationPublisher(window=60)
+
+        publisher.publish("group", "frame")
+        with caplog.at_level(logging.ERROR):
+            publisher.flush()
+
+        assert "Publishing to group failed" in caplog.text
@@ -0,0 +1,141 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.tasks.notification_tasks import send_scheduled_notifications
+
+from ..models import Notification, ScheduledNotification
+from ..scheduler import ScheduledNotificationSender
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def publish_mock(mocker):
+    return mocker.patch("apps.notifications.strategies.publish_notifications")
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def delay_mock(mocker):
+    return mocker.patch("apps.tasks.notification_tasks.send_scheduled_notifications.delay")
+
+
+class TestScheduledNotificationSender:
+    def test_due_notifications_are_sent_once(self, scheduled_notification_factory, publish_mock):
+        due = scheduled_notification_factory.create_batch(5, type="REMINDER", data={"title": "Hello"})
+        scheduled_notification_factory.create(scheduled_for=timezone.now() + timedelta(hours=1))
+
+        assert ScheduledNotificationSender(batch_size=2).run() == 5
+        assert ScheduledNotificationSender().run() == 0
+
+        notifications = Notification.objects.filter(type="REMINDER")
+        assert sorted(notification.user_id for notification in notifications) == sorted(
+            scheduled.user_id for scheduled in due
+        )
+        assert {notification.data["title"] for notification in notifications} == {"Hello"}
+        assert ScheduledNotification.objects.filter(sent=True, sent_at__isnull=False).count() == 5
+
+    def test_batch_is_sent_with_a_single_insert_and_update(
+        self,
+        scheduled_notification_factory,
+        publish_mock,
+        django_capture_on_commit_callbacks,
+        django_assert_num_queries,
+    ):
+        scheduled_notification_factory.create_batch(3)
+
+        # select due batch, select users, insert notifications, update batch and a savepoint around them
+        with django_capture_on_commit_callbacks(execute=True), django_assert_num_queries(6):
+            ScheduledNotificationSender().process_batch()
+
+        (published,) = publish_mock.call_args.args
+        assert len(published) == 3
+
+    def test_failed_dispatch_keeps_notifications_due(self, scheduled_notification_factory, mocker):
+        mocker.patch("apps.notifications.sender.send_notifications", side_effect=ConnectionError())
+        scheduled_notification_factory.create()
+
+        with pytest.raises(ConnectionError):
+            ScheduledNotificationSender().run()
+
+        assert ScheduledNotification.objects.filter(sent=False).count() == 1
+
+    def test_metrics(self, scheduled_notification_factory, publish_mock):
+        scheduled_notification_factory.create_batch(3, scheduled_for=timezone.now() - timedelta(minutes=1))
+        scheduler = ScheduledNotificationSender(batch_size=2)
+
+        scheduler.run(max_batches=1)
+        metrics = scheduler.metrics()
+
+        assert metrics["sent"] == 2
+        assert metrics["batches"] == 1
+        assert metrics["max_lag_seconds"] >= 60
+        assert metrics["pending"] == 1
+        assert metrics["pending_lag_seconds"] >= 60
+
+
+class TestSendScheduledNotificationsTask:
+    def test_backlog_is_drained_in_parallel(self, scheduled_notification_factory, publish_mock, delay_mock, settings):
+        settings.NOTIFICATIONS_SCHEDULED_BATCH_SIZE = 2
+        scheduled_notification_factory.create_batch(5)
+
+        metrics = send_scheduled_notifications(workers=4)
+
+        assert delay_mock.call_count == 2
+        delay_mock.assert_called_with(workers=1)
+        assert metrics["sent"] == 5
+        assert metrics["pending"] == 0
+
+    def test_nothing_due_is_not_fanned_out(self, publish_mock, delay_mock):
+        metrics = send_scheduled_notifications()
+
+        delay_mock.assert_not_called()
+        assert metrics["sent"] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentScheduledNotificationSenders:
+    def test_senders_skip_notifications_claimed_by_each_other(
+        self, scheduled_notification_factory, publish_mock, locmem_cache
+    ):
+        now = timezone.now()
+        scheduled = [
+            scheduled_notification_factory.create(scheduled_for=now - timedelta(minutes=index)) for index in range(4)
+        ]
+        claimed = threading.Event()
+        released = threading.Event()
+
+        def claim_first_batch():
+            try:
+                with transaction.atomic():
+                    list(ScheduledNotification.objects.select_for_update().order_by("scheduled_for")[:2])
+                    claimed.set()
+                    released.wait(timeout=10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=claim_first_batch)
+        thread.start()
+        claimed.wait(timeout=10)
+        try:
+            sent_count = ScheduledNotificationSender(batch_size=10).run()
+        finally:
+            released.set()
+            thread.join()
+
+        assert sent_count == 2
+        assert set(ScheduledNotification.objects.filter(sent=True).values_list("pk", flat=True)) == {
+            notification.pk for notification in scheduled[:2]
+        }
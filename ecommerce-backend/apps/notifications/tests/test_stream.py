@@ -0,0 +1,72 @@
+import json
+
+import pytest
+import redis
+
+from ..broadcast import publish_notifications
+from ..stream import NotificationStream, notification_stream
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@pytest.fixture
+def user_stream(user):
+    user_key = NotificationStream.user_key(user.pk)
+    notification_stream.redis.delete(user_key)
+    yield user_key
+    notification_stream.redis.delete(user_key)
+
+
+@pytest.fixture
+def published(user, user_stream, notification_factory, mocker):
+    """
+    Publishes three notifications of the user and returns their frames.
+    """
+    publish_many = mocker.patch("apps.notifications.broadcast.notification_publisher.publish_many")
+    notifications = notification_factory.create_batch(3, user=user)
+    publish_many.reset_mock()
+
+    publish_notifications(notifications)
+
+    return [json.loads(text) for _, text, _ in publish_many.call_args.args[0]]
+
+
+class TestNotificationStream:
+    def test_missed_events_are_replayed(self, user, published):
+        frames = notification_stream.read_after(user.pk, published[0]["event_id"])
+
+        assert [json.loads(frame) for frame in frames] == published[1:]
+
+    def test_nothing_is_replayed_to_client_up_to_date(self, user, published):
+        assert notification_stream.read_after(user.pk, published[-1]["event_id"]) == []
+
+    def test_trimmed_gap_requires_resync(self, user, user_stream, published):
+        notification_stream.redis.xtrim(user_stream, maxlen=1, approximate=False)
+
+        # The second event was missed and isn't kept anymore
+        assert notification_stream.read_after(user.pk, published[0]["event_id"]) is None
+
+    def test_expired_stream_requires_resync(self, user, user_stream, published):
+        notification_stream.redis.delete(user_stream)
+
+        assert notification_stream.read_after(user.pk, published[-1]["event_id"]) is None
+
+    @pytest.mark.parametrize("last_event_id", ["", "latest", "1-2-3", None])
+    def test_invalid_event_id_requires_resync(self, user, published, last_event_id):
+        assert notification_stream.read_after(user.pk, last_event_id) is None
+
+    def test_notifications_are_published_when_stream_fails(self, user, notification_factory, mocker):
+        notification = notification_factory(user=user)
+        mocker.patch.object(redis.client.Pipeline, "execute", side_effect=redis.ConnectionError("Redis is down"))
+        publish_many = mocker.patch("apps.notifications.broadcast.notification_publisher.publish_many")
+
+        publish_notifications([notification])
+
+        ((_, text, _),) = publish_many.call_args.args[0]
+        assert json.loads(text)["event_id"] is None
+        assert json.loads(text)["data"]["id"] == str(notification.pk)
@@ -1,33 +1,40 @@
-from rest_framework import status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from . import models, serializers
+from .counters import unread_counter
+from .services import NotificationService
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
     serializer_class = serializers.NotificationSerializer
     permission_classes = [IsAuthenticated]
-    http_method_names = ["get", "patch", "delete"]
+    # Notifications aren't created through the API, POST is only used by mark_all_read
+    http_method_names = ["get", "post", "patch", "delete"]
 
     def get_queryset(self):
-        return models.Notification.objects.filter(user=self.request.user).order_by("-created_at")
+        return models.Notification.objects.filter(user=self.request.user).with_read_until().order_by("-created_at")
 
     @action(detail=False, methods=["get"])
     def unread_count(self, request):
-        count = models.Notification.objects.filter(user=request.user, is_read=False).count()
-        return Response({"unread_count": count}, status=status.HTTP_200_OK)
+        return Response({"unread_count": unread_counter.get(request.user.pk)}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["patch"])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        NotificationService.set_notification_read(notification, True)
         serializer = self.get_serializer(notification)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"])
     def mark_all_read(self, request):
-        models.Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        NotificationService.mark_read_all_user_notifications(request.user)
         return Response({"message": "All notifications marked as read"}, status=status.HTTP_200_OK)
@@ -2,6 +2,8 @@ import os
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
+from django.conf import settings
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
@@ -25,6 +27,26 @@ app.conf.beat_schedule = {
         "task": "apps.tasks.notification_tasks.send_scheduled_notifications",
         "schedule": crontab(minute="*/5"),
     },
+    "resume-notification-broadcasts": {
+        "task": "apps.tasks.notification_tasks.resume_notification_broadcasts",
+        "schedule": crontab(minute="*/5"),
+    },
+    "resume-webhook-events": {
+        "task": "apps.tasks.finance_tasks.resume_webhook_events",
+        "schedule": crontab(minute="*/5"),
+    },
+    "relay-outbox": {
+        "task": "apps.tasks.notification_tasks.relay_outbox",
+        "schedule": settings.NOTIFICATIONS_OUTBOX_RELAY_INTERVAL,
+    },
+    "reconcile-unread-notification-counters": {
+        "task": "apps.tasks.notification_tasks.reconcile_unread_notification_counters",
+        "schedule": settings.NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_INTERVAL,
+    },
+    "flush-token-store": {
+        "task": "apps.tasks.scheduler.flush_token_store",
+        "schedule": crontab(minute="*"),
+    },
     "cleanup-expired-tokens": {
         "task": "apps.tasks.scheduler.cleanup_expired_tokens",
         "schedule": crontab(hour=0, minute=0),
@@ -32,3 +54,11 @@ app.conf.beat_schedule = {
 }
 
 app.conf.timezone = "UTC"
+
+
+@worker_process_shutdown.connect
+def flush_notification_publisher(**kwargs):
+    # Worker processes exit without running atexit handlers, frames published by their last tasks are sent here
+    from apps.notifications.publisher import notification_publisher
+
+    notification_publisher.flush(timeout=5)
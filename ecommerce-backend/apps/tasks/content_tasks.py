@@ -6,35 +6,26 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task
-def sync_content():
+def sync_content(full: bool = False):
     """Synchronize content from external CMS (Contentful)."""
-    from apps.content.models import ContentItem
+    from apps.content.sync import ContentItemSync
     from apps.integrations.services.contentful_service import ContentfulService
 
     logger.info("Starting content synchronization")
 
-    try:
-        service = ContentfulService()
-        entries = service.get_all_entries()
-
-        synced_count = 0
-        for entry in entries:
-            ContentItem.objects.update_or_create(
-                external_id=entry["id"],
-                defaults={
-                    "content_type": entry["content_type"],
-                    "fields": entry["fields"],
-                    "is_published": True,
-                },
-            )
-            synced_count += 1
+    service = ContentfulService()
+    if not service.is_configured():
+        logger.warning("Content synchronization skipped, Contentful is not configured")
+        return {"error": "Contentful is not configured"}
 
-        # Mark missing entries as unpublished
-        existing_ids = [e["id"] for e in entries]
-        ContentItem.objects.exclude(external_id__in=existing_ids).update(is_published=False)
+    try:
+        result = ContentItemSync(service).run(full=full)
 
-        logger.info(f"Synced {synced_count} content items")
-        return {"synced_count": synced_count}
+        logger.info(
+            f"Synced {result['synced_count']} content items, {result['updated_count']} updated, "
+            f"{result['unpublished_count']} unpublished"
+        )
+        return result
     except Exception as e:
         logger.error(f"Error syncing content: {e}")
         return {"error": str(e)}
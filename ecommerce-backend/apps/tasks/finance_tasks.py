@@ -0,0 +1,48 @@
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=None)
+def process_webhook_events(self, ordering_key: str):
+    """Process queued Stripe webhook events of a customer in order."""
+    from apps.finances.webhook_ingestion import WebhookEventProcessor
+
+    processor = WebhookEventProcessor(ordering_key)
+    try:
+        processor.run()
+    except Exception as e:
+        # The failed event blocks the key until it's retried, or until it runs out of attempts
+        logger.warning(f"Processing Stripe events of {ordering_key} failed, retrying: {e}")
+        raise self.retry(exc=e, countdown=min(2**self.request.retries, 300))
+
+    logger.info(
+        f"Processed {processor.stats['processed']} Stripe events of {ordering_key}, {processor.stats['failed']} failed"
+    )
+    return {"ordering_key": ordering_key, **processor.stats}
+
+
+@shared_task
+def resume_webhook_events(stalled_after_minutes: int = 5):
+    """Resume processing of Stripe events whose worker died or whose task was lost."""
+    from datetime import timedelta
+
+    from apps.finances.models import QueuedWebhookEvent
+
+    stalled_keys = (
+        QueuedWebhookEvent.objects.filter_pending()
+        .filter(received_at__lt=timezone.now() - timedelta(minutes=stalled_after_minutes))
+        .order_by()
+        .values_list("ordering_key", flat=True)
+        .distinct()
+    )
+
+    resumed = list(stalled_keys)
+    for ordering_key in resumed:
+        process_webhook_events.delay(ordering_key)
+
+    logger.info(f"Resumed processing of Stripe events of {len(resumed)} ordering keys")
+    return {"resumed": resumed}
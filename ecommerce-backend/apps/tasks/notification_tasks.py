@@ -1,8 +1,7 @@
 import logging
 
-from asgiref.sync import async_to_sync
 from celery import shared_task
-from channels.layers import get_channel_layer
+from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -10,7 +9,7 @@ logger = logging.getLogger(__name__)
 
 @shared_task
 def create_notification(user_id: int, notification_type: str, data: dict = None):
-    """Create a notification and send it via WebSocket."""
+    """Create a notification, it's sent via WebSocket once it's committed."""
     from apps.notifications.models import Notification
 
     try:
@@ -20,22 +19,6 @@ def create_notification(user_id: int, notification_type: str, data: dict = None)
             data=data or {},
         )
 
-        # Send via WebSocket
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"notifications_{user_id}",
-            {
-                "type": "notification_message",
-                "notification": {
-                    "id": str(notification.id),
-                    "type": notification.type,
-                    "data": notification.data,
-                    "is_read": notification.is_read,
-                    "created_at": notification.created_at.isoformat(),
-                },
-            },
-        )
-
         logger.info(f"Notification created for user {user_id}: {notification_type}")
         return {"notification_id": str(notification.id)}
     except Exception as e:
@@ -44,43 +27,86 @@ def create_notification(user_id: int, notification_type: str, data: dict = None)
 
 
 @shared_task
-def send_scheduled_notifications():
-    """Send all scheduled notifications that are due."""
-    from apps.notifications.models import ScheduledNotification
+def send_scheduled_notifications(workers: int = None):
+    """Send the scheduled notifications which are due, a backlog is drained by up to ``workers`` tasks in parallel."""
+    from math import ceil
 
-    now = timezone.now()
-    due_notifications = ScheduledNotification.objects.filter(scheduled_for__lte=now, sent=False)
+    from apps.notifications.scheduler import ScheduledNotificationSender, get_due_notifications
 
-    sent_count = 0
-    for scheduled in due_notifications:
-        create_notification.delay(user_id=scheduled.user_id, notification_type=scheduled.type, data=scheduled.data)
-        scheduled.sent = True
-        scheduled.sent_at = now
-        scheduled.save()
-        sent_count += 1
+    scheduler = ScheduledNotificationSender()
+    workers = workers or settings.NOTIFICATIONS_SCHEDULED_WORKERS
+    # Runs of the task claim different batches, those enqueued here don't fan out again
+    for _ in range(min(workers, ceil(get_due_notifications().count() / scheduler.batch_size)) - 1):
+        send_scheduled_notifications.delay(workers=1)
 
-    logger.info(f"Sent {sent_count} scheduled notifications")
-    return {"sent_count": sent_count}
+    scheduler.run()
+    metrics = scheduler.metrics()
+
+    logger.info(
+        f"Sent {metrics['sent']} scheduled notifications ({metrics['per_second']:.0f}/s, max lag "
+        f"{metrics['max_lag_seconds']:.1f}s), {metrics['pending']} pending"
+    )
+    return metrics
 
 
 @shared_task
 def broadcast_notification(notification_type: str, data: dict = None, tenant_id: str = None):
     """Broadcast a notification to all users or all users in a tenant."""
-    from apps.multitenancy.models import TenantMembership
-    from apps.users.models import User
+    from apps.notifications.models import NotificationBroadcast
+
+    broadcast = NotificationBroadcast.objects.create(type=notification_type, data=data or {}, tenant_id=tenant_id)
+    send_notification_broadcast.delay(str(broadcast.pk))
+
+    logger.info(f"Broadcast {broadcast.pk} of {notification_type} notification scheduled")
+    return {"broadcast_id": str(broadcast.pk)}
 
-    if tenant_id:
-        user_ids = TenantMembership.objects.filter(tenant_id=tenant_id, is_active=True).values_list(
-            "user_id", flat=True
-        )
-    else:
-        user_ids = User.objects.filter(is_active=True).values_list("id", flat=True)
 
-    for user_id in user_ids:
-        create_notification.delay(user_id=user_id, notification_type=notification_type, data=data)
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def send_notification_broadcast(broadcast_id: str):
+    """Send a broadcast in chunks, continuing from its last checkpoint."""
+    from apps.notifications.broadcast import NotificationBroadcaster
+    from apps.notifications.models import NotificationBroadcast
 
-    logger.info(f"Broadcast notification to {len(user_ids)} users")
-    return {"broadcast_to": len(user_ids)}
+    sent_count = NotificationBroadcaster(broadcast_id).run()
+    broadcast = NotificationBroadcast.objects.get(pk=broadcast_id)
+
+    logger.info(f"Broadcast {broadcast_id}: sent {sent_count} notifications in this run, {broadcast.sent_count} total")
+    return {"broadcast_id": broadcast_id, "broadcast_to": broadcast.sent_count}
+
+
+@shared_task
+def resume_notification_broadcasts(stalled_after_minutes: int = 10):
+    """Resume broadcasts whose worker died before they were completed."""
+    from datetime import timedelta
+
+    from apps.notifications.models import NotificationBroadcast
+
+    stalled_broadcasts = NotificationBroadcast.objects.filter(
+        completed_at__isnull=True, updated_at__lt=timezone.now() - timedelta(minutes=stalled_after_minutes)
+    ).values_list("pk", flat=True)
+
+    resumed = [str(broadcast_id) for broadcast_id in stalled_broadcasts]
+    for broadcast_id in resumed:
+        send_notification_broadcast.delay(broadcast_id)
+
+    logger.info(f"Resumed {len(resumed)} stalled broadcasts")
+    return {"resumed": resumed}
+
+
+@shared_task
+def relay_outbox(max_batches: int = 100):
+    """Dispatch emails and notifications committed to the outbox."""
+    from apps.notifications.outbox import OutboxRelay
+
+    relay = OutboxRelay()
+    relay.run(max_batches=max_batches)
+    metrics = relay.metrics()
+
+    logger.info(
+        f"Relayed {metrics['dispatched']} outbox messages ({metrics['per_second']:.0f}/s, max lag "
+        f"{metrics['max_lag_seconds']:.1f}s), {metrics['pending']} pending"
+    )
+    return metrics
 
 
 @shared_task
@@ -89,12 +115,19 @@ def mark_old_notifications_read(user_id: int, days: int = 30):
     from datetime import timedelta
 
     from apps.notifications.models import Notification
+    from apps.notifications.services import NotificationService
 
     cutoff_date = timezone.now() - timedelta(days=days)
 
-    updated = Notification.objects.filter(user_id=user_id, is_read=False, created_at__lt=cutoff_date).update(
-        is_read=True, read_at=timezone.now()
-    )
+    updated = NotificationService.mark_read(Notification.objects.filter(user_id=user_id, created_at__lt=cutoff_date))
 
     logger.info(f"Marked {updated} old notifications as read for user {user_id}")
     return {"marked_read": updated}
+
+
+@shared_task
+def reconcile_unread_notification_counters():
+    """Fix cached unread notification counters which drifted from the database."""
+    from apps.notifications.counters import unread_counter
+
+    return {"fixed": unread_counter.reconcile()}
@@ -30,6 +30,17 @@ def cleanup_expired_tokens():
         return {"error": str(e)}
 
 
+@shared_task
+def flush_token_store():
+    """Write refresh token state kept by the token store to the database."""
+    from apps.users.token_store import get_token_store
+
+    written = get_token_store().flush()
+
+    logger.info(f"Flushed {written} token store records")
+    return {"written": written}
+
+
 @shared_task
 def schedule_task(task_name: str, task_data: dict, eta=None):
     """Generic task scheduler for deferred execution."""
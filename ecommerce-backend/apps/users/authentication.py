@@ -1,11 +1,48 @@
-from channels.db import database_sync_to_async
 from django.conf import settings
 from django.http import parse_cookie
+from django.utils.translation import gettext_lazy as _
 from rest_framework import HTTP_HEADER_ENCODING
 from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
 
+from .cache import principal_cache
 
-class JSONWebTokenCookieAuthentication(authentication.JWTAuthentication):
+
+class CachedPrincipalMixin:
+    """
+    Builds the user from a cached principal snapshot instead of querying it, see ``apps.users.cache``.
+    """
+
+    def get_user(self, validated_token):
+        return self.check_user(principal_cache.get_user(self.get_user_id(validated_token)))
+
+    async def aget_user(self, validated_token):
+        return self.check_user(await principal_cache.aget_user(self.get_user_id(validated_token)))
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[jwt_api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_user(user):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+
+class JSONWebTokenAuthentication(CachedPrincipalMixin, authentication.JWTAuthentication):
+    pass
+
+
+class JSONWebTokenCookieAuthentication(CachedPrincipalMixin, authentication.JWTAuthentication):
     def get_header(self, request):
         """
         Extracts the header containing the JSON web token from the given
@@ -23,7 +60,7 @@ class JSONWebTokenCookieAuthentication(authentication.JWTAuthentication):
         return header
 
 
-class JSONWebTokenChannelsAuthentication(authentication.JWTAuthentication):
+class JSONWebTokenChannelsAuthentication(CachedPrincipalMixin, authentication.JWTAuthentication):
     def get_header(self, scope):
         for name, value in scope.get("headers", []):
             if name == b"cookie":
@@ -48,15 +85,39 @@ class JSONWebTokenChannelsAuthentication(authentication.JWTAuthentication):
     def get_raw_token(self, header):
         return header
 
+    async def aget_user(self, validated_token):
+        """
+        A ``ConnectionPrincipal`` of the user, it's kept for as long as the connection is open.
+        """
+        return self.check_user(await principal_cache.aget_connection_principal(self.get_user_id(validated_token)))
+
+    async def aauthenticate(self, scope):
+        header = self.get_header(scope)
+        if header is None:
+            return None
+
+        validated_token = self.get_validated_token(self.get_raw_token(header))
+        return await self.aget_user(validated_token), validated_token
+
 
 class JSONWebTokenCookieMiddleware:
+    """
+    Authenticates WebSocket connections with the access token cookie.
+
+    The token is validated in the event loop and the connection's principal is built from the principal cache, so a
+    connection of a user whose snapshot is cached locally is authenticated without a thread or a database connection.
+    Connections with an invalid token or of an unknown or inactive user get no user and are rejected by the consumers.
+    """
+
     def __init__(self, app):
         self.app = app
 
-    @database_sync_to_async
-    def authenticate(self, scope):
+    async def authenticate(self, scope):
         auth_backend = JSONWebTokenChannelsAuthentication()
-        return auth_backend.authenticate(scope)
+        try:
+            return await auth_backend.aauthenticate(scope)
+        except AuthenticationFailed:
+            return None
 
     async def __call__(self, scope, receive, send):
         scope = dict(scope)
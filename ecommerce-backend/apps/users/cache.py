@@ -0,0 +1,217 @@
+import time
+from dataclasses import dataclass, field
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.multitenancy.models import TenantMembership
+from common.cache import MISSING, CacheStats, LocalTTLCache
+
+
+@dataclass(frozen=True)
+class PrincipalSnapshot:
+    """
+    Everything needed to authenticate and authorize a request on behalf of a user.
+
+    ``user_fields`` holds the concrete fields of the user without secrets (see ``PrincipalCache.EXCLUDED_FIELDS``),
+    ``None`` for a user that doesn't exist. ``tenant_roles`` maps ids of tenants the user is a member of to roles.
+    """
+
+    version: int
+    user_fields: dict | None
+    groups: tuple[tuple[int, str], ...] = ()
+    tenant_roles: dict = field(default_factory=dict)
+
+    @property
+    def group_names(self) -> list[str]:
+        return [name for _, name in self.groups]
+
+    def get_user(self):
+        """
+        Builds a new user instance from the snapshot, so instances are never shared between requests.
+
+        Excluded fields are deferred and loaded on first access. Groups are set as prefetched, so ``user.groups.all()``
+        and ACL policies don't query the database.
+        """
+        if self.user_fields is None:
+            return None
+
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, list(self.user_fields), list(self.user_fields.values()))
+        groups = user.groups.all()
+        groups._result_cache = [Group.from_db(DEFAULT_DB_ALIAS, ["id", "name"], list(group)) for group in self.groups]
+        groups._prefetch_done = True
+        user._prefetched_objects_cache = {"groups": groups}
+        user.principal = self
+        return user
+
+    def get_connection_principal(self) -> "ConnectionPrincipal | None":
+        if self.user_fields is None:
+            return None
+
+        return ConnectionPrincipal(
+            pk=self.user_fields[get_user_model()._meta.pk.attname],
+            tenant_ids=frozenset(self.tenant_roles),
+            is_active=self.user_fields["is_active"],
+            is_superuser=self.user_fields["is_superuser"],
+        )
+
+
+class ConnectionPrincipal:
+    """
+    The user of a WebSocket connection. Connections are kept open for hours and there may be tens of thousands of them
+    per process, so they're authenticated with only what the consumers need instead of a user instance.
+
+    ``tenant_ids`` are the ids of the tenants whose membership the user accepted, pending invitations aren't included;
+    ``TenantConsumer.verify_tenant_access`` relies on that.
+    """
+
+    __slots__ = ("pk", "tenant_ids", "is_active", "is_superuser")
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, pk, tenant_ids: frozenset[str], is_active: bool, is_superuser: bool):
+        self.pk = pk
+        self.tenant_ids = tenant_ids
+        self.is_active = is_active
+        self.is_superuser = is_superuser
+
+    @property
+    def id(self):
+        return self.pk
+
+    def __repr__(self):
+        return f"<ConnectionPrincipal: {self.pk}>"
+
+
+class PrincipalCache:
+    """
+    Two-tier cache of ``PrincipalSnapshot`` used to authenticate requests without querying the database.
+
+    The first tier is an in-process LRU with a short TTL, the second one is the shared ``CACHES["default"]``. Every
+    user has a version counter in the shared cache which is bumped on changes of the user, its groups and tenant
+    memberships (see ``signals.py``). A snapshot is valid only for the version it was built for, so a snapshot built
+    from data read before a change can't overwrite the result of the change.
+    """
+
+    KEY_PREFIX = "principal"
+    EXCLUDED_FIELDS = ("password", "otp_base32", "otp_auth_url")
+
+    def __init__(self):
+        self.local = LocalTTLCache(
+            max_size=settings.PRINCIPAL_LOCAL_CACHE_MAX_SIZE,
+            timeout=settings.PRINCIPAL_LOCAL_CACHE_TIMEOUT,
+        )
+        self.stats = CacheStats()
+
+    @staticmethod
+    def normalize_user_id(user_id) -> str | None:
+        try:
+            user_pk = get_user_model()._meta.pk.to_python(user_id)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        return str(user_pk) if user_pk is not None else None
+
+    @classmethod
+    def snapshot_key(cls, user_pk) -> str:
+        return f"{cls.KEY_PREFIX}:snapshot:{user_pk}"
+
+    @classmethod
+    def version_key(cls, user_pk) -> str:
+        return f"{cls.KEY_PREFIX}:version:{user_pk}"
+
+    def get_user(self, user_id):
+        snapshot = self.get(user_id)
+        return snapshot.get_user() if snapshot is not None else None
+
+    def get(self, user_id) -> PrincipalSnapshot | None:
+        user_pk = self.normalize_user_id(user_id)
+        if user_pk is None:
+            return None
+
+        snapshot_key = self.snapshot_key(user_pk)
+        snapshot = self.local.get(snapshot_key)
+        if snapshot is not MISSING:
+            self.stats["local_hits"] += 1
+            return snapshot
+
+        version_key = self.version_key(user_pk)
+        values = cache.get_many([snapshot_key, version_key])
+        version = values.get(version_key)
+        if version is None:
+            version = self._init_version(user_pk)
+
+        snapshot = values.get(snapshot_key)
+        if snapshot is not None and snapshot.version == version:
+            self.stats["shared_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            snapshot = self._fetch(user_pk, version)
+            cache.set(snapshot_key, snapshot, timeout=settings.PRINCIPAL_CACHE_TIMEOUT)
+
+        self.local.set(snapshot_key, snapshot)
+        return snapshot
+
+    async def aget_user(self, user_id):
+        snapshot = await self.aget(user_id)
+        return snapshot.get_user() if snapshot is not None else None
+
+    async def aget(self, user_id) -> PrincipalSnapshot | None:
+        """
+        ``get()`` for the event loop: a snapshot of the local tier is returned without leaving the loop, only the
+        shared tier and the database are read from a thread.
+        """
+        user_pk = self.normalize_user_id(user_id)
+        if user_pk is None:
+            return None
+
+        snapshot = self.local.get(self.snapshot_key(user_pk))
+        if snapshot is not MISSING:
+            self.stats["local_hits"] += 1
+            return snapshot
+
+        return await database_sync_to_async(self.get)(user_pk)
+
+    async def aget_connection_principal(self, user_id) -> ConnectionPrincipal | None:
+        snapshot = await self.aget(user_id)
+        return snapshot.get_connection_principal() if snapshot is not None else None
+
+    def bump_version(self, user_pk):
+        user_pk = str(user_pk)
+        try:
+            cache.incr(self.version_key(user_pk))
+        except ValueError:
+            self._init_version(user_pk)
+        self.local.delete(self.snapshot_key(user_pk))
+        self.stats["invalidations"] += 1
+
+    def clear(self):
+        self.local.clear()
+        self.stats.clear()
+
+    def _init_version(self, user_pk) -> int:
+        # A counter that was evicted restarts from a new value, so it can't match a snapshot built before the eviction
+        cache.add(self.version_key(user_pk), time.time_ns(), timeout=None)
+        return cache.get(self.version_key(user_pk))
+
+    def _fetch(self, user_pk, version: int) -> PrincipalSnapshot:
+        User = get_user_model()
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname not in self.EXCLUDED_FIELDS]
+        user_fields = User.objects.filter(pk=user_pk).values(*fields).first()
+        if user_fields is None:
+            return PrincipalSnapshot(version=version, user_fields=None)
+
+        groups = tuple(Group.objects.filter(user__pk=user_pk).values_list("id", "name"))
+        tenant_roles = {
+            str(tenant_id): role
+            for tenant_id, role in TenantMembership.objects.filter(user_id=user_pk).values_list("tenant_id", "role")
+        }
+        return PrincipalSnapshot(version=version, user_fields=user_fields, groups=groups, tenant_roles=tenant_roles)
+
+
+principal_cache = PrincipalCache()
@@ -1,9 +1,42 @@
-from rest_framework_simplejwt.token_blacklist import models as blacklist_models
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens as jwt_tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
 
 from . import models
+from .token_store import get_token_store
+
+
+class RefreshToken(jwt_tokens.RefreshToken):
+    """
+    Refresh token keeping its outstanding and blacklisted state in the configured ``JWT_TOKEN_STORE`` instead of
+    writing to the ``token_blacklist`` tables on every issue and rotation.
+    """
+
+    def check_blacklist(self):
+        if get_token_store().is_revoked(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        get_token_store().revoke(self)
+
+    @classmethod
+    def for_user(cls, user):
+        return cls.for_user_id(getattr(user, jwt_api_settings.USER_ID_FIELD))
+
+    @classmethod
+    def for_user_id(cls, user_id):
+        """
+        Issues a token without loading the user, e.g. when rotating a refresh token that was already verified.
+        """
+        if not isinstance(user_id, int):
+            user_id = str(user_id)
+
+        token = cls()
+        token[jwt_api_settings.USER_ID_CLAIM] = user_id
+        get_token_store().add(token)
+        return token
 
 
 def blacklist_user_tokens(user: models.User):
-    tokens = blacklist_models.OutstandingToken.objects.filter(user=user)
-    for token in tokens:
-        blacklist_models.BlacklistedToken.objects.get_or_create(token=token)
+    get_token_store().revoke_user_tokens(user.pk)
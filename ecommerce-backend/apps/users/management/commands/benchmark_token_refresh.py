@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleJWTRefreshToken
+
+from apps.users import jwt
+from apps.users.cache import principal_cache
+from apps.users.token_store import get_token_store
+from common.benchmarks import BenchmarkCommand, rolled_back_transaction, run_batch_benchmark, run_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Measure refresh token rotation with simplejwt's database blacklist and with the configured token store"
+
+    def run_benchmarks(self, iterations: int, **options):
+        store = get_token_store()
+        with rolled_back_transaction():
+            user = get_user_model().objects.create_user(email="benchmark-token-refresh@example.com", password="secret")
+            legacy_tokens = [str(SimpleJWTRefreshToken.for_user(user))]
+            tokens = [str(jwt.RefreshToken.for_user(user))]
+            store.flush()
+
+            def legacy_rotate():
+                """
+                Rotation as it was before the token store: blacklist lookup, user lookup and two inserts.
+                """
+                refresh = SimpleJWTRefreshToken(legacy_tokens[-1])
+                refresh.blacklist()
+                rotated_user = get_user_model().objects.get(pk=refresh[jwt_api_settings.USER_ID_CLAIM])
+                legacy_tokens.append(str(SimpleJWTRefreshToken.for_user(rotated_user)))
+
+            def rotate():
+                refresh = jwt.RefreshToken(tokens[-1])
+                rotated_user = principal_cache.get_user(refresh[jwt_api_settings.USER_ID_CLAIM])
+                refresh.blacklist()
+                tokens.append(str(jwt.RefreshToken.for_user_id(rotated_user.pk)))
+
+            results = [
+                run_benchmark("legacy rotation (database)", legacy_rotate, iterations),
+                run_benchmark(f"rotation ({type(store).__name__})", rotate, iterations),
+                run_batch_benchmark("flush pending writes", store.flush, iterations * 2),
+                run_batch_benchmark(
+                    "revoke all user tokens", lambda: store.revoke_user_tokens(user.pk), len(legacy_tokens)
+                ),
+            ]
+        return results
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+
+import boto3
+from django.conf import settings
+from moto import mock_s3
+
+from apps.users.models import User
+from apps.users.services.export.services.export import ExportUserArchive, StreamingExportUserArchive
+from common.benchmarks import BenchmarkCommand, run_batch_benchmark
+
+MEBIBYTE = 1024 * 1024
+
+
+class _S3Key(str):
+    """
+    File path as passed to ``ExportUserArchive._export_user_archive_to_zip``, which reads its ``name``.
+    """
+
+    @property
+    def name(self) -> str:
+        return str(self)
+
+
+def _legacy_export(user: User, keys: list[str]):
+    export_user_archive = ExportUserArchive(user)
+    archive_filename = export_user_archive._export_user_archive_to_zip({"user": "data"}, [_S3Key(key) for key in keys])
+    try:
+        export_user_archive._export_zip_archive_to_s3(archive_filename)
+    finally:
+        os.remove(archive_filename)
+
+
+def _streaming_export(user: User, keys: list[str]):
+    export_user_archive = StreamingExportUserArchive(user)
+    s3 = boto3.client("s3", endpoint_url=settings.AWS_S3_ENDPOINT_URL)
+    export_user_archive._stream_user_archive_to_s3(
+        s3, export_user_archive._get_user_archive_obj_key(), {"user": "data"}, keys
+    )
+
+
+def _read_memory_status(field: str) -> int:
+    """
+    Returns a ``/proc/self/status`` memory field (e.g. ``VmRSS``, ``VmHWM``) in kilobytes.
+    """
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _run_in_child(connection, name: str, export, user: User, keys: list[str]):
+    """
+    Runs a single export in a forked process and reports how much its peak RSS grew during the export.
+
+    The peak (``VmHWM``) inherited from the parent, which uploaded the benchmark files, is reset first, so it doesn't
+    hide the peak of the export (Linux only).
+    """
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    rss_before = _read_memory_status("VmRSS")
+    result = run_batch_benchmark(name, lambda: export(user, keys), len(keys))
+    connection.send((result, (_read_memory_status("VmHWM") - rss_before) / 1024))
+    connection.close()
+
+
+class Command(BenchmarkCommand):
+    """
+    moto keeps S3 in the benchmarked process: every downloaded object is materialized in full and a multipart upload
+    is concatenated in memory on completion. Those copies are part of the peak RSS of both variants, the difference
+    between them is the buffering done by the exporter itself.
+    """
+
+    help = "Measure time and peak RSS of user data exports with large files against a moto S3 mock"
+
+    default_iterations = 4
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--file-size-mb", type=int, default=64)
+        parser.add_argument("--workers", type=int, default=settings.USER_DATA_EXPORT_DOWNLOAD_WORKERS)
+
+    def run_benchmarks(self, iterations: int, file_size_mb: int, workers: int, **options):
+        """
+        ``iterations`` is the number of exported files.
+        """
+        settings.USER_DATA_EXPORT_DOWNLOAD_WORKERS = workers
+        # An unsaved user is enough: exporting files only needs the user id, and children don't touch the database
+        user = User(id=1, email="benchmark-user-export@example.com")
+        keys = [f"benchmark/export/{index}.bin" for index in range(iterations)]
+        context = multiprocessing.get_context("fork")
+
+        results = []
+        with mock_s3():
+            s3 = boto3.client("s3", region_name="us-east-1", endpoint_url=settings.AWS_S3_ENDPOINT_URL)
+            s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+            s3.create_bucket(Bucket=settings.AWS_EXPORTS_STORAGE_BUCKET_NAME)
+            content = os.urandom(file_size_mb * MEBIBYTE)
+            for key in keys:
+                s3.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, Body=content)
+            del content
+
+            for name, export in (("legacy (BytesIO + /tmp)", _legacy_export), ("streaming", _streaming_export)):
+                parent_connection, child_connection = context.Pipe(duplex=False)
+                process = context.Process(target=_run_in_child, args=(child_connection, name, export, user, keys))
+                process.start()
+                result, peak_rss_growth_mb = parent_connection.recv()
+                process.join()
+                results.append(result)
+                self.stdout.write(f"{name}: peak RSS growth {peak_rss_growth_mb:.1f} MiB")
+
+        return results
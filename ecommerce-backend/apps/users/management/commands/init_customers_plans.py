@@ -8,6 +8,6 @@ class Command(BaseCommand):
     help = "Creates stripe customer and schedule subscription plan"
 
     def handle(self, *args, **options):
-        tenants = Tenant.objects.filter(djstripe_customers__isnull=True)
+        tenants = Tenant.objects.filter(djstripe_customers__isnull=True).order_by("pk")
         for tenant in tenants:
             subscriptions.initialize_tenant(tenant=tenant)
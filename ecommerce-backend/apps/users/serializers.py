@@ -10,12 +10,12 @@ from rest_framework_simplejwt import serializers as jwt_serializers
 from rest_framework_simplejwt import tokens as jwt_tokens
 from rest_framework_simplejwt.serializers import PasswordField
 from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.multitenancy.models import Tenant
 from common.decorators import context_user_required
 
 from . import jwt, models, notifications, tokens
+from .cache import principal_cache
 from .services import otp as otp_services
 from .services.users import get_role_names
 from .utils import generate_otp_auth_token
@@ -80,7 +80,7 @@ class UserSignupSerializer(serializers.ModelSerializer):
             validated_data["password"],
         )
 
-        refresh = jwt_tokens.RefreshToken.for_user(user)
+        refresh = jwt.RefreshToken.for_user(user)
 
         if jwt_api_settings.UPDATE_LAST_LOGIN:
             update_last_login(None, user)
@@ -147,7 +147,7 @@ class UserAccountChangePasswordSerializer(serializers.Serializer):
         user.set_password(new_password)
         user.save()
 
-        refresh = jwt_tokens.RefreshToken.for_user(user)
+        refresh = jwt.RefreshToken.for_user(user)
 
         return {
             "access": str(refresh.access_token),
@@ -217,6 +217,7 @@ class PasswordResetConfirmationSerializer(serializers.Serializer):
 
 class CookieTokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
     username_field = get_user_model().USERNAME_FIELD
+    token_class = jwt.RefreshToken
 
     default_error_messages = {"no_active_account": _("No active account found with the given credentials")}
 
@@ -261,19 +262,19 @@ class CookieTokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
             self.fail("invalid_token")
 
         try:
-            refresh = jwt_tokens.RefreshToken(raw_token)
+            refresh = jwt.RefreshToken(raw_token)
         except (jwt_exceptions.InvalidToken, jwt_exceptions.TokenError):
             self.fail("invalid_token")
 
+        user = principal_cache.get_user(refresh[jwt_api_settings.USER_ID_CLAIM])
+        if user is None or not user.is_active:
+            self.fail("invalid_token")
+
         if jwt_api_settings.ROTATE_REFRESH_TOKENS:
             if jwt_api_settings.BLACKLIST_AFTER_ROTATION:
-                try:
-                    refresh.blacklist()
-                except AttributeError:
-                    pass
+                refresh.blacklist()
 
-            user = get_user_model().objects.get(id=refresh[jwt_api_settings.USER_ID_CLAIM])
-            new_refresh = jwt_tokens.RefreshToken.for_user(user)
+            new_refresh = jwt.RefreshToken.for_user_id(user.pk)
 
             return {"access": str(new_refresh.access_token), "refresh": str(new_refresh)}
 
@@ -296,7 +297,7 @@ class LogoutSerializer(serializers.Serializer):
             self.fail("invalid_token")
 
         try:
-            refresh = jwt_tokens.RefreshToken(raw_token)
+            refresh = jwt.RefreshToken(raw_token)
         except (jwt_exceptions.InvalidToken, jwt_exceptions.TokenError):
             self.fail("invalid_token")
 
@@ -366,7 +367,7 @@ class ValidateOTPSerializer(serializers.Serializer):
         return attrs
 
     def create(self, validated_data):
-        refresh = RefreshToken.for_user(self.user)
+        refresh = jwt.RefreshToken.for_user(self.user)
         return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
 
@@ -11,6 +11,7 @@ from utils import hashid
 from ....models import User
 from ..constants import ExportUserArchiveRootPaths
 from ..protocols import UserDataExportable, UserFilesExportable
+from .streaming import ConcurrentS3Reader, S3MultipartUploadWriter
 
 
 class CrudDemoItemDataExport(UserDataExportable):
@@ -114,14 +115,59 @@ class ExportUserArchive:
         user_archive_obj_key = self._get_user_archive_obj_key()
 
         s3.upload_file(user_archive_filename, settings.AWS_EXPORTS_STORAGE_BUCKET_NAME, user_archive_obj_key)
-        export_url = s3.generate_presigned_url(
+        return self._get_export_url(s3, user_archive_obj_key)
+
+    @staticmethod
+    def _get_export_url(s3, user_archive_obj_key: str) -> str:
+        return s3.generate_presigned_url(
             "get_object",
             Params={"Bucket": settings.AWS_EXPORTS_STORAGE_BUCKET_NAME, "Key": user_archive_obj_key},
             ExpiresIn=settings.USER_DATA_EXPORT_EXPIRY_SECONDS,
         )
 
-        return export_url
-
     def _get_user_archive_obj_key(self) -> str:
         timestamp = datetime.datetime.now().strftime("%d-%m-%y_%H-%M-%S")
         return f"{ExportUserArchiveRootPaths.S3_ROOT.value}/{self._user_id}_{timestamp}.zip"
+
+
+class StreamingExportUserArchive(ExportUserArchive):
+    """
+    Builds the same archive as ``ExportUserArchive`` without holding files in memory or writing them to disk.
+
+    User files are downloaded concurrently by a bounded thread pool and piped chunk by chunk through the zip writer
+    straight into a multipart upload to the exports bucket, so memory usage doesn't depend on the size of the files.
+    """
+
+    def run(self) -> str:
+        user_data = self._export_user_data()
+        user_files = self._export_user_files()
+
+        s3 = boto3.client("s3", endpoint_url=settings.AWS_S3_ENDPOINT_URL)
+        user_archive_obj_key = self._get_user_archive_obj_key()
+        self._stream_user_archive_to_s3(s3, user_archive_obj_key, user_data, user_files)
+
+        return self._get_export_url(s3, user_archive_obj_key)
+
+    def _stream_user_archive_to_s3(self, s3, user_archive_obj_key: str, user_data: dict, user_files: list[str]):
+        reader = ConcurrentS3Reader(
+            s3,
+            settings.AWS_STORAGE_BUCKET_NAME,
+            workers=settings.USER_DATA_EXPORT_DOWNLOAD_WORKERS,
+            chunk_size=settings.USER_DATA_EXPORT_CHUNK_SIZE,
+            max_chunks=settings.USER_DATA_EXPORT_PREFETCH_CHUNKS,
+        )
+        writer = S3MultipartUploadWriter(
+            s3,
+            settings.AWS_EXPORTS_STORAGE_BUCKET_NAME,
+            user_archive_obj_key,
+            part_size=settings.USER_DATA_EXPORT_PART_SIZE,
+        )
+
+        with writer, zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(f"{self._user_id}/{self._user_id}.json", json.dumps(user_data).encode("utf-8"))
+
+            for file_path, chunks in reader.iter_objects([str(file_path) for file_path in user_files]):
+                # The size of a streamed file is not known upfront, zip64 allows entries larger than 4 GiB
+                with zf.open(f"{self._user_id}/{file_path}", "w", force_zip64=True) as entry:
+                    for chunk in chunks:
+                        entry.write(chunk)
@@ -0,0 +1,142 @@
+import io
+import queue
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
+
+
+class S3MultipartUploadWriter(io.RawIOBase):
+    """
+    Write-only file object which uploads everything written to it to S3 as a multipart upload.
+
+    Only the part being filled is kept in memory. The upload is finished by ``complete()``; closing the writer without
+    completing it aborts the upload, so an interrupted export doesn't leave a partial object or orphaned parts behind.
+    """
+
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, client, bucket: str, key: str, part_size: int):
+        super().__init__()
+        self._client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        size = memoryview(data).nbytes
+        self._buffer += data
+        self.bytes_written += size
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return size
+
+    def complete(self):
+        # S3 requires at least one part, even for an empty object
+        if self._buffer or not self._parts:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+
+        self._client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, MultipartUpload={"Parts": self._parts}
+        )
+        self._upload_id = None
+        self.close()
+
+    def close(self):
+        if self._upload_id is not None:
+            upload_id, self._upload_id = self._upload_id, None
+            self._buffer.clear()
+            self._client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=upload_id)
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.complete()
+        else:
+            self.close()
+
+    def _upload_part(self, body: bytes):
+        part_number = len(self._parts) + 1
+        response = self._client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=part_number, Body=body
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+
+class ConcurrentS3Reader:
+    """
+    Downloads S3 objects concurrently in a bounded thread pool and yields their content in the requested order.
+
+    Every download streams into its own queue of at most ``max_chunks`` chunks, so no more than
+    ``workers * max_chunks * chunk_size`` bytes are held in memory, whatever the size of the objects. Downloads are
+    started in the requested order, so the object being consumed is always one of the objects being downloaded.
+    """
+
+    def __init__(self, client, bucket: str, workers: int, chunk_size: int, max_chunks: int):
+        self._client = client
+        self.bucket = bucket
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+
+    def iter_objects(self, keys: list[str]) -> Iterator[tuple[str, Iterator[bytes]]]:
+        """
+        Yields ``(key, chunks)`` pairs. Chunks that are not consumed before the next pair is requested are skipped.
+        """
+        cancelled = threading.Event()
+        queues = [queue.Queue(maxsize=self.max_chunks) for _ in keys]
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="s3-reader")
+        try:
+            for key, chunks in zip(keys, queues, strict=True):
+                executor.submit(self._download, key, chunks, cancelled)
+
+            for key, chunks in zip(keys, queues, strict=True):
+                object_chunks = self._iter_chunks(chunks)
+                yield key, object_chunks
+                for _ in object_chunks:
+                    pass
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _download(self, key: str, chunks: queue.Queue, cancelled: threading.Event):
+        if cancelled.is_set():
+            return
+
+        try:
+            body = self._client.get_object(Bucket=self.bucket, Key=key)["Body"]
+            with body:
+                for chunk in body.iter_chunks(self.chunk_size):
+                    if not self._put(chunks, chunk, cancelled):
+                        return
+        except Exception as e:
+            self._put(chunks, e, cancelled)
+        else:
+            self._put(chunks, _END, cancelled)
+
+    @staticmethod
+    def _put(chunks: queue.Queue, item, cancelled: threading.Event) -> bool:
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _iter_chunks(chunks: queue.Queue) -> Iterator[bytes]:
+        while (item := chunks.get()) is not _END:
+            if isinstance(item, Exception):
+                raise item
+            yield item
@@ -10,18 +10,18 @@ class ExportedUserData(TypedDict):
     export_url: str
 
 
-class _ProcessUserDataExport:
-    def __call__(self, user_ids: list[str], admin_email: str):
-        entries = []
+class _ExportUserData:
+    """
+    Exports the archive of a single user and sends its link to the user. Returns ``None`` for an unknown user.
+    """
 
-        for user_id in user_ids:
-            if user := self._get_user(user_id):
-                entry = self._get_user_export_entry(user)
-                emails.UserDataExportEmail(to=user.email, data={"data": entry}).send()
-                entries.append(entry)
+    def __call__(self, user_id: str) -> ExportedUserData | None:
+        if user := self._get_user(user_id):
+            entry = self._get_user_export_entry(user)
+            emails.UserDataExportEmail(to=user.email, data={"data": entry}).send()
+            return entry
 
-        if entries:
-            emails.AdminDataExportEmail(to=admin_email, data={"data": entries}).send()
+        return None
 
     @staticmethod
     def _get_user(user_id: str) -> User | None:
@@ -33,8 +33,13 @@ class _ProcessUserDataExport:
 
     @staticmethod
     def _get_user_export_entry(user: User) -> ExportedUserData:
-        export_user_archive = export.ExportUserArchive(user)
+        export_user_archive = export.StreamingExportUserArchive(user)
         return {"email": user.email, "export_url": export_user_archive.run()}
 
 
-process_user_data_export = _ProcessUserDataExport()
+def send_admin_data_export_email(entries: list[ExportedUserData | None], admin_email: str):
+    if entries := [entry for entry in entries if entry]:
+        emails.AdminDataExportEmail(to=admin_email, data={"data": entries}).send()
+
+
+export_user_data = _ExportUserData()
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.multitenancy.models import TenantMembership
+
+from .cache import principal_cache
+
+User = get_user_model()
+
+
+def bump_principal_versions(user_pks):
+    user_pks = [user_pk for user_pk in user_pks if user_pk is not None]
+    if not user_pks:
+        return
+
+    def bump():
+        for user_pk in user_pks:
+            principal_cache.bump_version(user_pk)
+
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    bump_principal_versions([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=TenantMembership)
+def invalidate_tenant_membership_principal(sender, instance: TenantMembership, **kwargs):
+    bump_principal_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_principals(sender, instance: Group, **kwargs):
+    bump_principal_versions(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=TenantMembership)
+def invalidate_m2m_principals(sender, instance, action, pk_set, **kwargs):
+    """
+    Handles ``user.groups``, ``group.user_set``, ``tenant.members`` and ``user.tenants`` changes. The user is the
+    instance on one side of a relation and ``pk_set`` on the other one; ``pk_set`` is empty when the relation is
+    cleared, so affected users are collected before that.
+    """
+    if isinstance(instance, User):
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_principal_versions([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        bump_principal_versions(pk_set)
+    elif action == "pre_clear":
+        related_name = "user_set" if isinstance(instance, Group) else "members"
+        bump_principal_versions(getattr(instance, related_name).values_list("pk", flat=True))
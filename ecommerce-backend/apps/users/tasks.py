@@ -1,6 +1,9 @@
 import importlib
+import logging
 
-from celery import shared_task
+from botocore.exceptions import BotoCoreError, ClientError
+from celery import chord, shared_task
+from celery.utils.time import get_exponential_backoff_interval
 from django.conf import settings
 
 from .services.export.services import user as user_services
@@ -8,6 +11,8 @@ from .services.export.services import user as user_services
 module_name, package = settings.LAMBDA_TASKS_BASE_HANDLER.rsplit(".", maxsplit=1)
 LambdaTask = getattr(importlib.import_module(module_name), package)
 
+logger = logging.getLogger(__name__)
+
 
 class ExportUserData(LambdaTask):
     def __init__(self):
@@ -16,4 +21,37 @@ class ExportUserData(LambdaTask):
 
 @shared_task(bind=True)
 def export_user_data(self, user_ids, admin_email):
-    user_services.process_user_data_export(user_ids=user_ids, admin_email=admin_email)
+    """
+    Exports every user in a separate subtask, so archives are built in parallel by all workers. The admin email is
+    sent by the chord callback once all of them are finished.
+    """
+    if not user_ids:
+        return
+
+    chord(export_user_archive.s(user_id) for user_id in user_ids)(send_admin_data_export_email.s(admin_email))
+
+
+@shared_task(bind=True, max_retries=3)
+def export_user_archive(self, user_id):
+    """
+    Never fails, otherwise the chord callback wouldn't run and the admin wouldn't get the archives of the other users.
+    S3 errors are retried with an exponential backoff; a user whose archive still can't be exported is logged and
+    skipped like an unknown one.
+    """
+    try:
+        return user_services.export_user_data(user_id)
+    except (BotoCoreError, ClientError) as e:
+        if self.request.retries < self.max_retries:
+            countdown = get_exponential_backoff_interval(
+                factor=1, retries=self.request.retries, maximum=600, full_jitter=True
+            )
+            raise self.retry(exc=e, countdown=countdown)
+        logger.exception(f"Exporting user {user_id} failed after {self.request.retries} retries: {e}")
+    except Exception as e:
+        logger.exception(f"Exporting user {user_id} failed: {e}")
+    return None
+
+
+@shared_task
+def send_admin_data_export_email(entries, admin_email):
+    user_services.send_admin_data_export_email(entries, admin_email)
@@ -1,6 +1,7 @@
 import pytest
 import pytest_factoryboy
 
+from ..token_store import get_token_store
 from . import factories
 
 pytest_factoryboy.register(factories.GroupFactory)
@@ -23,3 +24,13 @@ def totp_mock(mocker):
         mocker.patch("pyotp.TOTP", return_value=totp_mock)
 
     return _factory
+
+
+@pytest.fixture
+def token_store():
+    """
+    The token store, cleared of the tokens of earlier tests. Requested by the tests of token issuing and revocation.
+    """
+    store = get_token_store()
+    store.clear()
+    return store
@@ -0,0 +1,197 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.multitenancy.cache import tenant_context_cache
+from apps.multitenancy.constants import TenantUserRole
+from apps.multitenancy.middleware import TenantMiddleware
+from common.acl import policies
+
+from ..cache import principal_cache
+from ..jwt import RefreshToken
+from ..services.users import get_role_names
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    principal_cache.clear()
+    tenant_context_cache.clear()
+    yield
+    principal_cache.clear()
+    tenant_context_cache.clear()
+
+
+class RolesView(APIView):
+    permission_classes = (policies.UserFullAccess,)
+
+    def get(self, request):
+        return Response(
+            {
+                "roles": get_role_names(request.user),
+                "tenant_role": getattr(request, "user_role", None),
+                "email": request.user.email,
+            }
+        )
+
+
+def get_access_token_cookie(user) -> str:
+    return f"{settings.ACCESS_TOKEN_COOKIE}={RefreshToken.for_user(user).access_token}"
+
+
+class TestPrincipalCache:
+    def test_snapshot_is_fetched_from_database_once(self, user, django_assert_num_queries):
+        # user, groups, tenant memberships
+        with django_assert_num_queries(3):
+            principal_cache.get(str(user.pk))
+
+        with django_assert_num_queries(0):
+            snapshot = principal_cache.get(str(user.pk))
+
+        assert snapshot.user_fields["email"] == user.email
+        assert "password" not in snapshot.user_fields
+        assert snapshot.group_names == ["user"]
+        assert principal_cache.stats["misses"] == 1
+        assert principal_cache.stats["local_hits"] == 1
+
+    def test_shared_cache_is_used_after_local_cache_is_dropped(self, user, django_assert_num_queries):
+        principal_cache.get(str(user.pk))
+        principal_cache.local.clear()
+
+        with django_assert_num_queries(0):
+            assert principal_cache.get(str(user.pk)).user_fields["id"] == user.pk
+
+        assert principal_cache.stats["shared_hits"] == 1
+
+    def test_user_is_built_with_prefetched_groups(self, user, django_assert_num_queries):
+        principal_cache.get(str(user.pk))
+
+        with django_assert_num_queries(0):
+            cached_user = principal_cache.get_user(str(user.pk))
+            assert cached_user == user
+            assert cached_user.email == user.email
+            assert get_role_names(cached_user) == ["user"]
+
+        # Excluded fields are deferred
+        with django_assert_num_queries(1):
+            assert cached_user.password == user.password
+
+    def test_connection_principal_is_built_from_snapshot(self, user, tenant_membership_factory):
+        membership = tenant_membership_factory(user=user)
+        principal_cache.get(str(user.pk))
+
+        principal = async_to_sync(principal_cache.aget_connection_principal)(str(user.pk))
+
+        assert principal.pk == principal.id == user.pk
+        assert str(membership.tenant_id) in principal.tenant_ids
+        assert principal.is_authenticated
+        assert principal.is_active
+        assert not principal.is_superuser
+        assert not hasattr(principal, "__dict__")
+
+    def test_missing_user_is_negatively_cached(self, django_assert_num_queries):
+        missing_user_id = str(principal_cache.normalize_user_id(10**9))
+        assert principal_cache.get_user(missing_user_id) is None
+
+        with django_assert_num_queries(0):
+            assert principal_cache.get_user(missing_user_id) is None
+
+    def test_invalid_user_id_does_not_query_database(self, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert principal_cache.get("not-a-hashid") is None
+
+    def test_user_change_bumps_version(self, user, django_capture_on_commit_callbacks):
+        version = principal_cache.get(str(user.pk)).version
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+
+        snapshot = principal_cache.get(str(user.pk))
+        assert snapshot.version > version
+        assert not snapshot.user_fields["is_active"]
+
+    def test_group_membership_change_bumps_version(self, user, group_factory, django_capture_on_commit_callbacks):
+        group = group_factory(name="admin")
+        principal_cache.get(str(user.pk))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            group.user_set.add(user)
+
+        assert sorted(principal_cache.get(str(user.pk)).group_names) == ["admin", "user"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.groups.clear()
+
+        assert principal_cache.get(str(user.pk)).group_names == []
+
+    def test_tenant_membership_change_bumps_version(
+        self, user, tenant, tenant_membership_factory, django_capture_on_commit_callbacks
+    ):
+        principal_cache.get(str(user.pk))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tenant_membership_factory(user=user, tenant=tenant, role=TenantUserRole.ADMIN)
+
+        assert principal_cache.get(str(user.pk)).tenant_roles[str(tenant.pk)] == TenantUserRole.ADMIN
+
+    def test_snapshot_of_older_version_is_not_used(self, user, django_assert_num_queries):
+        principal_cache.get(str(user.pk))
+        principal_cache.bump_version(user.pk)
+
+        with django_assert_num_queries(3):
+            principal_cache.get(str(user.pk))
+
+        assert principal_cache.stats["misses"] == 2
+        assert principal_cache.stats["invalidations"] == 1
+
+
+class TestJSONWebTokenAuthentication:
+    def test_authenticated_request_does_not_query_database(
+        self, api_request_factory, user, tenant, tenant_membership_factory, django_assert_num_queries
+    ):
+        tenant_membership_factory(user=user, tenant=tenant, role=TenantUserRole.MEMBER)
+        view = TenantMiddleware(RolesView.as_view())
+        cookie = get_access_token_cookie(user)
+        view(api_request_factory.get("/", HTTP_COOKIE=cookie, HTTP_X_TENANT_ID=str(tenant.pk)))
+
+        with django_assert_num_queries(0):
+            response = view(api_request_factory.get("/", HTTP_COOKIE=cookie, HTTP_X_TENANT_ID=str(tenant.pk)))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"roles": ["user"], "tenant_role": TenantUserRole.MEMBER, "email": user.email}
+
+    def test_authorization_header_uses_cached_principal(self, api_request_factory, user, django_assert_num_queries):
+        access_token = RefreshToken.for_user(user).access_token
+        RolesView.as_view()(api_request_factory.get("/", HTTP_AUTHORIZATION=f"Bearer {access_token}"))
+
+        with django_assert_num_queries(0):
+            response = RolesView.as_view()(api_request_factory.get("/", HTTP_AUTHORIZATION=f"Bearer {access_token}"))
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_deactivated_user_is_rejected(self, api_request_factory, user, django_capture_on_commit_callbacks):
+        cookie = get_access_token_cookie(user)
+        RolesView.as_view()(api_request_factory.get("/", HTTP_COOKIE=cookie))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+
+        response = RolesView.as_view()(api_request_factory.get("/", HTTP_COOKIE=cookie))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_user_without_group_is_denied(self, api_request_factory, user, django_capture_on_commit_callbacks):
+        cookie = get_access_token_cookie(user)
+        RolesView.as_view()(api_request_factory.get("/", HTTP_COOKIE=cookie))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.groups.clear()
+
+        response = RolesView.as_view()(api_request_factory.get("/", HTTP_COOKIE=cookie))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -7,14 +7,19 @@ from unittest.mock import call
 
 import boto3
 import pytest
+from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 from moto import mock_s3
 
+from apps.notifications.models import OutboxMessage
 from apps.users.exceptions import OTPVerificationFailure
 from apps.users.models import User
 from utils import hashid
 
-from ..services.export.services.export import ExportUserArchive
+from .. import tasks
+from ..services.export.services import user as user_services
+from ..services.export.services.export import ExportUserArchive, StreamingExportUserArchive
+from ..services.export.services.streaming import ConcurrentS3Reader, S3MultipartUploadWriter
 from ..services.otp import validate_otp
 
 pytestmark = pytest.mark.django_db
@@ -121,3 +126,173 @@ class TestExportUserArchive:
 
         assert settings.AWS_EXPORTS_STORAGE_BUCKET_NAME in export_url
         assert expected_obj_key in export_url
+
+
+@pytest.fixture
+def s3():
+    """
+    Source and exports buckets. ``mock_s3`` is already started by the autouse ``storage`` fixture.
+    """
+    client = boto3.client("s3", region_name="us-east-1", endpoint_url=settings.AWS_S3_ENDPOINT_URL)
+    client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+    client.create_bucket(Bucket=settings.AWS_EXPORTS_STORAGE_BUCKET_NAME)
+    return client
+
+
+def get_object_content(s3, bucket: str, key: str) -> bytes:
+    return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+
+class TestS3MultipartUploadWriter:
+    def test_content_is_uploaded_in_parts(self, s3):
+        content = os.urandom(12 * 1024 * 1024)
+        bucket = settings.AWS_EXPORTS_STORAGE_BUCKET_NAME
+
+        with S3MultipartUploadWriter(s3, bucket, "archive.zip", part_size=0) as writer:
+            for offset in range(0, len(content), 1024 * 1024):
+                writer.write(content[offset : offset + 1024 * 1024])
+
+        assert len(writer._parts) == 3
+        assert writer.bytes_written == len(content)
+        assert get_object_content(s3, bucket, "archive.zip") == content
+
+    def test_empty_object_is_uploaded(self, s3):
+        bucket = settings.AWS_EXPORTS_STORAGE_BUCKET_NAME
+
+        with S3MultipartUploadWriter(s3, bucket, "empty.zip", part_size=0):
+            pass
+
+        assert get_object_content(s3, bucket, "empty.zip") == b""
+
+    def test_upload_is_aborted_on_error(self, s3):
+        bucket = settings.AWS_EXPORTS_STORAGE_BUCKET_NAME
+
+        with pytest.raises(RuntimeError), S3MultipartUploadWriter(s3, bucket, "archive.zip", part_size=0) as writer:
+            writer.write(os.urandom(6 * 1024 * 1024))
+            raise RuntimeError
+
+        assert "Contents" not in s3.list_objects_v2(Bucket=bucket)
+        assert "Uploads" not in s3.list_multipart_uploads(Bucket=bucket)
+
+
+class TestConcurrentS3Reader:
+    @pytest.fixture
+    def objects(self, s3) -> dict[str, bytes]:
+        objects = {f"documents/{index}.bin": os.urandom(100_000 + index) for index in range(8)}
+        for key, content in objects.items():
+            s3.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, Body=content)
+        return objects
+
+    @pytest.fixture
+    def reader(self, s3) -> ConcurrentS3Reader:
+        return ConcurrentS3Reader(s3, settings.AWS_STORAGE_BUCKET_NAME, workers=3, chunk_size=16 * 1024, max_chunks=2)
+
+    def test_objects_are_yielded_in_order(self, reader, objects):
+        downloaded = [(key, b"".join(chunks)) for key, chunks in reader.iter_objects(list(objects))]
+
+        assert downloaded == list(objects.items())
+
+    def test_unconsumed_objects_are_skipped(self, reader, objects):
+        keys = [key for key, _ in reader.iter_objects(list(objects))]
+
+        assert keys == list(objects)
+
+    def test_download_error_is_raised_to_consumer(self, reader, objects):
+        keys = ["documents/missing.bin", *objects]
+
+        with pytest.raises(ClientError):
+            for _, chunks in reader.iter_objects(keys):
+                b"".join(chunks)
+
+
+class TestStreamingExportUserArchive:
+    @pytest.fixture
+    def user_files(self, s3) -> dict[str, bytes]:
+        user_files = {"documents/report.pdf": os.urandom(6 * 1024 * 1024), "documents/notes.txt": b"notes"}
+        for key, content in user_files.items():
+            s3.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, Body=content)
+        return user_files
+
+    @pytest.fixture
+    def export_user_archive(self, user, user_files, settings, mocker) -> StreamingExportUserArchive:
+        settings.USER_DATA_EXPORT_CHUNK_SIZE = 256 * 1024
+        settings.USER_DATA_EXPORT_PART_SIZE = 0
+        mocker.patch.object(StreamingExportUserArchive, "_export_user_data", return_value={"user": "data"})
+        mocker.patch.object(StreamingExportUserArchive, "_export_user_files", return_value=list(user_files))
+        return StreamingExportUserArchive(user=user)
+
+    @pytest.mark.freeze_time
+    def test_archive_is_streamed_to_s3(self, s3, user, user_files, export_user_archive):
+        hashed_user_id = hashid.encode(user.id)
+        timestamp = datetime.datetime.now().strftime("%d-%m-%y_%H-%M-%S")
+        expected_obj_key = f"exports/{hashed_user_id}_{timestamp}.zip"
+
+        export_url = export_user_archive.run()
+
+        assert expected_obj_key in export_url
+        archive = get_object_content(s3, settings.AWS_EXPORTS_STORAGE_BUCKET_NAME, expected_obj_key)
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            assert zf.namelist() == [
+                f"{hashed_user_id}/{hashed_user_id}.json",
+                *(f"{hashed_user_id}/{key}" for key in user_files),
+            ]
+            assert zf.read(f"{hashed_user_id}/{hashed_user_id}.json") == json.dumps({"user": "data"}).encode()
+            for key, content in user_files.items():
+                assert zf.read(f"{hashed_user_id}/{key}") == content
+
+    def test_no_local_file_is_written(self, user, export_user_archive, mocker):
+        open_mock = mocker.patch("builtins.open")
+
+        export_user_archive.run()
+
+        open_mock.assert_not_called()
+        assert not os.path.exists(f"/tmp/{hashid.encode(user.id)}.zip")
+
+
+class TestExportUserDataTask:
+    def test_users_are_exported_in_parallel_subtasks(self, mocker):
+        chord = mocker.patch("apps.users.tasks.chord")
+
+        tasks.export_user_data(["user-1", "user-2"], "admin@example.com")
+
+        header, *_ = chord.call_args.args
+        assert [signature.args for signature in header] == [("user-1",), ("user-2",)]
+        chord.return_value.assert_called_once_with(tasks.send_admin_data_export_email.s("admin@example.com"))
+
+    def test_user_archive_subtask_returns_export_entry(self, user, mocker):
+        mocker.patch("apps.users.services.export.services.user._ExportUserData._get_user", return_value=user)
+        mocker.patch.object(StreamingExportUserArchive, "run", return_value="https://exports/archive.zip")
+        entry = tasks.export_user_archive(str(user.id))
+
+        assert entry == {"email": user.email, "export_url": "https://exports/archive.zip"}
+        assert OutboxMessage.objects.get().payload["to"] == user.email
+
+    def test_unknown_user_is_skipped(self):
+        assert tasks.export_user_archive(hashid.encode(10**9)) is None
+
+    def test_failed_user_is_skipped(self, mocker):
+        mocker.patch.object(user_services, "export_user_data", side_effect=ValueError("broken archive"))
+
+        assert tasks.export_user_archive("user-1") is None
+
+    def test_user_is_skipped_once_retries_are_exhausted(self, mocker):
+        mocker.patch.object(user_services, "export_user_data", side_effect=BotoCoreError())
+        mocker.patch.object(tasks.export_user_archive, "max_retries", 0)
+
+        assert tasks.export_user_archive("user-1") is None
+
+    def test_admin_email_aggregates_entries(self):
+        entry = {"email": "user@example.com", "export_url": "https://exports/archive.zip"}
+
+        tasks.send_admin_data_export_email([entry, None], "admin@example.com")
+
+        assert OutboxMessage.objects.get().payload == {
+            "to": "admin@example.com",
+            "email_type": "USER_EXPORT_ADMIN",
+            "email_data": {"data": [entry]},
+        }
+
+    def test_admin_email_is_not_sent_without_entries(self):
+        tasks.send_admin_data_export_email([None], "admin@example.com")
+
+        assert not OutboxMessage.objects.exists()
@@ -0,0 +1,183 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleJWTRefreshToken
+
+from .. import jwt
+from ..cache import principal_cache
+from ..token_store import DatabaseTokenStore, RedisTokenStore
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def database_token_store(mocker):
+    store = DatabaseTokenStore()
+    mocker.patch("apps.users.jwt.get_token_store", return_value=store)
+    return store
+
+
+class TestRedisTokenStore:
+    def test_issued_token_is_not_revoked(self, user, token_store, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            refresh = jwt.RefreshToken.for_user(user)
+
+        assert not token_store.is_revoked(refresh)
+        assert jwt.RefreshToken(str(refresh))
+
+    def test_revoked_token_is_rejected(self, user, token_store):
+        refresh = jwt.RefreshToken.for_user(user)
+
+        refresh.blacklist()
+
+        assert token_store.is_revoked(refresh)
+        with pytest.raises(TokenError):
+            jwt.RefreshToken(str(refresh))
+
+    def test_revocation_expires_with_token(self, user, token_store):
+        refresh = jwt.RefreshToken.for_user(user)
+
+        refresh.blacklist()
+
+        ttl = token_store.redis.ttl(token_store.revoked_key(refresh["jti"]))
+        assert 0 < ttl <= refresh.lifetime.total_seconds() + 1
+
+    def test_flush_writes_tokens_in_batches(self, user, token_store, settings, django_assert_num_queries):
+        settings.JWT_TOKEN_STORE_BATCH_SIZE = 100
+        tokens = [jwt.RefreshToken.for_user(user) for _ in range(50)]
+        for refresh in tokens[:10]:
+            refresh.blacklist()
+
+        # users, savepoint, outstanding tokens, outstanding token ids, blacklisted tokens, release savepoint
+        with django_assert_num_queries(6):
+            assert token_store.flush() == 60
+
+        assert OutstandingToken.objects.filter(user=user).count() == 50
+        assert BlacklistedToken.objects.filter(token__user=user).count() == 10
+        assert token_store.flush() == 0
+
+    def test_flush_keeps_tokens_of_deleted_users(self, token_store):
+        deleted_user_id = get_user_model()._meta.pk.to_python(10**9)
+        refresh = jwt.RefreshToken.for_user_id(deleted_user_id)
+
+        token_store.flush()
+
+        assert OutstandingToken.objects.get(jti=refresh["jti"]).user is None
+
+    def test_failed_flush_keeps_records(self, user, token_store, mocker):
+        jwt.RefreshToken.for_user(user)
+        mocker.patch.object(RedisTokenStore, "_write", side_effect=RuntimeError)
+
+        with pytest.raises(RuntimeError):
+            token_store.flush()
+
+        assert token_store.redis.llen(token_store.processing_key) == 1
+        mocker.stopall()
+        assert token_store.flush() == 1
+        assert OutstandingToken.objects.filter(user=user).count() == 1
+        assert token_store.redis.llen(token_store.processing_key) == 0
+
+    def test_flush_is_skipped_while_another_one_runs(self, user, token_store):
+        jwt.RefreshToken.for_user(user)
+        token_store.redis.set(token_store.flush_lock_key, 1)
+
+        assert token_store.flush() == 0
+        assert token_store.redis.llen(token_store.pending_key) == 1
+
+    def test_token_issued_before_store_is_checked_in_database(self, user, token_store):
+        jwt.RefreshToken.for_user(user)
+        legacy_token = SimpleJWTRefreshToken.for_user(user)
+        legacy_token["iat"] = float(token_store.redis.get(token_store.since_key)) - 1
+        legacy_token.blacklist()
+
+        assert token_store.is_revoked(legacy_token)
+        with pytest.raises(TokenError):
+            jwt.RefreshToken(str(legacy_token))
+
+    def test_token_issued_by_store_is_not_checked_in_database(self, user, token_store, django_assert_num_queries):
+        refresh = jwt.RefreshToken.for_user(user)
+
+        with django_assert_num_queries(0):
+            assert not token_store.is_revoked(refresh)
+
+    def test_revoke_user_tokens(self, user, token_store, django_assert_max_num_queries):
+        tokens = [jwt.RefreshToken.for_user(user) for _ in range(200)]
+        legacy_token = SimpleJWTRefreshToken.for_user(user)
+
+        with django_assert_max_num_queries(1):
+            jwt.blacklist_user_tokens(user)
+
+        assert all(token_store.is_revoked(refresh) for refresh in tokens)
+        assert token_store.is_revoked(legacy_token)
+        token_store.flush()
+        assert BlacklistedToken.objects.filter(token__user=user).count() == 201
+
+    def test_revoke_user_tokens_keeps_other_users_tokens(self, user_factory, token_store):
+        user, other_user = user_factory.create_batch(2)
+        other_refresh = jwt.RefreshToken.for_user(other_user)
+        jwt.RefreshToken.for_user(user)
+
+        jwt.blacklist_user_tokens(user)
+
+        assert not token_store.is_revoked(other_refresh)
+
+
+class TestDatabaseTokenStore:
+    def test_issue_and_revoke(self, user, database_token_store):
+        refresh = jwt.RefreshToken.for_user(user)
+        assert OutstandingToken.objects.filter(jti=refresh["jti"], user=user).exists()
+
+        refresh.blacklist()
+
+        assert database_token_store.is_revoked(refresh)
+
+    def test_revoke_user_tokens(self, user, database_token_store, django_assert_num_queries):
+        tokens = [jwt.RefreshToken.for_user(user) for _ in range(20)]
+        tokens[0].blacklist()
+
+        with django_assert_num_queries(2):
+            assert database_token_store.revoke_user_tokens(user.pk) == 19
+
+        assert all(database_token_store.is_revoked(refresh) for refresh in tokens)
+
+
+class TestTokenRefresh:
+    def test_rotation_does_not_query_database(self, api_client, user, token_store, django_assert_num_queries):
+        refresh = jwt.RefreshToken.for_user(user)
+        principal_cache.get(user.pk)
+
+        with django_assert_num_queries(0):
+            response = api_client.post(reverse("jwt_token_refresh"), data={"refresh": str(refresh)})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert token_store.is_revoked(refresh)
+        new_refresh = jwt.RefreshToken(response.json()["refresh"])
+        assert new_refresh["user_id"] == str(user.pk)
+
+    def test_rotated_token_cannot_be_reused(self, api_client, user):
+        refresh = jwt.RefreshToken.for_user(user)
+        api_client.post(reverse("jwt_token_refresh"), data={"refresh": str(refresh)})
+        api_client.cookies.clear()
+
+        response = api_client.post(reverse("jwt_token_refresh"), data={"refresh": str(refresh)})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_token_of_deleted_user_is_rejected(self, api_client):
+        deleted_user_id = get_user_model()._meta.pk.to_python(10**9)
+        refresh = jwt.RefreshToken.for_user_id(deleted_user_id)
+
+        response = api_client.post(reverse("jwt_token_refresh"), data={"refresh": str(refresh)})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_token_of_inactive_user_is_rejected(self, api_client, user_factory):
+        user = user_factory(is_active=False)
+        refresh = jwt.RefreshToken.for_user(user)
+
+        response = api_client.post(reverse("jwt_token_refresh"), data={"refresh": str(refresh)})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -42,7 +42,7 @@ class TestTokenRefresh:
         assert response.cookies[settings.ACCESS_TOKEN_COOKIE].value == ""
         assert response.cookies[settings.REFRESH_TOKEN_COOKIE].value == ""
 
-    def test_refresh_cookie_auth(self, api_client, user: models.User):
+    def test_refresh_cookie_auth(self, api_client, user: models.User, token_store):
         refresh = RefreshToken.for_user(user)
         api_client.cookies = SimpleCookie(
             {
@@ -58,9 +58,10 @@ class TestTokenRefresh:
         new_refresh_token_raw = response.cookies[settings.REFRESH_TOKEN_COOKIE].value
         assert AccessToken(new_access_token_raw), new_access_token_raw
         assert RefreshToken(new_refresh_token_raw), new_refresh_token_raw
+        token_store.flush()
         assert BlacklistedToken.objects.filter(token__jti=refresh["jti"]).exists()
 
-    def test_refresh_sent_in_payload(self, api_client, user: models.User):
+    def test_refresh_sent_in_payload(self, api_client, user: models.User, token_store):
         refresh = RefreshToken.for_user(user)
 
         response = api_client.post(reverse("jwt_token_refresh"), data={"refresh": str(refresh)})
@@ -70,6 +71,7 @@ class TestTokenRefresh:
         new_refresh_token_raw = response.json().get("refresh")
         assert AccessToken(new_access_token_raw), new_access_token_raw
         assert RefreshToken(new_refresh_token_raw), new_refresh_token_raw
+        token_store.flush()
         assert BlacklistedToken.objects.filter(token__jti=refresh["jti"]).exists()
 
 
@@ -95,7 +97,7 @@ class TestLogout:
         assert not response.cookies[settings.REFRESH_TOKEN_COOKIE].value
         assert not response.cookies[settings.REFRESH_TOKEN_LOGOUT_COOKIE].value
 
-    def test_blacklist_old_token_with_cookie_auth(self, api_client, user: models.User):
+    def test_blacklist_old_token_with_cookie_auth(self, api_client, user: models.User, token_store):
         refresh = RefreshToken.for_user(user)
         api_client.cookies = SimpleCookie(
             {
@@ -105,9 +107,11 @@ class TestLogout:
 
         api_client.post(reverse("logout"))
 
+        token_store.flush()
         assert BlacklistedToken.objects.filter(token__jti=refresh["jti"]).exists()
 
-    def test_blacklist_old_token_with_refresh_in_payload(self, api_client, user: models.User):
+    def test_blacklist_old_token_with_refresh_in_payload(self, api_client, user: models.User, token_store):
         refresh = RefreshToken.for_user(user)
         api_client.post(reverse("logout"), data={"refresh": str(refresh)})
+        token_store.flush()
         assert BlacklistedToken.objects.filter(token__jti=refresh["jti"]).exists()
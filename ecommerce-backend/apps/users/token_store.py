@@ -0,0 +1,272 @@
+import json
+import time
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class BaseTokenStore:
+    """
+    Keeps track of issued (outstanding) refresh tokens and of revoked (blacklisted) ones.
+    """
+
+    def add(self, token):
+        raise NotImplementedError("Subclasses of BaseTokenStore must provide an add() method")
+
+    def is_revoked(self, token) -> bool:
+        raise NotImplementedError("Subclasses of BaseTokenStore must provide an is_revoked() method")
+
+    def revoke(self, token):
+        raise NotImplementedError("Subclasses of BaseTokenStore must provide a revoke() method")
+
+    def revoke_user_tokens(self, user_id) -> int:
+        raise NotImplementedError("Subclasses of BaseTokenStore must provide a revoke_user_tokens() method")
+
+    def flush(self) -> int:
+        """
+        Writes pending changes to the database. Returns the number of written records.
+        """
+        return 0
+
+    def clear(self):
+        """
+        Drops pending changes.
+        """
+
+
+class DatabaseTokenStore(BaseTokenStore):
+    """
+    Stores tokens directly in the ``rest_framework_simplejwt.token_blacklist`` tables.
+    """
+
+    def add(self, token):
+        OutstandingToken.objects.create(
+            user_id=token[jwt_api_settings.USER_ID_CLAIM],
+            jti=token[jwt_api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token["exp"]),
+        )
+
+    def is_revoked(self, token) -> bool:
+        return BlacklistedToken.objects.filter(token__jti=token[jwt_api_settings.JTI_CLAIM]).exists()
+
+    def revoke(self, token):
+        outstanding_token, _ = OutstandingToken.objects.get_or_create(
+            jti=token[jwt_api_settings.JTI_CLAIM],
+            defaults={"token": str(token), "expires_at": datetime_from_epoch(token["exp"])},
+        )
+        BlacklistedToken.objects.get_or_create(token=outstanding_token)
+
+    def revoke_user_tokens(self, user_id) -> int:
+        outstanding_token_ids = OutstandingToken.objects.filter(
+            user_id=user_id, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True
+        ).values_list("id", flat=True)
+        blacklisted_tokens = BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=token_id) for token_id in outstanding_token_ids],
+            batch_size=settings.JWT_TOKEN_STORE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return len(blacklisted_tokens)
+
+
+class RedisTokenStore(BaseTokenStore):
+    """
+    Keeps token state in redis and writes it to the ``token_blacklist`` tables asynchronously.
+
+    - ``{prefix}:revoked:{jti}`` marks a revoked token and expires together with the token
+    - ``{prefix}:user:{user_id}`` is a sorted set of a user's outstanding jtis scored by expiry, used to revoke all of
+      them at once
+    - ``{prefix}:pending`` is a list of records not written to the database yet, see ``flush()``
+    - ``{prefix}:processing`` is a list of records claimed by a flush and not committed yet
+    - ``{prefix}:since`` is the "iat" of the first token issued by the store. Tokens issued before it were revoked in
+      the database only, so their state is read from there until they expire
+
+    Revocations must never be evicted, so the store has its own connection, ``JWT_TOKEN_STORE_REDIS_URL``.
+    """
+
+    KEY_PREFIX = "jwt"
+    FLUSH_LOCK_TIMEOUT = 300
+
+    def __init__(self):
+        self.redis = redis.Redis.from_url(settings.JWT_TOKEN_STORE_REDIS_URL)
+
+    @property
+    def pending_key(self) -> str:
+        return f"{self.KEY_PREFIX}:pending"
+
+    @property
+    def processing_key(self) -> str:
+        return f"{self.KEY_PREFIX}:processing"
+
+    @property
+    def flush_lock_key(self) -> str:
+        return f"{self.KEY_PREFIX}:flush-lock"
+
+    @property
+    def since_key(self) -> str:
+        return f"{self.KEY_PREFIX}:since"
+
+    def revoked_key(self, jti: str) -> str:
+        return f"{self.KEY_PREFIX}:revoked:{jti}"
+
+    def user_key(self, user_id) -> str:
+        return f"{self.KEY_PREFIX}:user:{user_id}"
+
+    def add(self, token):
+        jti, exp, user_id = token[jwt_api_settings.JTI_CLAIM], token["exp"], token[jwt_api_settings.USER_ID_CLAIM]
+        record = {
+            "op": "add",
+            "jti": jti,
+            "user_id": user_id,
+            "token": str(token),
+            "created_at": token.current_time.timestamp(),
+            "exp": exp,
+        }
+
+        user_key = self.user_key(user_id)
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.zremrangebyscore(user_key, "-inf", time.time())
+        pipeline.zadd(user_key, {jti: exp})
+        # All refresh tokens have the same lifetime, the newest one expires last
+        pipeline.expire(user_key, self._ttl(exp))
+        pipeline.rpush(self.pending_key, json.dumps(record))
+        pipeline.set(self.since_key, token["iat"], nx=True)
+        pipeline.execute()
+
+    def is_revoked(self, token) -> bool:
+        jti = token[jwt_api_settings.JTI_CLAIM]
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.exists(self.revoked_key(jti))
+        pipeline.get(self.since_key)
+        revoked, since = pipeline.execute()
+        if revoked:
+            return True
+
+        # Tokens issued before the store are blacklisted in the database, once they've expired the check isn't reached
+        if since is None or token.get("iat", 0) < float(since):
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        return False
+
+    def revoke(self, token):
+        jti, exp = token[jwt_api_settings.JTI_CLAIM], token["exp"]
+        record = {"op": "revoke", "jti": jti, "token": str(token), "exp": exp}
+
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.set(self.revoked_key(jti), 1, ex=self._ttl(exp))
+        pipeline.rpush(self.pending_key, json.dumps(record))
+        pipeline.execute()
+
+    def revoke_user_tokens(self, user_id) -> int:
+        now = time.time()
+        tokens = dict(self.redis.zrangebyscore(self.user_key(user_id), now, "+inf", withscores=True))
+        tokens = {jti.decode(): exp for jti, exp in tokens.items()}
+
+        # Tokens issued before their state was kept in redis are only known to the database
+        tokens.update(
+            (jti, expires_at.timestamp())
+            for jti, expires_at in OutstandingToken.objects.filter(
+                user_id=user_id, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True
+            ).values_list("jti", "expires_at")
+        )
+        if not tokens:
+            return 0
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for jti, exp in tokens.items():
+            pipeline.set(self.revoked_key(jti), 1, ex=self._ttl(exp))
+        pipeline.rpush(
+            self.pending_key, *(json.dumps({"op": "revoke", "jti": jti, "exp": exp}) for jti, exp in tokens.items())
+        )
+        pipeline.delete(self.user_key(user_id))
+        pipeline.execute()
+        return len(tokens)
+
+    def clear(self):
+        self.redis.delete(self.pending_key, self.processing_key, self.flush_lock_key)
+
+    @staticmethod
+    def _ttl(exp: float) -> int:
+        return max(int(exp - time.time()) + 1, 1)
+
+    def flush(self) -> int:
+        """
+        Writes pending records to the database in batches of ``JWT_TOKEN_STORE_BATCH_SIZE``: one insert for outstanding
+        tokens and one for blacklisted tokens per batch.
+
+        A batch is moved to the processing list and dropped from it only once its transaction has committed, so the
+        records of a flush that fails or crashes are written by the next one. A single flush runs at a time.
+        """
+        if not self.redis.set(self.flush_lock_key, 1, nx=True, ex=self.FLUSH_LOCK_TIMEOUT):
+            return 0
+
+        written = 0
+        try:
+            while raw_records := self._claim_batch():
+                self._write([json.loads(raw_record) for raw_record in raw_records])
+                self.redis.delete(self.processing_key)
+                written += len(raw_records)
+            return written
+        finally:
+            self.redis.delete(self.flush_lock_key)
+
+    def _claim_batch(self) -> list[bytes]:
+        # Records left by a flush that didn't commit are written first, writes are idempotent
+        if raw_records := self.redis.lrange(self.processing_key, 0, -1):
+            return raw_records
+
+        pipeline = self.redis.pipeline(transaction=True)
+        for _ in range(settings.JWT_TOKEN_STORE_BATCH_SIZE):
+            pipeline.lmove(self.pending_key, self.processing_key, "LEFT", "RIGHT")
+        return [raw_record for raw_record in pipeline.execute() if raw_record is not None]
+
+    @staticmethod
+    def _write(records: list[dict]):
+        added = {record["jti"]: record for record in records if record["op"] == "add"}
+        revoked = {record["jti"]: record for record in records if record["op"] == "revoke"}
+
+        User = get_user_model()
+        user_ids = {record["user_id"] for record in added.values()}
+        existing_user_ids = {
+            str(user_id) for user_id in User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+        }
+
+        outstanding_tokens = [
+            OutstandingToken(
+                user_id=record["user_id"] if str(record["user_id"]) in existing_user_ids else None,
+                jti=jti,
+                token=record["token"],
+                created_at=datetime_from_epoch(record["created_at"]),
+                expires_at=datetime_from_epoch(record["exp"]),
+            )
+            for jti, record in added.items()
+        ]
+        # A token revoked by simplejwt's own classes or by revoke_user_tokens() may not be known as outstanding yet
+        outstanding_tokens += [
+            OutstandingToken(jti=jti, token=record.get("token", ""), expires_at=datetime_from_epoch(record["exp"]))
+            for jti, record in revoked.items()
+            if jti not in added
+        ]
+
+        with transaction.atomic():
+            OutstandingToken.objects.bulk_create(outstanding_tokens, ignore_conflicts=True)
+            if revoked:
+                outstanding_token_ids = OutstandingToken.objects.filter(jti__in=revoked.keys()).values_list(
+                    "id", flat=True
+                )
+                BlacklistedToken.objects.bulk_create(
+                    [BlacklistedToken(token_id=token_id) for token_id in outstanding_token_ids], ignore_conflicts=True
+                )
+
+
+@lru_cache
+def get_token_store() -> BaseTokenStore:
+    return import_string(settings.JWT_TOKEN_STORE)()
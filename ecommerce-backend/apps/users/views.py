@@ -5,7 +5,6 @@ from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt import tokens as jwt_tokens
 from rest_framework_simplejwt import views as jwt_views
 from rest_framework_simplejwt.views import TokenViewBase
 from social_core.actions import do_complete
@@ -13,7 +12,7 @@ from social_django.utils import psa
 
 from config import settings
 
-from . import models, serializers, utils
+from . import jwt, models, serializers, utils
 
 
 class CookieTokenRefreshView(jwt_views.TokenRefreshView):
@@ -138,6 +137,8 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.UserProfileSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ["get", "patch", "put"]
+    # Lists the profile of the current user only
+    pagination_class = None
 
     def get_queryset(self):
         return models.UserProfile.objects.filter(user=self.request.user)
@@ -210,7 +211,7 @@ def complete(request, backend, *args, **kwargs):
             otp_auth_token = utils.generate_otp_auth_token(user)
             backend.strategy.set_otp_auth_token(otp_auth_token)
         else:
-            token = jwt_tokens.RefreshToken.for_user(user)
+            token = jwt.RefreshToken.for_user(user)
             backend.strategy.set_jwt(token)
 
     return do_complete(
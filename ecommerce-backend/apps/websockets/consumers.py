@@ -1,16 +1,227 @@
+import asyncio
+import contextlib
 import json
+import logging
+import time
+from urllib.parse import parse_qs
 
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from apps.multitenancy.cache import tenant_context_cache
+from apps.notifications.counters import unread_counter
+from apps.notifications.publisher import encode_frame
+from apps.notifications.stream import notification_stream
+
+from .heartbeat import PONG_FRAME, heartbeat
+from .send_queue import SendQueue, SendQueueOverflow
+from .topics import get_topic_group_name
+
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
+# Close code of connections whose client didn't keep up with their frames, see QueuedSendMixin
+SLOW_CLIENT_CLOSE_CODE = 4008
+SLOW_CLIENT_CLOSE_REASON = "resync"
+
+# Close code of connections whose frames couldn't be sent, see QueuedSendMixin
+SEND_FAILED_CLOSE_CODE = 1011
+
+
+class QueuedSendMixin:
+    """
+    Frames published to the groups of the connection are sent by a writer task of the connection from a bounded queue,
+    not by the handlers, so a client which reads slowly doesn't hold back the consumer while its channel layer messages
+    pile up. The queue keeps up to ``WEBSOCKET_SEND_QUEUE_SIZE`` frames, ``WEBSOCKET_SEND_QUEUE_POLICY`` decides what
+    happens to another one (see ``SendQueuePolicy``). A disconnected client is closed with ``SLOW_CLIENT_CLOSE_CODE``
+    and a ``resync`` reason, not sent a message it wouldn't read either.
+
+    The queue and its writer task are created with the first frame, many connections don't get any for a long time.
+    A frame which can't be sent stops the queue and closes the connection with ``SEND_FAILED_CLOSE_CODE``, so its client
+    reconnects and resumes instead of waiting for the frames of a writer which is gone.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.send_queue: SendQueue | None = None
+        self.send_queue_writer: asyncio.Task | None = None
+        self.send_queue_stopped = False
+
+    async def queue_send(self, text: str, key: str = None):
+        if self.send_queue_stopped:
+            return
+
+        if self.send_queue is None:
+            self.send_queue = SendQueue(settings.WEBSOCKET_SEND_QUEUE_SIZE, settings.WEBSOCKET_SEND_QUEUE_POLICY)
+            self.send_queue_writer = asyncio.create_task(self.write_send_queue())
+
+        try:
+            self.send_queue.put(text, key)
+        except SendQueueOverflow:
+            logger.warning(f"Disconnecting {self.channel_name}, {self.send_queue.max_size} frames weren't sent yet")
+            await self.close_slow_client()
+
+    async def write_send_queue(self):
+        try:
+            while True:
+                await self.send(text_data=await self.send_queue.get())
+        except Exception as e:
+            logger.exception(f"Closing {self.channel_name}, a frame couldn't be sent: {e}")
+            # Not cancelled by stop_send_queue(), the task closes the connection itself
+            self.send_queue_writer = None
+            self.stop_send_queue()
+            with contextlib.suppress(Exception):
+                await self.close(code=SEND_FAILED_CLOSE_CODE)
+
+    async def close_slow_client(self):
+        self.stop_send_queue()
+        await self.close(code=SLOW_CLIENT_CLOSE_CODE, reason=SLOW_CLIENT_CLOSE_REASON)
+
+    def stop_send_queue(self):
+        if self.send_queue_writer is not None:
+            self.send_queue_writer.cancel()
+        self.send_queue = self.send_queue_writer = None
+        self.send_queue_stopped = True
+
+    async def websocket_disconnect(self, message):
+        self.stop_send_queue()
+        await super().websocket_disconnect(message)
+
+    async def notification_frames(self, event):
+        """
+        Handle frames published to the groups of the connection, e.g. notifications, unread counts and topic events.
+        Frames are encoded once by the publisher and sent as they are; the ones published with the same key may be
+        coalesced.
+        """
+        for frame, key in zip(event["frames"], event.get("keys") or [None] * len(event["frames"]), strict=True):
+            await self.queue_send(frame, key)
+
+    async def forward_update(self, event):
+        """
+        Sends the frame of an update handled by its ``type``, e.g. ``tenant_update``: the ``text`` its publisher encoded
+        once (see ``get_update_message``), or the frame of its ``data`` when it was sent without one.
+        """
+        text = event.get("text")
+        if text is None:
+            text = encode_frame({"type": event["type"], "data": event["data"]})
+        await self.queue_send(text, event.get("key"))
+
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+class HeartbeatMixin:
+    """
+    Accepted connections are pinged by the process's heartbeat and closed once their client didn't send anything, e.g.
+    the pong of a ping, for ``WEBSOCKET_HEARTBEAT_TIMEOUT`` seconds, see ``heartbeat.py``. Pongs are only recorded, they
+    aren't decoded.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_seen = time.monotonic()
+
+    async def accept(self, *args, **kwargs):
+        await super().accept(*args, **kwargs)
+        heartbeat.add(self)
+
+    async def websocket_receive(self, message):
+        self.last_seen = time.monotonic()
+        if message.get("text") == PONG_FRAME:
+            return
+        await super().websocket_receive(message)
+
+    async def websocket_disconnect(self, message):
+        heartbeat.discard(self)
+        await super().websocket_disconnect(message)
+
+    def pop_groups(self) -> list[str]:
+        """
+        The groups of the connection, which it isn't considered a member of afterwards: the heartbeat leaves them for
+        the connections it reaps, so they aren't left again on disconnect.
+        """
+        groups = list((self.topic_groups or {}).values())
+        self.topic_groups = None
+        if hasattr(self, "room_group_name"):
+            groups.append(self.room_group_name)
+            del self.room_group_name
+        return groups
+
+
+class TopicSubscriptionMixin:
+    """
+    Lets clients subscribe to topics (see ``topics.py``) with ``{"type": "subscribe", "topics": [...]}`` and unsubscribe
+    with ``{"type": "unsubscribe", "topics": [...]}``. Every topic is a channel layer group of its own, so events of a
+    topic are only sent to the connections subscribed to it instead of being filtered by the clients.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Created with the first subscription, most connections don't subscribe to any topic
+        self.topic_groups: dict[str, str] | None = None
+
+    def get_topic_group_name(self, topic: str) -> str | None:
+        return get_topic_group_name(topic)
+
+    async def subscribe(self, topics: list[str]):
+        """Join the groups of the topics; unknown topics and the ones over the limit are rejected"""
+        if not self.is_topic_list(topics):
+            await self.send(text_data=json.dumps({"type": "error", "message": "Invalid topics"}))
+            return
+
+        if self.topic_groups is None:
+            self.topic_groups = {}
+
+        subscribed, rejected, groups = [], [], {}
+        for topic in dict.fromkeys(topics):
+            if topic not in self.topic_groups:
+                group = self.get_topic_group_name(topic)
+                if group is None or len(self.topic_groups) + len(groups) >= settings.WEBSOCKET_MAX_TOPIC_SUBSCRIPTIONS:
+                    rejected.append(topic)
+                    continue
+                groups[topic] = group
+            subscribed.append(topic)
+
+        await asyncio.gather(*(self.channel_layer.group_add(group, self.channel_name) for group in groups.values()))
+        self.topic_groups.update(groups)
+        await self.send(text_data=json.dumps({"type": "subscribed", "topics": subscribed, "rejected": rejected}))
+
+    async def unsubscribe(self, topics: list[str]):
+        """Leave the groups of the topics"""
+        if not self.is_topic_list(topics):
+            await self.send(text_data=json.dumps({"type": "error", "message": "Invalid topics"}))
+            return
+
+        unsubscribed = [topic for topic in dict.fromkeys(topics) if topic in (self.topic_groups or {})]
+        await self.discard_topic_groups(unsubscribed)
+        await self.send(text_data=json.dumps({"type": "unsubscribed", "topics": unsubscribed}))
+
+    async def discard_topic_groups(self, topics: list[str] = None):
+        if not self.topic_groups:
+            return
+
+        topics = list(self.topic_groups) if topics is None else topics
+        groups = [self.topic_groups.pop(topic) for topic in topics]
+        await asyncio.gather(*(self.channel_layer.group_discard(group, self.channel_name) for group in groups))
+
+    @staticmethod
+    def is_topic_list(topics) -> bool:
+        return isinstance(topics, list) and all(isinstance(topic, str) for topic in topics)
+
+
+class NotificationConsumer(TopicSubscriptionMixin, QueuedSendMixin, HeartbeatMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time notifications.
     Works alongside REST API for bidirectional communication.
+
+    Every notification frame carries an ``event_id``. A client which reconnects passes the last one it got as the
+    ``last_event_id`` query parameter, or sends it in a ``resume`` message, and gets the notifications it missed. When
+    they aren't kept anymore it gets a ``resync`` message and fetches its notifications over the REST API instead.
+    Replayed notifications may also arrive live right after connecting; event ids increase, so clients skip the ones
+    they already got.
+
+    Clients may subscribe to topics shared by all tenants, e.g. ``content:<content_type>``.
     """
 
     async def connect(self):
@@ -19,8 +230,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
         if self.user and self.user.is_authenticated:
             # Create a unique room name for this user
-            self.room_name = f"user_{self.user.id}"
-            self.room_group_name = f"notifications_{self.room_name}"
+            self.room_group_name = f"notifications_user_{self.user.id}"
 
             # Join room group
             await self.channel_layer.group_add(self.room_group_name, self.channel_name)
@@ -31,6 +241,14 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.send(
                 text_data=json.dumps({"type": "connection_established", "message": "Connected to notification service"})
             )
+
+            # Later changes of the counter are pushed to the group
+            unread_count = await database_sync_to_async(unread_counter.get)(self.user.pk)
+            await self.send(text_data=json.dumps({"type": "unread_count", "data": {"unread_count": unread_count}}))
+
+            last_event_id = parse_qs(self.scope.get("query_string", b"").decode()).get("last_event_id")
+            if last_event_id:
+                await self.replay(last_event_id[0])
         else:
             # Reject connection if user is not authenticated
             await self.close()
@@ -40,6 +258,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         if hasattr(self, "room_group_name"):
             # Leave room group
             await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await self.discard_topic_groups()
 
     async def receive(self, text_data):
         """Handle messages received from WebSocket"""
@@ -50,29 +269,51 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             if message_type == "ping":
                 # Respond to ping with pong
                 await self.send(text_data=json.dumps({"type": "pong", "timestamp": data.get("timestamp")}))
+            elif message_type == "resume":
+                await self.replay(data.get("last_event_id"))
+            elif message_type == "subscribe":
+                await self.subscribe(data.get("topics"))
+            elif message_type == "unsubscribe":
+                await self.unsubscribe(data.get("topics"))
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({"type": "error", "message": "Invalid JSON"}))
 
-    async def notification_message(self, event):
+    async def replay(self, last_event_id: str):
         """
-        Handle notification messages sent to the group.
-        Called when a notification is sent via channel layer.
+        Queue the notifications published after the client's last event, or ask it to resync. Replayed frames go
+        through the send queue like live ones, so they keep their order; a gap which doesn't fit into the queue would
+        be cut by its policy and is resynced instead.
         """
-        await self.send(text_data=json.dumps({"type": "notification", "data": event["data"]}))
+        # Not on the thread of the consumers' database calls, reading the stream doesn't touch the database
+        frames = await sync_to_async(notification_stream.read_after, thread_sensitive=False)(
+            self.user.pk, last_event_id
+        )
+        queued = len(self.send_queue) if self.send_queue is not None else 0
+        if frames is None or queued + len(frames) > settings.WEBSOCKET_SEND_QUEUE_SIZE:
+            await self.queue_send(json.dumps({"type": "resync"}))
+            return
+
+        for frame in frames:
+            await self.queue_send(frame)
 
     async def order_update(self, event):
         """Handle order update notifications"""
-        await self.send(text_data=json.dumps({"type": "order_update", "data": event["data"]}))
+        await self.forward_update(event)
 
     async def payment_update(self, event):
         """Handle payment update notifications"""
-        await self.send(text_data=json.dumps({"type": "payment_update", "data": event["data"]}))
+        await self.forward_update(event)
 
 
-class TenantConsumer(AsyncWebsocketConsumer):
+class TenantConsumer(TopicSubscriptionMixin, QueuedSendMixin, HeartbeatMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for tenant-specific real-time updates.
     Useful for multi-tenant applications.
+
+    Memberships are checked against the tenant context cache, so reconnecting clients don't query the database.
+
+    Besides the tenant wide updates, clients may subscribe to topics of the tenant, e.g. ``order:<id>`` or ``billing``,
+    and to topics shared by all tenants.
     """
 
     async def connect(self):
@@ -102,6 +343,7 @@ class TenantConsumer(AsyncWebsocketConsumer):
         """Handle WebSocket disconnection"""
         if hasattr(self, "room_group_name"):
             await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await self.discard_topic_groups()
 
     async def receive(self, text_data):
         """Handle messages received from WebSocket"""
@@ -111,19 +353,24 @@ class TenantConsumer(AsyncWebsocketConsumer):
 
             if message_type == "ping":
                 await self.send(text_data=json.dumps({"type": "pong", "timestamp": data.get("timestamp")}))
+            elif message_type == "subscribe":
+                await self.subscribe(data.get("topics"))
+            elif message_type == "unsubscribe":
+                await self.unsubscribe(data.get("topics"))
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({"type": "error", "message": "Invalid JSON"}))
 
+    def get_topic_group_name(self, topic: str) -> str | None:
+        return get_topic_group_name(topic, self.tenant_id)
+
     async def tenant_update(self, event):
         """Handle tenant update notifications"""
-        await self.send(text_data=json.dumps({"type": "tenant_update", "data": event["data"]}))
+        await self.forward_update(event)
 
-    @database_sync_to_async
-    def verify_tenant_access(self):
+    async def verify_tenant_access(self):
         """Verify if user has access to the tenant"""
-        from apps.multitenancy.models import TenantMembership
-
-        try:
-            return TenantMembership.objects.filter(user=self.user, tenant_id=self.tenant_id, is_accepted=True).exists()
-        except Exception:
+        # Tenants the user isn't a member of are rejected without a lookup; the principal's tenant ids are as fresh as
+        # the tenant context cache, memberships bump the version of the principal snapshot
+        if tenant_context_cache.normalize_tenant_id(self.tenant_id) not in self.user.tenant_ids:
             return False
+        return await tenant_context_cache.ais_member(self.tenant_id, self.user.pk)
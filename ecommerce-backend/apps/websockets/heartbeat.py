@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+
+from .send_queue import send_queue_metrics
+
+logger = logging.getLogger(__name__)
+
+# Frames of the heartbeat, encoded once. Clients answer a ping with a pong
+PING_FRAME = '{"type":"ping"}'
+PONG_FRAME = '{"type":"pong"}'
+
+# Close code of connections whose client didn't answer the heartbeat
+IDLE_CLOSE_CODE = 4009
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: items are spread across ``slots`` buckets and every ``advance()`` returns the items of the
+    next one, so each item comes up once per turn and the work of a turn is split evenly across its ticks. An item
+    added comes up after a whole turn. Adding and discarding items is O(1).
+    """
+
+    def __init__(self, slots: int):
+        self.slots: list[set] = [set() for _ in range(slots)]
+        self.cursor = 0
+        self._positions: dict = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, item):
+        self.discard(item)
+        self.slots[self.cursor].add(item)
+        self._positions[item] = self.cursor
+
+    def discard(self, item):
+        position = self._positions.pop(item, None)
+        if position is not None:
+            self.slots[position].discard(item)
+
+    def advance(self) -> set:
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        return self.slots[self.cursor]
+
+
+async def group_discard_many(channel_layer, members: dict[str, list[str]]):
+    """
+    ``group_discard()`` of many channels at once. The redis channel layer removes the channels of a group with a single
+    ZREM, pipelined per shard, instead of a ZREM for every channel of every group.
+    """
+    if not isinstance(channel_layer, RedisChannelLayer):
+        await asyncio.gather(
+            *(
+                channel_layer.group_discard(group, channel_name)
+                for group, channel_names in members.items()
+                for channel_name in channel_names
+            )
+        )
+        return
+
+    shards = defaultdict(list)
+    for group, channel_names in members.items():
+        shards[channel_layer.consistent_hash(group)].append((group, channel_names))
+    for index, groups in shards.items():
+        async with channel_layer.connection(index).pipeline(transaction=False) as pipeline:
+            for group, channel_names in groups:
+                pipeline.zrem(channel_layer._group_key(group), *channel_names)
+            await pipeline.execute()
+
+
+class Heartbeat:
+    """
+    Liveness of the process's WebSocket connections, driven by the server instead of pings of the clients.
+
+    Connections are kept in a timing wheel which a single task of the event loop turns once every
+    ``WEBSOCKET_HEARTBEAT_INTERVAL`` seconds. A connection the wheel comes to is sent a ping, unless its client didn't
+    send anything for ``WEBSOCKET_HEARTBEAT_TIMEOUT`` seconds: clients answer pings, so its TCP connection is most
+    likely dead. Such connections of a tick are reaped together, they leave their groups with a single removal per
+    group (see ``group_discard_many``) and are closed with ``IDLE_CLOSE_CODE``, instead of staying members of their
+    groups until the server notices.
+
+    The task runs while there are connections and logs the metrics of the heartbeat and of the send queues once per
+    turn of the wheel. Counters are per process and are reset on restart.
+    """
+
+    SLOTS = 30
+
+    def __init__(self):
+        self.wheel = TimingWheel(self.SLOTS)
+        self.stats = Counter()
+        self._task: asyncio.Task | None = None
+
+    def add(self, consumer):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._task.get_loop() is not loop:
+            # Connections of another loop, e.g. of an earlier test, are gone with it
+            self._task.cancel()
+            self.wheel = TimingWheel(self.SLOTS)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self.run())
+
+        self.wheel.add(consumer)
+
+    def discard(self, consumer):
+        self.wheel.discard(consumer)
+
+    async def run(self):
+        while len(self.wheel):
+            await asyncio.sleep(settings.WEBSOCKET_HEARTBEAT_INTERVAL / self.SLOTS)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.exception(f"Heartbeat tick failed: {e}")
+
+    async def tick(self):
+        now = time.monotonic()
+        idle = []
+        for consumer in list(self.wheel.advance()):
+            if now - consumer.last_seen > settings.WEBSOCKET_HEARTBEAT_TIMEOUT:
+                idle.append(consumer)
+            else:
+                await consumer.queue_send(PING_FRAME, "heartbeat")
+                self.stats["pings"] += 1
+
+        if idle:
+            await self.reap(idle)
+
+        if self.wheel.cursor == 0:
+            self.log_metrics()
+
+    async def reap(self, consumers: list):
+        members = defaultdict(list)
+        for consumer in consumers:
+            self.wheel.discard(consumer)
+            consumer.stop_send_queue()
+            for group in consumer.pop_groups():
+                members[group].append(consumer.channel_name)
+
+        await group_discard_many(consumers[0].channel_layer, members)
+        await asyncio.gather(*(consumer.close(code=IDLE_CLOSE_CODE) for consumer in consumers), return_exceptions=True)
+        logger.info(f"Reaped {len(consumers)} idle WebSocket connections")
+
+        self.stats["reaped"] += len(consumers)
+        self.stats["group_entries"] += sum(len(channel_names) for channel_names in members.values())
+        self.stats["group_removals"] += len(members)
+
+    def metrics(self) -> dict:
+        return {
+            "connections": len(self.wheel),
+            "pings": self.stats["pings"],
+            "reaped": self.stats["reaped"],
+            "group_entries": self.stats["group_entries"],
+            "group_removals": self.stats["group_removals"],
+        }
+
+    def log_metrics(self):
+        logger.info(f"WebSocket heartbeat: {self.metrics()}, send queues: {send_queue_metrics.metrics()}")
+
+
+heartbeat = Heartbeat()
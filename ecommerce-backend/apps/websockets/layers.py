@@ -0,0 +1,90 @@
+import asyncio
+import bisect
+import hashlib
+
+from channels_redis import core, pubsub
+from channels_redis.utils import _wrap_close, decode_hosts
+
+
+class HashRing:
+    """
+    Consistent hash ring of the redis hosts of a channel layer.
+
+    Every host is placed on the ring at ``POINTS`` positions derived from its address, and a channel or group belongs
+    to the host of the first position following the hash of its name. A host which is added takes over about 1/N of
+    the names, the ones of a host which is removed are spread over the others; no other name moves. channels_redis
+    splits the hash space into N equal ranges instead, so adding a host to N remaps about half of the names.
+
+    Hosts are identified by their address, so every process has to list them with the same addresses, in any order.
+    """
+
+    POINTS = 160
+
+    def __init__(self, hosts: list[dict]):
+        points = sorted(
+            (self.hash(f"{self.get_host_key(host)}#{point}"), index)
+            for index, host in enumerate(hosts)
+            for point in range(self.POINTS)
+        )
+        self.size = len(hosts)
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._indexes = [index for _, index in points]
+
+    @staticmethod
+    def get_host_key(host: dict) -> str:
+        return str(host.get("address") or sorted(host.items()))
+
+    @staticmethod
+    def hash(value: str | bytes) -> int:
+        if isinstance(value, str):
+            value = value.encode()
+        return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+
+    def get_index(self, name: str | bytes) -> int:
+        """
+        Index of the host of the channel or group ``name`` in the layer's hosts.
+        """
+        if self.size == 1:
+            return 0
+        position = bisect.bisect(self._hashes, self.hash(name)) % len(self._hashes)
+        return self._indexes[position]
+
+
+class RedisChannelLayer(core.RedisChannelLayer):
+    """
+    channels_redis' channel layer with channels and groups sharded by ``HashRing``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ring = HashRing(self.hosts)
+
+    def consistent_hash(self, value):
+        return self.ring.get_index(value)
+
+
+class RedisPubSubLoopLayer(pubsub.RedisPubSubLoopLayer):
+    def __init__(self, hosts=None, *args, **kwargs):
+        super().__init__(hosts, *args, **kwargs)
+        self.ring = HashRing(decode_hosts(hosts))
+
+    def _get_shard(self, channel_or_group_name):
+        return self._shards[self.ring.get_index(channel_or_group_name)]
+
+
+class RedisPubSubChannelLayer(pubsub.RedisPubSubChannelLayer):
+    """
+    channels_redis' pub/sub channel layer with channels and groups sharded by ``HashRing``.
+    """
+
+    def _get_layer(self):
+        loop = asyncio.get_running_loop()
+
+        try:
+            layer = self._layers[loop]
+        except KeyError:
+            layer = RedisPubSubLoopLayer(*self._args, **self._kwargs, channel_layer=self)
+            self._layers[loop] = layer
+            _wrap_close(self, loop)
+
+        return layer
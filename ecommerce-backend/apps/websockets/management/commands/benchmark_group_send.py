@@ -0,0 +1,92 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from common.benchmarks import BenchmarkCommand, BenchmarkResult
+
+# The benchmark's layers are flushed afterwards, their prefix keeps them apart from the channels of the application
+PREFIX = "benchmark-group-send"
+
+DELIVERY_TIMEOUT = 300
+
+
+class Command(BenchmarkCommand):
+    """
+    For every channel layer mode of ``--modes`` (see ``CHANNEL_LAYER_MODE``) and every count of ``--subscribers``, that
+    many channels of this process are added to a group and ``--iterations`` messages are sent to it one after another.
+
+    The latency of a group send is the time until ``group_send()`` returns. The messages are delivered once the
+    channel which was added last received all of them. Groups of every size are named differently, so with several
+    ``--hosts`` they're spread across the shards.
+    """
+
+    help = (
+        "Measure group_send latency and throughput of the channel layer modes for groups of 10 up to 50k subscribers, "
+        "to size the channel layer's redis instances"
+    )
+
+    default_iterations = 100
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--subscribers", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 50_000])
+        parser.add_argument(
+            "--modes",
+            nargs="+",
+            choices=list(settings.CHANNEL_LAYER_BACKENDS),
+            default=list(settings.CHANNEL_LAYER_BACKENDS),
+        )
+        parser.add_argument("--hosts", nargs="+", help="Redis URLs of the shards, CHANNEL_LAYER_HOSTS by default")
+
+    def run_benchmarks(
+        self, iterations: int, subscribers: list[int], modes: list[str], hosts: list[str] | None, **options
+    ) -> list[BenchmarkResult]:
+        hosts = hosts or settings.CHANNEL_LAYER_HOSTS
+        self.stdout.write(f"Shards: {', '.join(hosts)}")
+
+        results = []
+        for mode in modes:
+            for count in subscribers:
+                channel_layer = import_string(settings.CHANNEL_LAYER_BACKENDS[mode])(
+                    hosts=hosts, prefix=PREFIX, capacity=iterations
+                )
+                name = f"{mode}, {count} subscribers"
+                latencies, delivered_in = async_to_sync(self._send)(channel_layer, count, iterations)
+
+                results.append(BenchmarkResult(f"{name}: group_send", iterations, sum(latencies), queries=0))
+                results.append(BenchmarkResult(f"{name}: delivered", iterations, delivered_in, queries=0))
+                percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+                self.stdout.write(
+                    f"{name}: group_send p50 {percentiles[49] * 1000:.2f} ms, p99 {percentiles[98] * 1000:.2f} ms"
+                )
+        return results
+
+    @staticmethod
+    async def _send(channel_layer, subscribers: int, iterations: int) -> tuple[list[float], float]:
+        group = f"benchmark.{subscribers}"
+        message = {"type": "notification_frames", "frames": ["{}"], "keys": [None]}
+        try:
+            channel_names = [await channel_layer.new_channel() for _ in range(subscribers)]
+            for channel_name in channel_names:
+                await channel_layer.group_add(group, channel_name)
+
+            async def receive_all() -> float:
+                for _ in range(iterations):
+                    await channel_layer.receive(channel_names[-1])
+                return time.perf_counter()
+
+            receiver = asyncio.create_task(receive_all())
+            latencies = []
+            started_at = time.perf_counter()
+            for _ in range(iterations):
+                sent_at = time.perf_counter()
+                await channel_layer.group_send(group, message)
+                latencies.append(time.perf_counter() - sent_at)
+            delivered_at = await asyncio.wait_for(receiver, DELIVERY_TIMEOUT)
+            return latencies, delivered_at - started_at
+        finally:
+            await channel_layer.flush()
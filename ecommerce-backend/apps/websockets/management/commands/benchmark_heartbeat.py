@@ -0,0 +1,168 @@
+import heapq
+import itertools
+import random
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management import CommandError
+
+from common.benchmarks import BenchmarkCommand, BenchmarkResult
+
+from ...heartbeat import Heartbeat, TimingWheel
+from ...topics import SHARED_TOPIC_KINDS, TOPIC_KINDS
+
+DAY = 24 * 60 * 60
+
+
+def _get_groups(rng: random.Random, tenants: int, topics: int) -> list[str]:
+    tenant = rng.randrange(tenants)
+    kinds = rng.sample(sorted(TOPIC_KINDS), topics)
+    return [f"tenant_{tenant}", *(kind if kind in SHARED_TOPIC_KINDS else f"{kind}.{tenant}" for kind in kinds)]
+
+
+class Command(BenchmarkCommand):
+    """
+    Simulates ``--iterations`` days of ``--connections`` WebSocket connections of a process on a virtual clock which
+    advances by a tick of the heartbeat's wheel. Every connection is a member of its tenant's group and of ``--topics``
+    topic groups. Sessions last ``--session`` seconds on average and are replaced by a new connection when they end;
+    ``--dead-rate`` of them end without a close frame, e.g. a phone which lost its network. At noon of every day
+    ``--outage`` of the connections are lost at once, e.g. to a network outage, and their clients reconnect.
+
+    Without the heartbeat the group entries of such a connection stay until the server notices its TCP connection is
+    gone after ``--linger`` seconds (TCP keepalive), then it leaves every group with a ZREM of its own. With it, the
+    connection is reaped at the first turn of the wheel after ``WEBSOCKET_HEARTBEAT_TIMEOUT``, together with the other
+    idle connections of the tick and a single ZREM per group. Both variants simulate the same sessions; dead
+    connections still lingering at the end aren't removed.
+
+    Stale group entries are still sent every message of their group, ``--group-sends`` per group and second: the
+    channel layer pushes each of them to the list of a channel which is never read. The times are the wall clock time
+    of the simulation.
+    """
+
+    help = "Simulate a day of WebSocket connections and compare the stale group entries with and without the heartbeat"
+
+    default_iterations = 1
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--connections", type=int, default=10_000)
+        parser.add_argument("--tenants", type=int, default=100)
+        parser.add_argument("--topics", type=int, default=2, help="Topic groups of every connection")
+        parser.add_argument("--session", type=float, default=1800, help="Mean session length in seconds")
+        parser.add_argument("--dead-rate", type=float, default=0.05)
+        parser.add_argument("--outage", type=float, default=0.1)
+        parser.add_argument("--linger", type=float, default=7200)
+        parser.add_argument("--group-sends", type=float, default=0.05)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def run_benchmarks(self, iterations: int, topics: int, **options) -> list[BenchmarkResult]:
+        if not 0 <= topics <= len(TOPIC_KINDS):
+            raise CommandError(f"--topics must be between 0 and {len(TOPIC_KINDS)}")
+
+        tick = settings.WEBSOCKET_HEARTBEAT_INTERVAL / Heartbeat.SLOTS
+        ticks = round(iterations * DAY / tick)
+        self.stdout.write(
+            f"{ticks} ticks of {tick:g} s, reaped after {settings.WEBSOCKET_HEARTBEAT_TIMEOUT:g} s without a pong"
+        )
+
+        results = []
+        for name, with_heartbeat in (("without heartbeat", False), ("with heartbeat", True)):
+            started_at = time.perf_counter()
+            stats = self._simulate(with_heartbeat, tick, ticks, topics=topics, **options)
+            results.append(BenchmarkResult(f"simulate, {name}", ticks, time.perf_counter() - started_at, queries=0))
+            self.stdout.write(
+                f"{name}: {stats['peak']} peak and {stats['stale_seconds'] / ticks:.0f} mean stale group entries, "
+                f"{stats['stale_seconds'] * tick * options['group_sends']:.0f} group sends pushed to stale channels, "
+                f"{stats['dead']} dead connections, {stats['removed']} stale group entries removed with "
+                f"{stats['removals']} ZREMs, {stats['pings']} pings"
+            )
+        return results
+
+    @staticmethod
+    def _simulate(
+        with_heartbeat: bool,
+        tick: float,
+        ticks: int,
+        connections: int,
+        tenants: int,
+        topics: int,
+        session: float,
+        dead_rate: float,
+        outage: float,
+        linger: float,
+        seed: int,
+        **options,
+    ) -> Counter:
+        rng = random.Random(seed)
+        timeout = settings.WEBSOCKET_HEARTBEAT_TIMEOUT / tick
+        wheel = TimingWheel(Heartbeat.SLOTS)
+        connection_ids = itertools.count()
+        # Connection ids by the tick their session ends at, and of dead connections by the tick they're noticed at
+        ends, lingering = [], []
+        groups, died_at = {}, {}
+        stale = 0
+        stats = Counter()
+
+        def die(connection: int, now: int):
+            nonlocal stale
+            stale += len(groups[connection])
+            stats["dead"] += 1
+            died_at[connection] = now
+            if not with_heartbeat:
+                heapq.heappush(lingering, (now + linger / tick, connection))
+
+        def connect(now: int):
+            connection = next(connection_ids)
+            groups[connection] = _get_groups(rng, tenants, topics)
+            heapq.heappush(ends, (now + rng.expovariate(tick / session), connection))
+            if with_heartbeat:
+                wheel.add(connection)
+
+        for _ in range(connections):
+            connect(0)
+
+        for now in range(ticks):
+            if now % round(DAY / tick) == round(DAY / tick / 2):
+                live = [connection for connection in groups if connection not in died_at]
+                for connection in rng.sample(live, round(len(live) * outage)):
+                    die(connection, now)
+                    connect(now)
+
+            while ends[0][0] <= now:
+                _, connection = heapq.heappop(ends)
+                if connection in died_at or connection not in groups:
+                    # Lost in the outage, the client has reconnected already
+                    continue
+                if rng.random() < dead_rate:
+                    die(connection, now)
+                else:
+                    wheel.discard(connection)
+                    del groups[connection]
+                connect(now)
+
+            if with_heartbeat:
+                due = wheel.advance()
+                idle = [connection for connection in due if now - died_at.get(connection, now) > timeout]
+                stats["pings"] += len(due) - len(idle)
+                members = defaultdict(int)
+                for connection in idle:
+                    wheel.discard(connection)
+                    del died_at[connection]
+                    for group in groups.pop(connection):
+                        members[group] += 1
+                stale -= sum(members.values())
+                stats["removed"] += sum(members.values())
+                stats["removals"] += len(members)
+            else:
+                while lingering and lingering[0][0] <= now:
+                    _, connection = heapq.heappop(lingering)
+                    del died_at[connection]
+                    removed = len(groups.pop(connection))
+                    stale -= removed
+                    stats["removed"] += removed
+                    stats["removals"] += removed
+
+            stats["stale_seconds"] += stale
+            stats["peak"] = max(stats["peak"], stale)
+        return stats
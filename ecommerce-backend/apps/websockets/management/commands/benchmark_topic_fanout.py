@@ -0,0 +1,139 @@
+import random
+from functools import partial
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+
+from apps.multitenancy.models import Tenant
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, run_batch_benchmark
+
+from ...topics import get_topic_group_name
+
+# Share of the events of every kind; tenant events are the tenant wide updates every connection of the tenant gets
+EVENT_MIX = {"order": 0.6, "content": 0.25, "billing": 0.1, "tenant": 0.05}
+
+
+def _tenant_group_name(tenant_id: str) -> str:
+    return f"tenant_{tenant_id}"
+
+
+class Command(BenchmarkCommand):
+    """
+    Connections of every tenant subscribe to the billing topic with a probability of ``--billing-rate``, to one to three
+    of ``--content-types`` content topics and to one to three of the ``--orders`` orders of their tenant.
+
+    ``--iterations`` events drawn from ``EVENT_MIX`` are sent to the in-memory channel layer, either all of them to the
+    tenant group the way the tenant consumer received them, content events to the groups of all tenants, or to the
+    groups of their topics. Every connection's messages are counted once the events are sent.
+    """
+
+    help = (
+        "Measure channel layer messages and the time it takes to send a synthetic mix of tenant events to tenant wide "
+        "groups versus topic groups"
+    )
+
+    default_iterations = 10_000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--tenants", type=int, default=20)
+        parser.add_argument("--connections", type=int, default=50, help="Connections of every tenant")
+        parser.add_argument("--orders", type=int, default=100, help="Orders of every tenant")
+        parser.add_argument("--content-types", type=int, default=5)
+        parser.add_argument("--billing-rate", type=float, default=0.1)
+
+    def run_benchmarks(
+        self,
+        iterations: int,
+        tenants: int,
+        connections: int,
+        orders: int,
+        content_types: int,
+        billing_rate: float,
+        **options,
+    ) -> list[BenchmarkResult]:
+        generator = random.Random(0)
+        tenant_ids = [str(Tenant._meta.pk.to_python(index)) for index in range(1, tenants + 1)]
+        content_topics = [f"content:type-{index}" for index in range(content_types)]
+
+        subscriptions = []
+        for tenant_id in tenant_ids:
+            for _ in range(connections):
+                topics = generator.sample(content_topics, generator.randint(1, min(3, content_types)))
+                topics += [f"order:{order}" for order in generator.sample(range(orders), generator.randint(1, 3))]
+                if generator.random() < billing_rate:
+                    topics.append("billing")
+                subscriptions.append((tenant_id, topics))
+
+        events = []
+        for kind in generator.choices(list(EVENT_MIX), weights=list(EVENT_MIX.values()), k=iterations):
+            tenant_id = generator.choice(tenant_ids)
+            topic = {
+                "order": lambda: f"order:{generator.randrange(orders)}",
+                "content": lambda: generator.choice(content_topics),
+                "billing": lambda: "billing",
+                "tenant": lambda: None,
+            }[kind]()
+            events.append((tenant_id, topic))
+
+        def get_tenant_groups(tenant_id, topic) -> list[str]:
+            if topic is not None and topic.startswith("content:"):
+                return [_tenant_group_name(other_tenant_id) for other_tenant_id in tenant_ids]
+            return [_tenant_group_name(tenant_id)]
+
+        def get_topic_groups(tenant_id, topic) -> list[str]:
+            if topic is None:
+                return [_tenant_group_name(tenant_id)]
+            return [get_topic_group_name(topic, tenant_id)]
+
+        results = []
+        messages = {}
+        for name, get_groups, subscribe in (
+            ("tenant groups", get_tenant_groups, False),
+            ("topic groups", get_topic_groups, True),
+        ):
+            channel_layer = InMemoryChannelLayer(capacity=1_000_000)
+            channel_names = self._connect(channel_layer, subscriptions, subscribe)
+            groups = [get_groups(tenant_id, topic) for tenant_id, topic in events]
+
+            results.append(
+                run_batch_benchmark(f"send events to {name}", partial(self._send, channel_layer, groups), len(events))
+            )
+            messages[name] = self._count(channel_layer, channel_names)
+            self.stdout.write(f"{name}: {messages[name]} messages, {messages[name] / len(events):.1f} per event")
+
+        reduction = 1 - messages["topic groups"] / messages["tenant groups"]
+        self.stdout.write(f"Topic groups send {reduction:.1%} fewer messages")
+        return results
+
+    @staticmethod
+    def _connect(channel_layer, subscriptions: list[tuple[str, list[str]]], subscribe: bool) -> list[str]:
+        async def connect():
+            channel_names = []
+            for tenant_id, topics in subscriptions:
+                channel_name = await channel_layer.new_channel()
+                await channel_layer.group_add(_tenant_group_name(tenant_id), channel_name)
+                if subscribe:
+                    for topic in topics:
+                        await channel_layer.group_add(get_topic_group_name(topic, tenant_id), channel_name)
+                channel_names.append(channel_name)
+            return channel_names
+
+        return async_to_sync(connect)()
+
+    @staticmethod
+    def _send(channel_layer, groups: list[list[str]]):
+        async def send():
+            for event_groups in groups:
+                for group in event_groups:
+                    await channel_layer.group_send(group, {"type": "notification_frames", "frames": ["{}"]})
+
+        async_to_sync(send)()
+
+    @staticmethod
+    def _count(channel_layer, channel_names: list[str]) -> int:
+        return sum(
+            channel_layer.channels[channel_name].qsize()
+            for channel_name in channel_names
+            if channel_name in channel_layer.channels
+        )
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+from datetime import UTC, datetime
+
+from asgiref.sync import async_to_sync
+from channels_redis.serializers import registry
+
+from apps.multitenancy.models import Tenant
+from apps.notifications.publisher import get_update_message
+from common.benchmarks import BenchmarkCommand, BenchmarkResult
+
+from ...consumers import TenantConsumer
+
+
+class _FanoutConsumer(TenantConsumer):
+    """
+    Counts the frames it's sent instead of sending them to a client.
+    """
+
+    sent = 0
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.sent += 1
+
+
+class _LegacyFanoutConsumer(_FanoutConsumer):
+    """
+    The tenant update handler as it was before updates were encoded by their publisher: once for every connection.
+    """
+
+    async def tenant_update(self, event):
+        await self.queue_send(json.dumps({"type": "tenant_update", "data": event["data"]}), event.get("key"))
+
+
+class Command(BenchmarkCommand):
+    """
+    ``--iterations`` tenant updates are fanned out to ``--connections`` tenant consumers: every message is serialized
+    once, the way the redis channel layer sends it to a group, and deserialized and handled by every consumer, whose
+    writer task then sends the frame. Times are the CPU time of the process, so "per op" is the CPU it takes to fan out
+    a single update.
+    """
+
+    help = (
+        "Measure the CPU per tenant update fanned out to the tenant's connections, with and without a pre-encoded frame"
+    )
+
+    default_iterations = 100
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--connections", type=int, default=5_000)
+        parser.add_argument("--members", type=int, default=20, help="Members of the tenant in the update")
+
+    def run_benchmarks(self, iterations: int, connections: int, members: int, **options) -> list[BenchmarkResult]:
+        data = {
+            "id": str(Tenant._meta.pk.to_python(1)),
+            "name": "Benchmark",
+            "type": "organization",
+            "billing_email": "billing@example.org",
+            "updated_at": datetime(2024, 5, 1, tzinfo=UTC).isoformat(),
+            "members": [
+                {"id": index, "email": f"member-{index}@example.org", "role": "member", "is_accepted": True}
+                for index in range(members)
+            ],
+        }
+
+        results = []
+        for name, consumer_class, message in (
+            ("encoded per connection", _LegacyFanoutConsumer, {"type": "tenant_update", "data": data, "key": None}),
+            ("pre-encoded", _FanoutConsumer, get_update_message("tenant_update", data)),
+        ):
+            seconds = async_to_sync(self._fan_out)(consumer_class, message, connections, iterations)
+            results.append(BenchmarkResult(f"{name}, {connections} connections", iterations, seconds, queries=0))
+        return results
+
+    @staticmethod
+    async def _fan_out(consumer_class, message: dict, connections: int, iterations: int) -> float:
+        serializer = registry.get_serializer("msgpack")
+        consumers = [consumer_class() for _ in range(connections)]
+        try:
+            started_at = time.process_time()
+            for _ in range(iterations):
+                serialized = serializer.serialize(message)
+                for consumer in consumers:
+                    event = serializer.deserialize(serialized)
+                    await getattr(consumer, event["type"])(event)
+                # Lets the writer tasks send the frame
+                await asyncio.sleep(0)
+            seconds = time.process_time() - started_at
+        finally:
+            for consumer in consumers:
+                consumer.stop_send_queue()
+
+        sent = sum(consumer.sent for consumer in consumers)
+        assert sent == connections * iterations, f"{sent} of {connections * iterations} frames were sent"
+        return seconds
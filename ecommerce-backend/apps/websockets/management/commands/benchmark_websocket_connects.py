@@ -0,0 +1,146 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import re_path
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.multitenancy.cache import tenant_context_cache
+from apps.multitenancy.constants import TenantType, TenantUserRole
+from apps.multitenancy.models import Tenant, TenantMembership
+from apps.users.authentication import JSONWebTokenChannelsAuthentication, JSONWebTokenCookieMiddleware
+from apps.users.cache import principal_cache
+from apps.users.jwt import RefreshToken
+from common.benchmarks import BenchmarkCommand, BenchmarkResult, run_batch_benchmark
+from config.routing import websocket_urlpatterns
+
+from ...consumers import TenantConsumer
+
+User = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": 1_000_000}}
+}
+
+CONNECT_TIMEOUT = 60
+
+
+class _LegacyChannelsAuthentication(JSONWebTokenChannelsAuthentication):
+    get_user = JWTAuthentication.get_user
+
+
+class _LegacyCookieMiddleware(JSONWebTokenCookieMiddleware):
+    """
+    Authentication as it was before the principal cache was used by channels: the user is queried from a thread.
+    """
+
+    @database_sync_to_async
+    def authenticate(self, scope):
+        return _LegacyChannelsAuthentication().authenticate(scope)
+
+
+class _LegacyTenantConsumer(TenantConsumer):
+    @database_sync_to_async
+    def verify_tenant_access(self):
+        return TenantMembership.objects.filter(user=self.user, tenant_id=self.tenant_id, is_accepted=True).exists()
+
+
+legacy_application = _LegacyCookieMiddleware(
+    URLRouter([re_path(r"ws/tenant/(?P<tenant_id>\w+)/$", _LegacyTenantConsumer.as_asgi())])
+)
+application = JSONWebTokenCookieMiddleware(URLRouter(websocket_urlpatterns))
+
+
+class Command(BenchmarkCommand):
+    """
+    Every iteration is a storm of ``--users`` connections to the tenant consumer opened at once, as after a deploy.
+    Connections are joined to their group of the in-memory channel layer, so the channel layer's redis isn't part of the
+    measurement.
+
+    The users are committed and deleted afterwards instead of being rolled back: ``database_sync_to_async`` closes the
+    database connection when it's within a transaction.
+    """
+
+    help = (
+        "Measure how many WebSocket connections per second the tenant consumer accepts, with the user and membership "
+        "queried on every connect versus resolved from the principal and tenant context caches"
+    )
+
+    default_iterations = 5
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--users", type=int, default=200, help="Connections of a storm")
+
+    def run_benchmarks(self, iterations: int, users: int, **options) -> list[BenchmarkResult]:
+        user_objects = User.objects.bulk_create(
+            User(email=f"websocket-connects-benchmark-{index}@example.org") for index in range(users)
+        )
+        tenant = Tenant.objects.create(creator=user_objects[0], name="Benchmark", type=TenantType.ORGANIZATION)
+        try:
+            TenantMembership.objects.bulk_create(
+                TenantMembership(user=user, tenant=tenant, role=TenantUserRole.MEMBER, is_accepted=True)
+                for user in user_objects
+            )
+            tenant_id = str(tenant.pk)
+            access_tokens = [str(RefreshToken.for_user(user).access_token) for user in user_objects]
+
+            def clear_local_cache():
+                principal_cache.local.clear()
+                tenant_context_cache.local.clear()
+
+            def clear_shared_cache():
+                cache.delete_many(
+                    [principal_cache.snapshot_key(user.pk) for user in user_objects]
+                    + [tenant_context_cache.member_key(tenant_id, user.pk) for user in user_objects]
+                )
+
+            def storm(app, before=None):
+                def run():
+                    for _ in range(iterations):
+                        if before:
+                            before()
+                        connected = async_to_sync(self._connect_all)(app, tenant_id, access_tokens)
+                        assert connected == len(access_tokens), f"{connected} of {len(access_tokens)} connected"
+
+                return run
+
+            results = []
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+                for name, run in (
+                    ("legacy (queried)", storm(legacy_application)),
+                    ("cold cache", storm(application, lambda: (clear_shared_cache(), clear_local_cache()))),
+                    ("shared cache hit", storm(application, clear_local_cache)),
+                    ("local cache hit", storm(application)),
+                ):
+                    results.append(run_batch_benchmark(f"storm, {name}", run, iterations * users))
+        finally:
+            tenant.delete()
+            User.objects.filter(pk__in=[user.pk for user in user_objects]).delete()
+            principal_cache.local.clear()
+            tenant_context_cache.local.clear()
+
+        self.stdout.write(f"Principal cache stats: {dict(principal_cache.stats)}")
+        self.stdout.write(f"Tenant context cache stats: {dict(tenant_context_cache.stats)}")
+        return results
+
+    @staticmethod
+    async def _connect_all(app, tenant_id: str, access_tokens: list[str]) -> int:
+        async def connect(access_token):
+            communicator = WebsocketCommunicator(
+                app,
+                f"/ws/tenant/{tenant_id}/",
+                headers=[(b"cookie", f"{settings.ACCESS_TOKEN_COOKIE}={access_token}".encode())],
+            )
+            # Connects of a storm wait for each other on the thread of database_sync_to_async
+            connected, _ = await communicator.connect(timeout=CONNECT_TIMEOUT)
+            await communicator.disconnect(timeout=CONNECT_TIMEOUT)
+            return connected
+
+        return sum(await asyncio.gather(*(connect(access_token) for access_token in access_tokens)))
@@ -0,0 +1,183 @@
+import asyncio
+import gc
+import multiprocessing
+import os
+import time
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django import db
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError
+from django.test import override_settings
+from django.urls import re_path
+
+from apps.multitenancy.cache import tenant_context_cache
+from apps.multitenancy.constants import TenantType, TenantUserRole
+from apps.multitenancy.models import Tenant, TenantMembership
+from apps.users.authentication import (
+    CachedPrincipalMixin,
+    JSONWebTokenChannelsAuthentication,
+    JSONWebTokenCookieMiddleware,
+)
+from apps.users.jwt import RefreshToken
+from common.benchmarks import BenchmarkCommand, BenchmarkResult
+from config.routing import websocket_urlpatterns
+
+from ...consumers import TenantConsumer
+from ...send_queue import SendQueue
+
+User = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": 1_000_000}}
+}
+
+CONNECT_TIMEOUT = 60
+
+# Connections opened at once
+BATCH_SIZE = 500
+
+
+class _LegacyChannelsAuthentication(JSONWebTokenChannelsAuthentication):
+    aget_user = CachedPrincipalMixin.aget_user
+
+
+class _LegacyCookieMiddleware(JSONWebTokenCookieMiddleware):
+    """
+    Authentication as it was before connections got a ``ConnectionPrincipal``: the scope keeps a user instance.
+    """
+
+    async def authenticate(self, scope):
+        return await _LegacyChannelsAuthentication().aauthenticate(scope)
+
+
+class _LegacyTenantConsumer(TenantConsumer):
+    """
+    The consumer's state as it was before it was created lazily.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.topic_groups = {}
+        self.send_queue = SendQueue(settings.WEBSOCKET_SEND_QUEUE_SIZE, settings.WEBSOCKET_SEND_QUEUE_POLICY)
+
+    async def verify_tenant_access(self):
+        return await tenant_context_cache.ais_member(self.tenant_id, self.user.pk)
+
+
+legacy_application = _LegacyCookieMiddleware(
+    URLRouter([re_path(r"ws/tenant/(?P<tenant_id>\w+)/$", _LegacyTenantConsumer.as_asgi())])
+)
+application = JSONWebTokenCookieMiddleware(URLRouter(websocket_urlpatterns))
+
+
+def _get_rss() -> int:
+    """
+    Resident set size of the process in bytes; Linux only.
+    """
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class Command(BenchmarkCommand):
+    """
+    ``--connections`` connections of a user to the tenant consumer are opened in this process and kept open while the
+    resident set size of the process is measured, with the user instance and the consumer state connections had before
+    versus a ``ConnectionPrincipal`` and lazily created state. The RSS per connection includes the in-process test
+    client of every connection, which is the same for both.
+
+    Every variant runs in a forked process, memory freed by a variant is kept by the process and would be reused by
+    the next one. The times are the times it took to open the connections.
+    """
+
+    help = "Measure the resident memory per open WebSocket connection"
+
+    default_iterations = 1
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--connections", type=int, default=10_000)
+
+    def run_benchmarks(self, iterations: int, connections: int, **options) -> list[BenchmarkResult]:
+        user = User.objects.create(email="websocket-memory-benchmark@example.org")
+        tenant = Tenant.objects.create(creator=user, name="Benchmark", type=TenantType.ORGANIZATION)
+        results = []
+        try:
+            TenantMembership.objects.create(user=user, tenant=tenant, role=TenantUserRole.MEMBER, is_accepted=True)
+            tenant_id = str(tenant.pk)
+            access_token = str(RefreshToken.for_user(user).access_token)
+            # Forked processes must not share the database connection
+            db.connections.close_all()
+
+            context = multiprocessing.get_context("fork")
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+                for name, app in (("legacy", legacy_application), ("principal", application)):
+                    for _ in range(iterations):
+                        queue = context.Queue()
+                        process = context.Process(
+                            target=self._measure, args=(queue, app, tenant_id, access_token, connections)
+                        )
+                        process.start()
+                        result = queue.get()
+                        process.join()
+                        if isinstance(result, CommandError):
+                            raise result
+
+                        seconds, rss = result
+
+                        results.append(BenchmarkResult(f"open connections, {name}", connections, seconds, queries=0))
+                        self.stdout.write(f"{name}: {rss / connections / 1024:.2f} KiB RSS per connection")
+        finally:
+            tenant.delete()
+            user.delete()
+        return results
+
+    @classmethod
+    def _measure(cls, queue, app, tenant_id: str, access_token: str, connections: int):
+        try:
+            queue.put(async_to_sync(cls._open_connections)(app, tenant_id, access_token, connections))
+        except Exception as e:
+            # The parent waits for a result
+            queue.put(CommandError(f"Connections couldn't be measured: {e!r}"))
+            raise
+
+    @staticmethod
+    async def _open_connections(app, tenant_id: str, access_token: str, connections: int) -> tuple[float, int]:
+        def get_communicator():
+            return WebsocketCommunicator(
+                app,
+                f"/ws/tenant/{tenant_id}/",
+                headers=[(b"cookie", f"{settings.ACCESS_TOKEN_COOKIE}={access_token}".encode())],
+            )
+
+        async def connect(communicator) -> bool:
+            connected, _ = await communicator.connect(timeout=CONNECT_TIMEOUT)
+            if connected:
+                # The connection established message
+                await communicator.receive_from(timeout=CONNECT_TIMEOUT)
+            return connected
+
+        # Caches are warmed up by the first connection, the rest of them don't leave the event loop
+        warm_up = get_communicator()
+        assert await connect(warm_up), "Connection was rejected"
+        await warm_up.disconnect(timeout=CONNECT_TIMEOUT)
+
+        gc.collect()
+        rss = _get_rss()
+        started_at = time.perf_counter()
+        communicators = [get_communicator() for _ in range(connections)]
+        for start in range(0, connections, BATCH_SIZE):
+            batch = communicators[start : start + BATCH_SIZE]
+            connected = sum(await asyncio.gather(*(connect(communicator) for communicator in batch)))
+            assert connected == len(batch), f"{connected} of {len(batch)} connected"
+        seconds = time.perf_counter() - started_at
+        gc.collect()
+        rss = _get_rss() - rss
+
+        for start in range(0, connections, BATCH_SIZE):
+            batch = communicators[start : start + BATCH_SIZE]
+            await asyncio.gather(*(communicator.disconnect(timeout=CONNECT_TIMEOUT) for communicator in batch))
+        return seconds, rss
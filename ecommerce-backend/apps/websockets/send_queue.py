@@ -0,0 +1,95 @@
+import asyncio
+import weakref
+from collections import Counter, OrderedDict
+from enum import StrEnum
+
+
+class SendQueuePolicy(StrEnum):
+    """
+    What a full send queue does with another frame:
+    - COALESCE: a frame replaces the queued one published with the same key, e.g. an older unread count. When no frame
+      can be replaced the oldest one is dropped.
+    - DROP_OLDEST: the oldest frame is dropped.
+    - DISCONNECT: the queue is cleared and the client is disconnected with a resync hint.
+    """
+
+    COALESCE = "coalesce"
+    DROP_OLDEST = "drop_oldest"
+    DISCONNECT = "disconnect"
+
+
+class SendQueueOverflow(Exception):
+    pass
+
+
+class SendQueueMetrics:
+    """
+    Depth of the send queues of the process's connections and counters of the frames they dropped or coalesced and of
+    the connections they disconnected. Queues are created with the first frame of a connection, so ``connections``
+    counts the ones which got any. Counters are per process and are reset on restart.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+        self.queues = weakref.WeakSet()
+
+    def metrics(self) -> dict:
+        depths = [len(queue) for queue in self.queues]
+        return {
+            "connections": len(depths),
+            "queued": sum(depths),
+            "max_depth": max(depths, default=0),
+            "dropped": self.stats["dropped"],
+            "coalesced": self.stats["coalesced"],
+            "disconnected": self.stats["disconnected"],
+        }
+
+
+send_queue_metrics = SendQueueMetrics()
+
+
+class SendQueue:
+    """
+    Bounded queue of the frames a connection is yet to send, see ``SendQueuePolicy``.
+    """
+
+    def __init__(self, max_size: int, policy: SendQueuePolicy | str):
+        self.max_size = max_size
+        self.policy = SendQueuePolicy(policy)
+        self._frames: OrderedDict = OrderedDict()
+        self._ready = asyncio.Event()
+        send_queue_metrics.queues.add(self)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames.values())
+
+    def put(self, text: str, key: str = None):
+        """
+        Queues a frame, raises ``SendQueueOverflow`` when the queue is full and the policy is to disconnect.
+        """
+        if key is not None and self.policy == SendQueuePolicy.COALESCE:
+            # A replaced frame is moved behind the frames queued before its replacement
+            if self._frames.pop(key, None) is not None:
+                send_queue_metrics.stats["coalesced"] += 1
+        else:
+            key = object()
+
+        if len(self._frames) >= self.max_size:
+            if self.policy == SendQueuePolicy.DISCONNECT:
+                self._frames.clear()
+                send_queue_metrics.stats["disconnected"] += 1
+                raise SendQueueOverflow
+            self._frames.popitem(last=False)
+            send_queue_metrics.stats["dropped"] += 1
+
+        self._frames[key] = text
+        self._ready.set()
+
+    async def get(self) -> str:
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popitem(last=False)[1]
@@ -0,0 +1,398 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, call
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.exceptions import StopConsumer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+
+from apps.multitenancy.cache import tenant_context_cache
+from apps.notifications.publisher import get_update_message
+from apps.users.authentication import JSONWebTokenCookieMiddleware
+from apps.users.cache import principal_cache
+from apps.users.jwt import RefreshToken
+from config.routing import websocket_urlpatterns
+
+from ..consumers import (
+    SEND_FAILED_CLOSE_CODE,
+    SLOW_CLIENT_CLOSE_CODE,
+    SLOW_CLIENT_CLOSE_REASON,
+    NotificationConsumer,
+    TenantConsumer,
+)
+from ..heartbeat import IDLE_CLOSE_CODE, heartbeat
+from ..send_queue import SendQueuePolicy, send_queue_metrics
+
+pytestmark = pytest.mark.django_db
+
+application = JSONWebTokenCookieMiddleware(URLRouter(websocket_urlpatterns))
+
+
+@pytest.fixture
+def consumer(user, mocker):
+    consumer = NotificationConsumer()
+    consumer.user = user
+    mocker.patch.object(consumer, "send", new=AsyncMock())
+    return consumer
+
+
+@pytest.fixture
+def tenant_consumer(user, tenant, mocker):
+    consumer = TenantConsumer()
+    consumer.user = user
+    consumer.tenant_id = str(tenant.pk)
+    consumer.channel_name = "tenant-consumer"
+    consumer.channel_layer = mocker.AsyncMock()
+    mocker.patch.object(consumer, "send", new=AsyncMock())
+    return consumer
+
+
+@pytest.fixture
+def stalled_consumer(user, mocker, settings):
+    """
+    A notification consumer whose client doesn't read: the first frame it's sent never is.
+    """
+
+    def make(policy: SendQueuePolicy, max_size: int = 3) -> NotificationConsumer:
+        settings.WEBSOCKET_SEND_QUEUE_SIZE = max_size
+        settings.WEBSOCKET_SEND_QUEUE_POLICY = policy
+        consumer = NotificationConsumer()
+        consumer.user = user
+        consumer.channel_name = "stalled-consumer"
+
+        async def stall(**kwargs):
+            await asyncio.Event().wait()
+
+        mocker.patch.object(consumer, "send", new=AsyncMock(side_effect=stall))
+        mocker.patch.object(consumer, "close", new=AsyncMock())
+        return consumer
+
+    return make
+
+
+def handle_events(consumer, *events: dict) -> list[str]:
+    """
+    Handles messages of the consumer's groups by their type and returns the frames still queued once its writer task
+    sent what it could.
+    """
+
+    async def handle():
+        for event in events:
+            await getattr(consumer, event["type"])(event)
+        for _ in range(sum(len(event.get("frames", [None])) for event in events) + 1):
+            await asyncio.sleep(0)
+        queued = list(consumer.send_queue or [])
+        # The writer task mustn't outlive the event loop of async_to_sync
+        consumer.stop_send_queue()
+        return queued
+
+    return async_to_sync(handle)()
+
+
+def handle_frames(consumer, frames: list[str], keys: list[str | None] = None) -> list[str]:
+    return handle_events(
+        consumer, {"type": "notification_frames", "frames": frames, "keys": keys or [None] * len(frames)}
+    )
+
+
+def get_queued_frames(consumer, handler, *args) -> list[str]:
+    """
+    Runs a handler of the consumer and returns the frames it queued, before its writer task sent any of them.
+    """
+
+    async def handle():
+        await handler(*args)
+        queued = list(consumer.send_queue or [])
+        consumer.stop_send_queue()
+        return queued
+
+    return async_to_sync(handle)()
+
+
+def sent_messages(consumer) -> list[dict]:
+    return [json.loads(send_call.kwargs["text_data"]) for send_call in consumer.send.await_args_list]
+
+
+@pytest.fixture
+def read_after(mocker):
+    return mocker.patch("apps.websockets.consumers.notification_stream.read_after")
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    principal_cache.clear()
+    tenant_context_cache.clear()
+    yield
+    principal_cache.clear()
+    tenant_context_cache.clear()
+
+
+def get_tenant_communicator(tenant, access_token) -> WebsocketCommunicator:
+    return WebsocketCommunicator(
+        application,
+        f"/ws/tenant/{tenant.pk}/",
+        headers=[(b"cookie", f"{settings.ACCESS_TOKEN_COOKIE}={access_token}".encode())],
+    )
+
+
+def connect_to_tenant(tenant, access_token) -> bool:
+    async def connect():
+        communicator = get_tenant_communicator(tenant, access_token)
+        connected, _ = await communicator.connect()
+        await communicator.disconnect()
+        return connected
+
+    return async_to_sync(connect)()
+
+
+class TestNotificationConsumer:
+    def test_frames_are_sent_as_they_are(self, consumer):
+        assert handle_frames(consumer, ["first", "second"]) == []
+
+        assert consumer.send.await_args_list == [call(text_data="first"), call(text_data="second")]
+
+    def test_missed_frames_are_replayed_on_resume(self, consumer, user, read_after):
+        read_after.return_value = ["missed"]
+
+        queued = get_queued_frames(consumer, consumer.receive, json.dumps({"type": "resume", "last_event_id": "1-0"}))
+
+        read_after.assert_called_once_with(user.pk, "1-0")
+        assert queued == ["missed"]
+
+    def test_client_resyncs_when_gap_is_not_kept(self, consumer, read_after):
+        read_after.return_value = None
+
+        assert get_queued_frames(consumer, consumer.replay, "1-0") == [json.dumps({"type": "resync"})]
+
+    def test_client_resyncs_when_gap_does_not_fit_into_send_queue(self, consumer, read_after, settings):
+        settings.WEBSOCKET_SEND_QUEUE_SIZE = 3
+        read_after.return_value = [f"missed-{index}" for index in range(4)]
+
+        assert get_queued_frames(consumer, consumer.replay, "1-0") == [json.dumps({"type": "resync"})]
+
+
+class TestUpdates:
+    def test_pre_encoded_update_is_forwarded_as_it_is(self, tenant_consumer, mocker):
+        encode_frame = mocker.patch("apps.websockets.consumers.encode_frame")
+        message = get_update_message("tenant_update", {"name": "Acme"}, key="tenant")
+
+        handle_events(tenant_consumer, message)
+
+        encode_frame.assert_not_called()
+        assert tenant_consumer.send.await_args_list == [call(text_data=message["text"])]
+        assert sent_messages(tenant_consumer) == [{"type": "tenant_update", "data": {"name": "Acme"}}]
+
+    @pytest.mark.parametrize("event_type", ["order_update", "payment_update"])
+    def test_update_without_text_is_encoded(self, consumer, event_type):
+        handle_events(consumer, {"type": event_type, "data": {"status": "paid"}})
+
+        assert sent_messages(consumer) == [{"type": event_type, "data": {"status": "paid"}}]
+
+
+class TestQueuedSend:
+    def test_stalled_client_drops_oldest_frames(self, stalled_consumer):
+        consumer = stalled_consumer(SendQueuePolicy.DROP_OLDEST)
+        dropped = send_queue_metrics.stats["dropped"]
+
+        queued = handle_frames(consumer, [f"frame-{index}" for index in range(10)])
+
+        # The queue kept the last three frames, the writer task is stuck sending the first of them
+        assert consumer.send.await_args_list == [call(text_data="frame-7")]
+        assert queued == ["frame-8", "frame-9"]
+        assert send_queue_metrics.stats["dropped"] - dropped == 7
+        consumer.close.assert_not_awaited()
+
+    def test_stalled_client_coalesces_keyed_frames(self, stalled_consumer):
+        consumer = stalled_consumer(SendQueuePolicy.COALESCE)
+        coalesced = send_queue_metrics.stats["coalesced"]
+        dropped = send_queue_metrics.stats["dropped"]
+
+        queued = handle_frames(
+            consumer,
+            ["count-1", "first", "count-2", "second", "count-3"],
+            ["unread_count", None, "unread_count", None, "unread_count"],
+        )
+
+        assert consumer.send.await_args_list == [call(text_data="first")]
+        assert queued == ["second", "count-3"]
+        assert send_queue_metrics.stats["coalesced"] - coalesced == 2
+        assert send_queue_metrics.stats["dropped"] == dropped
+
+    def test_stalled_client_is_disconnected_to_resync(self, stalled_consumer):
+        consumer = stalled_consumer(SendQueuePolicy.DISCONNECT)
+        disconnected = send_queue_metrics.stats["disconnected"]
+
+        queued = handle_frames(consumer, [f"frame-{index}" for index in range(5)])
+
+        consumer.close.assert_awaited_once_with(code=SLOW_CLIENT_CLOSE_CODE, reason=SLOW_CLIENT_CLOSE_REASON)
+        consumer.send.assert_not_awaited()
+        assert queued == []
+        assert send_queue_metrics.stats["disconnected"] - disconnected == 1
+
+    def test_failed_send_closes_connection(self, consumer, mocker):
+        consumer.channel_name = "consumer"
+        consumer.send.side_effect = ConnectionResetError()
+        mocker.patch.object(consumer, "close", new=AsyncMock())
+
+        async def queue_send():
+            await consumer.queue_send("first")
+            await consumer.send_queue_writer
+            await consumer.queue_send("second")
+
+        async_to_sync(queue_send)()
+
+        consumer.send.assert_awaited_once_with(text_data="first")
+        consumer.close.assert_awaited_once_with(code=SEND_FAILED_CLOSE_CODE)
+        assert consumer.send_queue is None
+        assert consumer.send_queue_writer is None
+
+    def test_queue_is_created_with_first_frame(self, consumer):
+        assert consumer.send_queue is None
+        assert consumer.topic_groups is None
+
+        async def queue_send():
+            await consumer.queue_send("first")
+            queued = list(consumer.send_queue)
+            consumer.stop_send_queue()
+            return queued
+
+        assert list(async_to_sync(queue_send)()) == ["first"]
+
+    def test_queue_is_stopped_on_disconnect(self, consumer):
+        consumer.channel_layer = AsyncMock()
+        consumer.channel_name = "consumer"
+
+        with pytest.raises(StopConsumer):
+            async_to_sync(consumer.websocket_disconnect)({"type": "websocket.disconnect", "code": 1000})
+
+        assert consumer.send_queue is None
+        assert consumer.send_queue_writer is None
+
+
+class TestTopicSubscriptions:
+    def test_subscribed_topics_join_their_groups(self, tenant_consumer, tenant):
+        async_to_sync(tenant_consumer.receive)(
+            json.dumps({"type": "subscribe", "topics": ["order:1", "billing", "content:article", "unknown"]})
+        )
+
+        assert sent_messages(tenant_consumer) == [
+            {"type": "subscribed", "topics": ["order:1", "billing", "content:article"], "rejected": ["unknown"]}
+        ]
+        assert {add_call.args for add_call in tenant_consumer.channel_layer.group_add.await_args_list} == {
+            (f"tenant_{tenant.pk}.order.1", "tenant-consumer"),
+            (f"tenant_{tenant.pk}.billing", "tenant-consumer"),
+            ("topic.content.article", "tenant-consumer"),
+        }
+
+    def test_tenant_topics_are_rejected_without_tenant(self, consumer, mocker):
+        consumer.channel_name = "notification-consumer"
+        consumer.channel_layer = mocker.AsyncMock()
+
+        async_to_sync(consumer.receive)(json.dumps({"type": "subscribe", "topics": ["content:article", "billing"]}))
+
+        assert sent_messages(consumer) == [
+            {"type": "subscribed", "topics": ["content:article"], "rejected": ["billing"]}
+        ]
+
+    def test_subscriptions_are_limited(self, tenant_consumer, settings):
+        settings.WEBSOCKET_MAX_TOPIC_SUBSCRIPTIONS = 2
+        async_to_sync(tenant_consumer.subscribe)(["order:1", "order:2"])
+
+        async_to_sync(tenant_consumer.subscribe)(["order:1", "order:3"])
+
+        assert sent_messages(tenant_consumer)[-1] == {
+            "type": "subscribed",
+            "topics": ["order:1"],
+            "rejected": ["order:3"],
+        }
+        assert tenant_consumer.channel_layer.group_add.await_count == 2
+
+    def test_unsubscribed_and_disconnected_topics_leave_their_groups(self, tenant_consumer, tenant):
+        async_to_sync(tenant_consumer.subscribe)(["order:1", "billing"])
+
+        async_to_sync(tenant_consumer.receive)(json.dumps({"type": "unsubscribe", "topics": ["order:1", "order:2"]}))
+        async_to_sync(tenant_consumer.disconnect)(1000)
+
+        assert sent_messages(tenant_consumer)[-1] == {"type": "unsubscribed", "topics": ["order:1"]}
+        assert [
+            discard_call.args[0] for discard_call in tenant_consumer.channel_layer.group_discard.await_args_list
+        ] == [
+            f"tenant_{tenant.pk}.order.1",
+            f"tenant_{tenant.pk}.billing",
+        ]
+        assert tenant_consumer.topic_groups == {}
+
+    def test_invalid_topics_are_an_error(self, tenant_consumer):
+        async_to_sync(tenant_consumer.receive)(json.dumps({"type": "subscribe", "topics": "billing"}))
+
+        assert sent_messages(tenant_consumer) == [{"type": "error", "message": "Invalid topics"}]
+
+
+# Connections are closed by database_sync_to_async within the atomic block of a non-transactional test
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("locmem_cache")
+class TestTenantConsumer:
+    def test_reconnect_does_not_query_database(
+        self, user, tenant, tenant_membership_factory, django_assert_num_queries
+    ):
+        tenant_membership_factory(user=user, tenant=tenant)
+        access_token = RefreshToken.for_user(user).access_token
+        assert connect_to_tenant(tenant, access_token)
+
+        with django_assert_num_queries(0):
+            assert connect_to_tenant(tenant, access_token)
+
+    def test_non_member_is_rejected_from_cache(
+        self, user, tenant, tenant_membership_factory, django_assert_num_queries
+    ):
+        tenant_membership_factory(user=user, tenant=tenant, is_accepted=False)
+        access_token = RefreshToken.for_user(user).access_token
+        assert not connect_to_tenant(tenant, access_token)
+
+        with django_assert_num_queries(0):
+            assert not connect_to_tenant(tenant, access_token)
+
+    def test_accepted_membership_is_not_cached_as_missing(
+        self, user, tenant, tenant_membership_factory, django_capture_on_commit_callbacks
+    ):
+        membership = tenant_membership_factory(user=user, tenant=tenant, is_accepted=False)
+        access_token = RefreshToken.for_user(user).access_token
+        assert not connect_to_tenant(tenant, access_token)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            membership.is_accepted = True
+            membership.save()
+
+        assert connect_to_tenant(tenant, access_token)
+
+    def test_tenant_of_other_users_is_rejected_without_lookup(self, user, tenant, mocker):
+        ais_member = mocker.spy(tenant_context_cache, "ais_member")
+        access_token = RefreshToken.for_user(user).access_token
+
+        assert not connect_to_tenant(tenant, access_token)
+        ais_member.assert_not_called()
+
+    def test_idle_connection_is_closed_by_heartbeat(self, user, tenant, tenant_membership_factory, settings):
+        settings.WEBSOCKET_HEARTBEAT_INTERVAL = 0.03
+        settings.WEBSOCKET_HEARTBEAT_TIMEOUT = 0
+        tenant_membership_factory(user=user, tenant=tenant)
+        access_token = RefreshToken.for_user(user).access_token
+
+        async def connect():
+            communicator = get_tenant_communicator(tenant, access_token)
+            await communicator.connect()
+            await communicator.receive_from()
+            output = await communicator.receive_output(timeout=1)
+            await communicator.disconnect()
+            return output
+
+        assert async_to_sync(connect)() == {"type": "websocket.close", "code": IDLE_CLOSE_CODE}
+        assert len(heartbeat.wheel) == 0
+
+    def test_invalid_token_is_rejected(self, tenant):
+        assert not connect_to_tenant(tenant, "invalid")
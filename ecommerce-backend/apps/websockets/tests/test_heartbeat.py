@@ -0,0 +1,156 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, call
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+
+from ..consumers import NotificationConsumer
+from ..heartbeat import IDLE_CLOSE_CODE, PING_FRAME, PONG_FRAME, Heartbeat, TimingWheel, group_discard_many
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def consumer_factory(user, mocker):
+    channel_layer = AsyncMock()
+
+    def make(channel_name: str, idle: bool = False) -> NotificationConsumer:
+        consumer = NotificationConsumer()
+        consumer.user = user
+        consumer.channel_name = channel_name
+        consumer.channel_layer = channel_layer
+        if idle:
+            consumer.last_seen -= settings.WEBSOCKET_HEARTBEAT_TIMEOUT + 1
+        mocker.patch.object(consumer, "send", new=AsyncMock())
+        mocker.patch.object(consumer, "close", new=AsyncMock())
+        return consumer
+
+    return make
+
+
+def turn_wheel(heartbeat: Heartbeat, *consumers: NotificationConsumer):
+    """
+    Adds the consumers to the heartbeat and turns its wheel once; ticks are driven by the test, not by its task.
+    """
+
+    async def turn():
+        for consumer in consumers:
+            heartbeat.add(consumer)
+        heartbeat._task.cancel()
+
+        for _ in range(heartbeat.SLOTS):
+            await heartbeat.tick()
+        # Lets the writer tasks send the pings
+        await asyncio.sleep(0)
+        for consumer in consumers:
+            consumer.stop_send_queue()
+
+    async_to_sync(turn)()
+
+
+class TestTimingWheel:
+    def test_item_comes_up_once_per_turn(self):
+        wheel = TimingWheel(3)
+        wheel.add("first")
+        wheel.advance()
+        wheel.add("second")
+
+        assert [wheel.advance() for _ in range(4)] == [set(), {"first"}, {"second"}, set()]
+
+    def test_discarded_item_does_not_come_up(self):
+        wheel = TimingWheel(2)
+        wheel.add("first")
+        wheel.discard("first")
+
+        assert [wheel.advance() for _ in range(2)] == [set(), set()]
+        assert len(wheel) == 0
+
+
+class TestHeartbeat:
+    def test_live_connection_is_pinged(self, consumer_factory):
+        consumer = consumer_factory("live")
+        heartbeat = Heartbeat()
+
+        turn_wheel(heartbeat, consumer)
+
+        consumer.send.assert_awaited_once_with(text_data=PING_FRAME)
+        consumer.close.assert_not_awaited()
+        assert heartbeat.metrics()["pings"] == 1
+        assert heartbeat.metrics()["connections"] == 1
+
+    def test_metrics_are_logged_once_per_turn(self, consumer_factory, caplog):
+        caplog.set_level("INFO", logger="apps.websockets.heartbeat")
+
+        turn_wheel(Heartbeat(), consumer_factory("live"))
+
+        (record,) = caplog.records
+        assert "'pings': 1" in record.getMessage()
+        assert "send queues: {'connections'" in record.getMessage()
+
+    def test_idle_connections_are_reaped_together(self, consumer_factory):
+        first, second = consumer_factory("first", idle=True), consumer_factory("second", idle=True)
+        first.room_group_name = second.room_group_name = "tenant_1"
+        first.topic_groups = {"billing": "tenant_1.billing"}
+        heartbeat = Heartbeat()
+
+        turn_wheel(heartbeat, first, second)
+
+        assert sorted(first.channel_layer.group_discard.await_args_list) == [
+            call("tenant_1", "first"),
+            call("tenant_1", "second"),
+            call("tenant_1.billing", "first"),
+        ]
+        first.close.assert_awaited_once_with(code=IDLE_CLOSE_CODE)
+        second.close.assert_awaited_once_with(code=IDLE_CLOSE_CODE)
+        first.send.assert_not_awaited()
+        assert heartbeat.metrics() == {
+            "connections": 0,
+            "pings": 0,
+            "reaped": 2,
+            "group_entries": 3,
+            "group_removals": 2,
+        }
+
+    def test_reaped_connection_does_not_leave_groups_again(self, consumer_factory):
+        consumer = consumer_factory("idle", idle=True)
+        consumer.room_group_name = "tenant_1"
+        turn_wheel(Heartbeat(), consumer)
+
+        async_to_sync(consumer.disconnect)(1006)
+
+        assert consumer.channel_layer.group_discard.await_count == 1
+
+    def test_pong_is_recorded_without_being_decoded(self, consumer_factory, mocker):
+        consumer = consumer_factory("live", idle=True)
+        receive = mocker.patch.object(consumer, "receive", new=AsyncMock())
+
+        async_to_sync(consumer.websocket_receive)({"type": "websocket.receive", "text": PONG_FRAME})
+
+        receive.assert_not_awaited()
+        assert time.monotonic() - consumer.last_seen < settings.WEBSOCKET_HEARTBEAT_TIMEOUT
+
+
+class TestGroupDiscardMany:
+    def test_channels_are_removed_from_redis_groups(self):
+        channel_layer = RedisChannelLayer(hosts=[settings.REDIS_CONNECTION], prefix="test-heartbeat")
+
+        async def discard():
+            for channel_name in ["first", "second", "third"]:
+                await channel_layer.group_add("tenant_1", channel_name)
+            await channel_layer.group_add("tenant_1.billing", "first")
+
+            await group_discard_many(channel_layer, {"tenant_1": ["first", "second"], "tenant_1.billing": ["first"]})
+
+            connection = channel_layer.connection(0)
+            members = {
+                group: await connection.zrange(channel_layer._group_key(group), 0, -1)
+                for group in ["tenant_1", "tenant_1.billing"]
+            }
+            await connection.delete(*(channel_layer._group_key(group) for group in members))
+            await channel_layer.close_pools()
+            return members
+
+        assert async_to_sync(discard)() == {"tenant_1": [b"third"], "tenant_1.billing": []}
@@ -0,0 +1,67 @@
+import runpy
+from collections import Counter
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+
+from ..layers import HashRing, RedisChannelLayer, RedisPubSubChannelLayer
+
+pytestmark = pytest.mark.django_db
+
+HOSTS = [{"address": f"redis://redis-{index}:6379"} for index in range(4)]
+NAMES = [f"tenant_{index}" for index in range(10_000)]
+
+
+def get_hosts(ring: HashRing, hosts: list[dict]) -> dict[str, str]:
+    return {name: hosts[ring.get_index(name)]["address"] for name in NAMES}
+
+
+class TestHashRing:
+    def test_names_are_spread_over_hosts(self):
+        counts = Counter(get_hosts(HashRing(HOSTS), HOSTS).values())
+
+        assert len(counts) == len(HOSTS)
+        assert max(counts.values()) < len(NAMES) / len(HOSTS) * 1.3
+
+    def test_added_host_takes_over_its_share_only(self):
+        before = get_hosts(HashRing(HOSTS[:3]), HOSTS[:3])
+        after = get_hosts(HashRing(HOSTS), HOSTS)
+
+        moved = [name for name in NAMES if before[name] != after[name]]
+        assert {after[name] for name in moved} == {HOSTS[3]["address"]}
+        assert len(moved) < len(NAMES) / len(HOSTS) * 1.3
+
+    def test_hosts_are_identified_by_address(self):
+        reversed_hosts = HOSTS[::-1]
+
+        assert get_hosts(HashRing(HOSTS), HOSTS) == get_hosts(HashRing(reversed_hosts), reversed_hosts)
+
+    def test_single_host(self):
+        assert HashRing(HOSTS[:1]).get_index("tenant_1") == 0
+
+
+class TestChannelLayers:
+    def test_core_layer_shards_by_ring(self):
+        layer = RedisChannelLayer(hosts=[host["address"] for host in HOSTS])
+
+        assert [layer.consistent_hash(name) for name in NAMES[:100]] == [
+            HashRing(HOSTS).get_index(name) for name in NAMES[:100]
+        ]
+
+    def test_pubsub_layer_shards_by_ring(self):
+        channel_layer = RedisPubSubChannelLayer(hosts=[host["address"] for host in HOSTS])
+
+        async def get_shard_indexes():
+            layer = channel_layer._get_layer()
+            indexes = [layer._shards.index(layer._get_shard(name)) for name in NAMES[:100]]
+            await channel_layer.flush()
+            return indexes
+
+        assert async_to_sync(get_shard_indexes)() == [HashRing(HOSTS).get_index(name) for name in NAMES[:100]]
+
+    def test_unknown_mode_is_improperly_configured(self, monkeypatch):
+        monkeypatch.setenv("CHANNEL_LAYER_MODE", "unknown")
+
+        with pytest.raises(ImproperlyConfigured, match="CHANNEL_LAYER_MODE"):
+            runpy.run_module("config.settings")
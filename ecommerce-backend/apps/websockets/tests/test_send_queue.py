@@ -0,0 +1,63 @@
+import pytest
+from asgiref.sync import async_to_sync
+
+from ..send_queue import SendQueue, SendQueueOverflow, SendQueuePolicy, send_queue_metrics
+
+pytestmark = pytest.mark.django_db
+
+
+class TestSendQueue:
+    @pytest.mark.parametrize("policy", [SendQueuePolicy.COALESCE, SendQueuePolicy.DROP_OLDEST])
+    def test_full_queue_drops_oldest_frame(self, policy):
+        queue = SendQueue(2, policy)
+
+        for frame in ["first", "second", "third"]:
+            queue.put(frame)
+
+        assert list(queue) == ["second", "third"]
+
+    def test_keyed_frame_replaces_queued_one(self):
+        queue = SendQueue(3, SendQueuePolicy.COALESCE)
+
+        queue.put("count-1", "unread_count")
+        queue.put("first")
+        queue.put("count-2", "unread_count")
+
+        assert list(queue) == ["first", "count-2"]
+
+    def test_keys_are_ignored_unless_coalescing(self):
+        queue = SendQueue(3, SendQueuePolicy.DROP_OLDEST)
+
+        queue.put("count-1", "unread_count")
+        queue.put("count-2", "unread_count")
+
+        assert list(queue) == ["count-1", "count-2"]
+
+    def test_full_queue_overflows_when_disconnecting(self):
+        queue = SendQueue(1, SendQueuePolicy.DISCONNECT)
+        queue.put("first")
+
+        with pytest.raises(SendQueueOverflow):
+            queue.put("second")
+        assert len(queue) == 0
+
+    def test_frames_are_got_in_order(self):
+        queue = SendQueue(3, SendQueuePolicy.COALESCE)
+        queue.put("first")
+        queue.put("second")
+
+        async def get_all():
+            return [await queue.get(), await queue.get()]
+
+        assert async_to_sync(get_all)() == ["first", "second"]
+
+    def test_metrics_report_queue_depths(self):
+        queues = [SendQueue(10, SendQueuePolicy.COALESCE) for _ in range(2)]
+        for frame in ["first", "second", "third"]:
+            queues[0].put(frame)
+        queues[1].put("first")
+        metrics = send_queue_metrics.metrics()
+
+        assert metrics["connections"] >= 2
+        assert metrics["queued"] >= 4
+        assert metrics["max_depth"] >= 3
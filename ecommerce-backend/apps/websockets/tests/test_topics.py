@@ -0,0 +1,54 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.notifications.publisher import notification_publisher
+
+from ..topics import get_topic_group_name, publish_topic_event
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+class TestTopics:
+    @pytest.mark.parametrize(
+        "topic, group_name",
+        [
+            ("content:article", "topic.content.article"),
+            ("order:42", "tenant_{tenant}.order.42"),
+            ("billing", "tenant_{tenant}.billing"),
+        ],
+    )
+    def test_topic_has_group_of_its_own(self, tenant, topic, group_name):
+        assert get_topic_group_name(topic, tenant.pk) == group_name.format(tenant=tenant.pk)
+
+    @pytest.mark.parametrize(
+        "topic", ["unknown:1", "content", "billing:1", "order:1:2", "order:a b", "content:" + "x" * 65, "order:1\n", 1]
+    )
+    def test_invalid_topic_has_no_group(self, tenant, topic):
+        assert get_topic_group_name(topic, tenant.pk) is None
+
+    def test_tenant_topic_needs_tenant(self):
+        assert get_topic_group_name("billing") is None
+        assert get_topic_group_name("billing", "invalid") is None
+        assert get_topic_group_name("content:article") == "topic.content.article"
+
+    def test_event_is_published_to_topic_group_only(self, tenant):
+        channel_layer = get_channel_layer()
+        subscribed, other = (async_to_sync(channel_layer.new_channel)() for _ in range(2))
+        async_to_sync(channel_layer.group_add)(get_topic_group_name("order:1", tenant.pk), subscribed)
+        async_to_sync(channel_layer.group_add)(get_topic_group_name("order:2", tenant.pk), other)
+
+        publish_topic_event("order:1", "order_update", {"status": "paid"}, tenant_id=tenant.pk)
+        notification_publisher.flush()
+
+        assert async_to_sync(channel_layer.receive)(subscribed) == {
+            "type": "notification_frames",
+            "frames": ['{"type":"order_update","topic":"order:1","data":{"status":"paid"}}'],
+            "keys": [None],
+        }
+        assert other not in channel_layer.channels
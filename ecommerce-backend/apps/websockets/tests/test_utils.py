@@ -0,0 +1,50 @@
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.notifications.publisher import get_update_message, notification_publisher
+
+from ..utils import send_tenant_update, send_update, send_user_notification
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+def receive(group: str, send) -> dict:
+    channel_layer = get_channel_layer()
+    channel_name = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(group, channel_name)
+    send()
+    notification_publisher.flush()
+    return async_to_sync(channel_layer.receive)(channel_name)
+
+
+class TestSendUpdate:
+    def test_update_is_sent_encoded(self):
+        message = receive("tenant_1", lambda: send_update("tenant_1", "tenant_update", {"name": "Tenant"}))
+
+        assert message == get_update_message("tenant_update", {"name": "Tenant"})
+
+    def test_user_notification_is_sent_to_user_group(self, user):
+        message = receive(
+            f"notifications_user_{user.id}",
+            lambda: send_user_notification(user.id, "order_update", {"order_id": 1, "status": "shipped"}),
+        )
+
+        assert message == get_update_message("order_update", {"order_id": 1, "status": "shipped"})
+
+    def test_tenant_update_is_sent_to_tenant_group(self):
+        message = receive("tenant_1", lambda: send_tenant_update(1, {"name": "Renamed"}))
+
+        assert message == get_update_message("tenant_update", {"id": "1", "name": "Renamed"}, key="tenant")
+
+    def test_update_is_published_by_notification_publisher(self, mocker):
+        publish_message = mocker.patch.object(notification_publisher, "publish_message")
+
+        send_update("tenant_1", "tenant_update", {})
+
+        publish_message.assert_called_once_with("tenant_1", get_update_message("tenant_update", {}))
@@ -0,0 +1,48 @@
+import logging
+import re
+
+from apps.multitenancy.cache import tenant_context_cache
+from apps.notifications.publisher import encode_frame, notification_publisher
+
+logger = logging.getLogger(__name__)
+
+TOPIC_RE = re.compile(r"(?P<kind>[a-z]+)(?::(?P<argument>[A-Za-z0-9_-]{1,64}))?")
+
+# Kinds of topics a WebSocket client can subscribe to, e.g. ``content:article``, ``order:42`` or ``billing``, and
+# whether they take an argument. Content isn't tenant specific, so content topics are shared by all tenants; the other
+# ones are topics of the connection's tenant.
+TOPIC_KINDS = {"content": True, "order": True, "billing": False}
+SHARED_TOPIC_KINDS = {"content"}
+
+
+def get_topic_group_name(topic: str, tenant_id=None) -> str | None:
+    """
+    The channel layer group of ``topic``, or ``None`` when the topic is unknown or is a tenant topic and ``tenant_id``
+    isn't a valid tenant id.
+    """
+    match = TOPIC_RE.fullmatch(topic) if isinstance(topic, str) else None
+    if match is None or TOPIC_KINDS.get(match["kind"]) != (match["argument"] is not None):
+        return None
+
+    # Group names may only contain ASCII letters, digits, hyphens, underscores and periods
+    name = topic.replace(":", ".")
+    if match["kind"] in SHARED_TOPIC_KINDS:
+        return f"topic.{name}"
+
+    tenant_pk = tenant_context_cache.normalize_tenant_id(tenant_id)
+    if tenant_pk is None:
+        return None
+    return f"tenant_{tenant_pk}.{name}"
+
+
+def publish_topic_event(topic: str, event_type: str, data: dict, tenant_id=None, key: str = None):
+    """
+    Sends a ``{"type": event_type, "topic": topic, "data": data}`` frame to the connections subscribed to the topic.
+    Frames published with the same ``key`` within the publisher's window are coalesced, the last one is sent.
+    """
+    group = get_topic_group_name(topic, tenant_id)
+    if group is None:
+        logger.warning(f"Event {event_type} of invalid topic {topic!r} wasn't published")
+        return
+
+    notification_publisher.publish(group, encode_frame({"type": event_type, "topic": topic, "data": data}), key=key)
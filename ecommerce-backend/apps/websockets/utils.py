@@ -0,0 +1,22 @@
+from apps.notifications.publisher import get_update_message, notification_publisher
+
+
+def send_update(group: str, event_type: str, data: dict, key: str = None):
+    """
+    Sends an update handled by the consumers' ``event_type`` handler, e.g. ``tenant_update``, to the connections of
+    ``group``. Its frame is encoded once here, see ``get_update_message``, and it's sent from the loop of
+    ``notification_publisher``.
+    """
+    notification_publisher.publish_message(group, get_update_message(event_type, data, key))
+
+
+def send_user_notification(user_id, notification_type: str, data: dict, key: str = None):
+    """
+    Sends an update, e.g. ``order_update`` or ``payment_update``, to the notification connections of a user.
+    """
+    send_update(f"notifications_user_{user_id}", notification_type, data, key)
+
+
+def send_tenant_update(tenant_id, data: dict):
+    # Clients refetch the tenant on every update, so a connection which is behind only needs the latest one
+    send_update(f"tenant_{tenant_id}", "tenant_update", {"id": str(tenant_id), **data}, key="tenant")
@@ -0,0 +1,93 @@
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    seconds: float
+    queries: int
+
+    @property
+    def per_second(self) -> float:
+        return self.iterations / self.seconds if self.seconds else float("inf")
+
+    @property
+    def microseconds_per_iteration(self) -> float:
+        return self.seconds / self.iterations * 1_000_000 if self.iterations else 0.0
+
+    @property
+    def queries_per_iteration(self) -> float:
+        return self.queries / self.iterations if self.iterations else 0.0
+
+
+def run_benchmark(name: str, func: Callable[[], object], iterations: int) -> BenchmarkResult:
+    with CaptureQueriesContext(connection) as queries:
+        started_at = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        seconds = time.perf_counter() - started_at
+
+    return BenchmarkResult(name=name, iterations=iterations, seconds=seconds, queries=len(queries))
+
+
+def run_batch_benchmark(name: str, func: Callable[[], object], iterations: int) -> BenchmarkResult:
+    """
+    Measures a single call of ``func`` which processes ``iterations`` items at once, e.g. a bulk operation.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        started_at = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - started_at
+
+    return BenchmarkResult(name=name, iterations=iterations, seconds=seconds, queries=len(queries))
+
+
+@contextmanager
+def rolled_back_transaction() -> Iterator[None]:
+    """
+    Benchmarks seed their own data; everything written inside this block is discarded afterwards.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Base class for ``benchmark_*`` management commands.
+
+    Subclasses implement ``run_benchmarks`` and return a list of ``BenchmarkResult`` which is printed as a table.
+    """
+
+    default_iterations = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=self.default_iterations)
+
+    def run_benchmarks(self, iterations: int, **options) -> list[BenchmarkResult]:
+        raise NotImplementedError("Subclasses of BenchmarkCommand must provide a run_benchmarks() method")
+
+    def handle(self, *args, **options):
+        results = self.run_benchmarks(**options)
+        self.write_results(results)
+
+    def write_results(self, results: list[BenchmarkResult]):
+        name_width = max([len(result.name) for result in results] + [len("benchmark")])
+        self.stdout.write(
+            f"{'benchmark':<{name_width}}  {'iterations':>10}  {'total [s]':>10}  {'per op [us]':>12}  "
+            f"{'ops/s':>12}  {'queries/op':>10}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result.name:<{name_width}}  {result.iterations:>10}  {result.seconds:>10.3f}  "
+                f"{result.microseconds_per_iteration:>12.1f}  {result.per_second:>12.1f}  "
+                f"{result.queries_per_iteration:>10.2f}"
+            )
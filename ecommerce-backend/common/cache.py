@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+MISSING = object()
+
+
+class LocalTTLCache:
+    """
+    Small thread-safe in-process LRU cache with per-entry expiry.
+
+    It is meant to sit in front of the shared Redis cache for hot, tiny values that are read on nearly every request.
+    Entries are not invalidated across processes, so the TTL is the upper bound on how stale another worker can be.
+    """
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout: float | None = None):
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheStats(Counter):
+    """
+    Hit/miss counters of a cache layer. Counters are per process and are reset on restart.
+    """
+
+    def hit_ratio(self, hits_keys=("local_hits", "shared_hits"), miss_key="misses") -> float:
+        hits = sum(self[key] for key in hits_keys)
+        total = hits + self[miss_key]
+        return hits / total if total else 0.0
@@ -0,0 +1,258 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = "./email/worker.js"
+STDERR_TAIL_LINES = 50
+
+_EXITED = object()
+
+
+class EmailRendererError(Exception):
+    def __init__(self, message, stderr=""):
+        super().__init__(message)
+        self.stderr = stderr
+
+
+class _WorkerCrashed(EmailRendererError):
+    pass
+
+
+def get_renderer_env() -> dict:
+    # Environmental variables are mapped manually to avoid secret values from being exposed to email renderer
+    # script that is usually maintained by non-backend developers
+    return {
+        "DEBUG": str(settings.DEBUG),
+        "VITE_EMAIL_ASSETS_URL": os.environ.get("VITE_EMAIL_ASSETS_URL", ""),
+        "VITE_WEB_APP_URL": os.environ.get("VITE_WEB_APP_URL", ""),
+    }
+
+
+def get_node_binary() -> str:
+    return shutil.which(settings.EMAIL_RENDERER_NODE_BINARY) or settings.EMAIL_RENDERER_NODE_BINARY
+
+
+class SubprocessEmailRenderer:
+    """
+    Starts a new node process for every rendered email. Used when the renderer pool is disabled.
+    """
+
+    RENDER_SCRIPT = """
+    const { renderEmail } = require('./email');
+    console.log(JSON.stringify(renderEmail('%s', %s)));
+    process.exit(0);
+    """
+
+    def __init__(self, cwd: str = None):
+        self.cwd = cwd or settings.EMAIL_RENDERER_WORKING_DIR
+
+    def render(self, email_type: str, email_data: dict) -> dict:
+        render_script = self.RENDER_SCRIPT % (email_type, json.dumps(email_data))
+        try:
+            node_process = subprocess.run(
+                [get_node_binary()],
+                input=bytes(render_script, "utf-8"),
+                capture_output=True,
+                check=True,
+                cwd=self.cwd,
+                env=get_renderer_env(),
+            )
+        except subprocess.CalledProcessError as e:
+            raise EmailRendererError(f"Email renderer exited with code {e.returncode}", stderr=e.stderr.decode())
+
+        return json.loads(node_process.stdout)
+
+    def render_many(self, emails: list[tuple[str, dict]]) -> list[dict]:
+        return [self.render(email_type, email_data) for email_type, email_data in emails]
+
+    def close(self):
+        pass
+
+
+class EmailRendererProcess:
+    """
+    A single long-lived node process running ``scripts/runtime/email/worker.js``.
+
+    Requests and responses are newline-delimited JSON. Responses are read by a background thread, so every request
+    can wait for its answer with a timeout. The process is started again transparently when it dies.
+    """
+
+    def __init__(self, cwd: str = None, timeout: float = None):
+        self.cwd = cwd or settings.EMAIL_RENDERER_WORKING_DIR
+        self.timeout = timeout or settings.EMAIL_RENDERER_TIMEOUT
+        self.restarts = -1
+        self._process = None
+        self._responses = None
+        self._stderr = deque(maxlen=STDERR_TAIL_LINES)
+        self._ids = itertools.count()
+
+    @property
+    def stderr(self) -> str:
+        return "".join(self._stderr)
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        self.stop()
+        self._responses = queue.Queue()
+        self._process = subprocess.Popen(
+            [get_node_binary(), WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=get_renderer_env(),
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self.restarts += 1
+        threading.Thread(target=self._read_stdout, args=(self._process, self._responses), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self._process,), daemon=True).start()
+
+    def stop(self):
+        if self._process is None:
+            return
+
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    def ping(self) -> bool:
+        try:
+            return self._request({"ping": True}) == "pong"
+        except EmailRendererError:
+            return False
+
+    def render(self, email_type: str, email_data: dict) -> dict:
+        try:
+            return self._request({"type": email_type, "data": email_data})
+        except _WorkerCrashed:
+            # Rendering has no side effects, so it is safe to retry once on a fresh process
+            logger.warning("Email renderer process crashed, retrying on a new one. stderr: %s", self.stderr)
+            return self._request({"type": email_type, "data": email_data})
+
+    def _request(self, payload: dict):
+        if not self.is_alive():
+            self.start()
+
+        request_id = next(self._ids)
+        try:
+            self._process.stdin.write(json.dumps({"id": request_id, **payload}) + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.stop()
+            raise _WorkerCrashed("Email renderer process is not accepting requests", stderr=self.stderr)
+
+        while True:
+            try:
+                response = self._responses.get(timeout=self.timeout)
+            except queue.Empty:
+                self.stop()
+                raise EmailRendererError(f"Email renderer timed out after {self.timeout}s", stderr=self.stderr)
+
+            if response is _EXITED:
+                self.stop()
+                raise _WorkerCrashed("Email renderer process exited unexpectedly", stderr=self.stderr)
+
+            # Responses to earlier requests that timed out are discarded
+            if response.get("id") == request_id:
+                break
+
+        if "error" in response:
+            raise EmailRendererError(response["error"], stderr=self.stderr)
+
+        return response["result"]
+
+    @staticmethod
+    def _read_stdout(process: subprocess.Popen, responses: queue.Queue):
+        for line in process.stdout:
+            try:
+                responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Unexpected email renderer output: %s", line.rstrip())
+        responses.put(_EXITED)
+
+    def _read_stderr(self, process: subprocess.Popen):
+        for line in process.stderr:
+            self._stderr.append(line)
+
+
+class EmailRendererPool:
+    """
+    Fixed size pool of ``EmailRendererProcess`` instances shared by threads of a single worker process.
+    """
+
+    def __init__(self, size: int = None, cwd: str = None, timeout: float = None):
+        self.size = size or settings.EMAIL_RENDERER_POOL_SIZE
+        self._processes = [EmailRendererProcess(cwd=cwd, timeout=timeout) for _ in range(self.size)]
+        self._idle = queue.Queue()
+        for process in self._processes:
+            self._idle.put(process)
+
+    @property
+    def restarts(self) -> int:
+        return sum(max(process.restarts, 0) for process in self._processes)
+
+    def render(self, email_type: str, email_data: dict) -> dict:
+        process = self._idle.get()
+        try:
+            return process.render(email_type, email_data)
+        finally:
+            self._idle.put(process)
+
+    def render_many(self, emails: list[tuple[str, dict]]) -> list[dict]:
+        """
+        Renders emails in parallel on all processes of the pool; results are returned in the order of ``emails``.
+        """
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(lambda email: self.render(*email), emails))
+
+    def health_check(self) -> int:
+        """
+        Pings idle processes, restarting the ones that don't answer. Returns the number of healthy processes.
+        """
+        healthy = 0
+        for _ in range(self.size):
+            process = self._idle.get()
+            try:
+                if not process.ping():
+                    process.start()
+                    if not process.ping():
+                        continue
+                healthy += 1
+            finally:
+                self._idle.put(process)
+        return healthy
+
+    def close(self):
+        for process in self._processes:
+            process.stop()
+
+
+@lru_cache
+def get_email_renderer() -> EmailRendererPool | SubprocessEmailRenderer:
+    if settings.EMAIL_RENDERER_POOL_SIZE <= 0:
+        return SubprocessEmailRenderer()
+
+    pool = EmailRendererPool()
+    atexit.register(pool.close)
+    return pool
@@ -1,11 +1,13 @@
-import json
-import os
-import subprocess
+import logging
 
 from celery import shared_task, states
 from celery.exceptions import Ignore
 from django.conf import settings
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
+
+from .email_renderer import EmailRendererError, get_email_renderer
+
+logger = logging.getLogger(__name__)
 
 
 class BaseEmail:
@@ -38,6 +40,11 @@ class Email(BaseEmail):
             self.data = {}
 
     def send(self, due_date=None):
+        """
+        Queues the email in the outbox; it's sent by the outbox relay once the current transaction is committed.
+        """
+        from apps.notifications.outbox import enqueue_email
+
         send_data = None
 
         serializer = self.get_serializer(data=self.data)
@@ -46,58 +53,73 @@ class Email(BaseEmail):
             send_data = serializer.data
 
         # TODO: Handle due_date
-        send_email.apply_async((self.to, self.name, send_data))
+        enqueue_email(self.to, self.name, send_data)
 
 
-@shared_task(bind=True)
-def send_email(self, to: str | list[str], email_type: str, email_data: dict):
-    render_script = """
-    const { renderEmail } = require('./email');
-    console.log(JSON.stringify(renderEmail('%s', %s)));
-    process.exit(0);
-    """ % (
-        email_type,
-        json.dumps(email_data),
+def get_email_message(to: str | list[str], rendered_email: dict, connection=None) -> EmailMessage:
+    if isinstance(to, str):
+        to = (to,)
+
+    email = EmailMessage(
+        rendered_email["subject"],
+        rendered_email["html"],
+        settings.EMAIL_FROM_ADDRESS,
+        to,
+        reply_to=settings.EMAIL_REPLY_ADDRESS,
+        connection=connection,
     )
+    email.content_subtype = "html"
+    return email
 
+
+@shared_task(bind=True)
+def send_email(self, to: str | list[str], email_type: str, email_data: dict):
     try:
-        node_process = subprocess.run(
-            ["node"],
-            shell=True,
-            input=bytes(render_script, "utf-8"),
-            capture_output=True,
-            check=True,
-            cwd="/app/scripts/runtime",
-            # Environmental variables are mapped manually to avoid secret values from being exposed to email renderer
-            # script that is usually maintained by non-backend developers
-            env={
-                "DEBUG": str(settings.DEBUG),
-                "VITE_EMAIL_ASSETS_URL": os.environ.get("VITE_EMAIL_ASSETS_URL", ""),
-                "VITE_WEB_APP_URL": os.environ.get("VITE_WEB_APP_URL", ""),
-            },
-        )
-    except subprocess.CalledProcessError as e:
+        rendered_email = get_email_renderer().render(email_type, email_data)
+    except EmailRendererError as e:
         self.update_state(
             state=states.FAILURE,
             meta={
-                "return_code": e.returncode,
-                "cmd": e.cmd,
-                "output": e.output,
+                "error": str(e),
                 "stderr": e.stderr,
             },
         )
         raise Ignore()
 
-    if isinstance(to, str):
-        to = (to,)
+    return {"sent_emails_count": get_email_message(to, rendered_email).send()}
 
-    rendered_email = json.loads(node_process.stdout)
-    email = EmailMessage(
-        rendered_email["subject"],
-        rendered_email["html"],
-        settings.EMAIL_FROM_ADDRESS,
-        to,
-        reply_to=settings.EMAIL_REPLY_ADDRESS,
-    )
-    email.content_subtype = "html"
-    return {"sent_emails_count": email.send()}
+
+def _render_emails(emails: list[tuple]) -> list[dict | None]:
+    renderer = get_email_renderer()
+    try:
+        return renderer.render_many([(email_type, email_data) for _, email_type, email_data in emails])
+    except EmailRendererError:
+        pass
+
+    # One of the emails can't be rendered, render them one by one to send all the others
+    rendered_emails = []
+    for to, email_type, email_data in emails:
+        try:
+            rendered_emails.append(renderer.render(email_type, email_data))
+        except EmailRendererError as e:
+            logger.error(f"Error rendering {email_type} email to {to}: {e}\n{e.stderr}")
+            rendered_emails.append(None)
+    return rendered_emails
+
+
+@shared_task
+def send_emails(emails: list[tuple]):
+    """
+    Sends a batch of ``(to, email_type, email_data)`` emails dispatched by the outbox relay. Emails are rendered
+    concurrently and sent over a single connection; an email which can't be rendered is skipped.
+    """
+    rendered_emails = _render_emails(emails)
+    with get_connection() as connection:
+        messages = [
+            get_email_message(to, rendered_email, connection=connection)
+            for (to, _, _), rendered_email in zip(emails, rendered_emails, strict=True)
+            if rendered_email is not None
+        ]
+        sent_emails_count = connection.send_messages(messages) if messages else 0
+
+    return {"sent_emails_count": sent_emails_count, "failed_emails_count": len(emails) - len(messages)}
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReadinessStatus:
+    migrations: bool
+    database: bool
+    redis: bool
+    checked_at: float
+
+    @property
+    def is_ready(self) -> bool:
+        return self.migrations and self.database and self.redis
+
+
+class ReadinessCheck:
+    """
+    Cached readiness of the application: all migrations applied, database and redis reachable.
+
+    Probes only read the last status and never do any I/O themselves. A stale status is refreshed by a background
+    thread; the migration plan, which requires loading all migration modules, is computed only every
+    ``HEALTH_CHECK_MIGRATIONS_INTERVAL`` seconds, or every ``HEALTH_CHECK_MIGRATIONS_RETRY_INTERVAL`` seconds while
+    migrations are pending. A refresh that hangs for longer than ``HEALTH_CHECK_TIMEOUT``, plus
+    ``HEALTH_CHECK_MIGRATIONS_TIMEOUT`` when it computes the migration plan, marks the application as not ready, so a
+    dead database is reported even if the driver never times out, and is replaced by a new one once the status is
+    stale.
+    """
+
+    def __init__(self):
+        self._status = None
+        self._migrations = False
+        self._migrations_checked_at = None
+        self._refresh_started_at = None
+        self._refresh_timeout = 0.0
+        self._lock = threading.Lock()
+        self._redis = None
+
+    @property
+    def status(self) -> ReadinessStatus | None:
+        return self._status
+
+    def is_ready(self) -> bool:
+        now = time.monotonic()
+        status = self._status
+        if status is None or now - status.checked_at > settings.HEALTH_CHECK_INTERVAL:
+            self.refresh_in_background()
+
+        refresh_started_at = self._refresh_started_at
+        if refresh_started_at is not None and now - refresh_started_at > self._refresh_timeout:
+            return False
+
+        return status is not None and status.is_ready
+
+    def is_migration_check_due(self, now: float) -> bool:
+        if self._migrations_checked_at is None:
+            return True
+
+        if self._migrations:
+            interval = settings.HEALTH_CHECK_MIGRATIONS_INTERVAL
+        else:
+            interval = settings.HEALTH_CHECK_MIGRATIONS_RETRY_INTERVAL
+        return now - self._migrations_checked_at > interval
+
+    def refresh(self, with_migrations: bool = None) -> ReadinessStatus:
+        """
+        Computes the migration plan too when ``with_migrations`` is set or, if it's ``None``, when it's due.
+        """
+        now = time.monotonic()
+        if with_migrations is None:
+            with_migrations = self.is_migration_check_due(now)
+        if with_migrations:
+            self._migrations = self.check_migrations()
+            self._migrations_checked_at = now
+
+        self._status = ReadinessStatus(
+            migrations=self._migrations,
+            database=self.ping_database(),
+            redis=self.ping_redis(),
+            checked_at=time.monotonic(),
+        )
+        return self._status
+
+    def refresh_in_background(self):
+        now = time.monotonic()
+        with self._lock:
+            refresh_started_at = self._refresh_started_at
+            if refresh_started_at is not None and now - refresh_started_at <= self._refresh_timeout:
+                return
+            with_migrations = self.is_migration_check_due(now)
+            self._refresh_started_at = now
+            self._refresh_timeout = settings.HEALTH_CHECK_TIMEOUT
+            if with_migrations:
+                self._refresh_timeout += settings.HEALTH_CHECK_MIGRATIONS_TIMEOUT
+
+        if refresh_started_at is not None:
+            logger.warning(f"Readiness check refresh hung for {now - refresh_started_at:.1f}s, starting a new one")
+        threading.Thread(
+            target=self._background_refresh, args=(now, with_migrations), name="readiness-check", daemon=True
+        ).start()
+
+    def clear(self):
+        self._status = None
+        self._migrations = False
+        self._migrations_checked_at = None
+        self._refresh_started_at = None
+        self._refresh_timeout = 0.0
+
+    def _background_refresh(self, started_at: float, with_migrations: bool = None):
+        try:
+            self.refresh(with_migrations)
+        except Exception:
+            logger.exception("Readiness check failed")
+        finally:
+            # A hung refresh which was replaced by a new one must not mark that one as finished
+            with self._lock:
+                if self._refresh_started_at == started_at:
+                    self._refresh_started_at = None
+            # Connections are per thread, don't leave one open for every refresh
+            connections[DEFAULT_DB_ALIAS].close()
+
+    @staticmethod
+    def check_migrations() -> bool:
+        try:
+            executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+            return not executor.migration_plan(executor.loader.graph.leaf_nodes())
+        except Exception as e:
+            logger.warning(f"Readiness check could not compute migration plan: {e}")
+            return False
+
+    @staticmethod
+    def ping_database() -> bool:
+        try:
+            with transaction.atomic(), connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                # SET LOCAL, the timeout ends with the transaction
+                cursor.execute(
+                    "SELECT set_config('statement_timeout', %s, true)", [f"{settings.HEALTH_CHECK_TIMEOUT * 1000:.0f}"]
+                )
+                cursor.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Readiness check database ping failed: {e}")
+            return False
+
+    def ping_redis(self) -> bool:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                settings.REDIS_CONNECTION,
+                socket_timeout=settings.HEALTH_CHECK_TIMEOUT,
+                socket_connect_timeout=settings.HEALTH_CHECK_TIMEOUT,
+            )
+
+        try:
+            return bool(self._redis.ping())
+        except redis.RedisError as e:
+            logger.warning(f"Readiness check redis ping failed: {e}")
+            return False
+
+
+readiness_check = ReadinessCheck()
@@ -0,0 +1,29 @@
+from common.benchmarks import BenchmarkCommand, run_batch_benchmark
+from common.email_renderer import EmailRendererPool, SubprocessEmailRenderer
+
+
+class Command(BenchmarkCommand):
+    help = "Measure email rendering throughput of a node process per email versus the persistent renderer pool"
+
+    default_iterations = 100
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--email-type", default="ACCOUNT_ACTIVATION")
+        parser.add_argument("--pool-size", type=int, default=None)
+
+    def run_benchmarks(self, iterations: int, email_type: str, pool_size: int, **options):
+        emails = [(email_type, {"user_id": "benchmark", "token": f"token-{index}"}) for index in range(iterations)]
+
+        pool = EmailRendererPool(size=pool_size)
+        try:
+            # Processes are started lazily, warm them up so boot time isn't part of the measurement
+            pool.health_check()
+            return [
+                run_batch_benchmark(
+                    "node process per email", lambda: SubprocessEmailRenderer().render_many(emails), len(emails)
+                ),
+                run_batch_benchmark(f"renderer pool (size {pool.size})", lambda: pool.render_many(emails), len(emails)),
+            ]
+        finally:
+            pool.close()
@@ -0,0 +1,34 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from common.benchmarks import BenchmarkCommand, run_benchmark
+from common.health import readiness_check
+from common.middleware import HealthCheckMiddleware
+
+
+def _legacy_readiness():
+    """
+    /lbcheck as it was before the readiness check was cached: a migration plan computed on every probe.
+    """
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    return not executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+class Command(BenchmarkCommand):
+    help = "Measure latency of load balancer probes"
+
+    def run_benchmarks(self, iterations: int, **options):
+        middleware = HealthCheckMiddleware(lambda request: HttpResponse())
+        request_factory = RequestFactory()
+        liveness_request = request_factory.get(HealthCheckMiddleware.LIVENESS_PATH)
+        readiness_request = request_factory.get(HealthCheckMiddleware.READINESS_PATHS[0])
+
+        readiness_check.refresh()
+        return [
+            run_benchmark("legacy readiness (migration plan)", _legacy_readiness, max(iterations // 100, 1)),
+            run_benchmark("background refresh (pings)", readiness_check.refresh, max(iterations // 100, 1)),
+            run_benchmark("readiness probe (cached)", lambda: middleware(readiness_request), iterations),
+            run_benchmark("liveness probe", lambda: middleware(liveness_request), iterations),
+        ]
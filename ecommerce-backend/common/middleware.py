@@ -1,5 +1,3 @@
-from django.db import DEFAULT_DB_ALIAS, connections
-from django.db.migrations.executor import MigrationExecutor
 from django.http import HttpResponse
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework import status
@@ -8,17 +6,28 @@ from sentry_sdk import capture_exception
 from apps.users.utils import reset_auth_cookie, set_auth_cookie
 from config import settings
 
+from .health import readiness_check
+
 
 class HealthCheckMiddleware(MiddlewareMixin):
+    """
+    Load balancer probes:
+    - LIVENESS_PATH answers as long as the process serves requests
+    - READINESS_PATHS answer 503 until migrations are applied and database and redis are reachable, see ReadinessCheck
+    """
+
+    LIVENESS_PATH = "/lbcheck/live"
+    READINESS_PATHS = ("/lbcheck", "/lbcheck/ready")
+
     def process_request(self, request):
-        if request.META["PATH_INFO"] == "/lbcheck":
-            response = HttpResponse()
+        path = request.META["PATH_INFO"]
+        if path == self.LIVENESS_PATH:
+            return HttpResponse()
 
-            executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
-            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
-            if plan:
+        if path in self.READINESS_PATHS:
+            response = HttpResponse()
+            if not readiness_check.is_ready():
                 response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-
             return response
 
 
@@ -0,0 +1,192 @@
+import datetime
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from hashids import Hashids
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.UTC)
+
+
+def estimate_count(queryset) -> int:
+    """
+    Row count estimated by the PostgreSQL planner, which costs the same no matter how many rows match.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        (plan,) = cursor.fetchone()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination which only ever uses a keyset condition on the ordering fields, so every page, however deep,
+    is read from an index on them the same way the first one is. Unlike ``CursorPagination`` no offset is kept for
+    rows with equal positions: the ordering has to be unique, which the primary key as its last field guarantees.
+
+    Views set ``keyset_ordering`` when their natural ordering isn't ``("-created_at", "-id")``. Only integer, hashid
+    and datetime fields can be ordered by. Cursors are encoded with a salt derived from ``HASHID_FIELD_SALT``, so they
+    are opaque to clients just like the ids are.
+
+    ``?with_count=true`` adds the total count of rows. It's estimated by the planner unless there are fewer than
+    ``PAGINATION_EXACT_COUNT_THRESHOLD`` rows, so it costs the same on tables of any size.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    count_query_param = "with_count"
+    invalid_cursor_message = "Invalid cursor"
+
+    @cached_property
+    def hashids(self) -> Hashids:
+        return Hashids(salt=f"{settings.HASHID_FIELD_SALT}:cursor", min_length=16)
+
+    def get_ordering(self, request, queryset, view) -> tuple[str, ...]:
+        return tuple(getattr(view, "keyset_ordering", self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        reverse, position = cursor if cursor else (False, None)
+
+        ordering = [self._reverse(name) for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._get_keyset_condition(ordering, position))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = cursor is not None if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        return self.page
+
+    def get_count(self, queryset, request) -> int | None:
+        if request.query_params.get(self.count_query_param, "").lower() not in ("1", "true"):
+            return None
+
+        count = estimate_count(queryset)
+        if count < settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+            return queryset.count()
+        return count
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        return self._get_link(reverse=False, instance=self.page[-1])
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Past the last row, e.g. after it was deleted; the first page is the closest there's left
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._get_link(reverse=True, instance=self.page[0])
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict([("next", self.get_next_link()), ("previous", self.get_previous_link())])
+        if self.count is not None:
+            response_data["count"] = self.count
+        response_data["results"] = data
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {"type": "integer", "example": 123}
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Whether to include the total count of results, estimated on large tables.",
+                "schema": {"type": "boolean"},
+            },
+        ]
+
+    def decode_cursor(self, request) -> tuple[bool, list] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        numbers = self.hashids.decode(encoded)
+        if len(numbers) != len(self.fields) + 1 or numbers[0] not in (0, 1):
+            raise NotFound(self.invalid_cursor_message)
+        reverse, *values = numbers
+        return bool(reverse), [
+            self._decode_value(field, value) for field, value in zip(self.fields, values, strict=True)
+        ]
+
+    def encode_cursor(self, reverse: bool, instance) -> str:
+        values = [self._encode_value(getattr(instance, field.attname)) for field in self.fields]
+        return self.hashids.encode(int(reverse), *values)
+
+    def _get_link(self, reverse: bool, instance) -> str:
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(reverse, instance))
+
+    def _get_keyset_condition(self, ordering, position) -> Q:
+        """
+        Rows after ``position`` in ``ordering``: ``(a, b) < (x, y)`` is ``a <= x AND (a < x OR (a = x AND b < y))``.
+        The redundant bound on the first field is what the database uses as the index condition.
+        """
+        names = [name.lstrip("-") for name in ordering]
+        comparisons = ["lt" if name.startswith("-") else "gt" for name in ordering]
+
+        alternatives = []
+        for index, (name, comparison) in enumerate(zip(names, comparisons, strict=True)):
+            equal = [Q(**{names[previous]: position[previous]}) for previous in range(index)]
+            alternatives.append(reduce(and_, [*equal, Q(**{f"{name}__{comparison}": position[index]})]))
+
+        first_bound = Q(**{f"{names[0]}__{comparisons[0]}e": position[0]})
+        return first_bound & reduce(or_, alternatives)
+
+    @staticmethod
+    def _reverse(name: str) -> str:
+        return name[1:] if name.startswith("-") else f"-{name}"
+
+    @staticmethod
+    def _encode_value(value) -> int:
+        if isinstance(value, datetime.datetime):
+            delta = value - EPOCH
+            return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+        return int(getattr(value, "id", value))
+
+    def _decode_value(self, field, value: int):
+        if field.get_internal_type() == "DateTimeField":
+            return EPOCH + datetime.timedelta(microseconds=value)
+        try:
+            return field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,89 @@
+import os
+import shutil
+
+import pytest
+
+from ..email_renderer import WORKER_SCRIPT, EmailRendererError, EmailRendererPool, SubprocessEmailRenderer
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed"),
+]
+
+RUNTIME_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "scripts", "runtime")
+
+STUB_RENDERER = """
+module.exports = {
+  renderEmail: (emailType, emailData) => {
+    if (emailType === 'CRASH') {
+      process.exit(1);
+    }
+    if (emailType === 'FAIL') {
+      throw new Error('Unknown email');
+    }
+    console.log('renderer log line');
+    return { subject: emailType, html: `<p>${JSON.stringify(emailData)}</p>` };
+  },
+};
+"""
+
+
+@pytest.fixture
+def renderer_dir(tmp_path):
+    email_dir = tmp_path / "email"
+    email_dir.mkdir()
+    (email_dir / "index.js").write_text(STUB_RENDERER)
+    shutil.copy(os.path.join(RUNTIME_DIR, WORKER_SCRIPT), email_dir / "worker.js")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def pool(renderer_dir):
+    pool = EmailRendererPool(size=2, cwd=renderer_dir, timeout=5)
+    yield pool
+    pool.close()
+
+
+class TestEmailRendererPool:
+    def test_render(self, pool):
+        rendered = pool.render("ACCOUNT_ACTIVATION", {"token": "test-token"})
+
+        assert rendered == {"subject": "ACCOUNT_ACTIVATION", "html": '<p>{"token":"test-token"}</p>'}
+
+    def test_render_many_keeps_order(self, pool):
+        emails = [("EMAIL", {"index": index}) for index in range(20)]
+
+        rendered = pool.render_many(emails)
+
+        assert [email["html"] for email in rendered] == [f'<p>{{"index":{index}}}</p>' for index in range(20)]
+
+    def test_processes_are_reused(self, pool):
+        pool.render_many([("EMAIL", {})] * 10)
+
+        assert pool.restarts == 0
+
+    def test_renderer_error_is_raised(self, pool):
+        with pytest.raises(EmailRendererError, match="Unknown email"):
+            pool.render("FAIL", {})
+
+        assert pool.render("EMAIL", {})["subject"] == "EMAIL"
+
+    def test_crashed_process_is_restarted(self, pool):
+        pool.render("EMAIL", {})
+
+        with pytest.raises(EmailRendererError):
+            pool.render("CRASH", {})
+
+        assert pool.render("EMAIL", {})["subject"] == "EMAIL"
+        assert pool.restarts >= 1
+
+    def test_health_check(self, pool):
+        assert pool.health_check() == 2
+
+
+class TestSubprocessEmailRenderer:
+    def test_render(self, renderer_dir):
+        renderer = SubprocessEmailRenderer(cwd=renderer_dir)
+
+        with pytest.raises(EmailRendererError):
+            renderer.render("CRASH", {})
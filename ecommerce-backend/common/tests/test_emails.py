@@ -2,7 +2,8 @@ import pytest
 from django.conf import settings
 from django.core import mail
 
-from ..emails import send_email
+from ..email_renderer import EmailRendererError
+from ..emails import send_email, send_emails
 
 pytestmark = pytest.mark.django_db
 
@@ -20,3 +21,41 @@ class TestSendEmail:
         assert sent_email.to == [to]
         assert sent_email.from_email == settings.EMAIL_FROM_ADDRESS
         assert f"http://localhost:3000/en/auth/confirm/{email_data['user_id']}/{email_data['token']}" in sent_email.body
+
+
+class TestSendEmails:
+    @pytest.fixture
+    def renderer(self, mocker):
+        renderer = mocker.patch("common.emails.get_email_renderer").return_value
+        renderer.render_many.side_effect = lambda emails: [
+            {"subject": email_type, "html": str(email_data)} for email_type, email_data in emails
+        ]
+        renderer.render.side_effect = lambda email_type, email_data: {"subject": email_type, "html": str(email_data)}
+        return renderer
+
+    def test_batch_is_sent_over_single_connection(self, renderer, mocker):
+        get_connection = mocker.spy(mail, "get_connection")
+        mocker.patch("common.emails.get_connection", get_connection)
+
+        result = send_emails([("a@example.org", "FIRST", {"a": 1}), (["b@example.org", "c@example.org"], "SECOND", {})])
+
+        assert result == {"sent_emails_count": 2, "failed_emails_count": 0}
+        assert get_connection.call_count == 1
+        assert [(sent_email.to, sent_email.subject) for sent_email in mail.outbox] == [
+            (["a@example.org"], "FIRST"),
+            (["b@example.org", "c@example.org"], "SECOND"),
+        ]
+
+    def test_email_which_cannot_be_rendered_is_skipped(self, renderer):
+        def render(email_type, email_data):
+            if email_type == "BROKEN":
+                raise EmailRendererError("Render failed")
+            return {"subject": email_type, "html": ""}
+
+        renderer.render_many.side_effect = EmailRendererError("Render failed")
+        renderer.render.side_effect = render
+
+        result = send_emails([("a@example.org", "BROKEN", {}), ("b@example.org", "VALID", {})])
+
+        assert result == {"sent_emails_count": 1, "failed_emails_count": 1}
+        assert [sent_email.to for sent_email in mail.outbox] == [["b@example.org"]]
@@ -0,0 +1,174 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from ..health import ReadinessCheck, readiness_check
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_readiness_check():
+    readiness_check.clear()
+    yield
+    readiness_check.clear()
+
+
+@pytest.fixture
+def background_refresh(mocker):
+    return mocker.patch.object(ReadinessCheck, "refresh_in_background")
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+class TestReadinessCheck:
+    def test_refresh(self):
+        status = ReadinessCheck().refresh()
+
+        assert status.migrations
+        assert status.database
+        assert status.redis
+        assert status.is_ready
+
+    def test_pending_migrations(self, mocker):
+        mocker.patch.object(ReadinessCheck, "check_migrations", return_value=False)
+
+        assert not ReadinessCheck().refresh().is_ready
+
+    def test_migration_plan_is_not_computed_on_every_refresh(self, mocker):
+        check_migrations = mocker.spy(ReadinessCheck, "check_migrations")
+        check = ReadinessCheck()
+
+        check.refresh()
+        check.refresh()
+
+        assert check_migrations.call_count == 1
+
+    def test_pending_migrations_are_checked_again_after_retry_interval(self, mocker, settings):
+        check_migrations = mocker.patch.object(ReadinessCheck, "check_migrations", return_value=False)
+        check = ReadinessCheck()
+
+        check.refresh()
+        check.refresh()
+        assert check_migrations.call_count == 1
+
+        settings.HEALTH_CHECK_MIGRATIONS_RETRY_INTERVAL = 0
+        check.refresh()
+        assert check_migrations.call_count == 2
+
+    def test_unreachable_redis(self, settings):
+        settings.REDIS_CONNECTION = "redis://127.0.0.1:1"
+
+        assert not ReadinessCheck().refresh().redis
+
+    def test_database_ping_is_bounded_by_timeout(self, settings):
+        settings.HEALTH_CHECK_TIMEOUT = 1.5
+
+        with CaptureQueriesContext(connection) as queries:
+            assert ReadinessCheck.ping_database()
+
+        assert "SELECT set_config('statement_timeout', '1500', true)" in [query["sql"] for query in queries]
+
+    def test_is_not_ready_before_first_refresh(self, background_refresh):
+        check = ReadinessCheck()
+
+        assert not check.is_ready()
+        background_refresh.assert_called_once()
+
+    def test_is_ready_does_not_run_queries(self, background_refresh, django_assert_num_queries):
+        check = ReadinessCheck()
+        check.refresh()
+
+        with django_assert_num_queries(0):
+            assert check.is_ready()
+
+        background_refresh.assert_not_called()
+
+    def test_stale_status_is_refreshed_in_background(self, background_refresh, settings):
+        check = ReadinessCheck()
+        check.refresh()
+        settings.HEALTH_CHECK_INTERVAL = 0
+
+        assert check.is_ready()
+        background_refresh.assert_called_once()
+
+    def test_hanging_refresh_is_not_ready(self, background_refresh, settings):
+        check = ReadinessCheck()
+        check.refresh()
+        check._refresh_timeout = settings.HEALTH_CHECK_TIMEOUT
+        check._refresh_started_at = time.monotonic() - settings.HEALTH_CHECK_TIMEOUT - 1
+
+        assert not check.is_ready()
+
+    def test_migration_plan_check_has_its_own_timeout(self, mocker, settings):
+        background_refresh = mocker.patch.object(ReadinessCheck, "_background_refresh")
+        check = ReadinessCheck()
+
+        check.refresh_in_background()
+        check._refresh_started_at -= settings.HEALTH_CHECK_TIMEOUT + 1
+
+        assert check._refresh_timeout == settings.HEALTH_CHECK_TIMEOUT + settings.HEALTH_CHECK_MIGRATIONS_TIMEOUT
+        assert background_refresh.call_args.args[1] is True
+        check.refresh_in_background()
+        assert background_refresh.call_count == 1
+
+    def test_pings_are_bounded_by_timeout_once_migrations_are_checked(self, mocker, settings):
+        background_refresh = mocker.patch.object(ReadinessCheck, "_background_refresh")
+        check = ReadinessCheck()
+        check.refresh()
+
+        check._refresh_started_at = time.monotonic() - settings.HEALTH_CHECK_TIMEOUT - 1
+        check._refresh_timeout = settings.HEALTH_CHECK_TIMEOUT
+        check.refresh_in_background()
+
+        assert check._refresh_timeout == settings.HEALTH_CHECK_TIMEOUT
+        assert background_refresh.call_args.args[1] is False
+
+    def test_hanging_refresh_is_replaced(self, mocker, settings):
+        background_refresh = mocker.patch.object(ReadinessCheck, "_background_refresh")
+        check = ReadinessCheck()
+        check.refresh_in_background()
+        check.refresh_in_background()
+        assert background_refresh.call_count == 1
+
+        check._refresh_started_at -= check._refresh_timeout + 1
+        check.refresh_in_background()
+
+        assert background_refresh.call_count == 2
+
+    def test_replaced_refresh_does_not_finish_the_new_one(self, mocker):
+        mocker.patch.object(ReadinessCheck, "refresh")
+        check = ReadinessCheck()
+        check._refresh_started_at = 2.0
+
+        check._background_refresh(started_at=1.0)
+
+        assert check._refresh_started_at == 2.0
+
+
+class TestHealthCheckMiddleware:
+    def test_liveness(self, client, mocker):
+        is_ready = mocker.patch.object(readiness_check, "is_ready")
+
+        response = client.get("/lbcheck/live")
+
+        assert response.status_code == 200
+        is_ready.assert_not_called()
+
+    @pytest.mark.parametrize("path", ["/lbcheck", "/lbcheck/ready"])
+    def test_readiness(self, client, path):
+        readiness_check.refresh()
+
+        assert client.get(path).status_code == 200
+
+    def test_not_ready(self, client, mocker):
+        mocker.patch.object(ReadinessCheck, "check_migrations", return_value=False)
+        readiness_check.refresh()
+
+        assert client.get("/lbcheck").status_code == 503
@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.content.models import ContentItem
+from apps.notifications.models import Notification
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def notifications(user, notification_factory):
+    notifications = notification_factory.create_batch(7, user=user)
+    # Rows with equal creation times are told apart by their ids
+    created_at = timezone.now() - datetime.timedelta(hours=1)
+    Notification.objects.filter(pk__in=[notification.pk for notification in notifications[2:5]]).update(
+        created_at=created_at
+    )
+    return list(Notification.objects.filter(user=user).order_by("-created_at", "-id"))
+
+
+@pytest.fixture
+def authenticated_client(api_client, user):
+    api_client.force_authenticate(user)
+    return api_client
+
+
+def get_ids(response) -> list[str]:
+    return [item["id"] for item in response.json()["results"]]
+
+
+class TestKeysetPagination:
+    def test_pages_follow_ordering_without_gaps(self, authenticated_client, notifications):
+        url = f"{reverse('notification-list')}?page_size=3"
+
+        ids = []
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            ids.extend(get_ids(response))
+            url = response.json()["next"]
+
+        assert ids == [str(notification.id) for notification in notifications]
+
+    def test_previous_link_returns_previous_page(self, authenticated_client, notifications):
+        first_page = authenticated_client.get(f"{reverse('notification-list')}?page_size=3").json()
+        assert first_page["previous"] is None
+
+        second_page = authenticated_client.get(first_page["next"]).json()
+        previous_page = authenticated_client.get(second_page["previous"]).json()
+
+        assert [item["id"] for item in previous_page["results"]] == [item["id"] for item in first_page["results"]]
+        assert previous_page["previous"] is None
+        assert previous_page["next"] is not None
+
+    def test_deep_page_is_read_with_single_query(
+        self, authenticated_client, notifications, user, django_assert_num_queries
+    ):
+        first_page = authenticated_client.get(f"{reverse('notification-list')}?page_size=2").json()
+
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(first_page["next"])
+
+        assert get_ids(response) == [str(notification.id) for notification in notifications[2:4]]
+
+    def test_cursor_is_opaque(self, authenticated_client, notifications):
+        next_link = authenticated_client.get(f"{reverse('notification-list')}?page_size=3").json()["next"]
+
+        cursor = next_link.split("cursor=")[1]
+        assert str(notifications[2].id) not in cursor
+        assert str(notifications[2].pk.id) not in cursor
+
+    def test_invalid_cursor(self, authenticated_client, notifications):
+        response = authenticated_client.get(f"{reverse('notification-list')}?cursor=not-a-cursor")
+
+        assert response.status_code == 404
+
+    def test_results_are_limited_to_max_page_size(self, authenticated_client, notification_factory, user):
+        notification_factory.create_batch(101, user=user)
+
+        response = authenticated_client.get(f"{reverse('notification-list')}?page_size=1000")
+
+        assert len(get_ids(response)) == 100
+
+    def test_count_is_opt_in(self, authenticated_client, notifications):
+        url = reverse("notification-list")
+
+        assert "count" not in authenticated_client.get(url).json()
+        assert authenticated_client.get(f"{url}?with_count=true").json()["count"] == len(notifications)
+
+    def test_large_count_is_estimated(self, authenticated_client, notifications, settings, django_assert_num_queries):
+        settings.PAGINATION_EXACT_COUNT_THRESHOLD = 0
+
+        with django_assert_num_queries(2):
+            response = authenticated_client.get(f"{reverse('notification-list')}?with_count=true")
+
+        assert isinstance(response.json()["count"], int)
+
+
+class TestContentItemsByType:
+    def test_items_are_paginated(self, api_client):
+        items = [
+            ContentItem.objects.create(external_id=f"entry-{index}", content_type="article", fields={})
+            for index in range(3)
+        ]
+        ContentItem.objects.create(external_id="other", content_type="page", fields={})
+
+        response = api_client.get(f"{reverse('content-items-by-type')}?type=article&page_size=2")
+        next_page = api_client.get(response.json()["next"])
+
+        assert get_ids(response) + get_ids(next_page) == [str(item.id) for item in reversed(items)]
+        assert next_page.json()["next"] is None
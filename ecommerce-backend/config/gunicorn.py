@@ -33,3 +33,13 @@ class HealthCheckFilter(logging.Filter):
 
 def on_starting(server):
     server.log.access_log.addFilter(HealthCheckFilter())
+
+
+def post_worker_init(worker):
+    # Start computing readiness (including the migration plan) at boot, so it's known by the time the first probe comes
+    from apps.finances.cache import customer_cache
+    from common.health import readiness_check
+
+    readiness_check.refresh_in_background()
+    # Finance endpoints resolve the tenant's Stripe customer on every request
+    customer_cache.warm_in_background()
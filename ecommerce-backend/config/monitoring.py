@@ -8,7 +8,7 @@ from sentry_sdk.scope import add_global_event_processor
 
 @add_global_event_processor
 def processor(event, hint):
-    if event.get("type") == "transaction" and event.get("transaction") == "/lbcheck":
+    if event.get("type") == "transaction" and event.get("transaction", "").startswith("/lbcheck"):
         return None
     return event
 
@@ -2,11 +2,12 @@
 ASGI routing configuration for WebSocket connections.
 Works alongside REST API for real-time features.
 """
-from channels.auth import AuthMiddlewareStack
+
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.urls import re_path
 
+from apps.users.authentication import JSONWebTokenCookieMiddleware
 from apps.websockets.consumers import NotificationConsumer, TenantConsumer
 
 websocket_urlpatterns = [
@@ -16,6 +17,6 @@ websocket_urlpatterns = [
 
 application = ProtocolTypeRouter(
     {
-        "websocket": AllowedHostsOriginValidator(AuthMiddlewareStack(URLRouter(websocket_urlpatterns))),
+        "websocket": AllowedHostsOriginValidator(JSONWebTokenCookieMiddleware(URLRouter(websocket_urlpatterns))),
     }
 )
@@ -3,6 +3,7 @@ import json
 import os
 
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 from . import monitoring
 
@@ -57,6 +58,8 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    # Management commands of the shared modules, e.g. their benchmarks; it has no models of its own
+    "common",
     "apps.content",
     "apps.finances",
     "apps.users",
@@ -168,15 +171,44 @@ DATABASES = {
 
 REDIS_CONNECTION = env("REDIS_CONNECTION")
 
+# "core" keeps a redis list for every channel, a group send pushes the message onto the list of each of the group's
+# members. "pubsub" publishes it once to the group's redis channel and every process hands it to its own members, so a
+# group send costs the same for 10 or 50k members; messages of a consumer which isn't connected aren't kept though.
+# Either mode shards channels and groups across CHANNEL_LAYER_HOSTS on a consistent hash ring of their names, so adding
+# a host moves about 1/N of them, see apps.websockets.layers.HashRing.
+CHANNEL_LAYER_MODE = env("CHANNEL_LAYER_MODE", default="core")
+CHANNEL_LAYER_HOSTS = env.list("CHANNEL_LAYER_HOSTS", default=[REDIS_CONNECTION])
+CHANNEL_LAYER_BACKENDS = {
+    "core": "apps.websockets.layers.RedisChannelLayer",
+    "pubsub": "apps.websockets.layers.RedisPubSubChannelLayer",
+}
+if CHANNEL_LAYER_MODE not in CHANNEL_LAYER_BACKENDS:
+    raise ImproperlyConfigured(
+        f"CHANNEL_LAYER_MODE must be one of {', '.join(CHANNEL_LAYER_BACKENDS)}, not {CHANNEL_LAYER_MODE!r}"
+    )
+
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": CHANNEL_LAYER_BACKENDS[CHANNEL_LAYER_MODE],
         "CONFIG": {
-            "hosts": [REDIS_CONNECTION],
+            "hosts": CHANNEL_LAYER_HOSTS,
         },
     },
 }
 
+# Topics a WebSocket connection can be subscribed to at once, see apps.websockets.topics
+WEBSOCKET_MAX_TOPIC_SUBSCRIPTIONS = env.int("WEBSOCKET_MAX_TOPIC_SUBSCRIPTIONS", default=50)
+
+# Frames a WebSocket connection may have yet to send, and what happens to another one: "coalesce", "drop_oldest" or
+# "disconnect", see apps.websockets.send_queue.SendQueuePolicy
+WEBSOCKET_SEND_QUEUE_SIZE = env.int("WEBSOCKET_SEND_QUEUE_SIZE", default=100)
+WEBSOCKET_SEND_QUEUE_POLICY = env("WEBSOCKET_SEND_QUEUE_POLICY", default="coalesce")
+
+# Seconds between the heartbeat pings of a WebSocket connection, and after which a connection whose client didn't send
+# anything is closed as dead, see apps.websockets.heartbeat
+WEBSOCKET_HEARTBEAT_INTERVAL = env.float("WEBSOCKET_HEARTBEAT_INTERVAL", default=30)
+WEBSOCKET_HEARTBEAT_TIMEOUT = env.float("WEBSOCKET_HEARTBEAT_TIMEOUT", default=75)
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -185,6 +217,28 @@ CACHES = {
     }
 }
 
+TENANT_CONTEXT_CACHE_TIMEOUT = env.int("TENANT_CONTEXT_CACHE_TIMEOUT", default=60 * 5)
+TENANT_CONTEXT_LOCAL_CACHE_TIMEOUT = env.float("TENANT_CONTEXT_LOCAL_CACHE_TIMEOUT", default=5)
+TENANT_CONTEXT_LOCAL_CACHE_MAX_SIZE = env.int("TENANT_CONTEXT_LOCAL_CACHE_MAX_SIZE", default=1024)
+
+# Tenants are mapped to their Stripe customers by apps.finances.cache. A tenant's customer never changes, so the shared
+# mapping is kept for a day; a tenant without a customer is resolved under a lock held for at most the lock timeout.
+STRIPE_CUSTOMER_CACHE_TIMEOUT = env.int("STRIPE_CUSTOMER_CACHE_TIMEOUT", default=60 * 60 * 24)
+STRIPE_CUSTOMER_LOCAL_CACHE_TIMEOUT = env.float("STRIPE_CUSTOMER_LOCAL_CACHE_TIMEOUT", default=60)
+STRIPE_CUSTOMER_LOCAL_CACHE_MAX_SIZE = env.int("STRIPE_CUSTOMER_LOCAL_CACHE_MAX_SIZE", default=4096)
+STRIPE_CUSTOMER_LOCK_TIMEOUT = env.float("STRIPE_CUSTOMER_LOCK_TIMEOUT", default=10)
+STRIPE_CUSTOMER_LOCK_POLL_INTERVAL = env.float("STRIPE_CUSTOMER_LOCK_POLL_INTERVAL", default=0.05)
+
+# Prices and products are kept in process by apps.finances.cache.PriceCatalog. A change is applied right away in the
+# process that saved it; other processes compare their catalog with the shared version at most this often.
+PRICE_CATALOG_VERSION_CHECK_INTERVAL = env.float("PRICE_CATALOG_VERSION_CHECK_INTERVAL", default=5)
+
+# Authenticated users are built from a cached snapshot, see apps.users.cache. The local timeout is the upper bound on
+# how long another worker may still accept a user that has been deactivated or has lost a group or tenant membership.
+PRINCIPAL_CACHE_TIMEOUT = env.int("PRINCIPAL_CACHE_TIMEOUT", default=60 * 15)
+PRINCIPAL_LOCAL_CACHE_TIMEOUT = env.float("PRINCIPAL_LOCAL_CACHE_TIMEOUT", default=5)
+PRINCIPAL_LOCAL_CACHE_MAX_SIZE = env.int("PRINCIPAL_LOCAL_CACHE_MAX_SIZE", default=4096)
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -242,12 +296,17 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "apps.users.authentication.JSONWebTokenCookieAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.JSONWebTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_THROTTLE_RATES": {"anon": "100/day"},
+    "DEFAULT_PAGINATION_CLASS": "common.pagination.KeysetPagination",
+    "PAGE_SIZE": env.int("API_PAGE_SIZE", default=25),
 }
 
+# Total counts requested from list endpoints are estimated by the planner above this number of rows
+PAGINATION_EXACT_COUNT_THRESHOLD = env.int("PAGINATION_EXACT_COUNT_THRESHOLD", default=10_000)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": datetime.timedelta(minutes=env.int("ACCESS_TOKEN_LIFETIME_MINUTES", default=5)),
     "REFRESH_TOKEN_LIFETIME": datetime.timedelta(days=env.int("REFRESH_TOKEN_LIFETIME_DAYS", default=7)),
@@ -258,6 +317,13 @@ SIMPLE_JWT = {
 ACCESS_TOKEN_COOKIE = "token"
 REFRESH_TOKEN_COOKIE = "refresh_token"
 REFRESH_TOKEN_LOGOUT_COOKIE = "refresh_token_logout"
+# Where outstanding and blacklisted refresh tokens are kept. RedisTokenStore writes to the token_blacklist tables in
+# batches of JWT_TOKEN_STORE_BATCH_SIZE from the flush_token_store task, DatabaseTokenStore writes on every request.
+JWT_TOKEN_STORE = env("JWT_TOKEN_STORE", default="apps.users.token_store.RedisTokenStore")
+JWT_TOKEN_STORE_BATCH_SIZE = env.int("JWT_TOKEN_STORE_BATCH_SIZE", default=1000)
+# Redis of RedisTokenStore. Revocations must never be evicted, so in production it should point to an instance with
+# maxmemory-policy noeviction; the default database only keeps them apart from the cache's FLUSHDB.
+JWT_TOKEN_STORE_REDIS_URL = env("JWT_TOKEN_STORE_REDIS_URL", default=f"{REDIS_CONNECTION}/1")
 COOKIE_MAX_AGE = 3600 * 24 * 14  # 14 days
 
 SOCIAL_AUTH_USER_MODEL = "users.User"
@@ -312,6 +378,14 @@ STRIPE_LIVE_MODE = env.bool("STRIPE_LIVE_MODE", default=False)
 DJSTRIPE_WEBHOOK_SECRET = env("DJSTRIPE_WEBHOOK_SECRET", default="")
 DJSTRIPE_FOREIGN_KEY_TO_FIELD = "id"
 
+# In the async mode the webhook only verifies and stores Stripe events, they are processed by celery workers in order
+# of their customer. A failed event is retried STRIPE_WEBHOOK_MAX_ATTEMPTS times, then it's left for the
+# replay_stripe_events command.
+STRIPE_WEBHOOK_ASYNC_PROCESSING = env.bool("STRIPE_WEBHOOK_ASYNC_PROCESSING", default=False)
+STRIPE_WEBHOOK_MAX_ATTEMPTS = env.int("STRIPE_WEBHOOK_MAX_ATTEMPTS", default=5)
+if STRIPE_WEBHOOK_ASYNC_PROCESSING:
+    DJSTRIPE_WEBHOOK_EVENT_CALLBACK = "apps.finances.webhook_ingestion.queue_webhook_event"
+
 
 def tenant_request_callback(request):
     return request.tenant
@@ -330,6 +404,55 @@ SUBSCRIPTION_TRIAL_PERIOD_DAYS = env("SUBSCRIPTION_TRIAL_PERIOD_DAYS", default=7
 
 NOTIFICATIONS_STRATEGIES = ["InAppNotificationStrategy"]
 
+# Number of recipients notified per transaction by a broadcast, and number of WebSocket messages sent concurrently.
+# Every concurrent message holds a connection of the channel layer's redis pool (100 connections by default).
+NOTIFICATIONS_BROADCAST_CHUNK_SIZE = env.int("NOTIFICATIONS_BROADCAST_CHUNK_SIZE", default=2000)
+NOTIFICATIONS_BROADCAST_PUBLISH_BATCH_SIZE = env.int("NOTIFICATIONS_BROADCAST_PUBLISH_BATCH_SIZE", default=50)
+
+# Seconds WebSocket frames published to the same user are collected for, to be sent with a single channel layer message
+NOTIFICATIONS_PUBLISH_WINDOW = env.float("NOTIFICATIONS_PUBLISH_WINDOW", default=0.02)
+
+# Number of notification events kept per user for clients which reconnect, and seconds they are kept for since the
+# user's last event
+NOTIFICATIONS_STREAM_MAX_LENGTH = env.int("NOTIFICATIONS_STREAM_MAX_LENGTH", default=200)
+NOTIFICATIONS_STREAM_TIMEOUT = env.int("NOTIFICATIONS_STREAM_TIMEOUT", default=60 * 60 * 24)
+# Redis of the notification streams, a database apart from the cache's so flushing the cache doesn't drop them. A lost
+# stream only makes its clients resync.
+NOTIFICATIONS_STREAM_REDIS_URL = env("NOTIFICATIONS_STREAM_REDIS_URL", default=f"{REDIS_CONNECTION}/2")
+
+# Number of outbox messages claimed and dispatched per transaction by the outbox relay, and seconds between relay runs
+# scheduled by celery beat
+NOTIFICATIONS_OUTBOX_BATCH_SIZE = env.int("NOTIFICATIONS_OUTBOX_BATCH_SIZE", default=500)
+NOTIFICATIONS_OUTBOX_RELAY_INTERVAL = env.float("NOTIFICATIONS_OUTBOX_RELAY_INTERVAL", default=5.0)
+
+# Number of due scheduled notifications claimed and sent per transaction, and number of tasks a backlog of them is
+# drained by in parallel
+NOTIFICATIONS_SCHEDULED_BATCH_SIZE = env.int("NOTIFICATIONS_SCHEDULED_BATCH_SIZE", default=1000)
+NOTIFICATIONS_SCHEDULED_WORKERS = env.int("NOTIFICATIONS_SCHEDULED_WORKERS", default=4)
+
+# Unread notification counters are cached for this many seconds since they were last counted or changed. Celery beat
+# recounts the cached counters in the database every NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_INTERVAL seconds, in
+# batches of NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_BATCH_SIZE users
+NOTIFICATIONS_UNREAD_COUNTER_TIMEOUT = env.int("NOTIFICATIONS_UNREAD_COUNTER_TIMEOUT", default=60 * 60 * 24)
+NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_INTERVAL = env.float(
+    "NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_INTERVAL", default=60.0 * 15
+)
+NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_BATCH_SIZE = env.int(
+    "NOTIFICATIONS_UNREAD_COUNTER_RECONCILE_BATCH_SIZE", default=1000
+)
+
+# Number of Contentful entries written by a single upsert during content sync
+CONTENT_SYNC_CHUNK_SIZE = env.int("CONTENT_SYNC_CHUNK_SIZE", default=1000)
+
+# Readiness probe: seconds a status is served before it's refreshed in the background, seconds between migration plan
+# checks (retried sooner while migrations are pending), the bound for database / redis pings and the bound for a
+# migration plan check
+HEALTH_CHECK_INTERVAL = env.float("HEALTH_CHECK_INTERVAL", default=5.0)
+HEALTH_CHECK_MIGRATIONS_INTERVAL = env.float("HEALTH_CHECK_MIGRATIONS_INTERVAL", default=300.0)
+HEALTH_CHECK_MIGRATIONS_RETRY_INTERVAL = env.float("HEALTH_CHECK_MIGRATIONS_RETRY_INTERVAL", default=30.0)
+HEALTH_CHECK_TIMEOUT = env.float("HEALTH_CHECK_TIMEOUT", default=2.0)
+HEALTH_CHECK_MIGRATIONS_TIMEOUT = env.float("HEALTH_CHECK_MIGRATIONS_TIMEOUT", default=60.0)
+
 SHELL_PLUS_IMPORTS = []
 
 AWS_STORAGE_BUCKET_NAME = env("AWS_STORAGE_BUCKET_NAME", default=None)
@@ -340,6 +463,12 @@ AWS_QUERYSTRING_EXPIRE = env("AWS_QUERYSTRING_EXPIRE", default=60 * 60 * 24)
 AWS_CLOUDFRONT_KEY = os.environ.get("AWS_CLOUDFRONT_KEY", "").encode("ascii")
 AWS_CLOUDFRONT_KEY_ID = os.environ.get("AWS_CLOUDFRONT_KEY_ID", None)
 USER_DATA_EXPORT_EXPIRY_SECONDS = env.int("USER_DATA_EXPORT_EXPIRY_SECONDS", 172800)  # 2 days default
+# User files are streamed into the export archive; at most WORKERS * PREFETCH_CHUNKS * CHUNK_SIZE bytes of downloads
+# and one upload part of PART_SIZE bytes (5 MiB at least, as required by S3) are held in memory per export
+USER_DATA_EXPORT_DOWNLOAD_WORKERS = env.int("USER_DATA_EXPORT_DOWNLOAD_WORKERS", default=4)
+USER_DATA_EXPORT_CHUNK_SIZE = env.int("USER_DATA_EXPORT_CHUNK_SIZE", default=1024 * 1024)
+USER_DATA_EXPORT_PREFETCH_CHUNKS = env.int("USER_DATA_EXPORT_PREFETCH_CHUNKS", default=4)
+USER_DATA_EXPORT_PART_SIZE = env.int("USER_DATA_EXPORT_PART_SIZE", default=8 * 1024 * 1024)
 
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
@@ -359,7 +488,7 @@ USER_DOCUMENTS_NUMBER_LIMIT = env.int("USER_DOCUMENTS_NUMBER_LIMIT", default=10)
 TENANT_INVITATION_TIMEOUT = env("TENANT_INVITATION_TIMEOUT", default=60 * 60 * 24 * 14)
 
 CELERY_RESULT_BACKEND = "django-db"
-CELERY_BROKER_URL = f'{env("REDIS_CONNECTION")}/0'
+CELERY_BROKER_URL = f"{env('REDIS_CONNECTION')}/0"
 CELERY_BROKER_TRANSPORT_OPTIONS = {
     "visibility_timeout": 3600,
 }
@@ -372,6 +501,12 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD", default=None)
 EMAIL_FROM_ADDRESS = env("EMAIL_FROM_ADDRESS", default=None)
 EMAIL_REPLY_ADDRESS = env.list("EMAIL_REPLY_ADDRESS", default=(EMAIL_FROM_ADDRESS,))
 
+# Number of long-lived node email renderer processes per worker process; 0 spawns a new node process per email
+EMAIL_RENDERER_POOL_SIZE = env.int("EMAIL_RENDERER_POOL_SIZE", default=2)
+EMAIL_RENDERER_TIMEOUT = env.float("EMAIL_RENDERER_TIMEOUT", default=30)
+EMAIL_RENDERER_NODE_BINARY = env("EMAIL_RENDERER_NODE_BINARY", default="node")
+EMAIL_RENDERER_WORKING_DIR = env("EMAIL_RENDERER_WORKING_DIR", default="/app/scripts/runtime")
+
 AWS_SES_REGION_NAME = env("AWS_SES_REGION_NAME", default=AWS_REGION)
 
 # If you want to use the SESv2 client
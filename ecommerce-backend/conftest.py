@@ -72,6 +72,16 @@ def storage(mocker):
             yield storage
 
 
+@pytest.fixture(autouse=True)
+def price_catalog():
+    """Prices are created by each test, so the in-process catalog must not outlive it"""
+    from apps.finances.cache import price_catalog
+
+    price_catalog.clear()
+    yield price_catalog
+    price_catalog.clear()
+
+
 @pytest.fixture
 def s3_exports_bucket():
     with mock_s3():
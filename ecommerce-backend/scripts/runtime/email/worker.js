@@ -0,0 +1,44 @@
+// Long-lived email renderer used by common.email_renderer.EmailRendererPool.
+// It reads newline-delimited JSON requests from stdin and writes one JSON response per line to stdout:
+//   request:  {"id": 1, "type": "ACCOUNT_ACTIVATION", "data": {...}}  or  {"id": 2, "ping": true}
+//   response: {"id": 1, "result": {"subject": "...", "html": "..."}}  or  {"id": 1, "error": "..."}
+const readline = require('readline');
+
+const write = (response) => {
+  process.stdout.write(`${JSON.stringify(response)}\n`);
+};
+
+// stdout is reserved for the protocol, anything logged by the renderer goes to stderr
+console.log = console.error;
+console.info = console.error;
+
+const { renderEmail } = require('./index');
+
+const lines = readline.createInterface({ input: process.stdin, terminal: false });
+
+lines.on('line', (line) => {
+  if (!line.trim()) {
+    return;
+  }
+
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (e) {
+    write({ id: null, error: `Invalid request: ${e.message}` });
+    return;
+  }
+
+  if (request.ping) {
+    write({ id: request.id, result: 'pong' });
+    return;
+  }
+
+  try {
+    write({ id: request.id, result: renderEmail(request.type, request.data) });
+  } catch (e) {
+    write({ id: request.id, error: (e && e.stack) || String(e) });
+  }
+});
+
+lines.on('close', () => process.exit(0));
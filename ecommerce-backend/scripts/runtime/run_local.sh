@@ -29,6 +29,7 @@ else
     python manage.py djstripe_sync_models Product Price
     python manage.py init_subscriptions
     python manage.py init_customers_plans
+    python manage.py warm_stripe_customer_cache
     echo "Stripe initialized"
 fi
 
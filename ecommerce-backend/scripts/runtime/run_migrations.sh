@@ -3,3 +3,4 @@
 /bin/chamber exec $CHAMBER_SERVICE_NAME -- ./manage.py migrate
 /bin/chamber exec $CHAMBER_SERVICE_NAME -- ./manage.py init_subscriptions
 /bin/chamber exec $CHAMBER_SERVICE_NAME -- ./manage.py init_customers_plans
+/bin/chamber exec $CHAMBER_SERVICE_NAME -- ./manage.py warm_stripe_customer_cache
@@ -6,7 +6,13 @@ import { Button } from '@/components/ui/button';
 import { ShoppingCart, Loader2 } from 'lucide-react';
 
 export default function ProductsPage() {
-  const { data: products, isLoading } = useContentItems('product');
+  const {
+    items: products,
+    isLoading,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage,
+  } = useContentItems('product');
 
   if (isLoading) {
     return (
@@ -24,7 +30,7 @@ export default function ProductsPage() {
       </div>
 
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-        {products?.map((product) => (
+        {products.map((product) => (
           <Card key={product.id} className="flex flex-col">
             {product.fields.image && (
               <div className="aspect-video w-full overflow-hidden rounded-t-lg bg-gray-100 relative">
@@ -62,12 +68,20 @@ export default function ProductsPage() {
           </Card>
         ))}
 
-        {(!products || products.length === 0) && (
+        {products.length === 0 && (
           <div className="col-span-full text-center py-12">
             <p className="text-gray-500">No products found.</p>
           </div>
         )}
       </div>
+
+      {hasNextPage && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={() => fetchNextPage()} isLoading={isFetchingNextPage}>
+            Load more
+          </Button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,4 +1,4 @@
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery } from '@tanstack/react-query';
 import apiClient from '@/lib/api-client';
 
 export interface ContentItem {
@@ -12,15 +12,33 @@ export interface ContentItem {
   updated_at: string;
 }
 
+interface ContentItemsResponse {
+  next: string | null;
+  previous: string | null;
+  count?: number;
+  results: ContentItem[];
+}
+
 export const useContentItems = (type?: string) => {
-  return useQuery({
+  const query = useInfiniteQuery({
     queryKey: ['content-items', type],
-    queryFn: async () => {
-      const params = type ? { content_type: type } : {};
-      const response = await apiClient.get<ContentItem[]>('/content/items/', { params });
+    queryFn: async ({ pageParam }) => {
+      // Pages after the first one are fetched from the cursor link of the previous page
+      const response = pageParam
+        ? await apiClient.get<ContentItemsResponse>(pageParam)
+        : await apiClient.get<ContentItemsResponse>('/content/items/', {
+            params: type ? { content_type: type } : {},
+          });
       return response.data;
     },
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next,
   });
+
+  return {
+    ...query,
+    items: query.data?.pages.flatMap((page) => page.results) ?? [],
+  };
 };
 
 export const useProductContent = () => {
@@ -49,6 +49,12 @@ export function useWebSocket({
     };
 
     ws.onmessage = (event) => {
+      // Connections which don't answer the server's heartbeat are closed
+      if (event.data === '{"type":"ping"}') {
+        ws.send('{"type":"pong"}');
+        return;
+      }
+
       try {
         const message = JSON.parse(event.data) as WebSocketMessage;
         onMessage?.(message);